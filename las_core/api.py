@@ -96,6 +96,36 @@ async def health_check():
     logger.info("Health check endpoint called")
     return {"status": "healthy", "version": "0.1.0", "api_version": "v1"}
 
+@app.on_event("shutdown")
+async def close_connection_pools():
+    """Close the keep-alive HTTP clients shared by the providers."""
+    from services.connection_pool import get_connection_pool
+    await get_connection_pool().close_all()
+
+@app.on_event("shutdown")
+async def flush_ingestion_pipeline():
+    """Write out texts still queued for RAG ingestion."""
+    from services.ingestion_pipeline import get_ingestion_pipeline
+    await get_ingestion_pipeline().aflush(timeout=30)
+
+@app.on_event("shutdown")
+async def flush_cost_tracker():
+    """Write out buffered LLM usage."""
+    from services.cost_tracker import get_cost_tracker
+    get_cost_tracker().close()
+
+@app.on_event("shutdown")
+async def stop_task_queue():
+    """Stop the task queue workers."""
+    from services.task_queue import get_task_queue
+    get_task_queue().close()
+
+@app.on_event("shutdown")
+async def flush_audit_log():
+    """Commit queued audit events."""
+    from security.audit_logger import get_audit_logger
+    get_audit_logger().close()
+
 from fastapi.openapi.utils import get_openapi
 
 def custom_openapi():
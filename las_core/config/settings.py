@@ -36,6 +36,103 @@ class Settings(BaseSettings):
     qdrant_host: str = Field("localhost", alias="QDRANT_HOST")
     qdrant_port: int = Field(6333, alias="QDRANT_PORT")
 
+    # RAG Retrieval Config
+    rag_search_mode: str = Field("hybrid", alias="RAG_SEARCH_MODE")
+    rag_candidates: int = Field(20, alias="RAG_CANDIDATES")
+    rag_bm25_dir: Optional[str] = Field("data/bm25", alias="RAG_BM25_DIR")
+    rag_reranker_model: Optional[str] = Field(None, alias="RAG_RERANKER_MODEL")
+    rag_rerank_budget_ms: float = Field(150.0, alias="RAG_RERANK_BUDGET_MS")
+
+    # Agent Router Config
+    router_batch_size: int = Field(16, alias="ROUTER_BATCH_SIZE")
+    router_batch_wait_ms: float = Field(5.0, alias="ROUTER_BATCH_WAIT_MS")
+    router_cache_size: int = Field(1024, alias="ROUTER_CACHE_SIZE")
+    router_prototype_dir: Optional[str] = Field("data/router_prototypes", alias="ROUTER_PROTOTYPE_DIR")
+
+    # Conversation Memory Config
+    memory_token_budget: int = Field(8192, alias="MEMORY_TOKEN_BUDGET")
+    memory_summary_tokens: int = Field(512, alias="MEMORY_SUMMARY_TOKENS")
+    summarization_model: str = Field("pszemraj/led-base-book-summary", alias="SUMMARIZATION_MODEL")
+    summarization_quantize: str = Field("none", alias="SUMMARIZATION_QUANTIZE")
+    summarization_max_batch: int = Field(8, alias="SUMMARIZATION_MAX_BATCH")
+    summarization_linger_ms: float = Field(20.0, alias="SUMMARIZATION_LINGER_MS")
+
+    # Cost Tracking Config
+    cost_flush_interval_ms: float = Field(250.0, alias="COST_FLUSH_INTERVAL_MS")
+    budget_action: str = Field("reject", alias="BUDGET_ACTION")  # reject or downgrade
+    budget_downgrade_provider: Optional[str] = Field(None, alias="BUDGET_DOWNGRADE_PROVIDER")
+    budget_downgrade_model: Optional[str] = Field(None, alias="BUDGET_DOWNGRADE_MODEL")
+
+    # Task Queue Config
+    task_queue_workers: int = Field(4, alias="TASK_QUEUE_WORKERS")
+    task_queue_process_workers: int = Field(2, alias="TASK_QUEUE_PROCESS_WORKERS")
+    task_queue_aging_s: float = Field(30.0, alias="TASK_QUEUE_AGING_S")
+    task_queue_max_retries: int = Field(3, alias="TASK_QUEUE_MAX_RETRIES")
+    task_queue_retry_backoff_s: float = Field(1.0, alias="TASK_QUEUE_RETRY_BACKOFF_S")
+    task_queue_retention_s: float = Field(7 * 86400, alias="TASK_QUEUE_RETENTION_S")
+    task_queue_backend: str = Field("sqlite", alias="TASK_QUEUE_BACKEND")  # sqlite or memory
+    task_queue_db: str = Field("data/tasks/tasks.sqlite3", alias="TASK_QUEUE_DB")
+    task_queue_visibility_timeout_s: float = Field(300.0, alias="TASK_QUEUE_VISIBILITY_TIMEOUT_S")
+
+    # Audit Log Config
+    audit_log_dir: str = Field("data/audit_logs", alias="AUDIT_LOG_DIR")
+    audit_segment_max_entries: int = Field(10_000, alias="AUDIT_SEGMENT_MAX_ENTRIES")
+    audit_segment_max_bytes: int = Field(16 * 1024 * 1024, alias="AUDIT_SEGMENT_MAX_BYTES")
+    audit_batch_max: int = Field(512, alias="AUDIT_BATCH_MAX")
+    audit_linger_ms: float = Field(0.0, alias="AUDIT_LINGER_MS")
+    audit_fsync: bool = Field(True, alias="AUDIT_FSYNC")
+    audit_checkpoint_key_file: Optional[str] = Field("data/.audit_checkpoint_key", alias="AUDIT_CHECKPOINT_KEY_FILE")
+    audit_verify_workers: int = Field(4, alias="AUDIT_VERIFY_WORKERS")
+
+    # Worker Pool Config
+    worker_selection: str = Field("p2c", alias="WORKER_SELECTION")  # p2c or least_loaded
+    worker_heartbeat_timeout_s: float = Field(30.0, alias="WORKER_HEARTBEAT_TIMEOUT_S")
+    worker_probe_concurrency: int = Field(32, alias="WORKER_PROBE_CONCURRENCY")
+
+    # Embedding Cache Config
+    embedding_cache_max_entries: int = Field(50_000, alias="EMBEDDING_CACHE_MAX_ENTRIES")
+    embedding_cache_tier: str = Field("auto", alias="EMBEDDING_CACHE_TIER")
+    embedding_cache_dir: Optional[str] = Field("data/embedding_cache", alias="EMBEDDING_CACHE_DIR")
+    embedding_cache_ttl: int = Field(7 * 24 * 3600, alias="EMBEDDING_CACHE_TTL")
+    embedding_model_version: str = Field("1", alias="EMBEDDING_MODEL_VERSION")
+
+    # RAG Ingestion Pipeline Config
+    ingestion_max_batch_tokens: int = Field(8192, alias="INGESTION_MAX_BATCH_TOKENS")
+    ingestion_max_queue: int = Field(10_000, alias="INGESTION_MAX_QUEUE")
+    ingestion_linger_ms: float = Field(50.0, alias="INGESTION_LINGER_MS")
+
+    # Semantic Cache Config
+    semantic_cache_embedding_backend: str = Field("ollama", alias="SEMANTIC_CACHE_EMBEDDING_BACKEND")
+    semantic_cache_embedding_model: Optional[str] = Field(None, alias="SEMANTIC_CACHE_EMBEDDING_MODEL")
+    semantic_cache_max_entries: Optional[int] = Field(100_000, alias="SEMANTIC_CACHE_MAX_ENTRIES")
+    semantic_cache_max_bytes: Optional[int] = Field(None, alias="SEMANTIC_CACHE_MAX_BYTES")
+    semantic_cache_eviction_policy: str = Field("lru", alias="SEMANTIC_CACHE_EVICTION_POLICY")
+    semantic_cache_stale_ttl: float = Field(300.0, alias="SEMANTIC_CACHE_STALE_TTL")
+    completion_cache_enabled: bool = Field(True, alias="COMPLETION_CACHE_ENABLED")
+
+    # Query Concurrency Config
+    max_concurrent_queries: int = Field(8, alias="MAX_CONCURRENT_QUERIES")
+    max_queued_queries: int = Field(256, alias="MAX_QUEUED_QUERIES")
+    max_sessions: int = Field(1000, alias="MAX_SESSIONS")
+    session_idle_timeout: float = Field(3600.0, alias="SESSION_IDLE_TIMEOUT")
+
+    # Event Bus Config (SSE fan-out)
+    event_bus_backend: str = Field("auto", alias="EVENT_BUS_BACKEND")
+    event_bus_stream_key: str = Field("las:events", alias="EVENT_BUS_STREAM_KEY")
+    event_bus_buffer_size: int = Field(256, alias="EVENT_BUS_BUFFER_SIZE")
+    event_bus_history_size: int = Field(1000, alias="EVENT_BUS_HISTORY_SIZE")
+
+    # Rate Limit Config
+    rate_limit_backend: str = Field("auto", alias="RATE_LIMIT_BACKEND")  # auto, redis or memory
+    rate_limit_default: Optional[str] = Field(None, alias="RATE_LIMIT_DEFAULT")  # e.g. 100/minute
+    rate_limit_routes: str = Field(
+        "/api/v1/auth/login=5/minute,/api/v1/auth/register=3/hour,/api/v1/auth/refresh=10/minute",
+        alias="RATE_LIMIT_ROUTES"
+    )
+    rate_limit_users: str = Field("", alias="RATE_LIMIT_USERS")  # e.g. alice=1000/minute,role:admin=5000/minute
+    rate_limit_max_keys: int = Field(100_000, alias="RATE_LIMIT_MAX_KEYS")
+    rate_limit_key_prefix: str = Field("las:rl:", alias="RATE_LIMIT_KEY_PREFIX")
+
     # OpenRouter Config
     app_url: str = Field("https://github.com/your-repo/las", alias="APP_URL")
     app_name: str = Field("Local Agent System", alias="APP_NAME")
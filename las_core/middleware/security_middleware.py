@@ -1,97 +1,118 @@
 """
 Security Middleware - Add security headers and rate limiting.
+
+Both middlewares are plain ASGI callables: they pass the request straight
+through and only touch the http.response.start message, so no extra tasks
+or memory streams are created per request and streamed (SSE) responses are
+forwarded chunk by chunk.
 """
 
-from fastapi import Request, HTTPException, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
-import time
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import List, Optional, Tuple
+
+from services.rate_limiter import RateLimiter, get_rate_limiter
+
+# Security headers
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", b"default-src 'self'; script-src 'self' 'unsafe-inline';"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+]
 
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
+def _set_headers(message: Message, headers: List[Tuple[bytes, bytes]]):
+    """Set (replacing) raw headers on an http.response.start message."""
+    names = {name for name, _ in headers}
+    message["headers"] = [
+        (name, value) for name, value in message.get("headers", []) if name.lower() not in names
+    ] + headers
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """Add security headers to all responses."""
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        response = await call_next(request)
-        
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'; script-src 'self' 'unsafe-inline';"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        
-        return response
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Custom rate limiting for specific patterns."""
-    
-    def __init__(self, app):
-        super().__init__(app)
-        self.request_counts = {}  # In production, use Redis
-        self.window = 60  # 60 seconds
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
-        path = request.url.path
-        
-        # Strict rate limits for sensitive endpoints
-        strict_limits = {
-            "/api/auth/login": {"limit": 5, "window": 60},
-            "/api/auth/register": {"limit": 3, "window": 3600},
-            "/api/auth/refresh": {"limit": 10, "window": 60},
-        }
-        
-        # Check if path needs strict limiting
-        for pattern, config in strict_limits.items():
-            if pattern in path:
-                key = f"{client_ip}:{pattern}"
-                current_time = time.time()
-                
-                # Initialize or clean up old entries
-                if key not in self.request_counts:
-                    self.request_counts[key] = []
-                
-                # Remove old timestamps
-                self.request_counts[key] = [
-                    ts for ts in self.request_counts[key]
-                    if current_time - ts < config["window"]
-                ]
-                
-                # Check limit
-                if len(self.request_counts[key]) >= config["limit"]:
-                    return JSONResponse(
-                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                        content={
-                            "error": "Rate limit exceeded",
-                            "retry_after": config["window"]
-                        }
-                    )
-                
-                # Add current timestamp
-                self.request_counts[key].append(current_time)
-        
-        response = await call_next(request)
-        return response
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                _set_headers(message, SECURITY_HEADERS)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+class RateLimitMiddleware:
+    """Per-client rate limiting with per-route and per-user limits (see services.rate_limiter)."""
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or get_rate_limiter()
+
+    @staticmethod
+    def _identify(scope: Scope) -> Tuple[str, Optional[str], Optional[str]]:
+        """Client identity, username and role (user from a valid bearer token, else IP)."""
+        authorization = Headers(scope=scope).get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                from services.auth_service import get_auth_service
+                payload = get_auth_service().verify_token(authorization[7:], token_type="access")
+            except Exception:
+                payload = None
+            if payload and payload.get("username"):
+                return f"user:{payload['username']}", payload["username"], payload.get("role")
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        return f"ip:{client_ip}", None, None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        identity, user, role = self._identify(scope)
+        result = await self.limiter.check(identity, scope["path"], user, role)
+
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not result.allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={
+                    "error": "Rate limit exceeded",
+                    "retry_after": max(1, round(result.retry_after))
+                },
+                headers=result.headers()
+            )
+            await response(scope, receive, send)
+            return
+
+        limit_headers = [(name.lower().encode(), value.encode()) for name, value in result.headers().items()]
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                _set_headers(message, limit_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 def setup_security_middleware(app):
     """Setup all security middleware."""
-    # Add security headers
-    app.add_middleware(SecurityHeadersMiddleware)
-    
     # Add rate limiting
     app.add_middleware(RateLimitMiddleware)
-    
-    # Add rate limit exception handler
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-    
+
+    # Add security headers (outermost, so 429 responses get them too)
+    app.add_middleware(SecurityHeadersMiddleware)
+
     return app
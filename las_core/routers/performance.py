@@ -5,6 +5,9 @@ from services.semantic_cache import get_semantic_cache
 from services.cost_tracker import get_cost_tracker
 from services.task_queue import get_task_queue, TaskPriority, TaskStatus
 from services.worker_pool import get_worker_pool
+from services.ingestion_pipeline import get_ingestion_pipeline
+from services.embedding_cache import get_embedding_cache
+from services.summarization_service import get_summarization_service
 from middleware.auth_middleware import require_auth, require_admin_auth
 
 router = APIRouter()
@@ -40,6 +43,41 @@ async def clear_cache_stats(current_user = Depends(require_admin_auth)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# === Embedding Cache Endpoints ===
+
+@router.get("/embeddings/stats")
+async def get_embedding_cache_stats():
+    """Get embedding cache hit ratio and estimated time saved."""
+    return get_embedding_cache().get_stats()
+
+@router.post("/embeddings/clear-stats")
+async def clear_embedding_cache_stats(current_user = Depends(require_admin_auth)):
+    """Clear embedding cache statistics (admin only)."""
+    get_embedding_cache().clear_stats()
+    return {"status": "cleared"}
+
+# === RAG Ingestion Endpoints ===
+
+@router.get("/ingestion/stats")
+async def get_ingestion_stats():
+    """Get background ingestion pipeline statistics."""
+    return get_ingestion_pipeline().get_stats()
+
+@router.post("/ingestion/flush")
+async def flush_ingestion(timeout: Optional[float] = None):
+    """Wait until all queued texts are embedded and upserted."""
+    flushed = await get_ingestion_pipeline().aflush(timeout)
+    if not flushed:
+        raise HTTPException(status_code=504, detail="Ingestion flush timed out")
+    return {"status": "flushed", **get_ingestion_pipeline().get_stats()}
+
+# === Summarization Endpoints ===
+
+@router.get("/summarization/stats")
+async def get_summarization_stats():
+    """Get shared summarization service batching statistics."""
+    return get_summarization_service().get_stats()
+
 # === Cost Tracking Endpoints ===
 
 class BudgetRequest(BaseModel):
@@ -47,14 +85,21 @@ class BudgetRequest(BaseModel):
     amount: float
 
 @router.get("/cost/summary")
-async def get_cost_summary(period: str = "daily"):
-    """Get cost summary for a period (daily, monthly, total)."""
+async def get_cost_summary(period: str = "daily", group_by: str = "provider", key: Optional[str] = None):
+    """Get cost summary for a period (daily, monthly, total) by provider, model or agent."""
     try:
         tracker = get_cost_tracker()
-        return tracker.get_cost_summary(period=period)
+        return tracker.get_cost_summary(period=period, group_by=group_by, key=key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cost/daily")
+async def get_daily_costs(days: int = 30):
+    """Get the cost of each of the last N days."""
+    return {"days": get_cost_tracker().get_daily_costs(days)}
+
 @router.post("/cost/budget")
 async def set_budget(request: BudgetRequest):
     """Set budget limit for an agent."""
@@ -86,20 +131,43 @@ class TaskRequest(BaseModel):
     payload: Dict[str, Any]
     priority: str = "normal"
     agent: Optional[str] = None
+    max_retries: Optional[int] = None
+    idempotency_key: Optional[str] = None
+
+class BulkTaskRequest(BaseModel):
+    tasks: List[TaskRequest]
+
+def _enqueue_args(request: TaskRequest) -> Dict[str, Any]:
+    return {
+        "task_type": request.task_type,
+        "payload": request.payload,
+        "priority": TaskPriority(request.priority),
+        "agent": request.agent,
+        "max_retries": request.max_retries,
+        "idempotency_key": request.idempotency_key
+    }
 
 @router.post("/queue/enqueue")
 async def enqueue_task(request: TaskRequest):
     """Enqueue a task for async processing."""
     try:
         queue = get_task_queue()
-        priority = TaskPriority(request.priority)
-        task_id = queue.enqueue(
-            task_type=request.task_type,
-            payload=request.payload,
-            priority=priority,
-            agent=request.agent
-        )
+        task_id = queue.enqueue(**_enqueue_args(request))
         return {"task_id": task_id, "status": "enqueued"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/queue/enqueue/bulk")
+async def enqueue_tasks(request: BulkTaskRequest):
+    """Enqueue many tasks with a single write to the durable store."""
+    try:
+        queue = get_task_queue()
+        task_ids = queue.enqueue_many([_enqueue_args(task) for task in request.tasks])
+        return {"task_ids": task_ids, "status": "enqueued"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -117,6 +185,25 @@ async def get_task_status(task_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/queue/task/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    """Cancel a pending or running task."""
+    queue = get_task_queue()
+    if queue.get_task(task_id) is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    if not queue.cancel_task(task_id):
+        raise HTTPException(status_code=409, detail=f"Task {task_id} has already finished")
+    return {"task_id": task_id, "status": "cancelling"}
+
+@router.get("/queue/tasks")
+async def list_tasks(status: Optional[str] = None, agent: Optional[str] = None, limit: int = 100):
+    """List tasks by status and/or agent."""
+    try:
+        task_status = TaskStatus(status) if status else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"tasks": get_task_queue().list_tasks(status=task_status, agent=agent, limit=limit)}
+
 @router.get("/queue/stats")
 async def get_queue_stats():
     """Get queue statistics."""
@@ -126,12 +213,18 @@ async def get_queue_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/queue/cleanup")
+async def cleanup_tasks(max_age: Optional[float] = None, current_user = Depends(require_admin_auth)):
+    """Drop finished tasks older than max_age seconds (admin only)."""
+    return {"removed": get_task_queue().cleanup(max_age)}
+
 # === Worker Pool Endpoints ===
 
 class WorkerRegistration(BaseModel):
     worker_id: str
     url: str
     capabilities: List[str]
+    concurrency: int = 1
 
 @router.post("/workers/register")
 async def register_worker(request: WorkerRegistration):
@@ -141,7 +234,8 @@ async def register_worker(request: WorkerRegistration):
         success = pool.register_worker(
             worker_id=request.worker_id,
             url=request.url,
-            capabilities=request.capabilities
+            capabilities=request.capabilities,
+            concurrency=request.concurrency
         )
         if success:
             return {"status": "registered", "worker_id": request.worker_id}
@@ -162,6 +256,22 @@ async def list_workers():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/workers/{worker_id}/heartbeat")
+async def worker_heartbeat(worker_id: str):
+    """Record a worker heartbeat."""
+    if not get_worker_pool().heartbeat(worker_id):
+        raise HTTPException(status_code=404, detail="Worker not found")
+    return {"status": "ok", "worker_id": worker_id}
+
+@router.post("/workers/health")
+async def check_workers_health():
+    """Probe every worker's /health endpoint concurrently."""
+    try:
+        health = await get_worker_pool().check_health()
+        return {"workers": health, "offline": [w for w, healthy in health.items() if not healthy]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/workers/stats")
 async def get_worker_stats():
     """Get worker pool statistics."""
@@ -170,3 +280,11 @@ async def get_worker_stats():
         return pool.get_stats()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# === Rate Limit Endpoints ===
+
+@router.get("/rate-limit/stats")
+async def get_rate_limit_stats():
+    """Get rate limiter backend and configured limits."""
+    from services.rate_limiter import get_rate_limiter
+    return get_rate_limiter().get_stats()
@@ -1,20 +1,28 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
+from sse_starlette.sse import EventSourceResponse
 from sources.schemas import QueryRequest, QueryResponse
 from sources.logger import Logger
 from sources.utility import pretty_print
+from sources.cached_provider import get_completion_cache, CACHE_HIT, CACHE_STALE
+from services.query_scheduler import get_query_scheduler, SchedulerFullError
+from services.cost_tracker import BudgetExceededError
+from config.settings import settings
 import uuid
 import sys
+import json
 import asyncio
 
 router = APIRouter()
 logger = Logger("query_router.log")
 
 # Placeholder for the interaction service
-interaction_service = None 
-is_generating = False
+interaction_service = None
 query_resp_history = []
 
+class QueryFailedError(Exception):
+    """Raised when the agents could not answer; failures are never cached."""
+
 def set_interaction_service(service):
     global interaction_service
     interaction_service = service
@@ -40,16 +48,46 @@ async def think_wrapper(interaction, query):
         interaction.last_success = False
         raise e
 
+async def generate_answer(interaction, request: QueryRequest) -> dict:
+    """
+    Run the agents for a query and return a cacheable answer payload.
+    The caller is responsible for scheduling and provider selection; a
+    session runs one query at a time.
+
+    Raises:
+        QueryFailedError: If the agents did not produce an answer
+    """
+    success = await think_wrapper(interaction, request.query)
+    if not success:
+        raise QueryFailedError()
+
+    if not interaction.current_agent:
+        logger.error("No current agent found")
+        interaction.last_answer = "Error: No current agent"
+        raise QueryFailedError()
+
+    blocks_json = {f'{i}': block.jsonify() for i, block in enumerate(interaction.current_agent.get_blocks_result())}
+    logger.info(f"Answer: {interaction.last_answer}")
+    logger.info(f"Blocks: {blocks_json}")
+    return {
+        "answer": interaction.last_answer,
+        "reasoning": interaction.last_reasoning,
+        "agent_name": interaction.current_agent.agent_name,
+        "success": str(interaction.last_success),
+        "blocks": blocks_json
+    }
+
 @router.post("/query", response_model=QueryResponse)
 async def process_query(request: QueryRequest):
-    global is_generating, query_resp_history
-    
+    global query_resp_history
+
     if interaction_service is None:
         return JSONResponse(status_code=500, content={"error": "Interaction service not initialized"})
-    
-    interaction = interaction_service.get_interaction()
-    
-    logger.info(f"Processing query: {request.query}")
+
+    session_id = request.session_id or str(uuid.uuid4())
+    interaction = interaction_service.get_interaction(session_id)
+
+    logger.info(f"Processing query for session {session_id}: {request.query}")
     query_resp = QueryResponse(
         done="false",
         answer="",
@@ -58,60 +96,46 @@ async def process_query(request: QueryRequest):
         success="false",
         blocks={},
         status="Ready",
-        uid=str(uuid.uuid4())
+        uid=str(uuid.uuid4()),
+        session_id=session_id
     )
-    if is_generating:
-        logger.warning("Another query is being processed, please wait.")
-        return JSONResponse(status_code=429, content=query_resp.jsonify())
 
-    try:
-        is_generating = True
-        
-        # Update provider if specified
-        if request.provider and request.model:
-            logger.info(f"Switching provider to {request.provider} with model {request.model}")
-            # Assuming interaction.agents[0].provider is the shared provider instance
-            # Or access via interaction_service.provider if accessible
-            # Since we don't have direct access to interaction_service.provider here easily without getter
-            # We can access it via the first agent in interaction
-            if interaction.agents:
-                provider_instance = interaction.agents[0].provider
-                provider_instance.provider_name = request.provider
-                provider_instance.model = request.model
-                # Also update the available_providers dict if needed? 
-                # No, available_providers is a dict of functions, provider_name selects the key.
-                # We might need to re-initialize api_key if switching to a cloud provider that wasn't set?
-                # The Provider class handles api_key fetching in __init__ but we might need to trigger it if switching.
-                # Let's check Provider class again.
-                if request.provider in provider_instance.unsafe_providers:
-                     # Re-fetch API key just in case it wasn't loaded (though get_api_key loads dotenv)
-                     provider_instance.api_key = provider_instance.get_api_key(request.provider)
-
-        success = await think_wrapper(interaction, request.query)
-        is_generating = False
+    # Provider selection is per session; the shared provider is never reconfigured
+    if request.provider and request.model:
+        logger.info(f"Switching session to provider {request.provider} with model {request.model}")
+        interaction.use_provider(interaction_service.get_provider(request.provider, request.model))
 
-        if not success:
-            query_resp.answer = interaction.last_answer
-            query_resp.reasoning = interaction.last_reasoning
-            return JSONResponse(status_code=400, content=query_resp.jsonify())
+    # A stale hit is refreshed in the background against the history as of this request
+    snapshot = interaction.fork()
 
-        if interaction.current_agent:
-            blocks_json = {f'{i}': block.jsonify() for i, block in enumerate(interaction.current_agent.get_blocks_result())}
-        else:
-            logger.error("No current agent found")
-            blocks_json = {}
-            query_resp.answer = "Error: No current agent"
-            return JSONResponse(status_code=400, content=query_resp.jsonify())
+    try:
+        result, cache_status = await get_completion_cache().acomplete(
+            interaction.history_messages() + [{"role": "user", "content": request.query}],
+            provider=request.provider or settings.provider_name,
+            model=request.model or settings.provider_model,
+            temperature=None,
+            compute=lambda: get_query_scheduler().run(
+                session_id, lambda: generate_answer(interaction, request)
+            ),
+            bypass=request.cache_bypass or not settings.completion_cache_enabled,
+            ttl=request.cache_ttl,
+            refresh=lambda: get_query_scheduler().run(
+                session_id, lambda: generate_answer(snapshot, request)
+            )
+        )
+        if cache_status in (CACHE_HIT, CACHE_STALE):
+            # The agents did not run, so record the turn for the session's next query
+            logger.info(f"Query served from cache ({cache_status})")
+            interaction.record_turn(request.query, result["answer"])
 
-        logger.info(f"Answer: {interaction.last_answer}")
-        logger.info(f"Blocks: {blocks_json}")
         query_resp.done = "true"
-        query_resp.answer = interaction.last_answer
-        query_resp.reasoning = interaction.last_reasoning
-        query_resp.agent_name = interaction.current_agent.agent_name
-        query_resp.success = str(interaction.last_success)
-        query_resp.blocks = blocks_json
-        
+        query_resp.answer = result["answer"]
+        query_resp.reasoning = result["reasoning"]
+        query_resp.agent_name = result["agent_name"]
+        query_resp.success = result["success"]
+        query_resp.blocks = result["blocks"]
+        query_resp.cache = cache_status
+
         query_resp_dict = {
             "done": query_resp.done,
             "answer": query_resp.answer,
@@ -119,12 +143,23 @@ async def process_query(request: QueryRequest):
             "success": query_resp.success,
             "blocks": query_resp.blocks,
             "status": query_resp.status,
-            "uid": query_resp.uid
+            "uid": query_resp.uid,
+            "session_id": session_id
         }
         query_resp_history.append(query_resp_dict)
 
         logger.info("Query processed successfully")
         return JSONResponse(status_code=200, content=query_resp.jsonify())
+    except SchedulerFullError as e:
+        logger.warning(f"Query rejected: {str(e)}")
+        return JSONResponse(status_code=429, content=query_resp.jsonify())
+    except BudgetExceededError as e:
+        logger.warning(f"Query rejected: {str(e)}")
+        return JSONResponse(status_code=402, content={"error": str(e)})
+    except QueryFailedError:
+        query_resp.answer = interaction.last_answer
+        query_resp.reasoning = interaction.last_reasoning
+        return JSONResponse(status_code=400, content=query_resp.jsonify())
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         # Don't exit the process, just return error
@@ -135,3 +170,56 @@ async def process_query(request: QueryRequest):
         # For now, assuming save_session is handled within interaction or we need to pass config
         if interaction.recover_last_session: # Using attribute from interaction if available
              interaction.save_session()
+
+async def query_event_generator(interaction, request: QueryRequest, session_id: str):
+    """
+    Yield SSE events for a streamed query: the session id, node transitions,
+    token deltas, then a final (or error) event.
+    """
+    try:
+        async with get_query_scheduler().slot(session_id):
+            yield {"event": "session", "data": json.dumps({"session_id": session_id})}
+            interaction.last_query = request.query
+            async for event in interaction.astream_think():
+                yield {"event": event["type"], "data": json.dumps(event)}
+    except (SchedulerFullError, BudgetExceededError) as e:
+        yield {"event": "error", "data": json.dumps({"type": "error", "error": str(e)})}
+    finally:
+        if interaction.recover_last_session:
+            interaction.save_session()
+
+@router.post("/query/stream")
+async def process_query_stream(request: QueryRequest):
+    """
+    Streaming variant of /query: Server-Sent Events with LLM token deltas as
+    they are generated. Responses are not served from the completion cache.
+    """
+    if interaction_service is None:
+        return JSONResponse(status_code=500, content={"error": "Interaction service not initialized"})
+
+    scheduler = get_query_scheduler()
+    if scheduler.queued >= scheduler.max_queued:
+        return JSONResponse(status_code=429, content={"error": "Query queue is full"})
+
+    session_id = request.session_id or str(uuid.uuid4())
+    interaction = interaction_service.get_interaction(session_id)
+    logger.info(f"Streaming query for session {session_id}: {request.query}")
+    return EventSourceResponse(query_event_generator(interaction, request, session_id))
+
+@router.get("/sessions")
+async def list_sessions():
+    """List active sessions, least recently used first."""
+    if interaction_service is None:
+        return JSONResponse(status_code=500, content={"error": "Interaction service not initialized"})
+    return {"sessions": interaction_service.list_sessions(), "scheduler": get_query_scheduler().get_stats()}
+
+@router.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Drop a session's conversation history and agents."""
+    if interaction_service is None:
+        return JSONResponse(status_code=500, content={"error": "Interaction service not initialized"})
+    if get_query_scheduler().is_busy(session_id):
+        raise HTTPException(status_code=409, detail="Session has a query in progress")
+    if not interaction_service.close_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"status": "closed", "session_id": session_id}
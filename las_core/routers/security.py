@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
@@ -15,9 +16,12 @@ router = APIRouter()
 async def query_audit_logs(
     event_type: Optional[str] = None,
     agent: Optional[str] = None,
+    user: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
     limit: int = Query(100, le=1000)
 ):
-    """Query audit logs with filters."""
+    """Query audit logs with filters (newest first)."""
     try:
         logger = get_audit_logger()
         
@@ -26,6 +30,9 @@ async def query_audit_logs(
         logs = logger.query(
             event_type=event_type_enum,
             agent=agent,
+            user=user,
+            start_time=start_time,
+            end_time=end_time,
             limit=limit
         )
         
@@ -34,12 +41,30 @@ async def query_audit_logs(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/audit/verify")
-async def verify_audit_integrity():
-    """Verify integrity of audit log chain."""
+async def verify_audit_integrity(full: bool = False):
+    """Verify integrity of audit log chain (entries after the last checkpoint unless full)."""
     try:
         logger = get_audit_logger()
-        is_valid = logger.verify_integrity()
-        return {"valid": is_valid, "status": "intact" if is_valid else "compromised"}
+        report = await run_in_threadpool(logger.verify, full)
+        return {**report, "status": "intact" if report["valid"] else "compromised"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/audit/verify/range")
+async def verify_audit_range(
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    include_proof: bool = False
+):
+    """Verify the entries of a time window with a Merkle range proof."""
+    try:
+        logger = get_audit_logger()
+        proof = await run_in_threadpool(logger.prove_range, start_time, end_time)
+        report = logger.verifier.verify_range(proof)
+        result = {**report, "status": "intact" if report["valid"] else "compromised"}
+        if include_proof:
+            result["proof"] = proof
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
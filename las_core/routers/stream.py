@@ -1,42 +1,60 @@
 from fastapi import APIRouter, Request
 from sse_starlette.sse import EventSourceResponse
+from typing import Optional
 import asyncio
 import json
 from sources.logger import Logger
+from services.event_bus import get_event_bus
 
 router = APIRouter()
 logger = Logger("stream.log")
 
-# Global queue for broadcasting messages (simplified for single-instance)
-# In production, use Redis Pub/Sub
-message_queue = asyncio.Queue()
-
-async def event_generator():
-    while True:
-        # If client disconnects, this will throw
-        try:
-            message = await message_queue.get()
+async def event_generator(request: Request, last_event_id: Optional[str] = None):
+    """
+    Yield events for one SSE connection from its own bounded subscription.
+    """
+    bus = get_event_bus()
+    subscription = await bus.subscribe(last_event_id)
+    try:
+        while True:
+            # If client disconnects, this will throw
+            try:
+                message = await subscription.get()
+            except asyncio.CancelledError:
+                break
+            dropped = subscription.take_dropped()
+            if dropped:
+                # Slow consumer: tell the client it missed events
+                yield {
+                    "event": "overflow",
+                    "retry": 15000,
+                    "data": json.dumps({"dropped": dropped})
+                }
             yield {
                 "event": "message",
-                "id": "message_id",
+                "id": message["id"],
                 "retry": 15000,
-                "data": json.dumps(message)
+                "data": json.dumps({"type": message["type"], "data": message["data"]})
             }
-        except asyncio.CancelledError:
-            break
+    finally:
+        bus.unsubscribe(subscription)
 
 @router.get("/stream")
-async def stream(request: Request):
+async def stream(request: Request, last_event_id: Optional[str] = None):
     """
     Server-Sent Events endpoint for real-time agent updates.
+    Reconnecting clients resume after the Last-Event-ID header (or query parameter).
     """
-    return EventSourceResponse(event_generator())
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    return EventSourceResponse(event_generator(request, last_event_id))
+
+@router.get("/stream/stats")
+async def stream_stats():
+    """Event bus statistics."""
+    return get_event_bus().get_stats()
 
 async def broadcast_event(event_type: str, data: dict):
     """
-    Helper to push events to the queue.
+    Helper to publish events to all connected clients.
     """
-    await message_queue.put({
-        "type": event_type,
-        "data": data
-    })
+    return await get_event_bus().publish(event_type, data)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark audit store startup and query latency over a month of logs.
+
+Writes --per-day entries for each of --days days into a fresh store, then
+times reopening it and a set of filtered queries (cold first, then warm):
+
+    python scripts/benchmark_audit_query.py --days 30 --per-day 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security.audit_store import AuditStore
+
+EVENT_TYPES = ["tool_call", "decision", "file_access", "network_access", "code_execution", "error"]
+AGENTS = ["casual", "coder", "file", "browser", "planner"]
+
+
+def populate(store: AuditStore, days: int, per_day: int):
+    start = datetime.now() - timedelta(days=days)
+    step = 86400 / per_day
+    batch = []
+    for n in range(days * per_day):
+        batch.append({
+            "timestamp": (start + timedelta(seconds=n * step)).isoformat(),
+            "event_type": EVENT_TYPES[n % len(EVENT_TYPES)],
+            "action": f"action_{n}",
+            "agent": AGENTS[n % len(AGENTS)],
+            "user": f"user_{n % 50}",
+            "details": {"n": n},
+            "result": None,
+            "error": None,
+            "hash": f"{n:064x}",
+            "previous_hash": f"{max(n - 1, 0):064x}"
+        })
+        if len(batch) == 1000:
+            store.append(batch)
+            batch = []
+    store.append(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--per-day", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    storage_dir = tempfile.mkdtemp(prefix="las-audit-")
+    t0 = time.perf_counter()
+    populate(AuditStore(storage_dir), args.days, args.per_day)
+    print(f"wrote {args.days * args.per_day} entries in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    store = AuditStore(storage_dir)
+    print(f"startup: {(time.perf_counter() - t0) * 1000:.1f} ms, {len(store.segments())} segments")
+
+    now = datetime.now()
+    queries = {
+        "latest 100": {},
+        "event_type": {"event_type": "error"},
+        "agent+user": {"agent": "coder", "user": "user_6"},
+        "one day": {"start_time": now - timedelta(days=10), "end_time": now - timedelta(days=9)},
+        "type in week": {"event_type": "decision", "start_time": now - timedelta(days=20),
+                         "end_time": now - timedelta(days=13)},
+        "rare user": {"user": "user_unknown"},
+    }
+    print(f"{'query':<16}{'cold ms':>10}{'warm p50':>10}{'warm p99':>10}{'results':>9}")
+    for name, filters in queries.items():
+        t0 = time.perf_counter()
+        results = store.query(limit=100, **filters)
+        cold = (time.perf_counter() - t0) * 1000
+        warm = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            store.query(limit=100, **filters)
+            warm.append((time.perf_counter() - t0) * 1000)
+        print(f"{name:<16}{cold:>10.2f}{np.percentile(warm, 50):>10.2f}{np.percentile(warm, 99):>10.2f}"
+              f"{len(results):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request middleware overhead on a /health endpoint.
+
+Calls the ASGI app directly (no sockets) and reports p50/p99 latency for the
+bare app, the previous BaseHTTPMiddleware-based security stack, and the
+current pure-ASGI stack, each with security headers and a (never exceeded)
+rate limit:
+
+    python scripts/benchmark_middleware.py --requests 20000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Callable
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware.security_middleware import RateLimitMiddleware, SecurityHeadersMiddleware, SECURITY_HEADERS
+from services.rate_limiter import RateLimit, RateLimiter
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation this script compares against."""
+
+    async def dispatch(self, request: Request, call_next: Callable):
+        response = await call_next(request)
+        for name, value in SECURITY_HEADERS:
+            response.headers[name.decode()] = value.decode()
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation this script compares against."""
+
+    def __init__(self, app, limiter: RateLimiter):
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request: Request, call_next: Callable):
+        client_ip = request.client.host if request.client else "unknown"
+        result = await self.limiter.check(f"ip:{client_ip}", request.url.path)
+        if result is not None and not result.allowed:
+            return JSONResponse(status_code=429, content={"error": "Rate limit exceeded"}, headers=result.headers())
+        response = await call_next(request)
+        if result is not None:
+            response.headers.update(result.headers())
+        return response
+
+
+def make_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "version": "0.1.0", "api_version": "v1"}
+
+    limiter = RateLimiter(default=RateLimit(10 ** 9, 60))
+    if stack == "base_http":
+        app.add_middleware(LegacyRateLimitMiddleware, limiter=limiter)
+        app.add_middleware(LegacySecurityHeadersMiddleware)
+    elif stack == "asgi":
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+        app.add_middleware(SecurityHeadersMiddleware)
+    return app
+
+
+async def call(app, scope) -> int:
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(dict(scope), receive, send)
+    return status
+
+
+async def bench(stack: str, requests: int, warmup: int) -> np.ndarray:
+    app = make_app(stack)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/health", "raw_path": b"/health", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 50000), "server": ("localhost", 8000),
+    }
+    for _ in range(warmup):
+        assert await call(app, scope) == 200
+    latencies = np.empty(requests)
+    for n in range(requests):
+        t0 = time.perf_counter()
+        await call(app, scope)
+        latencies[n] = time.perf_counter() - t0
+    return latencies * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--warmup", type=int, default=1_000)
+    args = parser.parse_args()
+
+    results = {stack: await bench(stack, args.requests, args.warmup) for stack in ("bare", "base_http", "asgi")}
+    bare = np.percentile(results["bare"], [50, 99])
+    print(f"{args.requests} GET /health calls (us per request; overhead vs bare app)")
+    print(f"{'stack':<12}{'p50':>10}{'p99':>10}{'+p50':>10}{'+p99':>10}")
+    for stack, latencies in results.items():
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{stack:<12}{p50:>10.1f}{p99:>10.1f}{p50 - bare[0]:>10.1f}{p99 - bare[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
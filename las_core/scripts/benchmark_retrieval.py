@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark dense, BM25 and hybrid retrieval: recall@k and per-stage latency.
+
+Runs offline by default on a synthetic code/error-log corpus with the
+dependency-free hashing embeddings. Point it at real data with:
+
+    python scripts/benchmark_retrieval.py --corpus docs.jsonl --queries queries.jsonl \\
+        --embedding-backend ollama --reranker cross-encoder/ms-marco-MiniLM-L-6-v2
+
+corpus.jsonl lines: {"id": ..., "text": ...}
+queries.jsonl lines: {"query": ..., "relevant": [id, ...]}
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embeddings import create_embedding_backend
+from services.hybrid_retrieval import BM25Index, HybridRetriever, CrossEncoderReranker
+
+
+def synthetic_dataset(size: int, seed: int = 7):
+    """
+    Documents mixing prose with identifiers, filenames and error codes.
+    Half the queries quote an error code and identifier verbatim; the other
+    half describe the document in shuffled prose.
+    """
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("bcdfghjklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+                  for _ in range(2000)]
+    corpus, queries = [], []
+    for i in range(size):
+        words = rng.sample(vocabulary, 8)
+        function = f"{words[0]}_{words[1]}"
+        filename = f"{words[2]}.py"
+        code = f"E{1000 + i}"
+        text = (f"The {words[3]} {words[4]} fails in {function}() defined in {filename} "
+                f"with error {code} when the {words[5]} {words[6]} exhausts the {words[7]}.")
+        corpus.append({"id": str(i), "text": text})
+        if i % 10 == 0:
+            queries.append({"query": f"{code} raised by {function}", "relevant": [str(i)]})
+            described = words[3:8]
+            rng.shuffle(described)
+            queries.append({"query": "why is " + " and ".join(described) + " failing", "relevant": [str(i)]})
+    return corpus, queries
+
+
+def load_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Corpus JSONL (default: synthetic)")
+    parser.add_argument("--queries", help="Queries JSONL (default: synthetic)")
+    parser.add_argument("--size", type=int, default=5000, help="Synthetic corpus size")
+    parser.add_argument("--embedding-backend", default="hashing")
+    parser.add_argument("--embedding-model", default=None)
+    parser.add_argument("--reranker", default=None, help="Cross-encoder model for the re-ranked run")
+    parser.add_argument("--rerank-budget-ms", type=float, default=150.0)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    args = parser.parse_args()
+
+    if args.corpus and args.queries:
+        corpus, queries = load_jsonl(args.corpus), load_jsonl(args.queries)
+    else:
+        corpus, queries = synthetic_dataset(args.size)
+
+    backend = create_embedding_backend(args.embedding_backend, model=args.embedding_model)
+    start = time.perf_counter()
+    matrix = backend.embed_batch([doc["text"] for doc in corpus])
+    print(f"Embedded {len(corpus)} documents with {backend.name} in {time.perf_counter() - start:.2f}s")
+
+    bm25 = BM25Index()
+    start = time.perf_counter()
+    bm25.add_documents([(str(doc["id"]), doc["text"], {}) for doc in corpus])
+    print(f"Built BM25 index in {time.perf_counter() - start:.2f}s")
+
+    def dense_search(query, k):
+        scores = matrix @ backend.embed(query)
+        top = np.argsort(-scores)[:k]
+        return [{"id": str(corpus[i]["id"]), "text": corpus[i]["text"], "metadata": {}, "score": float(scores[i])}
+                for i in top]
+
+    reranker = CrossEncoderReranker(args.reranker, budget_ms=args.rerank_budget_ms) if args.reranker else None
+    retriever = HybridRetriever(dense_search, bm25, reranker=reranker, candidates=args.candidates)
+
+    runs = [("dense", "dense", False), ("sparse", "sparse", False), ("hybrid", "hybrid", False)]
+    if reranker:
+        runs.append(("hybrid+rerank", "hybrid", True))
+
+    limit = max(args.k)
+    print(f"\n{len(queries)} queries, candidates={args.candidates}\n")
+    header = f"{'run':<15}" + "".join(f"{'R@' + str(k):>8}" for k in args.k) + "   stage latency p50/p95 (ms)"
+    print(header)
+    print("-" * len(header))
+    for name, mode, rerank in runs:
+        hits = {k: 0 for k in args.k}
+        stages = {}
+        for q in queries:
+            results = retriever.search(q["query"], limit=limit, mode=mode, rerank=rerank)
+            ids = [str(r["id"]) for r in results]
+            relevant = {str(r) for r in q["relevant"]}
+            for k in args.k:
+                hits[k] += bool(relevant & set(ids[:k]))
+            for stage, ms in retriever.last_timings.items():
+                stages.setdefault(stage, []).append(ms)
+        recall = "".join(f"{hits[k] / len(queries):>8.3f}" for k in args.k)
+        latency = "  ".join(f"{stage[:-3]} {percentile(v, 50):.2f}/{percentile(v, 95):.2f}"
+                            for stage, v in stages.items())
+        print(f"{name:<15}{recall}   {latency}")
+
+
+if __name__ == "__main__":
+    main()
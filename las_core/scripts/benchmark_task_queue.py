@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark TaskQueue enqueue throughput, p99 enqueue latency and drain rate.
+
+Queues N agent tasks (10k by default) one at a time and in bulk, for the
+in-memory queue and the durable SQLite backend, then measures how fast the
+workers drain them with a no-op handler:
+
+    python scripts/benchmark_task_queue.py --tasks 10000 --batch 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.task_queue import TaskQueue, TaskPriority, TaskStatus
+from services.task_store import SQLiteTaskStore
+
+PRIORITIES = list(TaskPriority)
+AGENTS = ["casual", "coder", "file", "browser", "planner"]
+
+
+async def noop(payload):
+    return payload["n"]
+
+
+def make_queue(backend: str, workers: int) -> TaskQueue:
+    store = None
+    if backend == "sqlite":
+        store = SQLiteTaskStore(os.path.join(tempfile.mkdtemp(prefix="las-tasks-"), "tasks.sqlite3"))
+    queue = TaskQueue(max_workers=workers, store=store)
+    queue.register_handler("agent_task", noop)
+    return queue
+
+
+def request(n: int) -> dict:
+    return {
+        "task_type": "agent_task",
+        "payload": {"n": n, "query": f"step {n} of the plan"},
+        "priority": PRIORITIES[n % len(PRIORITIES)],
+        "agent": AGENTS[n % len(AGENTS)]
+    }
+
+
+def drain(queue: TaskQueue, total: int) -> float:
+    start = time.perf_counter()
+    while True:
+        stats = queue.get_stats()
+        if stats[TaskStatus.COMPLETED.value] + stats[TaskStatus.FAILED.value] >= total:
+            return time.perf_counter() - start
+        time.sleep(0.005)
+
+
+def bench_single(backend: str, tasks: int, workers: int) -> dict:
+    queue = make_queue(backend, workers)
+    latencies = np.empty(tasks)
+    start = time.perf_counter()
+    for n in range(tasks):
+        t0 = time.perf_counter()
+        queue.enqueue(**request(n))
+        latencies[n] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+    drained = drain(queue, tasks)
+    queue.close()
+    return {
+        "mode": f"{backend}/single",
+        "enqueue_per_s": tasks / elapsed,
+        "p50_ms": np.percentile(latencies, 50) * 1000,
+        "p99_ms": np.percentile(latencies, 99) * 1000,
+        "drain_per_s": tasks / (elapsed + drained)
+    }
+
+
+def bench_bulk(backend: str, tasks: int, workers: int, batch: int) -> dict:
+    queue = make_queue(backend, workers)
+    latencies = []
+    start = time.perf_counter()
+    for first in range(0, tasks, batch):
+        t0 = time.perf_counter()
+        queue.enqueue_many([request(n) for n in range(first, min(first + batch, tasks))])
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    drained = drain(queue, tasks)
+    queue.close()
+    return {
+        "mode": f"{backend}/bulk{batch}",
+        "enqueue_per_s": tasks / elapsed,
+        "p50_ms": np.percentile(latencies, 50) * 1000,
+        "p99_ms": np.percentile(latencies, 99) * 1000,
+        "drain_per_s": tasks / (elapsed + drained)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        results.append(bench_single(backend, args.tasks, args.workers))
+        results.append(bench_bulk(backend, args.tasks, args.workers, args.batch))
+
+    print(f"{args.tasks} tasks, {args.workers} workers (p50/p99 per enqueue call)")
+    print(f"{'mode':<18}{'enqueue/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'end-to-end/s':>14}")
+    for r in results:
+        print(f"{r['mode']:<18}{r['enqueue_per_s']:>12.0f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+              f"{r['drain_per_s']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
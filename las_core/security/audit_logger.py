@@ -2,14 +2,26 @@
 Audit Logger - Immutable audit trail for all agent actions.
 
 Logs all tool calls, decisions, and sensitive operations for compliance and debugging.
+Entries are stored in indexed segments by security.audit_store.
+
+log() only stamps the event and queues it, so audited requests and tool
+calls never touch the disk. A single writer thread takes everything queued,
+extends the hash chain in queue order and group-commits the batch with one
+fsync. Each log() call returns a future that resolves to the entry's hash
+once it is durable.
 """
 
-import json
+import queue
+import threading
+from concurrent.futures import Future
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 from datetime import datetime
 from enum import Enum
-import hashlib
+import time
+
+from security.audit_store import AuditStore
+from security.audit_verify import AuditVerifier, compute_entry_hash, load_or_create_key
 
 class AuditEventType(str, Enum):
     """Audit event types."""
@@ -30,53 +42,63 @@ class AuditLogger:
     Features:
     - Structured JSON logs
     - Hash chaining for tamper detection
-    - Searchable by event type, agent, time range
+    - Segmented storage with sidecar indexes (see security.audit_store)
+    - Searchable by event type, agent, user, time range
+    - Group-committed writes off the request path
+    - Checkpointed, parallel verification and range proofs (see security.audit_verify)
     - Retention policies
     """
     
-    def __init__(self, storage_dir: str = "data/audit_logs"):
+    def __init__(self, storage_dir: str = "data/audit_logs",
+                 segment_max_entries: int = 10_000,
+                 segment_max_bytes: int = 16 * 1024 * 1024,
+                 batch_max: int = 512,
+                 linger_ms: float = 0.0,
+                 fsync: bool = True,
+                 checkpoint_key_file: Optional[str] = None,
+                 verify_workers: int = 4):
+        """
+        Args:
+            storage_dir: Directory holding the segments
+            segment_max_entries: Entries after which a segment is sealed
+            segment_max_bytes: Data size after which a segment is sealed
+            batch_max: Most entries committed by one write
+            linger_ms: How long the writer waits for more entries before committing
+            fsync: fsync each batch (futures then mean durable, not just written)
+            checkpoint_key_file: HMAC key signing verification checkpoints
+                (created if missing; defaults to .checkpoint_key in storage_dir)
+            verify_workers: Processes replaying segments during verification
+        """
         self.storage_dir = Path(storage_dir)
-        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.store = AuditStore(storage_dir, segment_max_entries, segment_max_bytes)
+        self.last_hash = self.store.last_hash
+        self.batch_max = batch_max
+        self.linger = linger_ms / 1000
+        self.fsync = fsync
+        self.verifier = AuditVerifier(
+            self.store,
+            load_or_create_key(checkpoint_key_file or str(self.storage_dir / ".checkpoint_key")),
+            workers=verify_workers
+        )
         
-        self.log_file = self.storage_dir / f"audit_{datetime.now().strftime('%Y%m%d')}.jsonl"
-        self.last_hash = self._get_last_hash()
-    
-    def _get_last_hash(self) -> str:
-        """Get hash of last log entry for chaining."""
-        if not self.log_file.exists():
-            return "0" * 64  # Genesis hash
-        
-        try:
-            with open(self.log_file, 'r') as f:
-                lines = f.readlines()
-                if lines:
-                    last_entry = json.loads(lines[-1])
-                    return last_entry.get("hash", "0" * 64)
-        except:
-            pass
-        
-        return "0" * 64
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._last_future: Optional[Future] = None
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="audit-writer", daemon=True)
+        self._writer.start()
     
     def _compute_hash(self, entry: Dict[str, Any], previous_hash: str) -> str:
         """Compute hash for log entry (includes previous hash for chaining)."""
-        # Create stable string representation
-        hash_data = {
-            "timestamp": entry["timestamp"],
-            "event_type": entry["event_type"],
-            "agent": entry.get("agent"),
-            "action": entry.get("action"),
-            "previous_hash": previous_hash
-        }
-        
-        hash_str = json.dumps(hash_data, sort_keys=True)
-        return hashlib.sha256(hash_str.encode()).hexdigest()
+        return compute_entry_hash(entry, previous_hash)
     
     def log(self, event_type: AuditEventType, action: str,
             details: Optional[Dict[str, Any]] = None,
             agent: Optional[str] = None,
             user: Optional[str] = None,
             result: Optional[Any] = None,
-            error: Optional[str] = None):
+            error: Optional[str] = None) -> Future:
         """
         Log an audit event.
         
@@ -88,34 +110,104 @@ class AuditLogger:
             user: User identifier
             result: Action result
             error: Error message if failed
-        """
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "event_type": event_type.value,
-            "action": action,
-            "agent": agent,
-            "user": user,
-            "details": details or {},
-            "result": result,
-            "error": error
-        }
-        
-        # Compute hash with previous entry's hash
-        entry["hash"] = self._compute_hash(entry, self.last_hash)
-        entry["previous_hash"] = self.last_hash
         
-        # Write to log file (append mode)
-        with open(self.log_file, 'a') as f:
-            f.write(json.dumps(entry) + '\n')
+        Returns:
+            Future resolving to the entry's hash once it is committed
+        """
+        future: Future = Future()
+        with self._lock:
+            # Stamped under the lock so timestamps follow chain order
+            entry = {
+                "timestamp": datetime.now().isoformat(),
+                "event_type": event_type.value,
+                "action": action,
+                "agent": agent,
+                "user": user,
+                "details": details or {},
+                "result": result,
+                "error": error
+            }
+            self._last_future = future
+            if not self._closed:
+                self._queue.put((entry, future))
+                return future
         
-        # Update last hash for next entry
-        self.last_hash = entry["hash"]
+        # Writer already stopped (shutdown): commit in the caller
+        self._commit([(entry, future)])
+        return future
+    
+    def _write_loop(self):
+        """Drain the queue in batches until close() enqueues None."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_max:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+    
+    def _commit(self, batch: List[tuple]):
+        """Chain and write a batch, then resolve its futures."""
+        with self._commit_lock:
+            previous_hash = self.last_hash
+            entries = []
+            for entry, _ in batch:
+                # Compute hash with previous entry's hash
+                entry["hash"] = self._compute_hash(entry, previous_hash)
+                entry["previous_hash"] = previous_hash
+                previous_hash = entry["hash"]
+                entries.append(entry)
+            
+            try:
+                self.store.append(entries, sync=self.fsync)
+            except Exception as e:
+                self.last_hash = self.store.last_hash
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            
+            # Update last hash for next batch
+            self.last_hash = previous_hash
+        for entry, future in batch:
+            future.set_result(entry["hash"])
+    
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until every event logged so far is committed."""
+        future = self._last_future
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+    
+    def close(self, timeout: float = 30.0):
+        """Commit queued events and stop the writer (later events are committed by their callers)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join(timeout=timeout)
     
     def query(self, event_type: Optional[AuditEventType] = None,
              agent: Optional[str] = None,
              start_time: Optional[datetime] = None,
              end_time: Optional[datetime] = None,
-             limit: int = 100) -> List[Dict[str, Any]]:
+             limit: int = 100,
+             user: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Query audit logs with filters.
         
@@ -125,100 +217,65 @@ class AuditLogger:
             start_time: Start of time range
             end_time: End of time range
             limit: Maximum results
+            user: Filter by user
         
         Returns:
-            List of matching log entries
+            List of matching log entries, newest first
         """
-        results = []
+        self.flush()
+        return self.store.query(
+            event_type=event_type.value if event_type else None,
+            agent=agent,
+            user=user,
+            start_time=start_time,
+            end_time=end_time,
+            limit=limit
+        )
+    
+    def verify(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Verify the hash chain, replaying only segments without a signed checkpoint.
         
-        # Read all log files in directory
-        for log_file in sorted(self.storage_dir.glob("audit_*.jsonl"), reverse=True):
-            with open(log_file, 'r') as f:
-                for line in f:
-                    if len(results) >= limit:
-                        break
-                    
-                    try:
-                        entry = json.loads(line)
-                        
-                        # Apply filters
-                        if event_type and entry["event_type"] != event_type.value:
-                            continue
-                        
-                        if agent and entry["agent"] != agent:
-                            continue
-                        
-                        entry_time = datetime.fromisoformat(entry["timestamp"])
-                        if start_time and entry_time < start_time:
-                            continue
-                        
-                        if end_time and entry_time > end_time:
-                            continue
-                        
-                        results.append(entry)
-                    
-                    except:
-                        continue
-            
-            if len(results) >= limit:
-                break
+        Args:
+            full: Replay every segment
         
-        return results
+        Returns:
+            Report with valid, error, verified_entries and checkpointed_segments
+        """
+        self.flush()
+        report = self.verifier.verify(full=full)
+        if not report["valid"]:
+            print(f"Integrity violation: {report['error']}")
+        return report
     
-    def verify_integrity(self) -> bool:
+    def verify_integrity(self, full: bool = False) -> bool:
         """
         Verify integrity of audit log using hash chain.
         
         Returns:
             True if log is intact, False if tampered
         """
-        previous_hash = "0" * 64
-        
-        for log_file in sorted(self.storage_dir.glob("audit_*.jsonl")):
-            with open(log_file, 'r') as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line)
-                        
-                        # Check previous hash matches
-                        if entry.get("previous_hash") != previous_hash:
-                            print(f"Integrity violation: Hash mismatch at {entry['timestamp']}")
-                            return False
-                        
-                        # Recompute hash
-                        computed_hash = self._compute_hash(entry, previous_hash)
-                        if computed_hash != entry.get("hash"):
-                            print(f"Integrity violation: Invalid hash at {entry['timestamp']}")
-                            return False
-                        
-                        previous_hash = entry["hash"]
-                    
-                    except Exception as e:
-                        print(f"Error verifying entry: {e}")
-                        return False
-        
-        return True
+        return self.verify(full=full)["valid"]
+    
+    def prove_range(self, start_time: Optional[datetime] = None,
+                    end_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build a Merkle range proof for the entries in a time window."""
+        self.flush()
+        return self.verifier.prove_range(start_time, end_time)
+    
+    def verify_range(self, start_time: Optional[datetime] = None,
+                     end_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """Verify a time window against the signed checkpoints without replaying the rest."""
+        return self.verifier.verify_range(self.prove_range(start_time, end_time))
     
     def get_stats(self) -> Dict[str, Any]:
         """Get audit log statistics."""
-        total_entries = 0
-        by_type = {}
-        
-        for log_file in self.storage_dir.glob("audit_*.jsonl"):
-            with open(log_file, 'r') as f:
-                for line in f:
-                    total_entries += 1
-                    try:
-                        entry = json.loads(line)
-                        event_type = entry.get("event_type", "unknown")
-                        by_type[event_type] = by_type.get(event_type, 0) + 1
-                    except:
-                        pass
-        
+        self.flush()
+        stats = self.store.get_stats()
         return {
-            "total_entries": total_entries,
-            "by_type": by_type,
-            "log_files": len(list(self.storage_dir.glob("audit_*.jsonl")))
+            "total_entries": stats["total_entries"],
+            "by_type": stats["by_type"],
+            "log_files": stats["segments"]
         }
 
 # Create singleton instance
@@ -228,7 +285,17 @@ def get_audit_logger() -> AuditLogger:
     """Get or create AuditLogger instance."""
     global _audit_logger
     if _audit_logger is None:
-        _audit_logger = AuditLogger()
+        from config.settings import settings
+        _audit_logger = AuditLogger(
+            storage_dir=settings.audit_log_dir,
+            segment_max_entries=settings.audit_segment_max_entries,
+            segment_max_bytes=settings.audit_segment_max_bytes,
+            batch_max=settings.audit_batch_max,
+            linger_ms=settings.audit_linger_ms,
+            fsync=settings.audit_fsync,
+            checkpoint_key_file=settings.audit_checkpoint_key_file,
+            verify_workers=settings.audit_verify_workers
+        )
     return _audit_logger
 
 # Convenience functions
@@ -236,7 +303,7 @@ def audit_tool_call(tool_name: str, args: Dict[str, Any], result: Any,
                    agent: Optional[str] = None):
     """Log a tool call."""
     logger = get_audit_logger()
-    logger.log(
+    return logger.log(
         event_type=AuditEventType.TOOL_CALL,
         action=f"call_{tool_name}",
         details={"tool": tool_name, "arguments": args},
@@ -247,7 +314,7 @@ def audit_tool_call(tool_name: str, args: Dict[str, Any], result: Any,
 def audit_decision(decision: str, reasoning: str, agent: Optional[str] = None):
     """Log an agent decision."""
     logger = get_audit_logger()
-    logger.log(
+    return logger.log(
         event_type=AuditEventType.DECISION,
         action="agent_decision",
         details={"decision": decision, "reasoning": reasoning},
@@ -257,7 +324,7 @@ def audit_decision(decision: str, reasoning: str, agent: Optional[str] = None):
 def audit_error(error_type: str, error_message: str, agent: Optional[str] = None):
     """Log an error."""
     logger = get_audit_logger()
-    logger.log(
+    return logger.log(
         event_type=AuditEventType.ERROR,
         action=error_type,
         error=error_message,
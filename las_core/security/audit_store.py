@@ -0,0 +1,492 @@
+"""
+Audit Store - Segmented, indexed storage for the audit trail.
+
+Entries are appended as JSON lines to the active segment. Each line also gets
+a fixed-size record in the segment's sidecar index: timestamp, byte offset,
+length, and 64-bit hashes of the event type, agent and user. When a segment
+reaches its size limit it is sealed. Sealing writes a footer with the
+segment's time range, record count, first and last chain hashes, and the
+event types, agents and users it contains.
+
+A query skips every segment whose footer rules it out. In the remaining
+segments it filters the index with vectorized comparisons, then reads only
+the matching lines. Startup reads just the active segment's index (plus one
+entry per distinct key) and the footer before it, so it does not depend on
+how large the trail has grown.
+
+Day files written before segmentation (audit_YYYYMMDD.jsonl) are converted
+to sealed segments the first time the store opens.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+GENESIS_HASH = "0" * 64
+
+INDEX_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("event", "<u8"),
+    ("agent", "<u8"),
+    ("user", "<u8"),
+])
+
+# Sealed segment indexes kept memory-mapped
+_INDEX_CACHE_SIZE = 1024
+
+def key_hash(value: Optional[str]) -> int:
+    """64-bit hash of an indexed field (0 for None)."""
+    if value is None:
+        return 0
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") | 1
+
+def entry_ts(entry: Dict[str, Any]) -> float:
+    """Timestamp of an entry as seconds since the epoch."""
+    return datetime.fromisoformat(entry["timestamp"]).timestamp()
+
+@dataclass
+class SegmentInfo:
+    """Footer of a segment (kept up to date in memory for the active one)."""
+    number: int
+    count: int = 0
+    first_ts: Optional[float] = None
+    last_ts: Optional[float] = None
+    first_previous_hash: Optional[str] = None
+    last_hash: Optional[str] = None
+    by_type: Dict[str, int] = field(default_factory=dict)
+    agents: Set[str] = field(default_factory=set)
+    users: Set[str] = field(default_factory=set)
+
+    def add(self, entry: Dict[str, Any], ts: float):
+        if self.count == 0:
+            self.first_ts = ts
+            self.first_previous_hash = entry.get("previous_hash")
+        self.count += 1
+        self.first_ts = min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.last_hash = entry.get("hash")
+        event_type = entry.get("event_type", "unknown")
+        self.by_type[event_type] = self.by_type.get(event_type, 0) + 1
+        if entry.get("agent") is not None:
+            self.agents.add(entry["agent"])
+        if entry.get("user") is not None:
+            self.users.add(entry["user"])
+
+    def may_match(self, event_type: Optional[str], agent: Optional[str], user: Optional[str],
+                  start_ts: Optional[float], end_ts: Optional[float]) -> bool:
+        """Whether the footer allows any entry matching the filters."""
+        if self.count == 0:
+            return False
+        if start_ts is not None and self.last_ts < start_ts:
+            return False
+        if end_ts is not None and self.first_ts > end_ts:
+            return False
+        if event_type is not None and event_type not in self.by_type:
+            return False
+        if agent is not None and agent not in self.agents:
+            return False
+        if user is not None and user not in self.users:
+            return False
+        return True
+
+    def to_footer(self) -> Dict[str, Any]:
+        footer = asdict(self)
+        footer["agents"] = sorted(self.agents)
+        footer["users"] = sorted(self.users)
+        return footer
+
+    @classmethod
+    def from_footer(cls, footer: Dict[str, Any]) -> "SegmentInfo":
+        footer = dict(footer)
+        footer["agents"] = set(footer.get("agents", []))
+        footer["users"] = set(footer.get("users", []))
+        return cls(**footer)
+
+class AuditStore:
+    """Append-only audit trail split into indexed segments."""
+
+    def __init__(self, storage_dir: str = "data/audit_logs",
+                 segment_max_entries: int = 10_000,
+                 segment_max_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            storage_dir: Directory holding the segments
+            segment_max_entries: Entries after which a segment is sealed
+            segment_max_bytes: Data size after which a segment is sealed
+        """
+        self.storage_dir = Path(storage_dir)
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_entries = segment_max_entries
+        self.segment_max_bytes = segment_max_bytes
+
+        self._lock = threading.RLock()
+        self._sealed: Optional[List[SegmentInfo]] = None  # Footers, loaded on first query
+        self._index_cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+
+        self._migrate_legacy()
+        numbers = self._segment_numbers()
+        if numbers and not self._footer_path(numbers[-1]).exists():
+            active = numbers[-1]
+        else:
+            active = (numbers[-1] if numbers else 0) + 1
+        self._previous_hash = self._read_footer_hash(active - 1)
+        self._open_active(active)
+
+    # === Paths ===
+
+    def _data_path(self, number: int) -> Path:
+        return self.storage_dir / f"segment_{number:08d}.jsonl"
+
+    def _index_path(self, number: int) -> Path:
+        return self.storage_dir / f"segment_{number:08d}.idx"
+
+    def _footer_path(self, number: int) -> Path:
+        return self.storage_dir / f"segment_{number:08d}.footer.json"
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for path in self.storage_dir.glob("segment_*.jsonl"):
+            try:
+                numbers.append(int(path.stem.split("_")[1]))
+            except (IndexError, ValueError):
+                continue
+        return sorted(numbers)
+
+    def _read_footer(self, number: int) -> Optional[SegmentInfo]:
+        path = self._footer_path(number)
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return SegmentInfo.from_footer(json.load(f))
+
+    def _read_footer_hash(self, number: int) -> str:
+        info = self._read_footer(number) if number > 0 else None
+        return info.last_hash if info and info.last_hash else GENESIS_HASH
+
+    # === Active segment ===
+
+    def _open_active(self, number: int):
+        """Open (and repair after a crash) the segment being appended to."""
+        data_path, index_path = self._data_path(number), self._index_path(number)
+        data_path.touch()
+        index_path.touch()
+
+        data_size = data_path.stat().st_size
+        index_bytes = index_path.read_bytes()
+        index = np.frombuffer(index_bytes[:len(index_bytes) - len(index_bytes) % INDEX_DTYPE.itemsize],
+                              dtype=INDEX_DTYPE)
+        ends = index["offset"] + index["length"]
+        valid = int(np.searchsorted(ends, data_size, side="right")) if len(index) else 0
+        index = index[:valid]
+        indexed_end = int(ends[valid - 1]) if valid else 0
+
+        # Lines written after the last index record (crash between the two writes)
+        trailing = []
+        with open(data_path, "rb") as f:
+            f.seek(indexed_end)
+            offset = indexed_end
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    trailing.append(self._index_record(json.loads(line), offset, len(line)))
+                except (ValueError, KeyError):
+                    pass
+                offset += len(line)
+        if trailing:
+            index = np.concatenate([index, np.array(trailing, dtype=INDEX_DTYPE)])
+
+        with open(data_path, "r+b") as f:
+            f.truncate(offset)
+        with open(index_path, "wb") as f:
+            f.write(index.tobytes())
+
+        self._active = self._summarize(number, index)
+        self._active_size = offset
+        self._data_file = open(data_path, "ab")
+        self._index_file = open(index_path, "ab")
+
+    def _summarize(self, number: int, index: np.ndarray) -> SegmentInfo:
+        """Rebuild a segment's footer from its index, decoding one entry per distinct key."""
+        info = SegmentInfo(number, count=len(index))
+        if not len(index):
+            return info
+        info.first_ts, info.last_ts = float(index["ts"].min()), float(index["ts"].max())
+        first, last = list(self._read_rows(number, [0, len(index) - 1], index))
+        info.first_previous_hash, info.last_hash = first.get("previous_hash"), last.get("hash")
+
+        for column, name in (("event", "event_type"), ("agent", "agent"), ("user", "user")):
+            hashes, rows, counts = np.unique(index[column], return_index=True, return_counts=True)
+            for entry, count in zip(self._read_rows(number, rows, index), counts):
+                value = entry.get(name)
+                if name == "event_type":
+                    info.by_type[value] = info.by_type.get(value, 0) + int(count)
+                elif value is not None:
+                    getattr(info, f"{name}s").add(value)
+        return info
+
+    def _index_record(self, entry: Dict[str, Any], offset: int, length: int) -> tuple:
+        return (entry_ts(entry), offset, length, key_hash(entry.get("event_type")),
+                key_hash(entry.get("agent")), key_hash(entry.get("user")))
+
+    def _seal_active(self):
+        """Write the active segment's footer and start the next segment."""
+        info = self._active
+        os.fsync(self._data_file.fileno())
+        self._data_file.close()
+        self._index_file.close()
+        self._write_footer(info)
+        if self._sealed is not None:
+            self._sealed.append(info)
+        self._previous_hash = info.last_hash or self._previous_hash
+        self._open_active(info.number + 1)
+
+    def _write_footer(self, info: SegmentInfo):
+        """Write a segment's footer atomically (a footer marks the segment sealed)."""
+        tmp_path = self._footer_path(info.number).with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(info.to_footer(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._footer_path(info.number))
+
+    @property
+    def last_hash(self) -> str:
+        """Hash of the newest entry (genesis hash for an empty trail)."""
+        return self._active.last_hash or self._previous_hash
+
+    # === Writing ===
+
+    def append(self, entries: List[Dict[str, Any]], sync: bool = False):
+        """
+        Append entries (already hash-chained) in order.
+
+        Args:
+            entries: Audit entries
+            sync: fsync the data before returning (the index is rebuilt from
+                the data after a crash, so it is only flushed)
+        """
+        with self._lock:
+            lines: List[bytes] = []
+            pending: List[Tuple[Dict[str, Any], tuple]] = []
+            size, count = self._active_size, self._active.count
+            for entry in entries:
+                line = (json.dumps(entry, default=str) + "\n").encode()
+                if count >= self.segment_max_entries or (size > 0 and size + len(line) > self.segment_max_bytes):
+                    self._write(lines, pending)
+                    lines, pending = [], []
+                    self._seal_active()
+                    size, count = self._active_size, self._active.count
+                pending.append((entry, self._index_record(entry, size, len(line))))
+                lines.append(line)
+                size += len(line)
+                count += 1
+            self._write(lines, pending)
+            if sync:
+                os.fsync(self._data_file.fileno())
+
+    def _write(self, lines: List[bytes], pending: List[Tuple[Dict[str, Any], tuple]]):
+        """Write lines and their index records, then count them in the active segment."""
+        if not lines:
+            return
+        try:
+            # Data first: an index record never points past the data
+            self._data_file.write(b"".join(lines))
+            self._data_file.flush()
+            self._index_file.write(np.array([record for _, record in pending], dtype=INDEX_DTYPE).tobytes())
+            self._index_file.flush()
+        except BaseException:
+            self._rollback()
+            raise
+        self._active_size += sum(len(line) for line in lines)
+        for entry, record in pending:
+            self._active.add(entry, record[0])
+
+    def _rollback(self):
+        """Cut the active segment's files back to its last committed entry."""
+        number = self._active.number
+        for f in (self._data_file, self._index_file):
+            try:
+                f.close()  # Anything the failed write left buffered is cut off below
+            except OSError:
+                pass
+        os.truncate(self._data_path(number), self._active_size)
+        os.truncate(self._index_path(number), self._active.count * INDEX_DTYPE.itemsize)
+        self._data_file = open(self._data_path(number), "ab")
+        self._index_file = open(self._index_path(number), "ab")
+
+    # === Reading ===
+
+    def _segments(self) -> List[SegmentInfo]:
+        """Footers of every segment, oldest first, ending with the active one."""
+        if self._sealed is None:
+            self._sealed = [info for info in (self._read_footer(number) for number in self._segment_numbers()
+                                              if number != self._active.number) if info is not None]
+        return self._sealed + [self._active]
+
+    def _load_index(self, info: SegmentInfo) -> np.ndarray:
+        if info is self._active:
+            return np.fromfile(self._index_path(info.number), dtype=INDEX_DTYPE)
+        index = self._index_cache.get(info.number)
+        if index is None:
+            index = np.memmap(self._index_path(info.number), dtype=INDEX_DTYPE, mode="r")
+            self._index_cache[info.number] = index
+            if len(self._index_cache) > _INDEX_CACHE_SIZE:
+                self._index_cache.popitem(last=False)
+        else:
+            self._index_cache.move_to_end(info.number)
+        return index
+
+    def _read_rows(self, number: int, rows, index: np.ndarray) -> Iterator[Dict[str, Any]]:
+        """Decode the given index rows of a segment."""
+        with open(self._data_path(number), "rb") as f:
+            for row in rows:
+                f.seek(int(index["offset"][row]))
+                try:
+                    yield json.loads(f.read(int(index["length"][row])))
+                except ValueError:
+                    continue
+
+    def query(self, event_type: Optional[str] = None,
+              agent: Optional[str] = None,
+              user: Optional[str] = None,
+              start_time: Optional[datetime] = None,
+              end_time: Optional[datetime] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Find entries matching all filters, newest first.
+
+        Args:
+            event_type: Event type value
+            agent: Agent identifier
+            user: User identifier
+            start_time: Start of time range
+            end_time: End of time range
+            limit: Maximum results
+
+        Returns:
+            Matching entries
+        """
+        start_ts = start_time.timestamp() if start_time else None
+        end_ts = end_time.timestamp() if end_time else None
+        results: List[Dict[str, Any]] = []
+
+        with self._lock:
+            segments = self._segments()
+            for info in reversed(segments):
+                if len(results) >= limit:
+                    break
+                if not info.may_match(event_type, agent, user, start_ts, end_ts):
+                    continue
+
+                index = self._load_index(info)
+                mask = np.ones(len(index), dtype=bool)
+                if event_type is not None:
+                    mask &= index["event"] == key_hash(event_type)
+                if agent is not None:
+                    mask &= index["agent"] == key_hash(agent)
+                if user is not None:
+                    mask &= index["user"] == key_hash(user)
+                if start_ts is not None:
+                    mask &= index["ts"] >= start_ts
+                if end_ts is not None:
+                    mask &= index["ts"] <= end_ts
+
+                for entry in self._read_rows(info.number, np.flatnonzero(mask)[::-1], index):
+                    # Guard against 64-bit hash collisions
+                    if (event_type is None or entry.get("event_type") == event_type) and \
+                            (agent is None or entry.get("agent") == agent) and \
+                            (user is None or entry.get("user") == user):
+                        results.append(entry)
+                        if len(results) >= limit:
+                            break
+
+        return results
+
+    def iter_segment(self, number: int) -> Iterator[Dict[str, Any]]:
+        """Entries of one segment in append order."""
+        with self._lock:
+            info = next((s for s in self._segments() if s.number == number), None)
+            if info is None:
+                return
+            index = np.array(self._load_index(info))
+        yield from self._read_rows(number, range(len(index)), index)
+
+    def segments(self) -> List[SegmentInfo]:
+        """Footers of all segments, oldest first (the last one is active)."""
+        with self._lock:
+            return list(self._segments())
+
+    def snapshot(self) -> Tuple[List[SegmentInfo], int]:
+        """Segment footers together with the active segment's committed size."""
+        with self._lock:
+            return list(self._segments()), self._active_size
+
+    def segment_path(self, number: int) -> Path:
+        """Data file of a segment."""
+        return self._data_path(number)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entry counts from the segment footers."""
+        with self._lock:
+            segments = self._segments()
+            by_type: Dict[str, int] = {}
+            for info in segments:
+                for event_type, count in info.by_type.items():
+                    by_type[event_type] = by_type.get(event_type, 0) + count
+            return {
+                "total_entries": sum(info.count for info in segments),
+                "by_type": by_type,
+                "segments": len(segments)
+            }
+
+    def close(self):
+        """Close the active segment's files."""
+        with self._lock:
+            self._data_file.close()
+            self._index_file.close()
+
+    # === Migration ===
+
+    def _migrate_legacy(self):
+        """
+        Convert pre-segmentation day files into sealed segments.
+
+        A day file is renamed into its segment only after the index and
+        footer are written, so any day file still present is unconverted and
+        an interrupted migration resumes on the next start.
+        """
+        legacy = sorted(self.storage_dir.glob("audit_*.jsonl"))
+        numbers = self._segment_numbers()
+        number = numbers[-1] if numbers else 0
+        for path in legacy:
+            number += 1
+            info = SegmentInfo(number)
+            records = []
+            offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        records.append(self._index_record(entry, offset, len(line)))
+                        info.add(entry, records[-1][0])
+                    except (ValueError, KeyError):
+                        pass
+                    offset += len(line)
+            with open(self._index_path(number), "wb") as f:
+                f.write(np.array(records, dtype=INDEX_DTYPE).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_footer(info)
+            os.replace(path, self._data_path(number))
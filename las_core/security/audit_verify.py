@@ -0,0 +1,358 @@
+"""
+Audit Verify - Checkpointed, parallel hash-chain verification.
+
+Each segment of the audit trail starts from the previous segment's last hash
+(recorded in its footer), so segments can be replayed independently. They are
+replayed in a process pool, and the verifier then checks that each segment
+links to the one before it.
+
+After a sealed segment verifies, the verifier stores a signed checkpoint for
+it in checkpoints.jsonl. The checkpoint holds the segment's size, entry count,
+first and last chain hashes, and the Merkle root of its entry hashes, signed
+with HMAC-SHA256. Later verifications replay only segments without a valid
+checkpoint, plus the active segment. A full verification replays everything.
+
+A Merkle range proof covers the entries of a time window. It gives those
+entries with the sibling hashes needed to rebuild each segment's root, and
+the root is compared with the signed checkpoint. A window can therefore be
+verified without replaying the history around it.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from security.audit_store import AuditStore, GENESIS_HASH, SegmentInfo
+
+def compute_entry_hash(entry: Dict[str, Any], previous_hash: str) -> str:
+    """Compute hash for log entry (includes previous hash for chaining)."""
+    # Create stable string representation
+    hash_data = {
+        "timestamp": entry["timestamp"],
+        "event_type": entry["event_type"],
+        "agent": entry.get("agent"),
+        "action": entry.get("action"),
+        "previous_hash": previous_hash
+    }
+
+    hash_str = json.dumps(hash_data, sort_keys=True)
+    return hashlib.sha256(hash_str.encode()).hexdigest()
+
+# === Merkle tree over entry hashes ===
+
+def merkle_leaf(entry_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(entry_hash)).digest()
+
+def merkle_parent(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+def merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """All tree levels, leaves first (an unpaired last node is promoted)."""
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [merkle_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+def merkle_root(entry_hashes: List[str]) -> str:
+    """Merkle root of a segment's entry hashes (empty string for no entries)."""
+    if not entry_hashes:
+        return ""
+    return merkle_levels([merkle_leaf(h) for h in entry_hashes])[-1][0].hex()
+
+def range_proof(levels: List[List[bytes]], lo: int, hi: int) -> Dict[str, str]:
+    """
+    Sibling nodes needed to rebuild the root from leaves lo..hi (inclusive).
+
+    Returns:
+        Node hashes keyed by "level:index"
+    """
+    proof = {}
+    for depth, level in enumerate(levels[:-1]):
+        if lo % 2:
+            proof[f"{depth}:{lo - 1}"] = level[lo - 1].hex()
+        if hi % 2 == 0 and hi + 1 < len(level):
+            proof[f"{depth}:{hi + 1}"] = level[hi + 1].hex()
+        lo, hi = lo // 2, hi // 2
+    return proof
+
+def root_from_range(entry_hashes: List[str], lo: int, size: int, proof: Dict[str, str]) -> str:
+    """Rebuild a Merkle root from a contiguous run of leaves and a range proof."""
+    nodes = {lo + i: merkle_leaf(h) for i, h in enumerate(entry_hashes)}
+    hi = lo + len(entry_hashes) - 1
+    depth = 0
+    while size > 1:
+        if lo % 2:
+            nodes[lo - 1] = bytes.fromhex(proof[f"{depth}:{lo - 1}"])
+        if hi % 2 == 0 and hi + 1 < size:
+            nodes[hi + 1] = bytes.fromhex(proof[f"{depth}:{hi + 1}"])
+        parents = {}
+        for index in range(lo - lo % 2, hi + 1, 2):
+            if index + 1 < size:
+                parents[index // 2] = merkle_parent(nodes[index], nodes[index + 1])
+            else:
+                parents[index // 2] = nodes[index]
+        nodes, lo, hi, size, depth = parents, lo // 2, hi // 2, (size + 1) // 2, depth + 1
+    return nodes[0].hex()
+
+# === Segment replay (runs in worker processes) ===
+
+def verify_segment(data_path: str, previous_hash: str, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Replay one segment's hash chain.
+
+    Args:
+        data_path: Segment data file
+        previous_hash: Hash the first entry must chain from
+        max_bytes: Only read this much (the active segment may be growing)
+
+    Returns:
+        ok, count, first_previous_hash, last_hash, root and error
+    """
+    first_previous_hash = previous_hash
+    hashes = []
+    read = 0
+    with open(data_path, "rb") as f:
+        for line in f:
+            if max_bytes is not None and read + len(line) > max_bytes:
+                break
+            read += len(line)
+            try:
+                entry = json.loads(line)
+                if entry.get("previous_hash") != previous_hash:
+                    error = f"Hash mismatch at {entry['timestamp']}"
+                elif compute_entry_hash(entry, previous_hash) != entry.get("hash"):
+                    error = f"Invalid hash at {entry['timestamp']}"
+                else:
+                    error = None
+            except (ValueError, KeyError) as e:
+                error = f"Unreadable entry at byte {read - len(line)}: {e}"
+            if error:
+                return {"ok": False, "error": error, "count": len(hashes)}
+            previous_hash = entry["hash"]
+            hashes.append(previous_hash)
+
+    return {
+        "ok": True,
+        "error": None,
+        "count": len(hashes),
+        "size": read,
+        "first_previous_hash": first_previous_hash,
+        "last_hash": previous_hash,
+        "root": merkle_root(hashes)
+    }
+
+# === Signed checkpoints ===
+
+def load_or_create_key(key_file: str) -> bytes:
+    """Load the checkpoint signing key, creating it (mode 600) if missing."""
+    key_path = Path(key_file)
+    if key_path.exists():
+        return key_path.read_bytes()
+    key = os.urandom(32)
+    key_path.parent.mkdir(parents=True, exist_ok=True)
+    key_path.write_bytes(key)
+    os.chmod(key_path, 0o600)
+    return key
+
+class AuditVerifier:
+    """Verifies the audit trail of an AuditStore against signed checkpoints."""
+
+    CHECKPOINT_FIELDS = ("segment", "size", "count", "first_previous_hash", "last_hash", "root")
+
+    def __init__(self, store: AuditStore, key: bytes, workers: int = 4):
+        """
+        Args:
+            store: Audit store to verify
+            key: HMAC key signing the checkpoints
+            workers: Processes replaying segments in parallel (1 replays inline)
+        """
+        self.store = store
+        self.key = key
+        self.workers = workers
+        self.checkpoint_file = store.storage_dir / "checkpoints.jsonl"
+
+    def _sign(self, checkpoint: Dict[str, Any]) -> str:
+        message = json.dumps([checkpoint[name] for name in self.CHECKPOINT_FIELDS]).encode()
+        return hmac.new(self.key, message, hashlib.sha256).hexdigest()
+
+    def checkpoints(self) -> Dict[int, Dict[str, Any]]:
+        """Checkpoints with a valid signature, by segment number."""
+        checkpoints = {}
+        if not self.checkpoint_file.exists():
+            return checkpoints
+        with open(self.checkpoint_file, "r") as f:
+            for line in f:
+                try:
+                    checkpoint = json.loads(line)
+                    if hmac.compare_digest(checkpoint["signature"], self._sign(checkpoint)):
+                        checkpoints[checkpoint["segment"]] = checkpoint
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return checkpoints
+
+    def _save_checkpoints(self, checkpoints: List[Dict[str, Any]]):
+        if not checkpoints:
+            return
+        with open(self.checkpoint_file, "a") as f:
+            for checkpoint in checkpoints:
+                checkpoint["signature"] = self._sign(checkpoint)
+                f.write(json.dumps(checkpoint) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay(self, jobs: List[Tuple[SegmentInfo, Optional[int]]]) -> List[Dict[str, Any]]:
+        args = [(str(self.store.segment_path(info.number)), info.first_previous_hash or GENESIS_HASH, max_bytes)
+                for info, max_bytes in jobs]
+        if self.workers <= 1 or len(args) <= 1:
+            return [verify_segment(*a) for a in args]
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(args))) as pool:
+            return list(pool.map(verify_segment, *zip(*args)))
+
+    def verify(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Verify the hash chain.
+
+        Args:
+            full: Replay every segment, ignoring checkpoints
+
+        Returns:
+            valid, error, verified_entries (replayed) and checkpointed_segments (skipped)
+        """
+        segments, active_size = self.store.snapshot()
+        active = segments[-1]
+        checkpoints = {} if full else self.checkpoints()
+
+        jobs = []
+        for info in segments:
+            checkpoint = checkpoints.get(info.number)
+            if info is not active and checkpoint and checkpoint["count"] == info.count and \
+                    checkpoint["size"] == self.store.segment_path(info.number).stat().st_size:
+                continue
+            jobs.append((info, active_size if info is active else None))
+        results = {info.number: result for (info, _), result in zip(jobs, self._replay(jobs))}
+
+        report = {"valid": True, "error": None, "verified_entries": 0,
+                  "checkpointed_segments": len(segments) - len(jobs)}
+        new_checkpoints = []
+        previous_hash = GENESIS_HASH
+        for info in segments:
+            result = results.get(info.number) or checkpoints[info.number]
+            if "ok" in result:
+                if not result["ok"]:
+                    return {**report, "valid": False, "error": f"Segment {info.number}: {result['error']}"}
+                report["verified_entries"] += result["count"]
+            if result["count"] and result["first_previous_hash"] != previous_hash:
+                return {**report, "valid": False, "error": f"Segment {info.number} does not link to the previous one"}
+            if result["count"]:
+                previous_hash = result["last_hash"]
+            if "ok" in result and info is not active:
+                new_checkpoints.append({"segment": info.number, **{k: result[k] for k in self.CHECKPOINT_FIELDS[1:]}})
+
+        self._save_checkpoints(new_checkpoints)
+        return report
+
+    # === Range proofs ===
+
+    def prove_range(self, start_time: Optional[datetime] = None,
+                    end_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Build a proof for the entries in a time window.
+
+        Checkpointed segments contribute the window's entries plus a Merkle
+        range proof; segments without a checkpoint yet (such as the active
+        one) contribute every entry up to the end of the window, replayed
+        from the start of the segment.
+
+        Args:
+            start_time: Start of the window
+            end_time: End of the window
+
+        Returns:
+            Proof with one part per segment overlapping the window
+        """
+        start_ts = start_time.timestamp() if start_time else None
+        end_ts = end_time.timestamp() if end_time else None
+        checkpoints = self.checkpoints()
+        parts = []
+
+        for info in self.store.segments():
+            if not info.may_match(None, None, None, start_ts, end_ts):
+                continue
+            entries = list(self.store.iter_segment(info.number))
+            ts = np.array([datetime.fromisoformat(e["timestamp"]).timestamp() for e in entries])
+            mask = np.ones(len(entries), dtype=bool)
+            if start_ts is not None:
+                mask &= ts >= start_ts
+            if end_ts is not None:
+                mask &= ts <= end_ts
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            checkpoint = checkpoints.get(info.number)
+            if checkpoint is None or checkpoint["count"] != len(entries):
+                # Not checkpointed: the whole segment is needed to replay the window
+                lo, hi = 0, int(rows[-1])
+                parts.append({"segment": info.number, "checkpoint": None, "lo": lo, "entries": entries[lo:hi + 1],
+                              "first_previous_hash": info.first_previous_hash})
+                continue
+            # Entries in a segment are in append order, so the window is contiguous
+            lo, hi = int(rows[0]), int(rows[-1])
+            levels = merkle_levels([merkle_leaf(e["hash"]) for e in entries])
+            parts.append({
+                "segment": info.number,
+                "checkpoint": checkpoint,
+                "lo": lo,
+                "entries": entries[lo:hi + 1],
+                "proof": range_proof(levels, lo, hi)
+            })
+        return {"start_time": start_ts, "end_time": end_ts, "parts": parts}
+
+    def verify_range(self, proof: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Check a proof from prove_range.
+
+        Returns:
+            valid, error and the number of entries proven
+        """
+        proven = 0
+        for part in proof["parts"]:
+            entries = part["entries"]
+            checkpoint = part["checkpoint"]
+            if checkpoint is None:
+                chain_start = part["first_previous_hash"] or GENESIS_HASH
+            else:
+                if not hmac.compare_digest(checkpoint.get("signature", ""), self._sign(checkpoint)):
+                    return {"valid": False, "error": f"Segment {part['segment']}: bad checkpoint signature",
+                            "entries": proven}
+                chain_start = entries[0].get("previous_hash") if entries else None
+                if part["lo"] == 0 and chain_start != checkpoint["first_previous_hash"]:
+                    return {"valid": False, "error": f"Segment {part['segment']}: chain start mismatch",
+                            "entries": proven}
+
+            previous_hash = chain_start
+            for entry in entries:
+                if entry.get("previous_hash") != previous_hash or \
+                        compute_entry_hash(entry, previous_hash) != entry.get("hash"):
+                    return {"valid": False, "error": f"Segment {part['segment']}: invalid entry at "
+                                                     f"{entry.get('timestamp')}", "entries": proven}
+                previous_hash = entry["hash"]
+
+            if checkpoint is not None:
+                root = root_from_range([e["hash"] for e in entries], part["lo"], checkpoint["count"],
+                                       part["proof"])
+                if root != checkpoint["root"]:
+                    return {"valid": False, "error": f"Segment {part['segment']}: Merkle root mismatch",
+                            "entries": proven}
+            proven += len(entries)
+        return {"valid": True, "error": None, "entries": proven}
@@ -101,14 +101,12 @@ def analyze_image(image_path: str, prompt: str = "Describe this image"):
 @app.task(name='services.celery_tasks.check_worker_health')
 def check_worker_health():
     """Periodic task to check worker health."""
+    import asyncio
     from services.worker_pool import get_worker_pool
     
     pool = get_worker_pool()
-    offline_workers = []
-    
-    for worker in pool.list_workers():
-        if not pool.health_check(worker.id):
-            offline_workers.append(worker.id)
+    health = asyncio.run(pool.check_health())
+    offline_workers = [worker_id for worker_id, healthy in health.items() if not healthy]
     
     if offline_workers:
         print(f"⚠️  Offline workers detected: {offline_workers}")
@@ -125,14 +123,7 @@ def cleanup_old_tasks(days_old: int = 7):
     
     queue = get_task_queue()
     cutoff_date = datetime.now() - timedelta(days=days_old)
-    
-    removed = 0
-    for task_id, task in list(queue.tasks.items()):
-        if task.get("completed_at"):
-            completed = datetime.fromisoformat(task["completed_at"])
-            if completed < cutoff_date:
-                del queue.tasks[task_id]
-                removed += 1
+    removed = queue.cleanup(max_age=days_old * 86400)
     
     return {
         "removed_count": removed,
@@ -3,10 +3,14 @@ Connection Pool Service - Manages HTTP connection pools for external APIs.
 """
 
 import httpx
+import importlib.util
 from typing import Dict, Optional
 from contextlib import asynccontextmanager
 import asyncio
 
+# HTTP/2 multiplexing needs the optional 'h2' package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 class ConnectionPool:
     """
     Manage HTTP connection pools for efficient API requests.
@@ -37,6 +41,7 @@ class ConnectionPool:
         base_url: str,
         headers: Optional[Dict[str, str]] = None,
         timeout: float = 30.0,
+        http2: bool = True,
         **kwargs
     ) -> httpx.AsyncClient:
         """
@@ -46,6 +51,7 @@ class ConnectionPool:
             base_url: Base URL for the client
             headers: Optional default headers
             timeout: Request timeout in seconds
+            http2: Negotiate HTTP/2 when the 'h2' package is installed
             **kwargs: Additional httpx.AsyncClient arguments
             
         Returns:
@@ -61,6 +67,7 @@ class ConnectionPool:
                     keepalive_expiry=30.0
                 ),
                 timeout=timeout,
+                http2=http2 and HTTP2_AVAILABLE,
                 **kwargs
             )
         return self.pools[base_url]
@@ -1,9 +1,23 @@
 """
 Cost Tracker - Monitor and manage API costs for LLM providers.
+
+Usage is recorded in an SQLite ledger (WAL mode, safe across worker
+processes). track_usage only appends to an in-memory buffer; a background
+thread flushes the buffer every few hundred milliseconds in one transaction,
+writing the raw rows and upserting a per-day rollup keyed by provider, model
+and agent. Summaries are indexed queries over the rollup.
+
+Per-agent spend is also kept in memory (the database totals as of the last
+flush plus this process's unflushed usage), so budget checks made before
+every LLM request are dictionary lookups.
 """
 
 import json
-from typing import Dict, Any, Optional, List
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 from datetime import datetime, timedelta
 from enum import Enum
@@ -27,37 +41,118 @@ COST_PER_1M_TOKENS = {
     Provider.OLLAMA: {"input": 0.0, "output": 0.0}  # Local/free
 }
 
+SUMMARY_GROUPS = ("provider", "model", "agent")
+
+# Fraction of a budget at which an agent is reported as "warning"
+BUDGET_WARNING_RATIO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_day ON usage(day);
+CREATE TABLE IF NOT EXISTS usage_rollup (
+    day TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, provider, model, agent)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_agent ON usage_rollup(agent, day);
+CREATE INDEX IF NOT EXISTS idx_rollup_model ON usage_rollup(model, day);
+"""
+
+def _name(value: Any) -> str:
+    if value is None:
+        return ""
+    return value.value if isinstance(value, Enum) else str(value)
+
+class BudgetExceededError(Exception):
+    """Raised when a request is rejected because its agent is over budget."""
+    
+    def __init__(self, agent: str, spent: float, budget: float):
+        self.agent = agent
+        self.spent = spent
+        self.budget = budget
+        super().__init__(f"Budget exceeded for agent '{agent}': ${spent:.2f} / ${budget:.2f}")
+
 class CostTracker:
     """Track API costs and manage budgets."""
     
-    def __init__(self, storage_dir: str = "data/costs"):
+    def __init__(self, storage_dir: str = "data/costs", flush_interval_ms: float = 250.0):
+        """
+        Args:
+            storage_dir: Directory of the usage database, budgets and alerts
+            flush_interval_ms: How often buffered usage is written to SQLite
+        """
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         
-        self.usage_file = self.storage_dir / "usage.json"
+        self.db_file = self.storage_dir / "usage.sqlite3"
+        self.usage_file = self.storage_dir / "usage.json"  # Legacy store, migrated on first start
         self.budgets_file = self.storage_dir / "budgets.json"
         
-        self.usage: Dict[str, Any] = self.load_usage()
-        self.budgets: Dict[str, float] = self.load_budgets()
-    
-    def load_usage(self) -> Dict[str, Any]:
-        """Load usage data from disk."""
-        if self.usage_file.exists():
-            try:
-                with open(self.usage_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Failed to load usage: {e}")
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self.migrate_json_usage()
         
-        return {"daily": {}, "monthly": {}, "total": {}}
+        # Spend per agent: database totals, rows being flushed, rows still buffered
+        self._spend_db: Dict[str, float] = self._load_agent_spend()
+        self._spend_flushing: Dict[str, float] = {}
+        self._spend_pending: Dict[str, float] = defaultdict(float)
+        self._budget_state: Dict[str, str] = {}
+        
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._buffer: List[Tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="cost-tracker-flush", daemon=True)
+        self._flusher.start()
+        
+        self.budgets: Dict[str, float] = self.load_budgets()
     
-    def save_usage(self):
-        """Save usage data to disk."""
+    def migrate_json_usage(self):
+        """Import the daily totals of a legacy usage.json into the rollup table."""
+        if not self.usage_file.exists():
+            return
         try:
-            with open(self.usage_file, 'w') as f:
-                json.dump(self.usage, f, indent=2)
+            with open(self.usage_file, 'r') as f:
+                daily = json.load(f).get("daily", {})
+            rows = [
+                (day, provider, "", "", data["input_tokens"], data["output_tokens"],
+                 data["total_cost"], data["requests"])
+                for day, providers in daily.items()
+                for provider, data in providers.items()
+            ]
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO usage_rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+            self.usage_file.rename(self.usage_file.with_suffix(".json.migrated"))
         except Exception as e:
-            print(f"Failed to save usage: {e}")
+            print(f"Failed to migrate usage: {e}")
+    
+    def _load_agent_spend(self) -> Dict[str, float]:
+        """Total cost per agent in the database."""
+        with self._db_lock:
+            rows = self._conn.execute("SELECT agent, SUM(cost) FROM usage_rollup GROUP BY agent").fetchall()
+        return {agent: cost for agent, cost in rows}
     
     def load_budgets(self) -> Dict[str, float]:
         """Load budget limits from disk."""
@@ -78,149 +173,242 @@ class CostTracker:
         except Exception as e:
             print(f"Failed to save budgets: {e}")
     
+    def calculate_cost(self, provider: str, input_tokens: int, output_tokens: int) -> float:
+        """Cost in USD of a request at the provider's rates."""
+        rates = COST_PER_1M_TOKENS.get(provider, {"input": 0, "output": 0})
+        return (input_tokens / 1_000_000) * rates["input"] + (output_tokens / 1_000_000) * rates["output"]
+    
     def track_usage(self, provider: str, input_tokens: int, output_tokens: int,
-                   agent: Optional[str] = None):
+                   agent: Optional[str] = None, model: Optional[str] = None,
+                   cost: Optional[float] = None):
         """
         Track token usage and calculate cost.
         
+        Only appends to an in-memory buffer; the background flusher persists it.
+        
         Args:
             provider: Provider name
             input_tokens: Number of input tokens
             output_tokens: Number of output tokens
             agent: Optional agent identifier
+            model: Optional model identifier
+            cost: Cost in USD when the caller knows the model's pricing
+                  (defaults to the provider's rates)
         """
-        # Get cost rates
-        rates = COST_PER_1M_TOKENS.get(provider, {"input": 0, "output": 0})
-        
-        # Calculate cost
-        input_cost = (input_tokens / 1_000_000) * rates["input"]
-        output_cost = (output_tokens / 1_000_000) * rates["output"]
-        total_cost = input_cost + output_cost
-        
-        # Get current date keys
-        now = datetime.now()
-        daily_key = now.strftime("%Y-%m-%d")
-        monthly_key = now.strftime("%Y-%m")
-        
-        # Initialize structures if needed
-        for period_type in ["daily", "monthly", "total"]:
-            if period_type not in self.usage:
-                self.usage[period_type] = {}
-        
-        # Get period key
-        if period_type == "daily":
-            period_key = daily_key
-        elif period_type == "monthly":
-            period_key = monthly_key
-        else:
-            period_key = "all_time"
-        
-        # Track by provider
-        for period_type, period_key in [("daily", daily_key), ("monthly", monthly_key), ("total", "all_time")]:
-            if period_key not in self.usage[period_type]:
-                self.usage[period_type][period_key] = {}
-            
-            if provider not in self.usage[period_type][period_key]:
-                self.usage[period_type][period_key][provider] = {
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "total_cost": 0.0,
-                    "requests": 0
-                }
-            
-            usage_data = self.usage[period_type][period_key][provider]
-            usage_data["input_tokens"] += input_tokens
-            usage_data["output_tokens"] += output_tokens
-            usage_data["total_cost"] += total_cost
-            usage_data["requests"] += 1
-        
-        self.save_usage()
+        if cost is None:
+            cost = self.calculate_cost(provider, input_tokens, output_tokens)
+        now = time.time()
+        row = (now, datetime.fromtimestamp(now).strftime("%Y-%m-%d"), _name(provider), _name(model),
+               _name(agent), int(input_tokens), int(output_tokens), cost)
+        with self._buffer_lock:
+            self._buffer.append(row)
+            self._spend_pending[row[4]] += cost
         
         # Check budget
         if agent and agent in self.budgets:
             self._check_budget_alert(agent)
     
-    def _check_budget_alert(self, agent: str) -> bool:
-        """Check if budget limit is exceeded."""
-        budget = self.budgets.get(agent, float('inf'))
-        spent = self.get_cost_by_agent(agent)
+    def flush(self) -> int:
+        """
+        Write buffered usage to the database in one transaction.
         
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            return self._flush()
+    
+    def _flush(self) -> int:
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+            pending, self._spend_pending = self._spend_pending, defaultdict(float)
+            self._spend_flushing = pending
+        if not rows:
+            return 0
+        rollup: Dict[Tuple, List] = defaultdict(lambda: [0, 0, 0.0, 0])
+        for _, day, provider, model, agent, input_tokens, output_tokens, cost in rows:
+            totals = rollup[(day, provider, model, agent)]
+            totals[0] += input_tokens
+            totals[1] += output_tokens
+            totals[2] += cost
+            totals[3] += 1
+        try:
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO usage (ts, day, provider, model, agent, input_tokens, output_tokens, cost) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self._conn.executemany(
+                    "INSERT INTO usage_rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(day, provider, model, agent) DO UPDATE SET "
+                    "input_tokens = input_tokens + excluded.input_tokens, "
+                    "output_tokens = output_tokens + excluded.output_tokens, "
+                    "cost = cost + excluded.cost, requests = requests + excluded.requests",
+                    [key + tuple(totals) for key, totals in rollup.items()]
+                )
+            spend_db = self._load_agent_spend()  # Includes other processes' usage
+        except sqlite3.Error as e:
+            print(f"Failed to save usage: {e}")
+            with self._buffer_lock:
+                self._buffer[:0] = rows  # Retry on the next flush
+                for agent, cost in pending.items():
+                    self._spend_pending[agent] += cost
+                self._spend_flushing = {}
+            return 0
+        with self._buffer_lock:
+            self._spend_db = spend_db
+            self._spend_flushing = {}
+        return len(rows)
+    
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+    
+    def close(self):
+        """Stop the background flusher and write out pending usage."""
+        self._closed.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+    
+    def agent_spend(self, agent: str) -> float:
+        """Total cost of an agent from the in-memory counters (no database access)."""
+        agent = _name(agent)
+        return (self._spend_db.get(agent, 0.0) + self._spend_flushing.get(agent, 0.0)
+                + self._spend_pending.get(agent, 0.0))
+    
+    def check_budget(self, agent: str) -> str:
+        """
+        Check an agent's spend against its budget in O(1).
+        
+        Args:
+            agent: Agent identifier
+            
+        Returns:
+            "ok", "warning" (at 90% of the budget) or "exceeded"
+        """
+        budget = self.budgets.get(_name(agent))
+        if budget is None:
+            return "ok"
+        spent = self.agent_spend(agent)
         if spent >= budget:
+            return "exceeded"
+        if spent >= budget * BUDGET_WARNING_RATIO:
+            return "warning"
+        return "ok"
+    
+    def _check_budget_alert(self, agent: str) -> bool:
+        """Alert when an agent's budget state worsens; returns whether it is over 90%."""
+        state = self.check_budget(agent)
+        previous = self._budget_state.get(agent, "ok")
+        self._budget_state[agent] = state
+        if state == previous or state == "ok":
+            return state != "ok"
+        
+        budget = self.budgets[agent]
+        spent = self.agent_spend(agent)
+        if state == "exceeded":
             self.trigger_alert(
                 agent=agent,
                 message=f"Budget exceeded: ${spent:.2f} / ${budget:.2f}",
                 alert_type="critical"
             )
-            return True
-        elif spent >= budget * 0.9:
+        elif previous == "ok":
             self.trigger_alert(
                 agent=agent,
                 message=f"Budget warning: ${spent:.2f} / ${budget:.2f} (90%)",
                 alert_type="warning"
             )
-            return True
-        
-        return False
+        return True
     
     def set_budget(self, agent: str, amount: float):
         """Set budget limit for an agent."""
         self.budgets[agent] = amount
+        self._budget_state.pop(agent, None)
         self.save_budgets()
     
     def get_budget(self, agent: str) -> Optional[float]:
         """Get budget limit for an agent."""
         return self.budgets.get(agent)
     
-    def get_cost_summary(self, period: str = "daily") -> Dict[str, Any]:
+    def _period_range(self, period: str, key: Optional[str] = None) -> Tuple[str, Optional[str], Optional[str]]:
+        """Resolve a period to its key and inclusive day range (None for all time)."""
+        now = datetime.now()
+        if period == "daily":
+            key = key or now.strftime("%Y-%m-%d")
+            return key, key, key
+        if period == "monthly":
+            key = key or now.strftime("%Y-%m")
+            return key, f"{key}-01", f"{key}-31"
+        return "all_time", None, None
+    
+    def _query_rollup(self, group_by: str, period: str, key: Optional[str] = None,
+                      agent: Optional[str] = None) -> Tuple[str, List[Tuple]]:
+        if group_by not in SUMMARY_GROUPS:
+            raise ValueError(f"Unknown group '{group_by}', expected one of {SUMMARY_GROUPS}")
+        self.flush()
+        key, first_day, last_day = self._period_range(period, key)
+        clauses, params = [], []
+        if first_day is not None:
+            clauses.append("day BETWEEN ? AND ?")
+            params += [first_day, last_day]
+        if agent is not None:
+            clauses.append("agent = ?")
+            params.append(agent)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT {group_by}, SUM(cost), SUM(requests), SUM(input_tokens), SUM(output_tokens) "
+                f"FROM usage_rollup {where} GROUP BY {group_by}", params
+            ).fetchall()
+        return key, rows
+    
+    def get_cost_summary(self, period: str = "daily", group_by: str = "provider",
+                         key: Optional[str] = None) -> Dict[str, Any]:
         """
         Get cost summary for a period.
         
         Args:
             period: Period type (daily, monthly, total)
+            group_by: Breakdown dimension (provider, model, agent)
+            key: Specific day (YYYY-MM-DD) or month (YYYY-MM); defaults to the current one
         
         Returns:
             Cost summary dict
         """
-        now = datetime.now()
-        if period == "daily":
-            key = now.strftime("%Y-%m-%d")
-        elif period == "monthly":
-            key = now.strftime("%Y-%m")
-        else:
-            key = "all_time"
-        
-        usage_data = self.usage.get(period, {}).get(key, {})
-        
-        total_cost = sum(
-            provider_data["total_cost"]
-            for provider_data in usage_data.values()
-        )
-        
-        total_requests = sum(
-            provider_data["requests"]
-            for provider_data in usage_data.values()
-        )
-        
+        key, rows = self._query_rollup(group_by, period, key)
         return {
             "period": period,
             "key": key,
-            "total_cost": round(total_cost, 4),
-            "total_requests": total_requests,
-            "by_provider": {
-                provider: {
-                    "cost": round(data["total_cost"], 4),
-                    "requests": data["requests"],
-                    "input_tokens": data["input_tokens"],
-                    "output_tokens": data["output_tokens"]
+            "total_cost": round(sum(row[1] for row in rows), 4),
+            "total_requests": sum(row[2] for row in rows),
+            f"by_{group_by}": {
+                (name or "unknown"): {
+                    "cost": round(cost, 4),
+                    "requests": requests,
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens
                 }
-                for provider, data in usage_data.items()
+                for name, cost, requests, input_tokens, output_tokens in rows
             }
         }
     
+    def get_daily_costs(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Get the cost of each of the last N days."""
+        self.flush()
+        since = (datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT day, SUM(cost), SUM(requests) FROM usage_rollup WHERE day >= ? GROUP BY day ORDER BY day",
+                (since,)
+            ).fetchall()
+        return [{"day": day, "cost": round(cost, 4), "requests": requests} for day, cost, requests in rows]
+    
     def get_cost_by_agent(self, agent: str, period: str = "total") -> float:
         """Get total cost for a specific agent."""
-        # This is a simplified version - would need to track per-agent in production
-        return 0.0
+        if period == "total":
+            return self.agent_spend(agent)
+        _, rows = self._query_rollup("agent", period, agent=agent)
+        return sum(row[1] for row in rows)
 
     def set_alert_callback(self, callback):
         """Set callback function for budget alerts."""
@@ -273,5 +461,6 @@ def get_cost_tracker() -> CostTracker:
     """Get or create CostTracker instance."""
     global _cost_tracker
     if _cost_tracker is None:
-        _cost_tracker = CostTracker()
+        from config.settings import settings
+        _cost_tracker = CostTracker(flush_interval_ms=settings.cost_flush_interval_ms)
     return _cost_tracker
@@ -0,0 +1,251 @@
+"""
+Embedding Cache - Content-addressed cache for text embeddings.
+
+Keys are a SHA-256 over the embedding model, a model version tag, the
+embedding kind (query or document) and the exact text, so a model change
+never serves stale vectors. Lookups go through an in-process LRU first and
+then an optional shared tier (Redis when reachable, otherwise an SQLite file
+on disk). CachedEmbeddings wraps any LangChain-style embeddings object and
+only sends unseen texts to the model, de-duplicating within each batch.
+"""
+
+import base64
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from sources.logger import Logger
+
+logger = Logger("embedding_cache.log")
+
+
+def _encode(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _decode(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class RedisTier:
+    """Shared tier storing float32 vectors in Redis via RedisCache."""
+
+    name = "redis"
+
+    def __init__(self, redis_cache, ttl: int = 7 * 24 * 3600):
+        self.cache = redis_cache
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        value = self.cache.get(f"emb:{key}")
+        return _decode(base64.b64decode(value)) if value else None
+
+    def set(self, key: str, vector: np.ndarray):
+        self.cache.set(f"emb:{key}", base64.b64encode(_encode(vector)).decode("ascii"), self.ttl)
+
+
+class DiskTier:
+    """Persistent tier in a single SQLite file."""
+
+    name = "disk"
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def set(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", (key, _encode(vector)))
+            self._conn.commit()
+
+
+class EmbeddingCache:
+    """Two-tier (LRU + optional shared tier) embedding cache."""
+
+    def __init__(self, max_entries: int = 50_000, tier=None):
+        """
+        Args:
+            max_entries: Capacity of the in-process LRU
+            tier: Optional RedisTier or DiskTier consulted on LRU misses
+        """
+        self.max_entries = max_entries
+        self.tier = tier
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "tier_hits": 0,
+            "misses": 0,
+            "embedded": 0,
+            "embed_ms": 0.0,
+            "saved_ms": 0.0
+        }
+
+    @staticmethod
+    def key(model: str, version: str, kind: str, text: str) -> str:
+        """Content-addressed cache key."""
+        return hashlib.sha256(f"{model}\0{version}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look a key up in the LRU, then the shared tier."""
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+                return vector
+        if self.tier is not None:
+            try:
+                vector = self.tier.get(key)
+            except Exception as e:
+                logger.warning(f"Embedding cache tier read failed: {e}")
+                vector = None
+            if vector is not None:
+                with self._lock:
+                    self._remember(key, vector)
+                    self.stats["tier_hits"] += 1
+                return vector
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, vector: np.ndarray):
+        """Store a vector in both tiers."""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+        if self.tier is not None:
+            try:
+                self.tier.set(key, vector)
+            except Exception as e:
+                logger.warning(f"Embedding cache tier write failed: {e}")
+
+    def record_embedding(self, count: int, elapsed_ms: float, hits: int):
+        """Account for a model call and estimate the time the hits saved."""
+        with self._lock:
+            self.stats["embedded"] += count
+            self.stats["embed_ms"] += elapsed_ms
+            if self.stats["embedded"]:
+                self.stats["saved_ms"] += hits * self.stats["embed_ms"] / self.stats["embedded"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._lru)
+        lookups = stats["hits"] + stats["tier_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["tier_hits"]) / lookups if lookups else 0.0
+        stats["avg_embed_ms"] = stats["embed_ms"] / stats["embedded"] if stats["embedded"] else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["tier"] = self.tier.name if self.tier is not None else None
+        return stats
+
+    def clear_stats(self):
+        """Reset counters (cached vectors are kept)."""
+        with self._lock:
+            for name in self.stats:
+                self.stats[name] = 0.0 if name.endswith("_ms") else 0
+
+
+class CachedEmbeddings:
+    """LangChain-compatible embeddings wrapper backed by EmbeddingCache."""
+
+    def __init__(self, embeddings, model: str, version: str = "1", cache: Optional[EmbeddingCache] = None):
+        """
+        Args:
+            embeddings: Object with embed_documents/embed_query (e.g. OllamaEmbeddingBackend)
+            model: Model identifier included in every key
+            version: Version tag; bump it to invalidate vectors for the same model name
+            cache: Embedding cache (defaults to the shared instance)
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.version = version
+        self.cache = cache or get_embedding_cache()
+
+    def _hits_since(self, before: Dict[str, Any]) -> int:
+        stats = self.cache.stats
+        return (stats["hits"] - before["hits"]) + (stats["tier_hits"] - before["tier_hits"])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, sending only unseen unique texts to the model."""
+        before = dict(self.cache.stats)
+        keys = [self.cache.key(self.model, self.version, "document", text) for text in texts]
+        vectors: Dict[str, Any] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            vector = self.cache.get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                vectors[key] = vector
+
+        if missing:
+            start = time.perf_counter()
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for key, vector in zip(missing, embedded):
+                self.cache.set(key, vector)
+                vectors[key] = vector
+            duplicates = len(texts) - len(set(keys))
+            self.cache.record_embedding(len(missing), elapsed_ms, self._hits_since(before) + duplicates)
+        else:
+            self.cache.record_embedding(0, 0.0, len(texts))
+        return [np.asarray(vectors[key], dtype=np.float32).tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing a cached vector when available."""
+        key = self.cache.key(self.model, self.version, "query", text)
+        vector = self.cache.get(key)
+        if vector is not None:
+            self.cache.record_embedding(0, 0.0, 1)
+            return vector.tolist()
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self.cache.record_embedding(1, (time.perf_counter() - start) * 1000, 0)
+        self.cache.set(key, vector)
+        return list(vector)
+
+
+# Singleton instance
+_embedding_cache: Optional[EmbeddingCache] = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the shared EmbeddingCache."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        from config.settings import settings
+
+        tier = None
+        backend = settings.embedding_cache_tier
+        if backend in ("auto", "redis"):
+            from services.redis_cache import get_redis_cache
+            redis_cache = get_redis_cache()
+            if redis_cache.available:
+                tier = RedisTier(redis_cache, ttl=settings.embedding_cache_ttl)
+        if tier is None and backend in ("auto", "disk") and settings.embedding_cache_dir:
+            tier = DiskTier(str(Path(settings.embedding_cache_dir) / "embeddings.sqlite3"))
+        _embedding_cache = EmbeddingCache(max_entries=settings.embedding_cache_max_entries, tier=tier)
+    return _embedding_cache
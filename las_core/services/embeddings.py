@@ -0,0 +1,181 @@
+"""
+Embedding Backends - Pluggable text embedding providers.
+
+Backends turn text into L2-normalized float32 vectors so callers can use a
+plain dot product as cosine similarity.
+"""
+
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+import requests
+
+from sources.logger import Logger
+
+logger = Logger("embeddings.log")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or a matrix of row vectors (float32)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingBackend(ABC):
+    """Abstract base class for embedding backends."""
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Stable identifier of the backend and model (e.g. ``ollama:nomic-embed-text``)."""
+        pass
+
+    @abstractmethod
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed several texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix of shape (len(texts), dimension) with unit rows
+        """
+        pass
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text into a unit float32 vector."""
+        return self.embed_batch([text])[0]
+
+    # LangChain-style interface, so a backend can stand in for LangChain embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with one embed_batch() call."""
+        return self.embed_batch(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query."""
+        return self.embed(text).tolist()
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Dependency-free feature-hashing embeddings.
+
+    Words and character trigrams are hashed into a fixed number of buckets,
+    so texts sharing vocabulary land close together. Used as a fallback when
+    no model server is available.
+    """
+
+    def __init__(self, dimension: int = 512):
+        self.dimension = dimension
+
+    @property
+    def name(self) -> str:
+        return f"hashing:{self.dimension}"
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_RE.findall(text.lower())
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                matrix[row, (value >> 1) % self.dimension] += sign
+        return normalize(matrix)
+
+
+class OllamaEmbeddingBackend(EmbeddingBackend):
+    """Embeddings served by an Ollama instance (same model as RAGService)."""
+
+    def __init__(self, base_url: str, model: str = "nomic-embed-text", timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @property
+    def name(self) -> str:
+        return f"ollama:{self.model}"
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # /api/embed takes the whole batch in one request
+        response = self.session.post(
+            f"{self.base_url}/api/embed",
+            json={"model": self.model, "input": list(texts)},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return normalize(np.array(response.json()["embeddings"], dtype=np.float32))
+
+
+class SentenceTransformerEmbeddingBackend(EmbeddingBackend):
+    """Local sentence-transformers model (loaded lazily on first use)."""
+
+    def __init__(self, model: str = "all-MiniLM-L6-v2", device: Optional[str] = None):
+        self.model_name = model
+        self.device = device
+        self._model = None
+
+    @property
+    def name(self) -> str:
+        return f"sentence-transformers:{self.model_name}"
+
+    def _load(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = self._load().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def create_embedding_backend(backend: str, model: Optional[str] = None,
+                             base_url: Optional[str] = None) -> EmbeddingBackend:
+    """
+    Create an embedding backend by name.
+
+    Args:
+        backend: One of ``ollama``, ``sentence-transformers`` or ``hashing``
+        model: Optional model name for the backend
+        base_url: Server address for the Ollama backend
+
+    Returns:
+        EmbeddingBackend instance
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    backend = backend.lower()
+    if backend == "ollama":
+        if base_url is None:
+            from config.settings import settings
+            base_url = settings.provider_server_address
+        return OllamaEmbeddingBackend(base_url, model or "nomic-embed-text")
+    if backend in ("sentence-transformers", "sentence_transformers"):
+        return SentenceTransformerEmbeddingBackend(model or "all-MiniLM-L6-v2")
+    if backend == "hashing":
+        return HashingEmbeddingBackend()
+    raise ValueError(
+        f"Unknown embedding backend: '{backend}'. "
+        "Available backends: ollama, sentence-transformers, hashing"
+    )
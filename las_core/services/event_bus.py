@@ -0,0 +1,270 @@
+"""
+Event Bus Service - Pub/sub fan-out for Server-Sent Events.
+
+Every subscriber (one per SSE connection) gets its own bounded buffer; when a
+slow consumer falls behind, the oldest buffered events are dropped instead of
+blocking publishers. Events carry monotonically increasing ids in Redis
+Stream format ("<ms>-<seq>") so clients can resume with Last-Event-ID.
+
+With Redis available, events are appended to a capped Redis Stream and each
+API worker runs a single reader task that fans them out locally, so any
+number of workers can serve SSE clients. Without Redis, fan-out happens
+in-process with a bounded replay history.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sources.logger import Logger
+
+logger = Logger("event_bus.log")
+
+
+def event_id_key(event_id: str) -> Tuple[int, int]:
+    """Parse an event id into a sortable (ms, seq) tuple."""
+    ms, _, seq = str(event_id).partition("-")
+    return int(ms), int(seq or 0)
+
+
+class Subscription:
+    """Bounded, drop-oldest event buffer for one consumer."""
+
+    def __init__(self, maxsize: int = 256):
+        """
+        Args:
+            maxsize: Maximum number of buffered events
+        """
+        self.buffer: Deque[Dict[str, Any]] = deque(maxlen=maxsize)
+        self.dropped = 0
+        self.last_id: Optional[str] = None
+        self._ready = asyncio.Event()
+
+    def push(self, event: Dict[str, Any]):
+        """Buffer an event, dropping the oldest one if full. Duplicates are ignored."""
+        if self.last_id is not None and event_id_key(event["id"]) <= event_id_key(self.last_id):
+            return
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(event)
+        self.last_id = event["id"]
+        self._ready.set()
+
+    async def get(self) -> Dict[str, Any]:
+        """Wait for and return the next buffered event."""
+        while not self.buffer:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.buffer.popleft()
+
+    def take_dropped(self) -> int:
+        """Return and reset the number of events dropped since the last call."""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class EventBus:
+    """In-process event bus with bounded replay history."""
+
+    backend = "memory"
+
+    def __init__(self, buffer_size: int = 256, history_size: int = 1000):
+        """
+        Args:
+            buffer_size: Per-subscriber buffer size
+            history_size: Number of recent events kept for Last-Event-ID resume
+        """
+        self.buffer_size = buffer_size
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self.subscribers: List[Subscription] = []
+        self._last_ms = 0
+        self._seq = 0
+        self.stats = {"published": 0, "dropped": 0}
+
+    def _next_id(self) -> str:
+        ms = int(time.time() * 1000)
+        if ms <= self._last_ms:
+            ms = self._last_ms
+            self._seq += 1
+        else:
+            self._seq = 0
+        self._last_ms = ms
+        return f"{ms}-{self._seq}"
+
+    def _fan_out(self, event: Dict[str, Any]):
+        for subscription in self.subscribers:
+            before = subscription.dropped
+            subscription.push(event)
+            self.stats["dropped"] += subscription.dropped - before
+
+    async def publish(self, event_type: str, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Publish an event to all subscribers.
+
+        Args:
+            event_type: Event type
+            data: JSON-serializable payload
+
+        Returns:
+            The event id
+        """
+        event = {"id": self._next_id(), "type": event_type, "data": data}
+        self.history.append(event)
+        self.stats["published"] += 1
+        self._fan_out(event)
+        return event["id"]
+
+    async def _replay(self, last_event_id: str) -> List[Dict[str, Any]]:
+        after = event_id_key(last_event_id)
+        return [event for event in self.history if event_id_key(event["id"]) > after]
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Register a subscriber.
+
+        Args:
+            last_event_id: Resume after this event id, replaying what is still retained
+
+        Returns:
+            Subscription to read events from
+        """
+        subscription = Subscription(self.buffer_size)
+        self.subscribers.append(subscription)
+        if last_event_id:
+            try:
+                for event in await self._replay(last_event_id):
+                    subscription.push(event)
+            except ValueError:
+                logger.warning(f"Ignoring malformed Last-Event-ID: {last_event_id}")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber."""
+        try:
+            self.subscribers.remove(subscription)
+        except ValueError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get event bus statistics."""
+        return {**self.stats, "backend": self.backend, "subscribers": len(self.subscribers)}
+
+
+class RedisStreamEventBus(EventBus):
+    """Event bus backed by a capped Redis Stream, shared across workers."""
+
+    backend = "redis"
+
+    def __init__(self, client, stream_key: str = "las:events", buffer_size: int = 256,
+                 history_size: int = 1000, block_ms: int = 5000):
+        """
+        Args:
+            client: redis.asyncio.Redis client (decode_responses=True)
+            stream_key: Redis Stream key
+            buffer_size: Per-subscriber buffer size
+            history_size: Approximate stream length retained for resume
+            block_ms: XREAD blocking timeout in milliseconds
+        """
+        super().__init__(buffer_size=buffer_size, history_size=0)
+        self.client = client
+        self.stream_key = stream_key
+        self.history_size = history_size
+        self.block_ms = block_ms
+        self._reader: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _decode(event_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+        return {"id": event_id, "type": fields.get("type", "message"), "data": json.loads(fields.get("data", "null"))}
+
+    async def publish(self, event_type: str, data: Dict[str, Any]) -> Optional[str]:
+        """Append the event to the stream; every worker's reader delivers it."""
+        try:
+            event_id = await self.client.xadd(
+                self.stream_key, {"type": event_type, "data": json.dumps(data)},
+                maxlen=self.history_size, approximate=True
+            )
+            self.stats["published"] += 1
+            return event_id
+        except Exception as e:
+            logger.error(f"Failed to publish event to Redis: {e}")
+            return None
+
+    async def _replay(self, last_event_id: str) -> List[Dict[str, Any]]:
+        event_id_key(last_event_id)  # Validate before querying
+        entries = await self.client.xrange(self.stream_key, min=f"({last_event_id}", max="+")
+        return [self._decode(event_id, fields) for event_id, fields in entries]
+
+    async def _read_loop(self, last_id: Optional[str] = None):
+        """Read stream entries after ``last_id`` (default: the current tail) and fan them out."""
+        backoff = 1.0
+        while self.subscribers:
+            try:
+                if last_id is None:
+                    latest = await self.client.xrevrange(self.stream_key, count=1)
+                    last_id = latest[0][0] if latest else "0-0"
+                response = await self.client.xread({self.stream_key: last_id}, count=100, block=self.block_ms)
+                backoff = 1.0
+                for _, entries in response or []:
+                    for event_id, fields in entries:
+                        last_id = event_id
+                        self._fan_out(self._decode(event_id, fields))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis stream read failed: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+        self._reader = None
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = await super().subscribe(last_event_id)
+        if self._reader is None or self._reader.done():
+            # Continue right after what was replayed so nothing falls in between
+            start_id = subscription.last_id
+            self._reader = asyncio.create_task(self._read_loop(start_id))
+        return subscription
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "stream_key": self.stream_key}
+
+
+def _create_event_bus() -> EventBus:
+    from config.settings import settings
+
+    if settings.event_bus_backend in ("auto", "redis"):
+        from services.redis_cache import get_redis_cache
+        cache = get_redis_cache()
+        if cache.available:
+            import redis.asyncio as aioredis
+            pool_kwargs = cache.redis.connection_pool.connection_kwargs
+            client = aioredis.Redis(
+                host=pool_kwargs.get("host", "localhost"),
+                port=pool_kwargs.get("port", 6379),
+                db=pool_kwargs.get("db", 0),
+                password=pool_kwargs.get("password"),
+                decode_responses=True
+            )
+            logger.info("Using Redis Streams event bus")
+            return RedisStreamEventBus(
+                client,
+                stream_key=settings.event_bus_stream_key,
+                buffer_size=settings.event_bus_buffer_size,
+                history_size=settings.event_bus_history_size
+            )
+        if settings.event_bus_backend == "redis":
+            logger.warning("Redis unavailable, falling back to in-process event bus")
+
+    return EventBus(buffer_size=settings.event_bus_buffer_size, history_size=settings.event_bus_history_size)
+
+
+# Singleton instance
+_event_bus: Optional[EventBus] = None
+
+def get_event_bus() -> EventBus:
+    """Get or create the shared EventBus."""
+    global _event_bus
+    if _event_bus is None:
+        _event_bus = _create_event_bus()
+    return _event_bus
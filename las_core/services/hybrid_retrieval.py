@@ -0,0 +1,420 @@
+"""
+Hybrid Retrieval - BM25 + dense search with reciprocal-rank fusion.
+
+Dense embeddings miss exact-token matches (identifiers, filenames, error
+strings). BM25Index is a local inverted index kept next to each Qdrant
+collection and persisted as an append-only log. HybridRetriever fetches
+candidates from both, fuses the rankings with reciprocal-rank fusion and can
+re-rank the head of the list with a CPU cross-encoder under a latency budget.
+Per-stage timings of the last search are kept in ``last_timings``.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sources.logger import Logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = Logger("hybrid_retrieval.log")
+
+SEARCH_MODES = ("hybrid", "dense", "sparse")
+
+_WORD = re.compile(r"[A-Za-z0-9_]+(?:[.\-][A-Za-z0-9_]+)*")
+_SUBWORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize for code-aware lexical search.
+
+    Compound tokens such as ``config.settings``, ``ERR-42`` or
+    ``getUserName`` are kept whole and also split into their parts.
+    """
+    tokens = []
+    for match in _WORD.finditer(text):
+        word = match.group(0)
+        tokens.append(word.lower())
+        parts = [p.lower() for piece in re.split(r"[._\-]", word) for p in _SUBWORD.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index with an append-only persistence log.
+
+    Only postings, document lengths and each document's log offset are held
+    in memory; texts are read back from the log when a result needs them.
+    The log is shared by every worker: writes take an exclusive file lock and
+    first replay records appended by other workers, searches pick them up the
+    same way, and a log rewritten by compaction is reloaded. The log is
+    compacted once superseded records outnumber live documents.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75,
+                 compact_min_records: int = 1000):
+        """
+        Args:
+            path: JSONL log file; the index is rebuilt from it on load
+            k1: Term frequency saturation
+            b: Length normalization
+            compact_min_records: Superseded records tolerated before compacting
+        """
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self.compact_min_records = compact_min_records
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        # Log offset of each document's record (the record itself without a log)
+        self._locations: Dict[str, Any] = {}
+        self.total_length = 0
+        self.dead_records = 0
+        # Per-document k1 * length normalization, recomputed lazily after writes
+        self._norms: Optional[Dict[str, float]] = None
+        self._lock = threading.RLock()
+        self._log = None
+        self._log_size = 0
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.touch()
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    # === Log ===
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive advisory lock on the log, shared by all workers (no-op without fcntl)."""
+        with open(self.path.with_suffix(self.path.suffix + ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # Closing the file releases the lock
+
+    def _reset(self):
+        self.postings = defaultdict(dict)
+        self.doc_lengths = {}
+        self._locations = {}
+        self.total_length = 0
+        self.dead_records = 0
+        self._norms = None
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.path, "rb")
+        self._log_size = 0
+
+    def _sync(self):
+        """Replay records other workers appended, reloading if the log was compacted."""
+        if not self.path:
+            return
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if self._log is None or os.fstat(self._log.fileno()).st_ino != stat.st_ino:
+            self._reset()
+        elif stat.st_size == self._log_size:
+            return
+        while True:
+            # Seek every record: removals read earlier records through the same handle
+            self._log.seek(self._log_size)
+            line = self._log.readline()
+            if not line.endswith(b"\n"):
+                break  # End of log, or a torn or still-being-written record
+            offset = self._log_size
+            self._log_size += len(line)
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("op") == "remove":
+                # The remove record and the record it removes are both dead
+                self.dead_records += 2 if record["id"] in self.doc_lengths else 1
+                self._remove(record["id"])
+            else:
+                self._add(record["id"], record["text"], offset)
+
+    def _read(self, location: Any) -> Dict[str, Any]:
+        if not isinstance(location, int):
+            return location
+        self._log.seek(location)
+        return json.loads(self._log.readline())
+
+    def _append_log(self, records: List[Dict[str, Any]]):
+        with open(self.path, "ab") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records).encode("utf-8"))
+
+    # === Index ===
+
+    def _add(self, doc_id: str, text: str, location: Any):
+        if doc_id in self.doc_lengths:
+            self._remove(doc_id)
+            self.dead_records += 1
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings[term][doc_id] = tf
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        self._norms = None
+        self._locations[doc_id] = location
+
+    def _remove(self, doc_id: str):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        self._norms = None
+        text = self._read(self._locations.pop(doc_id))["text"]
+        for term in set(tokenize(text)):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    def add_documents(self, documents: List[Tuple[str, str, Dict[str, Any]]]):
+        """
+        Index documents.
+
+        Args:
+            documents: (id, text, metadata) tuples
+        """
+        records = [{"id": d, "text": t, "metadata": m} for d, t, m in documents]
+        with self._lock:
+            if not self.path:
+                for record in records:
+                    self._add(record["id"], record["text"], record)
+                return
+            with self._file_lock():
+                self._sync()
+                self._append_log(records)
+                self._sync()
+            self._maybe_compact()
+
+    def remove(self, doc_id: str):
+        """Remove a document from the index."""
+        with self._lock:
+            if not self.path:
+                self._remove(doc_id)
+                return
+            with self._file_lock():
+                self._sync()
+                self._append_log([{"op": "remove", "id": doc_id}])
+                self._sync()
+            self._maybe_compact()
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank documents for a query.
+
+        Returns:
+            (id, score) tuples, best first
+        """
+        with self._lock:
+            self._sync()
+            n = len(self.doc_lengths)
+            if not n:
+                return []
+            if self._norms is None:
+                avg_length = self.total_length / n or 1.0
+                self._norms = {
+                    doc_id: self.k1 * (1 - self.b + self.b * length / avg_length)
+                    for doc_id, length in self.doc_lengths.items()
+                }
+            norms = self._norms
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                weight = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5)) * (self.k1 + 1)
+                for doc_id, tf in docs.items():
+                    scores[doc_id] += weight * tf / (tf + norms[doc_id])
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Stored text and metadata for a document (read from the log)."""
+        with self._lock:
+            location = self._locations.get(doc_id)
+            if location is None:
+                return None
+            record = self._read(location)
+        return {"text": record["text"], "metadata": record.get("metadata") or {}}
+
+    def _maybe_compact(self):
+        if self.dead_records >= max(self.compact_min_records, len(self.doc_lengths)):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with only live documents."""
+        if not self.path:
+            return
+        with self._lock, self._file_lock():
+            self._sync()
+            tmp = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                for doc_id, offset in self._locations.items():
+                    self._log.seek(offset)
+                    f.write(self._log.readline())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._sync()
+        logger.info(f"Compacted BM25 log {self.path} to {len(self)} documents")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists: score(d) = sum over lists of 1 / (k + rank).
+
+    Returns:
+        (id, fused score) tuples, best first
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class CrossEncoderReranker:
+    """Cross-encoder re-ranker that stops scoring when its latency budget runs out."""
+
+    def __init__(self, model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", budget_ms: float = 150.0,
+                 batch_size: int = 8):
+        """
+        Args:
+            model: sentence-transformers CrossEncoder model name
+            budget_ms: Time budget per query; unscored candidates keep their fused order
+            batch_size: Candidates scored per forward pass
+        """
+        self.model_name = model
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError("Re-ranking requires sentence-transformers: pip install sentence-transformers") from e
+            self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        return [float(s) for s in self.model.predict([(query, text) for text in texts])]
+
+    def rerank(self, query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Re-rank candidates head-first within the budget.
+
+        Returns:
+            Scored candidates sorted by cross-encoder score, followed by the
+            unscored remainder in their original order
+        """
+        deadline = time.perf_counter() + self.budget_ms / 1000.0
+        scored = []
+        index = 0
+        while index < len(candidates) and time.perf_counter() < deadline:
+            batch = candidates[index:index + self.batch_size]
+            for candidate, score in zip(batch, self.score(query, [c["text"] for c in batch])):
+                scored.append({**candidate, "score": score, "reranked": True})
+            index += len(batch)
+        scored.sort(key=lambda c: c["score"], reverse=True)
+        return scored + candidates[index:]
+
+
+class HybridRetriever:
+    """Dense + BM25 retrieval with RRF fusion and optional re-ranking."""
+
+    def __init__(self, dense_search: Callable[[str, int], List[Dict[str, Any]]], bm25: BM25Index,
+                 reranker: Optional[CrossEncoderReranker] = None, candidates: int = 20, rrf_k: int = 60):
+        """
+        Args:
+            dense_search: (query, k) -> [{"id", "text", "metadata", "score"}] best first
+            bm25: Lexical index over the same documents (same ids)
+            reranker: Optional cross-encoder re-ranker
+            candidates: Candidates fetched from each retriever before fusion
+            rrf_k: RRF rank offset
+        """
+        self.dense_search = dense_search
+        self.bm25 = bm25
+        self.reranker = reranker
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.last_timings: Dict[str, float] = {}
+
+    def search(self, query: str, limit: int = 4, mode: str = "hybrid",
+               rerank: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve documents for a query.
+
+        Args:
+            query: Search query
+            limit: Number of results
+            mode: hybrid, dense or sparse
+            rerank: Re-rank with the cross-encoder (defaults to whether one is configured)
+
+        Returns:
+            Result dicts with id, text, metadata and score, best first
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        timings = {}
+        fetch = max(limit, self.candidates)
+        docs: Dict[str, Dict[str, Any]] = {}
+        rankings = []
+
+        if mode in ("hybrid", "dense"):
+            start = time.perf_counter()
+            dense = self.dense_search(query, fetch)
+            timings["dense_ms"] = (time.perf_counter() - start) * 1000
+            for hit in dense:
+                docs.setdefault(str(hit["id"]), hit)
+            rankings.append([str(hit["id"]) for hit in dense])
+
+        if mode in ("hybrid", "sparse"):
+            start = time.perf_counter()
+            sparse = self.bm25.search(query, fetch)
+            timings["sparse_ms"] = (time.perf_counter() - start) * 1000
+            for doc_id, score in sparse:
+                if doc_id not in docs:
+                    doc = self.bm25.get(doc_id) or {"text": "", "metadata": {}}
+                    docs[doc_id] = {"id": doc_id, "text": doc["text"], "metadata": doc["metadata"], "score": score}
+            rankings.append([doc_id for doc_id, _ in sparse])
+
+        start = time.perf_counter()
+        if len(rankings) > 1:
+            results = [{**docs[doc_id], "score": score} for doc_id, score in reciprocal_rank_fusion(rankings, self.rrf_k)]
+        else:
+            results = [docs[doc_id] for doc_id in rankings[0]]
+        timings["fusion_ms"] = (time.perf_counter() - start) * 1000
+
+        if rerank is None:
+            rerank = self.reranker is not None
+        if rerank and self.reranker is not None and results:
+            start = time.perf_counter()
+            results = self.reranker.rerank(query, results[:fetch])
+            timings["rerank_ms"] = (time.perf_counter() - start) * 1000
+
+        timings["total_ms"] = sum(timings.values())
+        self.last_timings = timings
+        return results[:limit]
@@ -0,0 +1,257 @@
+"""
+Ingestion Pipeline - Background batched embedding and bulk upserts for RAG.
+
+Texts submitted from the chat path are queued in O(1). A single worker
+thread splits them, coalesces the chunks into embedding micro-batches sized
+by token count, embeds each batch with one request and uploads the points to
+Qdrant in large ``wait=False`` upserts. A bounded queue applies backpressure
+to producers when ingestion falls behind, and flush() waits until everything
+submitted so far has been written.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sources.logger import Logger
+
+logger = Logger("ingestion_pipeline.log")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class IngestionPipeline:
+    """Queue-backed ingestion worker for RAGService."""
+
+    def __init__(
+        self,
+        rag_service=None,
+        max_batch_tokens: int = 8192,
+        max_batch_chunks: int = 256,
+        max_queue: int = 10_000,
+        linger: float = 0.05,
+        upsert_batch_size: int = 512
+    ):
+        """
+        Args:
+            rag_service: RAGService providing split_text, embeddings and upsert_chunks
+                (defaults to the shared instance)
+            max_batch_tokens: Token budget of one embedding request
+            max_batch_chunks: Maximum chunks in one embedding request
+            max_queue: Maximum queued texts before producers block
+            linger: Seconds to wait for more texts before embedding a partial batch
+            upsert_batch_size: Maximum points per Qdrant upsert
+        """
+        self._rag = rag_service
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_chunks = max_batch_chunks
+        self.linger = linger
+        self.upsert_batch_size = upsert_batch_size
+        self._queue: "queue.Queue[Tuple[str, str, Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            "submitted": 0,
+            "ingested_texts": 0,
+            "ingested_chunks": 0,
+            "embedding_batches": 0,
+            "upserts": 0,
+            "failed_chunks": 0,
+            "blocked_submits": 0
+        }
+
+    @property
+    def rag(self):
+        if self._rag is None:
+            from services.rag_service import get_rag_service
+            self._rag = get_rag_service()
+        return self._rag
+
+    def start(self):
+        """Start the worker thread if it is not running."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="rag-ingestion", daemon=True)
+                self._thread.start()
+
+    def _add_pending(self, count: int):
+        with self._idle:
+            self._pending += count
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def submit(self, text: str, collection_name: str, metadata: Dict[str, Any] = None,
+               timeout: Optional[float] = None):
+        """
+        Queue a text for ingestion, blocking while the queue is full.
+
+        Args:
+            text: Text to ingest
+            collection_name: Target collection
+            metadata: Metadata stored with every chunk
+            timeout: Maximum seconds to wait for queue space
+
+        Raises:
+            queue.Full: If the queue stayed full for ``timeout`` seconds
+        """
+        self.start()
+        self._add_pending(1)
+        try:
+            try:
+                self._queue.put_nowait((text, collection_name, metadata or {}))
+            except queue.Full:
+                self.stats["blocked_submits"] += 1
+                self._queue.put((text, collection_name, metadata or {}), timeout=timeout)
+        except queue.Full:
+            self._add_pending(-1)
+            raise
+        self.stats["submitted"] += 1
+
+    async def asubmit(self, text: str, collection_name: str, metadata: Dict[str, Any] = None,
+                      timeout: Optional[float] = None):
+        """Async submit(); waits for queue space in a worker thread instead of blocking the loop."""
+        self.start()
+        self._add_pending(1)
+        item = (text, collection_name, metadata or {})
+        try:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.stats["blocked_submits"] += 1
+                await asyncio.to_thread(self._queue.put, item, True, timeout)
+        except BaseException:
+            self._add_pending(-1)
+            raise
+        self.stats["submitted"] += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every submitted text has been embedded and upserted.
+
+        Returns:
+            False if the timeout expired first
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    async def aflush(self, timeout: Optional[float] = None) -> bool:
+        """Async flush()."""
+        return await asyncio.to_thread(self.flush, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush pending texts and stop the worker."""
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_items(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Block for one text, then gather more until the batch budget or linger expires."""
+        try:
+            items = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        tokens = estimate_tokens(items[0][0])
+        deadline = time.monotonic() + self.linger
+        while tokens < self.max_batch_tokens and len(items) < self.max_batch_chunks:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            items.append(item)
+            tokens += estimate_tokens(item[0])
+        return items
+
+    def _micro_batches(self, chunks: List[Tuple[str, Any]]):
+        """Group (collection, chunk) pairs into batches within the token and size budgets."""
+        batch, tokens = [], 0
+        for entry in chunks:
+            size = estimate_tokens(entry[1].page_content)
+            if batch and (tokens + size > self.max_batch_tokens or len(batch) >= self.max_batch_chunks):
+                yield batch
+                batch, tokens = [], 0
+            batch.append(entry)
+            tokens += size
+        if batch:
+            yield batch
+
+    def _ingest(self, items: List[Tuple[str, str, Dict[str, Any]]]):
+        chunks = []
+        for text, collection_name, metadata in items:
+            try:
+                chunks.extend((collection_name, chunk) for chunk in self.rag.split_text(text, metadata))
+            except Exception as e:
+                logger.error(f"Error splitting text for {collection_name}: {e}")
+
+        by_collection = defaultdict(lambda: ([], []))
+        for batch in self._micro_batches(chunks):
+            try:
+                vectors = self.rag.embeddings.embed_documents([chunk.page_content for _, chunk in batch])
+                self.stats["embedding_batches"] += 1
+            except Exception as e:
+                logger.error(f"Error embedding batch of {len(batch)} chunks: {e}")
+                self.stats["failed_chunks"] += len(batch)
+                continue
+            for (collection_name, chunk), vector in zip(batch, vectors):
+                by_collection[collection_name][0].append(chunk)
+                by_collection[collection_name][1].append(vector)
+
+        for collection_name, (collection_chunks, vectors) in by_collection.items():
+            for start in range(0, len(collection_chunks), self.upsert_batch_size):
+                end = start + self.upsert_batch_size
+                try:
+                    self.rag.upsert_chunks(collection_name, collection_chunks[start:end], vectors[start:end], wait=False)
+                    self.stats["upserts"] += 1
+                    self.stats["ingested_chunks"] += len(collection_chunks[start:end])
+                except Exception as e:
+                    logger.error(f"Error upserting into {collection_name}: {e}")
+                    self.stats["failed_chunks"] += len(collection_chunks[start:end])
+        self.stats["ingested_texts"] += len(items)
+
+    def _run(self):
+        while not self._stop.is_set():
+            items = self._next_items()
+            if not items:
+                continue
+            try:
+                self._ingest(items)
+            except Exception as e:
+                logger.error(f"Ingestion batch failed: {e}")
+            finally:
+                self._add_pending(-len(items))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pipeline statistics."""
+        return {
+            **self.stats,
+            "queued": self._queue.qsize(),
+            "pending": self._pending,
+            "running": self._thread is not None and self._thread.is_alive()
+        }
+
+
+# Singleton instance
+_ingestion_pipeline: Optional[IngestionPipeline] = None
+
+def get_ingestion_pipeline() -> IngestionPipeline:
+    """Get or create the shared IngestionPipeline."""
+    global _ingestion_pipeline
+    if _ingestion_pipeline is None:
+        from config.settings import settings
+        _ingestion_pipeline = IngestionPipeline(
+            max_batch_tokens=settings.ingestion_max_batch_tokens,
+            max_queue=settings.ingestion_max_queue,
+            linger=settings.ingestion_linger_ms / 1000.0
+        )
+    return _ingestion_pipeline
@@ -5,12 +5,23 @@ from sources.browser import Browser, create_driver
 from sources.logger import Logger
 from services.llm_service import get_llm_service
 from config.settings import settings
+from collections import OrderedDict
+from typing import Optional
 import os
 import sys
+import time
 
 logger = Logger("interaction_service.log")
 
+# Session used by callers that do not send a session id
+DEFAULT_SESSION = "default"
+
 class InteractionService:
+    """
+    Owns one interaction per session. Sessions get isolated conversation
+    history, agent instances and provider/model selection; the browser is
+    shared.
+    """
     _instance = None
 
     def __new__(cls):
@@ -22,12 +33,15 @@ class InteractionService:
     def initialize(self):
         self.llm_service = get_llm_service()
         self.provider = self.llm_service.get_provider()
-        self.interaction = self._initialize_system()
+        self.personality_folder = "jarvis" if settings.jarvis_personality else "base"
+        self.languages = settings.languages.split(' ')
+        self.browser = self._initialize_browser()
+        self.sessions: "OrderedDict[str, object]" = OrderedDict()
+        self.interaction = self.get_interaction(DEFAULT_SESSION)
 
-    def _initialize_system(self):
+    def _initialize_browser(self):
         stealth_mode = settings.stealth_mode
-        personality_folder = "jarvis" if settings.jarvis_personality else "base"
-        languages = settings.languages.split(' ')
+        languages = self.languages
         
         # Force headless mode in Docker containers
         headless = settings.headless_browser
@@ -44,45 +58,59 @@ class InteractionService:
         except Exception as e:
             logger.error(f"Failed to initialize browser: {e}")
             browser = None
+        return browser
+
+    def get_provider(self, provider_name: Optional[str] = None, model: Optional[str] = None):
+        """Provider for a provider/model pair (the configured one by default)."""
+        return self.llm_service.get_provider(provider_name, model)
 
+    def _create_agents(self, provider=None):
+        """Create a fresh set of agents for one session."""
+        personality_folder = self.personality_folder
+        browser = self.browser
+        provider = provider or self.provider
         agents = [
             CasualAgent(
                 name=settings.agent_name,
                 prompt_path=f"prompts/{personality_folder}/casual_agent.txt",
-                provider=self.provider, verbose=False
+                provider=provider, verbose=False
             ),
             CoderAgent(
                 name="coder",
                 prompt_path=f"prompts/{personality_folder}/coder_agent.txt",
-                provider=self.provider, verbose=False
+                provider=provider, verbose=False
             ),
             FileAgent(
                 name="File Agent",
                 prompt_path=f"prompts/{personality_folder}/file_agent.txt",
-                provider=self.provider, verbose=False
+                provider=provider, verbose=False
             ),
             BrowserAgent(
                 name="Browser",
                 prompt_path=f"prompts/{personality_folder}/browser_agent.txt",
-                provider=self.provider, verbose=False, browser=browser
+                provider=provider, verbose=False, browser=browser
             ),
             PlannerAgent(
                 name="Planner",
                 prompt_path=f"prompts/{personality_folder}/planner_agent.txt",
-                provider=self.provider, verbose=False, browser=browser
+                provider=provider, verbose=False, browser=browser
             )
         ]
         logger.info("Agents initialized")
+        return agents
 
+    def _create_interaction(self, session_id: str):
         from sources.langgraph_interaction import LangGraphInteraction
         interaction = LangGraphInteraction(
-            agents,
+            agent_factory=self._create_agents,
+            provider=self.provider,
             tts_enabled=settings.speak,
             stt_enabled=settings.listen,
             recover_last_session=settings.recover_last_session,
-            langs=languages
+            langs=self.languages,
+            session_id=session_id
         )
-        logger.info("Interaction initialized (LangGraph)")
+        logger.info(f"Interaction initialized (LangGraph) for session {session_id}")
         return interaction
 
     def _is_running_in_docker(self):
@@ -95,8 +123,52 @@ class InteractionService:
             pass
         return False
 
-    def get_interaction(self):
-        return self.interaction
+    def get_interaction(self, session_id: Optional[str] = None):
+        """
+        Get the interaction for a session, creating it on first use.
+
+        Args:
+            session_id: Session identifier (defaults to the shared default session)
+
+        Returns:
+            The session's interaction
+        """
+        session_id = session_id or DEFAULT_SESSION
+        interaction = self.sessions.get(session_id)
+        if interaction is None:
+            self._evict_sessions()
+            interaction = self._create_interaction(session_id)
+            self.sessions[session_id] = interaction
+        else:
+            self.sessions.move_to_end(session_id)
+        interaction.last_active = time.time()
+        return interaction
+
+    def close_session(self, session_id: str) -> bool:
+        """Drop a session and its state. Returns False if it did not exist."""
+        return self.sessions.pop(session_id, None) is not None
+
+    def list_sessions(self) -> list:
+        """List sessions, least recently used first."""
+        return [
+            {"session_id": sid, "last_active": interaction.last_active}
+            for sid, interaction in self.sessions.items()
+        ]
+
+    def _evict_sessions(self):
+        """Drop idle sessions past the timeout and the least recently used beyond the limit."""
+        from services.query_scheduler import get_query_scheduler
+        scheduler = get_query_scheduler()
+        cutoff = time.time() - settings.session_idle_timeout
+        for sid, interaction in list(self.sessions.items()):
+            over_limit = len(self.sessions) >= settings.max_sessions
+            if not over_limit and interaction.last_active >= cutoff:
+                # Sessions are ordered by last use, so the rest are fresh too
+                break
+            if sid == DEFAULT_SESSION or scheduler.is_busy(sid):
+                continue
+            del self.sessions[sid]
+            logger.info(f"Evicted session {sid}")
 
 def get_interaction_service():
     return InteractionService()
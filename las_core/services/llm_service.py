@@ -1,5 +1,6 @@
 from config.settings import settings
 from sources.llm_provider import Provider
+from sources.cached_provider import CachedProvider
 from sources.logger import Logger
 
 logger = Logger("llm_service.log")
@@ -17,20 +18,40 @@ class LLMService:
     def initialize(self):
         if not hasattr(self, '_initialized') or not self._initialized:
             try:
-                self.provider = Provider(
-                    provider_name=settings.provider_name,
-                    model=settings.provider_model,
-                    server_address=settings.provider_server_address,
-                    is_local=settings.is_local
-                )
+                self.provider = self._create_provider(settings.provider_name, settings.provider_model)
+                self._providers = {(self.provider.provider_name, self.provider.model): self.provider}
                 self._initialized = True
                 logger.info(f"LLM Service initialized with provider: {self.provider.provider_name}")
             except Exception as e:
                 logger.error(f"Failed to initialize provider: {e}")
                 raise e
 
-    def get_provider(self):
-        return self.provider
+    def _create_provider(self, provider_name: str, model: str):
+        provider = Provider(
+            provider_name=provider_name,
+            model=model,
+            server_address=settings.provider_server_address,
+            is_local=settings.is_local
+        )
+        if settings.completion_cache_enabled:
+            provider = CachedProvider(provider)
+        return provider
+
+    def get_provider(self, provider_name: str = None, model: str = None):
+        """
+        Get the provider for a provider/model pair (the configured one by default).
+
+        Providers are created once per pair and never reconfigured, so sessions
+        selecting different models can share them safely.
+        """
+        if not provider_name or not model:
+            return self.provider
+        key = (provider_name.lower(), model)
+        provider = self._providers.get(key)
+        if provider is None:
+            provider = self._providers.setdefault(key, self._create_provider(*key))
+            logger.info(f"Created provider {key[0]} with model {key[1]}")
+        return provider
 
     def get_available_models(self, provider_name: str = None):
         return self.provider.list_models(provider_name)
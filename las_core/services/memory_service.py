@@ -58,8 +58,9 @@ class MemoryService:
             await session.commit()
             
             # Also add to Long-term memory (Tier 2) if significant
-            # For now, we add everything to vector DB for semantic search
-            self.rag_service.ingest_text(
+            # For now, we add everything to vector DB for semantic search.
+            # Queued for batched background ingestion to keep the chat path fast.
+            await self.rag_service.ingest_text_async(
                 text=f"{role}: {content}",
                 collection_name="long_term_memory",
                 metadata={"session_id": session_id, "role": role, "timestamp": str(datetime.utcnow())}
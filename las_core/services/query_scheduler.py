@@ -0,0 +1,174 @@
+"""
+Query Scheduler - Bounded, fair admission for concurrent agent queries.
+
+At most ``max_concurrent`` queries run at once and each session runs at most
+one query at a time (its interaction state is not re-entrant). Waiting
+queries are queued per session and admitted round-robin across sessions, so
+one busy session cannot starve the others. When ``max_queued`` queries are
+already waiting, new ones are rejected with SchedulerFullError.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from sources.logger import Logger
+
+logger = Logger("query_scheduler.log")
+
+
+class SchedulerFullError(Exception):
+    """Raised when the scheduler's wait queue is full."""
+
+
+class QueryScheduler:
+    """Round-robin scheduler limiting concurrent queries."""
+
+    def __init__(self, max_concurrent: int = 8, max_queued: int = 256):
+        """
+        Args:
+            max_concurrent: Maximum number of queries running at once
+            max_queued: Maximum number of queries waiting for a slot
+        """
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._running = 0
+        self._active_sessions = set()
+        # session id -> waiting futures; ordering is the round-robin ring
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0, "queued_total": 0}
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _can_start(self, session_id: str) -> bool:
+        return self._running < self.max_concurrent and session_id not in self._active_sessions
+
+    def _start(self, session_id: str):
+        self._running += 1
+        self._active_sessions.add(session_id)
+
+    def _dispatch(self):
+        """Admit waiting queries round-robin while slots are free."""
+        for session_id in list(self._waiting):
+            if self._running >= self.max_concurrent:
+                break
+            if session_id in self._active_sessions:
+                continue
+            waiters = self._waiting.pop(session_id)
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                # Requeue at the back of the ring so other sessions go first
+                self._waiting[session_id] = waiters
+            self._start(session_id)
+            future.set_result(None)
+
+    async def _acquire(self, session_id: str):
+        if self._can_start(session_id) and not self._waiting:
+            self._start(session_id)
+            return
+
+        if self._queued >= self.max_queued:
+            self.stats["rejected"] += 1
+            raise SchedulerFullError(f"Query queue is full ({self.max_queued} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(session_id, deque()).append(future)
+        self._queued += 1
+        self.stats["queued_total"] += 1
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before cancellation; hand the slot back
+                self._release(session_id)
+            else:
+                waiters = self._waiting.get(session_id)
+                if waiters is not None and future in waiters:
+                    waiters.remove(future)
+                    self._queued -= 1
+                    if not waiters:
+                        del self._waiting[session_id]
+            raise
+
+    def _release(self, session_id: str):
+        self._running -= 1
+        self._active_sessions.discard(session_id)
+        self._dispatch()
+
+    async def run(self, session_id: str, query: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a query once a slot is available for its session.
+
+        Args:
+            session_id: Session the query belongs to
+            query: Coroutine function performing the query
+
+        Returns:
+            The query's result
+
+        Raises:
+            SchedulerFullError: If too many queries are already waiting
+        """
+        async with self.slot(session_id):
+            return await query()
+
+    @asynccontextmanager
+    async def slot(self, session_id: str):
+        """
+        Hold a running slot for the session for the duration of the block,
+        e.g. while a streamed query is being consumed.
+
+        Raises:
+            SchedulerFullError: If too many queries are already waiting
+        """
+        await self._acquire(session_id)
+        try:
+            yield
+            self.stats["completed"] += 1
+        except BaseException:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._release(session_id)
+
+    def is_busy(self, session_id: str) -> bool:
+        """Whether the session has a query running or waiting."""
+        return session_id in self._active_sessions or session_id in self._waiting
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        return {
+            **self.stats,
+            "running": self._running,
+            "queued": self._queued,
+            "waiting_sessions": len(self._waiting),
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued
+        }
+
+
+# Singleton instance
+_query_scheduler: Optional[QueryScheduler] = None
+
+def get_query_scheduler() -> QueryScheduler:
+    """Get or create the shared QueryScheduler."""
+    global _query_scheduler
+    if _query_scheduler is None:
+        from config.settings import settings
+        _query_scheduler = QueryScheduler(
+            max_concurrent=settings.max_concurrent_queries,
+            max_queued=settings.max_queued_queries
+        )
+    return _query_scheduler
@@ -2,10 +2,12 @@ import os
 from typing import List, Dict, Any
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
 from config.settings import settings
+from services.embedding_cache import CachedEmbeddings
+from services.embeddings import OllamaEmbeddingBackend
+from services.hybrid_retrieval import BM25Index, HybridRetriever, CrossEncoderReranker
 from sources.logger import Logger
 import uuid
 
@@ -22,14 +24,25 @@ class RAGService:
 
     def initialize(self):
         self.client = QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
-        self.embeddings = OllamaEmbeddings(
-            base_url=settings.provider_server_address,
-            model="nomic-embed-text" # Or configurable via settings
+        embedding_model = "nomic-embed-text" # Or configurable via settings
+        # Identical texts are embedded once; see services/embedding_cache.py.
+        # Each embed_documents() call is a single /api/embed request.
+        self.embeddings = CachedEmbeddings(
+            OllamaEmbeddingBackend(settings.provider_server_address, embedding_model),
+            model=f"ollama:{embedding_model}",
+            version=settings.embedding_model_version
         )
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200
         )
+        # Lexical indexes kept next to each Qdrant collection for hybrid search
+        self.bm25_indexes: Dict[str, BM25Index] = {}
+        self.retrievers: Dict[str, HybridRetriever] = {}
+        self.reranker = (
+            CrossEncoderReranker(settings.rag_reranker_model, budget_ms=settings.rag_rerank_budget_ms)
+            if settings.rag_reranker_model else None
+        )
         logger.info(f"RAG Service initialized. Connected to Qdrant at {settings.qdrant_host}:{settings.qdrant_port}")
 
     def create_collection(self, collection_name: str, vector_size: int = 768):
@@ -44,54 +57,118 @@ class RAGService:
                 logger.error(f"Error creating collection: {e}")
                 raise e
 
+    def get_bm25_index(self, collection_name: str) -> BM25Index:
+        """Get (loading on first use) the lexical index for a collection."""
+        if collection_name not in self.bm25_indexes:
+            path = os.path.join(settings.rag_bm25_dir, f"{collection_name}.jsonl") if settings.rag_bm25_dir else None
+            self.bm25_indexes[collection_name] = BM25Index(path)
+        return self.bm25_indexes[collection_name]
+
+    def get_retriever(self, collection_name: str) -> HybridRetriever:
+        """Get the hybrid retriever for a collection."""
+        if collection_name not in self.retrievers:
+            self.retrievers[collection_name] = HybridRetriever(
+                dense_search=lambda query, k: self.dense_search(query, collection_name, k),
+                bm25=self.get_bm25_index(collection_name),
+                reranker=self.reranker,
+                candidates=settings.rag_candidates
+            )
+        return self.retrievers[collection_name]
+
+    def split_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Document]:
+        """Split a text into chunk documents carrying the metadata."""
+        docs = [Document(page_content=text, metadata=metadata or {})]
+        return self.text_splitter.split_documents(docs)
+
+    def upsert_chunks(self, collection_name: str, chunks: List[Document], vectors: List[List[float]],
+                      wait: bool = True):
+        """
+        Upload embedded chunks to Qdrant in one request.
+
+        Args:
+            collection_name: Target collection
+            chunks: Chunk documents
+            vectors: One embedding per chunk
+            wait: Wait for Qdrant to apply the write before returning
+        """
+        points = [
+            models.PointStruct(
+                id=str(uuid.uuid4()),
+                vector=vector,
+                payload={
+                    "text": chunk.page_content,
+                    "metadata": chunk.metadata
+                }
+            )
+            for chunk, vector in zip(chunks, vectors)
+        ]
+        self.client.upsert(
+            collection_name=collection_name,
+            points=points,
+            wait=wait
+        )
+        self.get_bm25_index(collection_name).add_documents(
+            [(point.id, chunk.page_content, chunk.metadata) for point, chunk in zip(points, chunks)]
+        )
+        return len(points)
+
     def ingest_text(self, text: str, collection_name: str, metadata: Dict[str, Any] = None):
+        """Synchronously split, embed and upload one text. See also ingest_text_async."""
         try:
             # 1. Split text
-            docs = [Document(page_content=text, metadata=metadata or {})]
-            chunks = self.text_splitter.split_documents(docs)
+            chunks = self.split_text(text, metadata)
             
             # 2. Embed chunks
             texts = [chunk.page_content for chunk in chunks]
             embeddings = self.embeddings.embed_documents(texts)
             
             # 3. Upload to Qdrant
-            points = []
-            for i, (chunk, vector) in enumerate(zip(chunks, embeddings)):
-                points.append(models.PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector,
-                    payload={
-                        "text": chunk.page_content,
-                        "metadata": chunk.metadata
-                    }
-                ))
-            
-            self.client.upsert(
-                collection_name=collection_name,
-                points=points
-            )
-            logger.info(f"Ingested {len(points)} chunks into {collection_name}")
+            count = self.upsert_chunks(collection_name, chunks, embeddings)
+            logger.info(f"Ingested {count} chunks into {collection_name}")
             return True
         except Exception as e:
             logger.error(f"Error ingesting text: {e}")
             return False
 
-    def search(self, query: str, collection_name: str, limit: int = 4):
+    async def ingest_text_async(self, text: str, collection_name: str, metadata: Dict[str, Any] = None):
+        """Queue a text on the background ingestion pipeline (batched embedding and upserts)."""
+        from services.ingestion_pipeline import get_ingestion_pipeline
+        await get_ingestion_pipeline().asubmit(text, collection_name, metadata)
+
+    def dense_search(self, query: str, collection_name: str, limit: int = 4) -> List[Dict[str, Any]]:
+        """Vector similarity search in Qdrant."""
+        query_vector = self.embeddings.embed_query(query)
+        results = self.client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            limit=limit
+        )
+        return [
+            {
+                "id": str(hit.id),
+                "text": hit.payload.get("text"),
+                "metadata": hit.payload.get("metadata"),
+                "score": hit.score
+            }
+            for hit in results
+        ]
+
+    def search(self, query: str, collection_name: str, limit: int = 4, mode: str = None,
+               rerank: bool = None):
+        """
+        Retrieve chunks for a query.
+
+        Args:
+            query: Search query
+            collection_name: Collection to search
+            limit: Number of results
+            mode: hybrid (BM25 + dense, RRF-fused), dense or sparse; defaults to RAG_SEARCH_MODE
+            rerank: Re-rank with the cross-encoder (defaults to whether one is configured)
+        """
         try:
-            query_vector = self.embeddings.embed_query(query)
-            results = self.client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=limit
+            return self.get_retriever(collection_name).search(
+                query, limit=limit, mode=mode or settings.rag_search_mode, rerank=rerank
             )
-            return [
-                {
-                    "text": hit.payload.get("text"),
-                    "metadata": hit.payload.get("metadata"),
-                    "score": hit.score
-                }
-                for hit in results
-            ]
         except Exception as e:
             logger.error(f"Error searching: {e}")
             return []
@@ -0,0 +1,302 @@
+"""
+Rate Limiter Service - Shared GCRA rate limiting.
+
+Limits use the generic cell rate algorithm (GCRA), so each key holds a single
+number: its theoretical arrival time (TAT). A limit of N requests per window
+spaces requests one emission interval (window / N) apart and allows a burst
+of N. One check reads and advances the TAT.
+
+With Redis available, the check runs as one Lua script keyed by the client,
+using the Redis clock, so every API worker shares the same limits atomically.
+The key expires when its TAT passes. Without Redis, or while Redis is
+unreachable, checks run against a bounded in-process store: an LRU of TATs
+that drops expired keys first and never holds more than max_keys entries.
+
+Limits come from rules: a default limit per client, optional per-user and
+per-role overrides, and per-route limits matched by path prefix.
+"""
+
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sources.logger import Logger
+
+logger = Logger("rate_limiter.log")
+
+UNITS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60,
+         "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+# GCRA check. KEYS[1]: key. ARGV: emission interval (ms), burst window (ms).
+# Returns allowed, remaining, retry_after_ms, reset_after_ms.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if allow_at > now then
+  return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((window - (new_tat - now)) / interval), 0, new_tat - now}
+"""
+
+@dataclass(frozen=True)
+class RateLimit:
+    """N requests per window (seconds)."""
+    limit: int
+    window: float
+
+    @property
+    def interval_ms(self) -> float:
+        return self.window * 1000 / self.limit
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """
+        Parse "5/minute", "100/min", "10/30s" or "1000/hour".
+
+        Raises:
+            ValueError: If the spec is malformed
+        """
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d*\.?\d*)\s*([a-z]+)\s*", spec.lower())
+        if not match or match.group(3) not in UNITS or int(match.group(1)) <= 0:
+            raise ValueError(f"Invalid rate limit '{spec}', expected e.g. 5/minute or 10/30s")
+        return cls(int(match.group(1)), float(match.group(2) or 1) * UNITS[match.group(3)])
+
+    def __str__(self) -> str:
+        return f"{self.limit}/{self.window:g}s"
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until the next request is allowed (0 if allowed)
+    reset_after: float  # Seconds until the full burst is available again
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.remaining, 0)),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+class MemoryRateLimitStore:
+    """Bounded in-process GCRA store (per worker)."""
+
+    backend = "memory"
+
+    def __init__(self, max_keys: int = 100_000):
+        """
+        Args:
+            max_keys: Most keys kept; least recently used keys are dropped beyond this
+        """
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    async def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        now = time.monotonic() * 1000
+        interval, window = rate.interval_ms, rate.window * 1000
+        tat = max(self._tats.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - window
+        if allow_at > now:
+            self._tats.move_to_end(key)
+            return RateLimitResult(False, rate.limit, 0, (allow_at - now) / 1000, (tat - now) / 1000)
+
+        self._tats[key] = new_tat
+        self._tats.move_to_end(key)
+        self._evict(now)
+        return RateLimitResult(True, rate.limit, int((window - (new_tat - now)) // interval), 0.0,
+                               (new_tat - now) / 1000)
+
+    def _evict(self, now: float):
+        # Keys whose TAT has passed are equivalent to absent keys
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_keys:
+                break
+            self._tats.popitem(last=False)
+
+class RedisRateLimitStore:
+    """GCRA store shared through Redis (one Lua script call per check)."""
+
+    backend = "redis"
+
+    def __init__(self, client, key_prefix: str = "las:rl:"):
+        """
+        Args:
+            client: redis.asyncio.Redis client
+            key_prefix: Prefix of every rate limit key
+        """
+        self.client = client
+        self.key_prefix = key_prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    async def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        allowed, remaining, retry_ms, reset_ms = await self._script(
+            keys=[self.key_prefix + key], args=[rate.interval_ms, rate.window * 1000]
+        )
+        return RateLimitResult(bool(allowed), rate.limit, int(remaining), float(retry_ms) / 1000,
+                               float(reset_ms) / 1000)
+
+class RateLimiter:
+    """Resolves the limits of a request and checks them against a store."""
+
+    def __init__(self, store=None, fallback: Optional[MemoryRateLimitStore] = None,
+                 default: Optional[RateLimit] = None,
+                 routes: Optional[Dict[str, RateLimit]] = None,
+                 users: Optional[Dict[str, RateLimit]] = None,
+                 retry_interval: float = 5.0):
+        """
+        Args:
+            store: Primary store (Redis); None uses the fallback only
+            fallback: Local store used without Redis or while it is unreachable
+            default: Limit per client across all routes (None: no global limit)
+            routes: Limits per path prefix (the longest matching prefix applies)
+            users: Default-limit overrides by username or "role:<role>"
+            retry_interval: Seconds before retrying Redis after an error
+        """
+        self.store = store
+        self.fallback = fallback or MemoryRateLimitStore()
+        self.default = default
+        self.routes = dict(sorted((routes or {}).items(), key=lambda item: -len(item[0])))
+        self.users = users or {}
+        self.retry_interval = retry_interval
+        self._store_down_until = 0.0
+        self.fallback_checks = 0
+
+    def limits_for(self, path: str, user: Optional[str] = None,
+                   role: Optional[str] = None) -> List[Tuple[str, RateLimit]]:
+        """
+        Limits that apply to a request, with the scope each is counted under.
+
+        Args:
+            path: Request path
+            user: Authenticated username
+            role: Authenticated user's role
+
+        Returns:
+            (scope, limit) pairs
+        """
+        limits = []
+        for prefix, rate in self.routes.items():
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                limits.append((f"route:{prefix}", rate))
+                break
+        default = self.users.get(user) if user else None
+        if default is None and role:
+            default = self.users.get(f"role:{role}")
+        default = default or self.default
+        if default is not None:
+            limits.append(("global", default))
+        return limits
+
+    async def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        """Count one request against a key, using the local store while Redis is down."""
+        if self.store is not None and time.monotonic() >= self._store_down_until:
+            try:
+                return await self.store.hit(key, rate)
+            except Exception as e:
+                self._store_down_until = time.monotonic() + self.retry_interval
+                logger.warning(f"Rate limit store unavailable, using local limits: {e}")
+        self.fallback_checks += 1
+        return await self.fallback.hit(key, rate)
+
+    async def check(self, identity: str, path: str, user: Optional[str] = None,
+                    role: Optional[str] = None) -> Optional[RateLimitResult]:
+        """
+        Check every limit that applies to a request.
+
+        Args:
+            identity: Client identity (user or IP based)
+            path: Request path
+            user: Authenticated username
+            role: Authenticated user's role
+
+        Returns:
+            The first denial, else the result closest to its limit (None if no limit applies)
+        """
+        tightest = None
+        for scope, rate in self.limits_for(path, user, role):
+            result = await self.hit(f"{scope}:{identity}", rate)
+            if not result.allowed:
+                return result
+            if tightest is None or result.remaining < tightest.remaining:
+                tightest = result
+        return tightest
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.store.backend if self.store is not None else self.fallback.backend,
+            "store_available": self.store is not None and time.monotonic() >= self._store_down_until,
+            "local_keys": len(self.fallback),
+            "fallback_checks": self.fallback_checks,
+            "default": str(self.default) if self.default else None,
+            "routes": {prefix: str(rate) for prefix, rate in self.routes.items()},
+            "users": {user: str(rate) for user, rate in self.users.items()}
+        }
+
+def parse_limits(spec: Optional[str]) -> Dict[str, RateLimit]:
+    """Parse "name=5/minute,other=100/hour" into limits by name."""
+    limits = {}
+    for item in (spec or "").split(","):
+        if item.strip():
+            name, _, rate = item.rpartition("=")
+            limits[name.strip()] = RateLimit.parse(rate)
+    return limits
+
+def _create_rate_limiter() -> RateLimiter:
+    from config.settings import settings
+
+    store = None
+    if settings.rate_limit_backend in ("auto", "redis"):
+        from services.redis_cache import get_redis_cache
+        cache = get_redis_cache()
+        if cache.available:
+            import redis.asyncio as aioredis
+            pool_kwargs = cache.redis.connection_pool.connection_kwargs
+            client = aioredis.Redis(
+                host=pool_kwargs.get("host", "localhost"),
+                port=pool_kwargs.get("port", 6379),
+                db=pool_kwargs.get("db", 0),
+                password=pool_kwargs.get("password"),
+                socket_timeout=0.5
+            )
+            logger.info("Using Redis rate limiter")
+            store = RedisRateLimitStore(client, key_prefix=settings.rate_limit_key_prefix)
+        elif settings.rate_limit_backend == "redis":
+            logger.warning("Redis unavailable, falling back to per-worker rate limits")
+
+    return RateLimiter(
+        store=store,
+        fallback=MemoryRateLimitStore(max_keys=settings.rate_limit_max_keys),
+        default=RateLimit.parse(settings.rate_limit_default) if settings.rate_limit_default else None,
+        routes=parse_limits(settings.rate_limit_routes),
+        users=parse_limits(settings.rate_limit_users)
+    )
+
+# Singleton instance
+_rate_limiter: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the shared RateLimiter."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = _create_rate_limiter()
+    return _rate_limiter
@@ -2,207 +2,850 @@
 Semantic Cache - Embedding-based caching for LLM responses.
 
 Reduces costs and latency by serving cached responses for similar queries.
+Embeddings live in one contiguous float32 matrix per provider/model
+partition, so a lookup is a single matrix-vector product (or an HNSW query
+once a partition grows large and ``hnswlib`` is installed).
+
+On disk the cache is:
+
+- ``entries.<gen>.jsonl``: append-only log of entry records
+- ``index/<partition>.npy``: memory-mapped embedding matrix
+- ``index/<partition>.slots.<gen>.npy``: memory-mapped per-slot record
+  (log offset, record length, expiry timestamp)
+- ``manifest.json``: partitions, embedding model and current generation
+
+Inserts append one line and write one matrix row. Startup maps the arrays
+and reads records lazily on hit, so it does not parse the whole log.
+Compaction rewrites the log without dead records under a new generation
+and commits it by atomically replacing the manifest.
 """
 
-import json
 import hashlib
+import heapq
+import json
+import os
+import shutil
+import threading
+import time
 from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 from datetime import datetime, timedelta
 import numpy as np
 
+from services.embeddings import EmbeddingBackend, HashingEmbeddingBackend, create_embedding_backend
+from sources.logger import Logger
+
+try:
+    import hnswlib
+except ImportError:  # Optional ANN acceleration
+    hnswlib = None
+
+logger = Logger("semantic_cache.log")
+
+PartitionKey = Tuple[str, str]
+
+# Per-slot record: where the entry lives in the log, when it expires and
+# how it has been used (for LRU/LFU eviction)
+SLOT_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("expires_at", "<f8"),
+    ("last_access", "<f8"),
+    ("hits", "<i4")
+])
+FREE_SLOT = -1
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+def _new_array(path: Optional[Path], shape, dtype) -> np.ndarray:
+    """Allocate a zeroed array, memory-mapped to ``path`` when given."""
+    if path is None:
+        return np.zeros(shape, dtype=dtype)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+
+def _replace_array(array: np.ndarray, tmp_path: Path, path: Path):
+    """Flush a memory-mapped array written at ``tmp_path`` and move it into place."""
+    array.flush()
+    os.replace(tmp_path, path)
+
+
+class VectorIndex:
+    """
+    Contiguous float32 matrix of unit vectors with top-1 cosine lookup.
+
+    Rows are addressed by slot; removed slots are zeroed and reused. Each
+    slot carries a ``SLOT_DTYPE`` record. When paths are given both arrays
+    are memory-mapped ``.npy`` files and reopened as-is on the next start.
+    When ``hnswlib`` is available and the index holds at least
+    ``ann_threshold`` vectors, lookups go through an HNSW graph (built on
+    the first lookup) instead of a full scan.
+    """
+
+    def __init__(self, dimension: int, initial_capacity: int = 1024,
+                 ann_threshold: int = 20_000,
+                 vectors_path: Optional[Path] = None,
+                 slots_path: Optional[Path] = None):
+        self.dimension = dimension
+        self.ann_threshold = ann_threshold
+        self.vectors_path = vectors_path
+        self.slots_path = slots_path
+        self._ann = None
+
+        if vectors_path is not None and vectors_path.exists() and slots_path.exists() \
+                and np.load(slots_path, mmap_mode="r").dtype == SLOT_DTYPE:
+            self.vectors = np.load(vectors_path, mmap_mode="r+")
+            self.slots = np.load(slots_path, mmap_mode="r+")
+            live = np.nonzero(self.slots["offset"] >= 0)[0]
+            self.size = int(live[-1]) + 1 if len(live) else 0  # High-water mark of used slots
+            self.count = len(live)  # Live vectors
+            self.free_slots: List[int] = np.nonzero(self.slots["offset"][:self.size] < 0)[0].tolist()
+        else:
+            self.vectors, self.slots = self._allocate(initial_capacity)
+            self.size = 0
+            self.count = 0
+            self.free_slots = []
+
+    @property
+    def capacity(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def persistent(self) -> bool:
+        return self.vectors_path is not None
+
+    def _tmp(self, path: Path) -> Path:
+        return path.with_name(path.name + ".tmp")
+
+    def _allocate(self, capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Allocate arrays of the given capacity, carrying over existing slots."""
+        vectors_tmp = self._tmp(self.vectors_path) if self.persistent else None
+        slots_tmp = self._tmp(self.slots_path) if self.persistent else None
+        vectors = _new_array(vectors_tmp, (capacity, self.dimension), np.float32)
+        slots = _new_array(slots_tmp, (capacity,), SLOT_DTYPE)
+        slots["offset"] = FREE_SLOT
+        if hasattr(self, "vectors"):
+            vectors[:self.size] = self.vectors[:self.size]
+            slots[:self.size] = self.slots[:self.size]
+        if self.persistent:
+            _replace_array(vectors, vectors_tmp, self.vectors_path)
+            _replace_array(slots, slots_tmp, self.slots_path)
+        return vectors, slots
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        self.vectors, self.slots = self._allocate(new_capacity)
+        if self._ann is not None:
+            self._ann.resize_index(new_capacity)
+
+    def _build_ann(self):
+        index = hnswlib.Index(space="ip", dim=self.dimension)
+        index.init_index(max_elements=self.capacity, ef_construction=100, M=16)
+        index.set_ef(64)
+        live = self.live_slots()
+        if len(live):
+            index.add_items(self.vectors[live], live)
+        self._ann = index
+
+    def live_slots(self) -> np.ndarray:
+        """Indices of occupied slots."""
+        return np.nonzero(self.slots["offset"][:self.size] >= 0)[0]
+
+    def add(self, vector: np.ndarray, offset: int, length: int, expires_at: float) -> int:
+        """
+        Store a unit vector and its slot record.
+
+        Args:
+            vector: Unit float32 vector
+            offset: Byte offset of the entry record in the log
+            length: Byte length of the entry record
+            expires_at: Expiry as a UNIX timestamp
+
+        Returns:
+            Slot the vector was stored in
+        """
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            slot = self.size
+            self.size += 1
+
+        self.vectors[slot] = vector
+        self.slots[slot] = (offset, length, expires_at, time.time(), 0)
+        self.count += 1
+
+        if self._ann is not None:
+            self._ann.add_items(vector[np.newaxis, :], [slot])
+        return slot
+
+    def remove(self, slot: int) -> int:
+        """
+        Free a slot so it no longer matches and can be reused.
+
+        Returns:
+            Length of the log record the slot pointed to (0 if already free)
+        """
+        if self.slots["offset"][slot] < 0:
+            return 0
+        length = int(self.slots["length"][slot])
+        self.vectors[slot] = 0.0
+        self.slots[slot] = (FREE_SLOT, 0, 0.0, 0.0, 0)
+        self.free_slots.append(slot)
+        self.count -= 1
+        if self._ann is not None:
+            self._ann.mark_deleted(slot)
+        return length
+
+    def search(self, query: np.ndarray) -> Tuple[Optional[int], float]:
+        """
+        Find the most similar stored vector.
+
+        Returns:
+            Tuple of (slot, cosine similarity), or (None, 0.0) if empty
+        """
+        matches = self.search_k(query, 1)
+        return matches[0] if matches else (None, 0.0)
+
+    def search_k(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """
+        Find the ``k`` most similar stored vectors.
+
+        Returns:
+            List of (slot, cosine similarity), most similar first
+        """
+        if self.count == 0:
+            return []
+        k = min(k, self.count)
+
+        if self._ann is None and hnswlib is not None and self.count >= self.ann_threshold:
+            self._build_ann()
+
+        if self._ann is not None:
+            labels, distances = self._ann.knn_query(query, k=k)
+            matches = [(int(slot), 1.0 - float(distance))
+                       for slot, distance in zip(labels[0], distances[0])]
+            if all(self.slots["offset"][slot] >= 0 for slot, _ in matches):
+                return matches
+
+        scores = self.vectors[:self.size] @ query
+        if k == 1:
+            top = np.array([np.argmax(scores)])
+        else:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        return [(int(slot), float(scores[slot])) for slot in top
+                if self.slots["offset"][slot] >= 0]
+
+    def touch(self, slot: int):
+        """Record an access to a slot."""
+        self.slots["last_access"][slot] = time.time()
+        self.slots["hits"][slot] += 1
+
+    def entry_bytes(self, slot: int) -> int:
+        """Approximate bytes held by a slot: log record plus vector and slot record."""
+        return int(self.slots["length"][slot]) + self.dimension * 4 + SLOT_DTYPE.itemsize
+
+    def search_above(self, query: np.ndarray, threshold: float) -> List[int]:
+        """Return every occupied slot with similarity >= threshold."""
+        if self.count == 0:
+            return []
+        scores = self.vectors[:self.size] @ query
+        return [int(slot) for slot in np.nonzero(scores >= threshold)[0]
+                if self.slots["offset"][slot] >= 0]
+
+    def flush(self):
+        """Flush memory-mapped arrays to disk."""
+        if self.persistent:
+            self.vectors.flush()
+            self.slots.flush()
+
+
 class SemanticCache:
     """
     Semantic caching using embeddings for similarity matching.
     Caches query-response pairs and retrieves similar queries.
     """
-    
-    def __init__(self, storage_dir: str = "data/cache", 
+
+    def __init__(self, storage_dir: str = "data/cache",
                  similarity_threshold: float = 0.85,
-                 ttl_hours: int = 24):
+                 ttl_hours: int = 24,
+                 embedding_backend: Optional[EmbeddingBackend] = None,
+                 compaction_interval: float = 3600.0,
+                 compaction_min_bytes: int = 1 << 20,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 eviction_policy: str = "lru",
+                 stale_ttl: float = 0.0):
         """
         Initialize semantic cache.
-        
+
         Args:
             storage_dir: Directory for cache storage
             similarity_threshold: Minimum similarity for cache hit (0-1)
             ttl_hours: Time to live in hours
+            embedding_backend: Backend used to embed queries (defaults to hashing)
+            compaction_interval: Seconds between compactions that drop dead records
+            compaction_min_bytes: Dead log bytes required before compacting early
+            max_entries: Optional limit on the number of cached entries
+            max_bytes: Optional limit on bytes held by cached entries
+            eviction_policy: Policy used when a limit is exceeded (lru or lfu)
+            stale_ttl: Seconds an expired entry can still be served as stale
+                (for stale-while-revalidate) before it is dropped
         """
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy: '{eviction_policy}'. "
+                f"Available policies: {', '.join(EVICTION_POLICIES)}"
+            )
+
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(parents=True, exist_ok=True)
         self.similarity_threshold = similarity_threshold
         self.ttl = timedelta(hours=ttl_hours)
-        
-        self.cache_file = self.storage_dir / "semantic_cache.json"
-        self.cache: List[Dict[str, Any]] = []
-        self.load_cache()
-        
+        self.embedder = embedding_backend or HashingEmbeddingBackend()
+        self.compaction_interval = compaction_interval
+        self.compaction_min_bytes = compaction_min_bytes
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        self.stale_ttl = stale_ttl
+
+        self.index_dir = self.storage_dir / "index"
+        self.manifest_file = self.storage_dir / "manifest.json"
+        self.legacy_cache_file = self.storage_dir / "semantic_cache.json"
+        self.partitions: Dict[PartitionKey, VectorIndex] = {}
+        self.generation = 0
+        self._log = None
+        self._reader = None
+        self._log_size = 0
+        self._dead_bytes = 0
+        self._total_bytes = 0
+        self._last_compaction = time.time()
+        self._lock = threading.RLock()
+
+        # Min-heaps with lazy deletion: (expires_at, partition, slot, offset)
+        # and (eviction priority, partition, slot, offset). An item is stale
+        # once its slot no longer holds the record at that log offset.
+        self._expiry_heap: List[Tuple[float, PartitionKey, int, int]] = []
+        self._eviction_heap: List[Tuple[Tuple, PartitionKey, int, int]] = []
+
         # Stats
         self.stats = {
             "hits": 0,
             "misses": 0,
-            "total_queries": 0
+            "total_queries": 0,
+            "evictions": 0,
+            "evicted_bytes": 0,
+            "expirations": 0
         }
-    
+
+        self.load_cache()
+
+    # === Storage layout ===
+
+    @staticmethod
+    def _partition_key(metadata: Optional[Dict[str, Any]]) -> PartitionKey:
+        """Partition entries by provider and model."""
+        metadata = metadata or {}
+        return (str(metadata.get("provider") or ""), str(metadata.get("model") or ""))
+
+    @staticmethod
+    def _partition_id(key: PartitionKey) -> str:
+        return hashlib.sha1("\x00".join(key).encode()).hexdigest()[:16]
+
+    def _log_file(self, generation: int) -> Path:
+        return self.storage_dir / f"entries.{generation}.jsonl"
+
+    def _slots_file(self, partition_id: str, generation: int) -> Path:
+        return self.index_dir / f"{partition_id}.slots.{generation}.npy"
+
+    def _vectors_file(self, partition_id: str) -> Path:
+        return self.index_dir / f"{partition_id}.npy"
+
+    def _open_partition(self, key: PartitionKey, dimension: int) -> VectorIndex:
+        partition_id = self._partition_id(key)
+        return VectorIndex(
+            dimension=dimension,
+            vectors_path=self._vectors_file(partition_id),
+            slots_path=self._slots_file(partition_id, self.generation)
+        )
+
+    def _write_manifest(self):
+        """Atomically replace the manifest (the commit point for compaction)."""
+        manifest = {
+            "embedding_model": self.embedder.name,
+            "generation": self.generation,
+            "partitions": [
+                {"provider": key[0], "model": key[1], "dimension": index.dimension}
+                for key, index in self.partitions.items()
+            ]
+        }
+        tmp = self.manifest_file.with_name(self.manifest_file.name + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_file)
+
+    def _open_log(self):
+        log_file = self._log_file(self.generation)
+        self._log = open(log_file, 'ab')
+        self._reader = open(log_file, 'rb')
+        self._log_size = self._log.seek(0, os.SEEK_END)
+
+    def _close_log(self):
+        for handle in (self._log, self._reader):
+            if handle is not None:
+                handle.close()
+        self._log = None
+        self._reader = None
+
+    def _reset_storage(self):
+        """Delete every cache file and start from an empty generation."""
+        self._close_log()
+        self.partitions = {}
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+        for log_file in self.storage_dir.glob("entries.*.jsonl"):
+            log_file.unlink()
+        self.manifest_file.unlink(missing_ok=True)
+        self.generation = 0
+        self._dead_bytes = 0
+        self._total_bytes = 0
+        self._expiry_heap = []
+        self._eviction_heap = []
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._open_log()
+        self._write_manifest()
+
     def load_cache(self):
-        """Load cache from disk."""
-        if self.cache_file.exists():
+        """Map the cache from disk without parsing the entry log."""
+        manifest = None
+        if self.manifest_file.exists():
             try:
-                with open(self.cache_file, 'r') as f:
-                    self.cache = json.load(f)
-                self._cleanup_expired()
+                with open(self.manifest_file, 'r') as f:
+                    manifest = json.load(f)
             except Exception as e:
-                print(f"Failed to load cache: {e}")
-                self.cache = []
-    
-    def save_cache(self):
-        """Save cache to disk."""
+                logger.error(f"Failed to read cache manifest: {e}")
+
+        # Vectors from a different embedding model are not comparable
+        if manifest is None or manifest.get("embedding_model") != self.embedder.name:
+            self._reset_storage()
+            self._migrate_legacy_cache()
+            return
+
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+            self.generation = manifest["generation"]
+            for info in manifest["partitions"]:
+                key = (info["provider"], info["model"])
+                self.partitions[key] = self._open_partition(key, info["dimension"])
+            self._open_log()
         except Exception as e:
-            print(f"Failed to save cache: {e}")
-    
+            logger.error(f"Failed to load cache: {e}")
+            self._reset_storage()
+            return
+
+        # Drop slots whose record never reached the log (e.g. crash mid-write)
+        live_bytes = 0
+        for index in self.partitions.values():
+            live = index.live_slots()
+            ends = index.slots["offset"][live] + index.slots["length"][live]
+            for slot in live[ends > self._log_size]:
+                index.remove(int(slot))
+            live_bytes += int(index.slots["length"][index.live_slots()].sum())
+        self._dead_bytes = self._log_size - live_bytes
+        self._rebuild_heaps()
+        self._cleanup_expired()
+
+    def _migrate_legacy_cache(self):
+        """Import entries from the old single-file JSON cache once."""
+        if not self.legacy_cache_file.exists():
+            return
+        try:
+            with open(self.legacy_cache_file, 'r') as f:
+                stored = json.load(f)
+            now = datetime.now()
+            for entry in stored:
+                if entry.get("embedding_model") != self.embedder.name:
+                    continue
+                if datetime.fromisoformat(entry["expires_at"]) <= now:
+                    continue
+                embedding = np.asarray(entry.pop("embedding"), dtype=np.float32)
+                entry.pop("embedding_model")
+                self._append(entry, embedding)
+            self.legacy_cache_file.rename(self.legacy_cache_file.with_suffix(".json.migrated"))
+        except Exception as e:
+            logger.error(f"Failed to migrate legacy cache: {e}")
+
+    def save_cache(self):
+        """Flush the entry log and memory-mapped index to disk."""
+        with self._lock:
+            try:
+                self._log.flush()
+                for index in self.partitions.values():
+                    index.flush()
+            except Exception as e:
+                logger.error(f"Failed to save cache: {e}")
+
+    def close(self):
+        """Flush and release file handles."""
+        with self._lock:
+            self.save_cache()
+            self._close_log()
+
+    # === Entry log ===
+
+    def _append(self, entry: Dict[str, Any], embedding: np.ndarray):
+        """Append an entry record to the log and index its embedding."""
+        key = self._partition_key(entry["metadata"])
+        index = self.partitions.get(key)
+        if index is None:
+            index = self._open_partition(key, embedding.shape[0])
+            self.partitions[key] = index
+            self._write_manifest()
+
+        record = (json.dumps(entry) + "\n").encode()
+        offset = self._log_size
+        self._log.write(record)
+        self._log.flush()
+        self._log_size += len(record)
+
+        # Entries stay in the index through the stale window; freshness is
+        # judged on hit from the record's own expires_at
+        expires_at = datetime.fromisoformat(entry["expires_at"]).timestamp() + self.stale_ttl
+        slot = index.add(embedding, offset, len(record), expires_at)
+        self._total_bytes += index.entry_bytes(slot)
+        heapq.heappush(self._expiry_heap, (expires_at, key, slot, offset))
+        heapq.heappush(self._eviction_heap, (self._eviction_priority(index, slot), key, slot, offset))
+
+    def _read_entry(self, index: VectorIndex, slot: int) -> Dict[str, Any]:
+        """Read an entry record from the log."""
+        offset, length = index.slots[["offset", "length"]][slot]
+        self._reader.seek(int(offset))
+        return json.loads(self._reader.read(int(length)))
+
+    def _remove(self, index: VectorIndex, slot: int) -> int:
+        """
+        Free an index slot; its log record becomes dead bytes.
+
+        Returns:
+            Bytes released by the entry
+        """
+        released = index.entry_bytes(slot)
+        self._dead_bytes += index.remove(slot)
+        self._total_bytes -= released
+        return released
+
+    # === Expiry and eviction ===
+
+    def _eviction_priority(self, index: VectorIndex, slot: int) -> Tuple:
+        """Heap priority of a slot; the smallest one is evicted first."""
+        last_access = float(index.slots["last_access"][slot])
+        if self.eviction_policy == "lfu":
+            return (int(index.slots["hits"][slot]), last_access)
+        return (last_access,)
+
+    def _rebuild_heaps(self):
+        """Rebuild both heaps from the slot arrays (after load or compaction)."""
+        self._expiry_heap = []
+        self._eviction_heap = []
+        self._total_bytes = 0
+        for key, index in self.partitions.items():
+            live = index.live_slots()
+            offsets = index.slots["offset"][live].tolist()
+            expiries = index.slots["expires_at"][live].tolist()
+            self._total_bytes += int(index.slots["length"][live].sum()) + \
+                len(live) * (index.dimension * 4 + SLOT_DTYPE.itemsize)
+            for slot, offset, expires_at in zip(live.tolist(), offsets, expiries):
+                self._expiry_heap.append((expires_at, key, slot, offset))
+                self._eviction_heap.append((self._eviction_priority(index, slot), key, slot, offset))
+        heapq.heapify(self._expiry_heap)
+        heapq.heapify(self._eviction_heap)
+
+    def _live_index(self, key: PartitionKey, slot: int, offset: int) -> Optional[VectorIndex]:
+        """Return the partition if the slot still holds the record at ``offset``."""
+        index = self.partitions.get(key)
+        if index is None or slot >= index.size or index.slots["offset"][slot] != offset:
+            return None
+        return index
+
     def _cleanup_expired(self):
-        """Remove expired cache entries."""
-        now = datetime.now()
-        self.cache = [
-            entry for entry in self.cache
-            if datetime.fromisoformat(entry["expires_at"]) > now
-        ]
-    
-    def _get_embedding(self, text: str) -> np.ndarray:
+        """Pop expired entries off the expiry heap (amortized O(log n) each)."""
+        now = time.time()
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, key, slot, offset = heapq.heappop(heap)
+            index = self._live_index(key, slot, offset)
+            if index is not None:
+                self._remove(index, slot)
+                self.stats["expirations"] += 1
+
+    def _over_limit(self) -> bool:
+        count = sum(index.count for index in self.partitions.values())
+        if self.max_entries is not None and count > self.max_entries:
+            return True
+        return self.max_bytes is not None and self._total_bytes > self.max_bytes
+
+    def _evict(self):
+        """Evict entries by policy until the cache is within its size limits."""
+        heap = self._eviction_heap
+        while heap and self._over_limit():
+            priority, key, slot, offset = heapq.heappop(heap)
+            index = self._live_index(key, slot, offset)
+            if index is None:
+                continue
+            current = self._eviction_priority(index, slot)
+            if current != priority:
+                # Accessed since it was pushed; a fresher item is in the heap
+                continue
+            self.stats["evicted_bytes"] += self._remove(index, slot)
+            self.stats["evictions"] += 1
+
+        # Accesses leave stale items behind; rebuild once they dominate
+        count = sum(index.count for index in self.partitions.values())
+        if len(heap) > 2 * count + 1024:
+            self._rebuild_heaps()
+
+    def _maybe_compact(self):
+        """Compact when dead records dominate the log or the interval has passed."""
+        live_bytes = self._log_size - self._dead_bytes
+        due = time.time() - self._last_compaction >= self.compaction_interval
+        if (self._dead_bytes >= self.compaction_min_bytes and self._dead_bytes > live_bytes) or \
+                (due and self._dead_bytes > 0):
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrite the log with only live, unexpired records.
+
+        The new log and slot arrays are written under the next generation and
+        committed by replacing the manifest, so a crash at any point leaves
+        either the old or the new generation intact.
         """
-        Get embedding for text.
-        In production, use sentence-transformers or similar.
-        For now, using a simple hash-based approach.
-        """
-        # TODO: Replace with actual embeddings (sentence-transformers, OpenAI, etc.)
-        # This is a placeholder that creates a deterministic vector from text
-        hash_obj = hashlib.sha256(text.encode())
-        hash_bytes = hash_obj.digest()
-        
-        # Convert to numpy array (normalized)
-        embedding = np.frombuffer(hash_bytes, dtype=np.uint8).astype(float)
-        embedding = embedding / np.linalg.norm(embedding)
-        
-        return embedding
-    
-    def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
-        """Calculate cosine similarity between two vectors."""
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-    
-    def get(self, query: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._cleanup_expired()
+            new_generation = self.generation + 1
+            new_slots: Dict[PartitionKey, np.ndarray] = {}
+
+            with open(self._log_file(new_generation), 'wb') as out:
+                position = 0
+                for key, index in self.partitions.items():
+                    slots_path = self._slots_file(self._partition_id(key), new_generation)
+                    slots = _new_array(slots_path, index.slots.shape, SLOT_DTYPE)
+                    slots[:] = index.slots
+                    for slot in index.live_slots():
+                        offset, length = index.slots[["offset", "length"]][slot]
+                        self._reader.seek(int(offset))
+                        out.write(self._reader.read(int(length)))
+                        slots["offset"][slot] = position
+                        position += int(length)
+                    slots.flush()
+                    new_slots[key] = slots
+                out.flush()
+                os.fsync(out.fileno())
+
+            old_generation = self.generation
+            self.generation = new_generation
+            self._write_manifest()
+
+            for key, index in self.partitions.items():
+                old_slots_path = index.slots_path
+                index.slots = new_slots[key]
+                index.slots_path = self._slots_file(self._partition_id(key), new_generation)
+                old_slots_path.unlink(missing_ok=True)
+            self._close_log()
+            self._log_file(old_generation).unlink(missing_ok=True)
+            self._open_log()
+            self._dead_bytes = 0
+            self._rebuild_heaps()
+            self._last_compaction = time.time()
+            logger.info(f"Compacted semantic cache to generation {new_generation} ({self._log_size} bytes)")
+
+    def _get_embedding(self, text: str) -> np.ndarray:
+        """Get unit float32 embedding for text from the configured backend."""
+        return self.embedder.embed(text)
+
+    def _entry_id(self, key: PartitionKey, index: VectorIndex, slot: int) -> str:
+        return f"{self._partition_id(key)}:{slot}:{int(index.slots['offset'][slot])}"
+
+    def get(self, query: str, metadata: Optional[Dict[str, Any]] = None,
+            exact: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Get cached response for query.
-        
+
         Args:
             query: Query text
             metadata: Optional metadata (provider, model, etc.)
-        
+            exact: Optional metadata fields the cached entry must match exactly
+
         Returns:
-            Cached response or None
+            Cached response or None. ``stale`` is True when the entry is past
+            its TTL but still inside the stale window.
         """
-        self.stats["total_queries"] += 1
-        self._cleanup_expired()
-        
-        # Get query embedding
-        query_embedding = self._get_embedding(query)
-        
-        # Find similar cached queries
-        best_match = None
-        best_similarity = 0.0
-        
-        for entry in self.cache:
-            # Check metadata match if provided
+        # Embed outside the lock so lookups don't queue behind the backend
+        try:
+            query_embedding = self._get_embedding(query)
+        except Exception as e:
+            logger.error(f"Embedding failed, treating as miss: {e}")
+            query_embedding = None
+
+        with self._lock:
+            self.stats["total_queries"] += 1
+            if query_embedding is None:
+                self.stats["misses"] += 1
+                return None
+            self._cleanup_expired()
+
+            # Restrict the search to the matching provider/model partition
             if metadata:
-                entry_metadata = entry.get("metadata", {})
-                if entry_metadata.get("provider") != metadata.get("provider"):
+                key = self._partition_key(metadata)
+                candidates = [key] if key in self.partitions else []
+            else:
+                candidates = list(self.partitions.keys())
+
+            # Exact fields are checked on the record, so look past the top match
+            k = 4 if exact else 1
+            matches = []
+            for key in candidates:
+                index = self.partitions[key]
+                for slot, similarity in index.search_k(query_embedding, k):
+                    if similarity >= self.similarity_threshold:
+                        matches.append((similarity, key, index, slot))
+            matches.sort(key=lambda match: match[0], reverse=True)
+
+            for similarity, key, index, slot in matches:
+                try:
+                    match = self._read_entry(index, slot)
+                except Exception as e:
+                    logger.error(f"Failed to read cache entry: {e}")
+                    self._remove(index, slot)
                     continue
-                if entry_metadata.get("model") != metadata.get("model"):
+                if exact and any(match["metadata"].get(field) != value for field, value in exact.items()):
                     continue
-            
-            # Calculate similarity
-            cached_embedding = np.array(entry["embedding"])
-            similarity = self._cosine_similarity(query_embedding, cached_embedding)
-            
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = entry
-        
-        # Check if similarity exceeds threshold
-        if best_similarity >= self.similarity_threshold:
-            self.stats["hits"] += 1
-            return {
-                "response": best_match["response"],
-                "similarity": best_similarity,
-                "cached_at": best_match["cached_at"],
-                "original_query": best_match["query"]
-            }
-        
-        self.stats["misses"] += 1
-        return None
-    
-    def set(self, query: str, response: Any, metadata: Optional[Dict[str, Any]] = None):
+
+                index.touch(slot)
+                heapq.heappush(self._eviction_heap, (
+                    self._eviction_priority(index, slot),
+                    key,
+                    slot,
+                    int(index.slots["offset"][slot])
+                ))
+                self.stats["hits"] += 1
+                return {
+                    "response": match["response"],
+                    "similarity": similarity,
+                    "cached_at": match["cached_at"],
+                    "original_query": match["query"],
+                    "stale": datetime.fromisoformat(match["expires_at"]) <= datetime.now(),
+                    "entry_id": self._entry_id(key, index, slot)
+                }
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, query: str, response: Any, metadata: Optional[Dict[str, Any]] = None,
+            ttl: Optional[float] = None):
         """
         Cache query-response pair.
-        
+
         Args:
             query: Query text
             response: Response to cache
             metadata: Optional metadata
+            ttl: Optional time to live in seconds (defaults to the cache TTL)
         """
-        query_embedding = self._get_embedding(query)
-        
+        try:
+            query_embedding = self._get_embedding(query)
+        except Exception as e:
+            logger.error(f"Embedding failed, response not cached: {e}")
+            return
+
+        now = datetime.now()
         entry = {
             "query": query,
             "response": response,
-            "embedding": query_embedding.tolist(),
             "metadata": metadata or {},
-            "cached_at": datetime.now().isoformat(),
-            "expires_at": (datetime.now() + self.ttl).isoformat()
+            "cached_at": now.isoformat(),
+            "expires_at": (now + (timedelta(seconds=ttl) if ttl is not None else self.ttl)).isoformat()
         }
-        
-        self.cache.append(entry)
-        self.save_cache()
-    
+
+        with self._lock:
+            try:
+                self._append(entry, query_embedding)
+            except Exception as e:
+                logger.error(f"Failed to append cache entry: {e}")
+                return
+            self._evict()
+            self._maybe_compact()
+
+    def discard(self, entry_id: str) -> bool:
+        """
+        Drop a single entry returned by get().
+
+        Returns:
+            True if the entry was still cached
+        """
+        partition_id, slot, offset = entry_id.split(":")
+        with self._lock:
+            for key in self.partitions:
+                if self._partition_id(key) == partition_id:
+                    index = self._live_index(key, int(slot), int(offset))
+                    if index is None:
+                        return False
+                    self._remove(index, int(slot))
+                    return True
+        return False
+
     def invalidate(self, query: Optional[str] = None):
         """
         Invalidate cache entries.
-        
+
         Args:
             query: Optional specific query to invalidate (invalidates all if None)
         """
-        if query:
-            query_embedding = self._get_embedding(query)
-            self.cache = [
-                entry for entry in self.cache
-                if self._cosine_similarity(np.array(entry["embedding"]), query_embedding) < 0.95
-            ]
-        else:
-            self.cache = []
-        
-        self.save_cache()
-    
+        query_embedding = self._get_embedding(query) if query else None
+        with self._lock:
+            if query:
+                for index in self.partitions.values():
+                    for slot in index.search_above(query_embedding, 0.95):
+                        self._remove(index, slot)
+                self._maybe_compact()
+            else:
+                self._reset_storage()
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
         hit_rate = (self.stats["hits"] / self.stats["total_queries"] * 100
                    if self.stats["total_queries"] > 0 else 0)
-        
+
         return {
             "total_queries": self.stats["total_queries"],
             "hits": self.stats["hits"],
             "misses": self.stats["misses"],
             "hit_rate": round(hit_rate, 2),
-            "cache_size": len(self.cache)
+            "cache_size": sum(index.count for index in self.partitions.values()),
+            "partitions": len(self.partitions),
+            "embedding_backend": self.embedder.name,
+            "total_bytes": self._total_bytes,
+            "log_bytes": self._log_size,
+            "dead_bytes": self._dead_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "eviction_policy": self.eviction_policy,
+            "evictions": self.stats["evictions"],
+            "evicted_bytes": self.stats["evicted_bytes"],
+            "expirations": self.stats["expirations"]
         }
-    
+
     def clear_stats(self):
         """Reset statistics."""
         self.stats = {
             "hits": 0,
             "misses": 0,
-            "total_queries": 0
+            "total_queries": 0,
+            "evictions": 0,
+            "evicted_bytes": 0,
+            "expirations": 0
         }
 
 # Create singleton instance
@@ -212,5 +855,16 @@ def get_semantic_cache() -> SemanticCache:
     """Get or create SemanticCache instance."""
     global _semantic_cache
     if _semantic_cache is None:
-        _semantic_cache = SemanticCache()
+        from config.settings import settings
+        backend = create_embedding_backend(
+            settings.semantic_cache_embedding_backend,
+            model=settings.semantic_cache_embedding_model
+        )
+        _semantic_cache = SemanticCache(
+            embedding_backend=backend,
+            max_entries=settings.semantic_cache_max_entries,
+            max_bytes=settings.semantic_cache_max_bytes,
+            eviction_policy=settings.semantic_cache_eviction_policy,
+            stale_ttl=settings.semantic_cache_stale_ttl
+        )
     return _semantic_cache
@@ -0,0 +1,239 @@
+"""
+Summarization Service - One shared, dynamically batched summarization model.
+
+Every agent's Memory submits summarization jobs here instead of loading its
+own copy of the model. A worker thread loads the model once (optionally
+int8-quantized with torch dynamic quantization, or exported to ONNX Runtime
+through optimum), gathers queued jobs into batches and resolves one future
+per job.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from sources.logger import Logger
+
+logger = Logger("summarization_service.log")
+
+DEFAULT_MODEL = "pszemraj/led-base-book-summary"
+QUANTIZATION_MODES = ("none", "dynamic", "onnx")
+
+
+class SummarizationService:
+    """Process-wide summarization model with dynamic batching."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, device: Optional[str] = None, quantize: str = "none",
+                 max_batch: int = 8, linger: float = 0.02, max_input_tokens: int = 4096,
+                 summarize_batch: Optional[Callable[[List[str], int, int], List[str]]] = None):
+        """
+        Args:
+            model_name: Hugging Face seq2seq summarization model
+            device: torch device (defaults to cuda, then mps, then cpu)
+            quantize: none, dynamic (int8 Linear layers, CPU only) or onnx (optimum + onnxruntime)
+            max_batch: Jobs summarized in one generate() call
+            linger: Seconds to wait for more jobs before running a partial batch
+            max_input_tokens: Inputs are truncated to this many tokens
+            summarize_batch: Replaces the model: (texts, min_length, max_length) -> summaries
+        """
+        if quantize not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantize}', expected one of {QUANTIZATION_MODES}")
+        self.model_name = model_name
+        self.device = device
+        self.quantize = quantize
+        self.max_batch = max_batch
+        self.linger = linger
+        self.max_input_tokens = max_input_tokens
+        self._summarize_batch = summarize_batch
+        self.model = None
+        self.tokenizer = None
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "jobs": 0,
+            "short_circuited": 0,
+            "batches": 0,
+            "summarized": 0,
+            "failed": 0,
+            "batch_ms": 0.0
+        }
+        self._worker = threading.Thread(target=self._run, name="summarization-service", daemon=True)
+        self._worker.start()
+
+    def _load(self):
+        """Load the model once, in the worker thread."""
+        import torch
+        from transformers import AutoTokenizer
+
+        if self.device is None:
+            if torch.cuda.is_available():
+                self.device = "cuda"
+            elif torch.backends.mps.is_available():
+                self.device = "mps"
+            else:
+                self.device = "cpu"
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+
+        if self.quantize == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSeq2SeqLM
+                self.model = ORTModelForSeq2SeqLM.from_pretrained(self.model_name, export=True)
+                self.device = "cpu"
+                logger.info(f"Loaded {self.model_name} on ONNX Runtime")
+                return
+            except ImportError:
+                logger.warning("optimum[onnxruntime] is not installed, falling back to torch")
+
+        from transformers import AutoModelForSeq2SeqLM
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+        if self.quantize == "dynamic":
+            if self.device == "cpu":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                logger.warning("Dynamic int8 quantization is CPU-only, loading the full-precision model")
+        self.model = model.to(self.device).eval()
+        logger.info(f"Loaded {self.model_name} on {self.device} (quantize={self.quantize})")
+
+    def _generate(self, texts: List[str], min_length: int, max_length: int) -> List[str]:
+        """Summarize a batch with the loaded model."""
+        import torch
+
+        if self.model is None:
+            self._load()
+        inputs = self.tokenizer(["summarize: " + text for text in texts], return_tensors="pt", padding=True,
+                                truncation=True, max_length=self.max_input_tokens)
+        inputs = {name: tensor.to(self.device) for name, tensor in inputs.items()}
+        if getattr(self.model.config, "model_type", None) == "led":
+            # LED expects global attention on the first token
+            global_attention_mask = torch.zeros_like(inputs["input_ids"])
+            global_attention_mask[:, 0] = 1
+            inputs["global_attention_mask"] = global_attention_mask
+        with torch.no_grad():
+            summary_ids = self.model.generate(
+                **inputs,
+                max_length=max_length,
+                min_length=min_length,
+                length_penalty=1.0,
+                num_beams=1,
+                early_stopping=True
+            )
+        summaries = self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+        return [summary.replace("summary:", "").strip() for summary in summaries]
+
+    def submit(self, text: str, min_length: int = 64, max_length: Optional[int] = None) -> Future:
+        """
+        Queue a summarization job.
+
+        Args:
+            text: Text to summarize
+            min_length: Minimum summary length (tokens); shorter texts are returned as-is
+            max_length: Maximum summary length (defaults to half the text length)
+
+        Returns:
+            Future resolving to the summary
+        """
+        future: Future = Future()
+        with self._stats_lock:
+            self.stats["jobs"] += 1
+        if len(text) < min_length * 1.5:
+            with self._stats_lock:
+                self.stats["short_circuited"] += 1
+            future.set_result(text)
+            return future
+        if max_length is None:
+            max_length = len(text) // 2 if len(text) > min_length * 2 else min_length * 2
+        self._queue.put((text, min_length, max_length, future))
+        return future
+
+    def summarize(self, text: str, min_length: int = 64, max_length: Optional[int] = None,
+                  timeout: Optional[float] = None) -> str:
+        """Summarize a text, blocking until its batch has run."""
+        return self.submit(text, min_length, max_length).result(timeout)
+
+    async def asummarize(self, text: str, min_length: int = 64, max_length: Optional[int] = None) -> str:
+        """Summarize a text without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(text, min_length, max_length))
+
+    def _next_batch(self) -> Optional[List[tuple]]:
+        job = self._queue.get()
+        if job is None:
+            return None
+        batch = [job]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)  # Finish this batch, then stop
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            texts = [text for text, _, _, _ in batch]
+            # One generate() call per batch: the shortest min and longest max length apply
+            min_length = min(job[1] for job in batch)
+            max_length = max(job[2] for job in batch)
+            start = time.perf_counter()
+            try:
+                summarize_batch = self._summarize_batch or self._generate
+                summaries = summarize_batch(texts, min_length, max_length)
+            except Exception as e:
+                logger.error(f"Summarization batch of {len(batch)} failed: {e}")
+                with self._stats_lock:
+                    self.stats["failed"] += len(batch)
+                for _, _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._stats_lock:
+                self.stats["batches"] += 1
+                self.stats["summarized"] += len(batch)
+                self.stats["batch_ms"] += (time.perf_counter() - start) * 1000
+            for (_, _, _, future), summary in zip(batch, summaries):
+                future.set_result(summary)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker after the queued jobs are done."""
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get summarization statistics."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["queued"] = self._queue.qsize()
+        stats["avg_batch_size"] = stats["summarized"] / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_batch_ms"] = stats["batch_ms"] / stats["batches"] if stats["batches"] else 0.0
+        stats["model"] = self.model_name
+        stats["quantize"] = self.quantize
+        stats["loaded"] = self.model is not None or self._summarize_batch is not None
+        return stats
+
+
+# Singleton instance
+_summarization_service: Optional[SummarizationService] = None
+_summarization_service_lock = threading.Lock()
+
+def get_summarization_service() -> SummarizationService:
+    """Get or create the shared SummarizationService."""
+    global _summarization_service
+    with _summarization_service_lock:
+        if _summarization_service is None:
+            from config.settings import settings
+            _summarization_service = SummarizationService(
+                model_name=settings.summarization_model,
+                quantize=settings.summarization_quantize,
+                max_batch=settings.summarization_max_batch,
+                linger=settings.summarization_linger_ms / 1000.0
+            )
+        return _summarization_service
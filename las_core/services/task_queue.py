@@ -1,11 +1,36 @@
 """
-Task Queue System - Async task processing with Celery and Redis.
+Task Queue System - Priority task queue with an asyncio and process-pool runtime.
+
+Pending tasks wait in one heap per priority. The dispatcher takes the head
+with the highest effective priority, where a task gains one level for every
+``aging_interval`` seconds it has waited, so low-priority work cannot be
+starved by a steady stream of urgent tasks. Tasks run on a dedicated event
+loop thread: coroutine handlers run on the loop, plain functions in its
+thread pool and handlers registered with ``cpu_bound=True`` in a process
+pool. Failed tasks are retried with exponential backoff, finished tasks are
+dropped once the retention period has passed, and status counts and the
+status/agent indexes are maintained as tasks move so nothing scans the
+whole task table.
 """
 
-from typing import Dict, Any, Optional, List
-from enum import Enum
-import json
+import asyncio
+import heapq
+import inspect
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from services.task_store import TaskStore
+from sources.logger import Logger
+
+logger = Logger("task_queue.log")
 
 class TaskPriority(str, Enum):
     """Task priority levels."""
@@ -22,118 +47,634 @@ class TaskStatus(str, Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
+PRIORITY_RANK = {
+    TaskPriority.LOW: 0,
+    TaskPriority.NORMAL: 1,
+    TaskPriority.HIGH: 2,
+    TaskPriority.URGENT: 3
+}
+
+FINISHED_STATUSES = (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value)
+
+@dataclass
+class TaskHandler:
+    """A registered task type."""
+    fn: Callable[[Dict[str, Any]], Any]
+    cpu_bound: bool = False
+    max_retries: Optional[int] = None
+    timeout: Optional[float] = None
+
 class TaskQueue:
     """
-    Simplified task queue system.
-    In production, use Celery with Redis/RabbitMQ.
+    Priority task queue with worker execution.
+
+    Handlers take the task payload and return the task result. Any thread may
+    enqueue or cancel tasks; the runtime thread starts on the first enqueue.
     """
-    
-    def __init__(self):
+
+    def __init__(self, max_workers: int = 4, process_workers: int = 2, aging_interval: float = 30.0,
+                 max_retries: int = 3, retry_backoff: float = 1.0, retention: float = 7 * 86400,
+                 cleanup_interval: float = 60.0, store: Optional[TaskStore] = None,
+                 visibility_timeout: float = 300.0):
+        """
+        Args:
+            max_workers: Tasks running at once
+            process_workers: Size of the process pool for cpu_bound handlers
+            aging_interval: Seconds of waiting that raise a task by one priority level (0 disables aging)
+            max_retries: Default retries of a failed task
+            retry_backoff: Delay before the first retry; doubles with each attempt
+            retention: Seconds finished tasks are kept
+            cleanup_interval: Seconds between retention sweeps
+            store: Durable backend every task is written through to (None keeps tasks in memory only)
+            visibility_timeout: Lease of a running task; renewed while it runs, and an
+                expired lease lets another process claim the task
+        """
+        self.store = store
+        self.visibility_timeout = visibility_timeout
+        self.max_workers = max_workers
+        self.process_workers = process_workers
+        self.aging_interval = aging_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retention = retention
+        self.cleanup_interval = cleanup_interval
+
         self.tasks: Dict[str, Dict[str, Any]] = {}
         self.task_counter = 0
-    
+        self._handlers: Dict[str, TaskHandler] = {}
+        self._lock = threading.RLock()
+        self._seq = itertools.count()
+
+        # Ready tasks: (enqueued_at, seq, task_id) per priority; retries wait in _delayed
+        self._heaps: Dict[TaskPriority, List[Tuple[float, int, str]]] = {p: [] for p in TaskPriority}
+        self._ready_counts: Dict[TaskPriority, int] = {p: 0 for p in TaskPriority}  # Live heap entries
+        self._delayed: List[Tuple[float, int, str]] = []
+        self._finished: Deque[Tuple[float, str]] = deque()
+
+        # Incremental indexes (dicts used as insertion-ordered sets)
+        self._counts: Dict[str, int] = {status.value: 0 for status in TaskStatus}
+        self._by_status: Dict[str, Dict[str, None]] = {status.value: {} for status in TaskStatus}
+        self._by_agent: Dict[str, Dict[str, None]] = {}
+        self._by_key: Dict[str, str] = {}
+        self.stats = {"retries": 0, "aged_dispatches": 0}
+
+        self._running: Dict[str, asyncio.Future] = {}
+        self._cancel_requested: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._closing = False
+        self._drain_timeout = 5.0
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def register_handler(self, task_type: str, handler: Callable[[Dict[str, Any]], Any],
+                         cpu_bound: bool = False, max_retries: Optional[int] = None,
+                         timeout: Optional[float] = None):
+        """
+        Register the function executing a task type.
+
+        Args:
+            task_type: Task type name
+            handler: Coroutine function or function taking the payload
+            cpu_bound: Run in the process pool (handler and payload must be picklable)
+            max_retries: Retries for this type (defaults to the queue's)
+            timeout: Seconds before an attempt is abandoned and counted as failed
+        """
+        self._handlers[task_type] = TaskHandler(handler, cpu_bound, max_retries, timeout)
+
+    # === Bookkeeping ===
+
+    def _set_status(self, task: Dict[str, Any], status: str):
+        """Move a task between status indexes (caller holds the lock)."""
+        previous = task["status"]
+        if previous == status:
+            return
+        if previous == TaskStatus.PENDING.value:
+            self._unready(task)
+        self._counts[previous] -= 1
+        self._by_status[previous].pop(task["id"], None)
+        self._counts[status] += 1
+        self._by_status[status][task["id"]] = None
+        task["status"] = status
+
+    def _finish(self, task: Dict[str, Any], status: str):
+        self._set_status(task, status)
+        task["completed_at"] = datetime.now().isoformat()
+        task["_completed_ts"] = time.time()
+        task["_lease_until"] = None
+        self._finished.append((task["_completed_ts"], task["id"]))
+        self._persist(task)
+
+    def _persist(self, task: Dict[str, Any]):
+        if self.store is not None:
+            self.store.save(task)
+
+    def _forget(self, task: Dict[str, Any]):
+        """Drop a task from memory and the indexes (caller holds the lock)."""
+        task_id = task["id"]
+        self.tasks.pop(task_id, None)
+        self._unready(task)
+        self._counts[task["status"]] -= 1
+        self._by_status[task["status"]].pop(task_id, None)
+        if task["agent"]:
+            agent_ids = self._by_agent.get(task["agent"], {})
+            agent_ids.pop(task_id, None)
+            if not agent_ids:
+                self._by_agent.pop(task["agent"], None)
+        if task["idempotency_key"] and self._by_key.get(task["idempotency_key"]) == task_id:
+            del self._by_key[task["idempotency_key"]]
+
+    def _push_ready(self, task: Dict[str, Any]):
+        priority = TaskPriority(task["priority"])
+        heapq.heappush(self._heaps[priority], (task["_enqueued_at"], next(self._seq), task["id"]))
+        task["_ready"] = True
+        self._ready_counts[priority] += 1
+
+    def _unready(self, task: Dict[str, Any]):
+        """Stop counting a task's heap entry, which may still be dropped lazily."""
+        if task.pop("_ready", False):
+            self._ready_counts[TaskPriority(task["priority"])] -= 1
+
+    def _notify(self):
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _new_task(self, task_type: str, payload: Dict[str, Any],
+                  priority: TaskPriority = TaskPriority.NORMAL, agent: Optional[str] = None,
+                  max_retries: Optional[int] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        handler = self._handlers.get(task_type)
+        if handler is None:
+            raise ValueError(f"No handler registered for task type '{task_type}'")
+        if max_retries is None:
+            max_retries = handler.max_retries if handler.max_retries is not None else self.max_retries
+
+        with self._lock:
+            self.task_counter += 1
+        # Unique across processes sharing a store, not just within this queue
+        task_id = f"task_{uuid.uuid4().hex}"
+        return {
+            "id": task_id,
+            "type": task_type,
+            "payload": payload,
+            "priority": TaskPriority(priority).value,
+            "agent": agent,
+            "idempotency_key": idempotency_key,
+            "status": TaskStatus.PENDING.value,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "max_retries": max_retries,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "completed_at": None,
+            "_created_ts": time.time(),
+            "_enqueued_at": time.monotonic()
+        }
+
+    def _add_task(self, task: Dict[str, Any]):
+        """Index a pending task and make it ready (caller holds the lock)."""
+        task_id = task["id"]
+        self.tasks[task_id] = task
+        self._counts[task["status"]] += 1
+        self._by_status[task["status"]][task_id] = None
+        if task["agent"]:
+            self._by_agent.setdefault(task["agent"], {})[task_id] = None
+        if task["idempotency_key"]:
+            self._by_key[task["idempotency_key"]] = task_id
+
     def enqueue(self, task_type: str, payload: Dict[str, Any],
                 priority: TaskPriority = TaskPriority.NORMAL,
-                agent: Optional[str] = None) -> str:
+                agent: Optional[str] = None, max_retries: Optional[int] = None,
+                idempotency_key: Optional[str] = None) -> str:
         """
         Enqueue a task for async processing.
-        
+
         Args:
             task_type: Type of task (query, scrape, code, etc.)
             payload: Task payload
             priority: Task priority
             agent: Optional agent identifier
-        
+            max_retries: Retries on failure (defaults to the handler's, then the queue's)
+            idempotency_key: Enqueueing the same key again returns the original task
+
         Returns:
             Task ID
+
+        Raises:
+            ValueError: If no handler is registered for the task type
         """
-        self.task_counter += 1
-        task_id = f"task_{self.task_counter}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        self.tasks[task_id] = {
-            "id": task_id,
-            "type": task_type,
+        return self.enqueue_many([{
+            "task_type": task_type,
             "payload": payload,
-            "priority": priority.value,
+            "priority": priority,
             "agent": agent,
-            "status": TaskStatus.PENDING.value,
-            "result": None,
-            "error": None,
-            "created_at": datetime.now().isoformat(),
-            "started_at": None,
-            "completed_at": None
-        }
-        
-        return task_id
-    
+            "max_retries": max_retries,
+            "idempotency_key": idempotency_key
+        }])[0]
+
+    def enqueue_many(self, requests: List[Dict[str, Any]]) -> List[str]:
+        """
+        Enqueue several tasks with one write to the store.
+
+        Args:
+            requests: Keyword arguments of enqueue() for each task
+
+        Returns:
+            Task IDs, in request order
+
+        Raises:
+            ValueError: If a task type has no handler (nothing is enqueued)
+        """
+        tasks = [self._new_task(**request) for request in requests]
+        owners = self.store.add(tasks) if self.store is not None else {}
+
+        task_ids = []
+        with self._lock:
+            for task in tasks:
+                key = task["idempotency_key"]
+                owner = (owners.get(key) if self.store is not None else self._by_key.get(key)) if key else None
+                if owner is not None and owner != task["id"]:
+                    task_ids.append(owner)
+                    continue
+                self._add_task(task)
+                self._push_ready(task)
+                task_ids.append(task["id"])
+
+        self._ensure_started()
+        self._notify()
+        return task_ids
+
+    def recover(self) -> int:
+        """
+        Reload unfinished tasks from the store after a restart.
+
+        Pending tasks are queued again with their original age. Tasks that
+        were running are queued once their lease expires; the claim before
+        execution skips them if another process still holds them. Register
+        handlers before recovering.
+
+        Returns:
+            Number of tasks recovered
+        """
+        if self.store is None:
+            return 0
+        recovered = self.store.unfinished()
+        wall_now, mono_now = time.time(), time.monotonic()
+        with self._lock:
+            for task in recovered:
+                if task["id"] in self.tasks:
+                    continue
+                task["_enqueued_at"] = mono_now - (wall_now - task["_created_ts"])
+                lease_until = task["_lease_until"]
+                task["status"] = TaskStatus.PENDING.value
+                self._add_task(task)
+                if lease_until is not None and lease_until > wall_now:
+                    heapq.heappush(self._delayed, (mono_now + lease_until - wall_now, next(self._seq), task["id"]))
+                else:
+                    self._push_ready(task)
+        if recovered:
+            logger.info(f"Recovered {len(recovered)} unfinished tasks")
+            self._ensure_started()
+            self._notify()
+        return len(recovered)
+
+    def _pop_next(self, now: float) -> Tuple[Optional[str], Optional[float]]:
+        """
+        Take the next task to run (caller holds the lock).
+
+        Returns:
+            (task_id, None), or (None, seconds until the next retry is due)
+        """
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, task_id = heapq.heappop(self._delayed)
+            task = self.tasks.get(task_id)
+            if task is not None and task["status"] == TaskStatus.PENDING.value:
+                self._push_ready(task)
+
+        best = None
+        for priority, heap in self._heaps.items():
+            # Cancelled and cleaned-up tasks are dropped lazily
+            while heap and self.tasks.get(heap[0][2], {}).get("status") != TaskStatus.PENDING.value:
+                heapq.heappop(heap)
+            if not heap:
+                continue
+            enqueued_at = heap[0][0]
+            level = PRIORITY_RANK[priority]
+            if self.aging_interval > 0:
+                level += int((now - enqueued_at) / self.aging_interval)
+            # Highest effective level first, oldest first among equals
+            if best is None or (level, -enqueued_at) > (best[0], -best[1]):
+                best = (level, enqueued_at, priority)
+
+        if best is None:
+            return None, (self._delayed[0][0] - now) if self._delayed else None
+        level, _, priority = best
+        _, _, task_id = heapq.heappop(self._heaps[priority])
+        self._unready(self.tasks[task_id])
+        if level > PRIORITY_RANK[priority]:
+            self.stats["aged_dispatches"] += 1
+        return task_id, None
+
+    # === Runtime ===
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None or self._closing:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="task-queue", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._wakeup = asyncio.Event()
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_until_complete(self._dispatch())
+            # Let running tasks finish, then interrupt the rest; with a store they
+            # stay leased and are recovered by the next process
+            running = asyncio.all_tasks(loop)
+            if running:
+                _, unfinished = loop.run_until_complete(asyncio.wait(running, timeout=self._drain_timeout))
+                for job in unfinished:
+                    job.cancel()
+                loop.run_until_complete(asyncio.gather(*unfinished, return_exceptions=True))
+        finally:
+            loop.close()
+
+    def _renew_leases(self):
+        if self.store is not None and self._running:
+            self.store.extend_leases(list(self._running), time.time() + self.visibility_timeout)
+
+    async def _dispatch(self):
+        slots = asyncio.Semaphore(self.max_workers)
+        # Leases are renewed three times per visibility timeout
+        renew_interval = self.visibility_timeout / 3
+        next_cleanup = time.monotonic() + self.cleanup_interval
+        next_renewal = time.monotonic() + renew_interval
+        while True:
+            task_id = None
+            while task_id is None:
+                self._wakeup.clear()
+                now = time.monotonic()
+                if now >= next_cleanup:
+                    self.cleanup()
+                    next_cleanup = now + self.cleanup_interval
+                if now >= next_renewal:
+                    self._renew_leases()
+                    next_renewal = now + renew_interval
+                if self._closing:
+                    return
+                # With every worker busy, keep waking for renewals and close
+                delay = None
+                if not slots.locked():
+                    with self._lock:
+                        task_id, delay = self._pop_next(now)
+                if task_id is None:
+                    timeout = min(next_cleanup, next_renewal) - now
+                    if delay is not None:
+                        timeout = min(timeout, delay)
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+                    except asyncio.TimeoutError:
+                        pass
+            await slots.acquire()
+            asyncio.ensure_future(self._execute(task_id, slots))
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._process_pool
+
+    def _start_job(self, handler: TaskHandler, payload: Dict[str, Any]) -> asyncio.Future:
+        if handler.cpu_bound:
+            return self._loop.run_in_executor(self._get_process_pool(), handler.fn, payload)
+        if inspect.iscoroutinefunction(handler.fn):
+            return asyncio.ensure_future(handler.fn(payload))
+        return self._loop.run_in_executor(None, handler.fn, payload)
+
+    async def _execute(self, task_id: str, slots: asyncio.Semaphore):
+        try:
+            with self._lock:
+                task = self.tasks.get(task_id)
+                if task is None or task["status"] != TaskStatus.PENDING.value:
+                    return
+                handler = self._handlers.get(task["type"])
+                if handler is None:
+                    task["error"] = f"No handler registered for task type '{task['type']}'"
+                    self._finish(task, TaskStatus.FAILED.value)
+                    return
+                task["attempts"] += 1
+                task["started_at"] = task["started_at"] or datetime.now().isoformat()
+                if self.store is not None:
+                    task["_lease_until"] = time.time() + self.visibility_timeout
+                    if not self.store.claim(task, task["_lease_until"], time.time()):
+                        # Another process owns it (or finished it); the store has its state
+                        self._forget(task)
+                        return
+                self._set_status(task, TaskStatus.RUNNING.value)
+                job = self._start_job(handler, task["payload"])
+                self._running[task_id] = job
+
+            try:
+                result = await asyncio.wait_for(job, handler.timeout)
+            except asyncio.CancelledError:
+                if task_id not in self._cancel_requested:
+                    raise
+                with self._lock:
+                    self._cancel_requested.discard(task_id)
+                    self._finish(task, TaskStatus.CANCELLED.value)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                with self._lock:
+                    task["error"] = error
+                    if task_id in self._cancel_requested:
+                        self._cancel_requested.discard(task_id)
+                        self._finish(task, TaskStatus.CANCELLED.value)
+                    elif task["attempts"] <= task["max_retries"]:
+                        delay = self.retry_backoff * (2 ** (task["attempts"] - 1))
+                        self._set_status(task, TaskStatus.PENDING.value)
+                        task["_lease_until"] = None
+                        self._persist(task)
+                        heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), task_id))
+                        self.stats["retries"] += 1
+                        logger.warning(f"Task {task_id} failed ({error}), retrying in {delay:.1f}s")
+                    else:
+                        self._finish(task, TaskStatus.FAILED.value)
+                        logger.error(f"Task {task_id} failed after {task['attempts']} attempts: {error}")
+            else:
+                with self._lock:
+                    if task_id in self._cancel_requested:
+                        # The handler could not be interrupted; its result is discarded
+                        self._cancel_requested.discard(task_id)
+                        self._finish(task, TaskStatus.CANCELLED.value)
+                    else:
+                        task["result"] = result
+                        task["error"] = None
+                        self._finish(task, TaskStatus.COMPLETED.value)
+        finally:
+            self._running.pop(task_id, None)
+            slots.release()
+            self._wakeup.set()
+
+    # === Public API ===
+
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """Get task details."""
-        return self.tasks.get(task_id)
-    
+        """Get task details (from the store for tasks no longer held in memory)."""
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is not None:
+                return {key: value for key, value in task.items() if not key.startswith("_")}
+        if self.store is None:
+            return None
+        task = self.store.get(task_id)
+        if task is None:
+            return None
+        return {key: value for key, value in task.items() if not key.startswith("_")}
+
     def update_status(self, task_id: str, status: TaskStatus,
                      result: Optional[Any] = None, error: Optional[str] = None):
         """Update task status."""
-        if task_id not in self.tasks:
-            return
-        
-        task = self.tasks[task_id]
-        task["status"] = status.value
-        
-        if status == TaskStatus.RUNNING and not task["started_at"]:
-            task["started_at"] = datetime.now().isoformat()
-        
-        if status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
-            task["completed_at"] = datetime.now().isoformat()
-        
-        if result is not None:
-            task["result"] = result
-        
-        if error is not None:
-            task["error"] = error
-    
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return
+
+            if status == TaskStatus.RUNNING and not task["started_at"]:
+                task["started_at"] = datetime.now().isoformat()
+
+            if status.value in FINISHED_STATUSES and task["status"] not in FINISHED_STATUSES:
+                self._finish(task, status.value)
+            else:
+                self._set_status(task, status.value)
+
+            if result is not None:
+                task["result"] = result
+
+            if error is not None:
+                task["error"] = error
+
+            self._persist(task)
+
     def cancel_task(self, task_id: str) -> bool:
-        """Cancel a pending task."""
-        if task_id not in self.tasks:
-            return False
-        
-        task = self.tasks[task_id]
-        if task["status"] == TaskStatus.PENDING.value:
-            task["status"] = TaskStatus.CANCELLED.value
-            return True
-        
+        """
+        Cancel a pending or running task.
+
+        Coroutine handlers are interrupted, and process-pool jobs that have
+        not started are withdrawn; a thread or process already executing
+        runs to completion, but its result is discarded.
+
+        Returns:
+            True if the task was pending or running
+        """
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return False
+
+            if task["status"] == TaskStatus.PENDING.value:
+                self._finish(task, TaskStatus.CANCELLED.value)  # Its heap entry is dropped lazily
+                return True
+
+            if task["status"] == TaskStatus.RUNNING.value:
+                self._cancel_requested.add(task_id)
+                job = self._running.get(task_id)
+                if job is not None:
+                    self._loop.call_soon_threadsafe(job.cancel)
+                return True
+
         return False
-    
+
     def list_tasks(self, status: Optional[TaskStatus] = None,
-                   agent: Optional[str] = None) -> List[Dict[str, Any]]:
-        """List tasks with optional filtering."""
-        tasks = list(self.tasks.values())
-        
-        if status:
-            tasks = [t for t in tasks if t["status"] == status.value]
-        
-        if agent:
-            tasks = [t for t in tasks if t["agent"] == agent]
-        
-        return tasks
-    
-    def get_stats(self) -> Dict[str, int]:
+                   agent: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """List tasks with optional filtering, using the status and agent indexes."""
+        with self._lock:
+            if status is not None and agent:
+                ids = self._by_status[status.value]
+                agent_ids = self._by_agent.get(agent, {})
+                if len(agent_ids) < len(ids):
+                    ids, other = agent_ids, ids
+                else:
+                    other = agent_ids
+                task_ids = [task_id for task_id in ids if task_id in other]
+            elif status is not None:
+                task_ids = list(self._by_status[status.value])
+            elif agent:
+                task_ids = list(self._by_agent.get(agent, {}))
+            else:
+                task_ids = list(self.tasks)
+            if limit is not None:
+                task_ids = task_ids[:limit]
+        return [self.get_task(task_id) for task_id in task_ids]
+
+    def cleanup(self, max_age: Optional[float] = None) -> int:
+        """
+        Drop tasks that finished more than max_age seconds ago.
+
+        Args:
+            max_age: Seconds to keep finished tasks (defaults to the retention period)
+
+        Returns:
+            Number of tasks removed
+        """
+        cutoff = time.time() - (self.retention if max_age is None else max_age)
+        removed = 0
+        with self._lock:
+            while self._finished and self._finished[0][0] < cutoff:
+                _, task_id = self._finished.popleft()
+                task = self.tasks.get(task_id)
+                if task is None or task["status"] not in FINISHED_STATUSES:
+                    continue
+                self._forget(task)
+                removed += 1
+        if self.store is not None:
+            self.store.delete_finished(cutoff)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
         """Get queue statistics."""
-        stats = {
-            "total": len(self.tasks),
-            "pending": 0,
-            "running": 0,
-            "completed": 0,
-            "failed": 0,
-            "cancelled": 0
-        }
-        
-        for task in self.tasks.values():
-            status = task["status"]
-            if status in stats:
-                stats[status] += 1
-        
+        with self._lock:
+            stats = {"total": len(self.tasks), **self._counts}
+            stats["queued_by_priority"] = {priority.value: count for priority, count in self._ready_counts.items()}
+            stats["awaiting_retry"] = len(self._delayed)
+            stats.update(self.stats)
+        stats["workers"] = self.max_workers
         return stats
 
+    def close(self, timeout: float = 5.0):
+        """Stop dispatching, cancel tasks still running after timeout and shut the workers down."""
+        with self._lock:
+            self._closing = True
+            self._drain_timeout = timeout
+        self._notify()
+        if self._thread is not None:
+            self._thread.join(timeout + 5.0)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+        if self.store is not None:
+            self.store.close()
+
+async def _summarize_task(payload: Dict[str, Any]) -> str:
+    """Summarize payload["text"] with the shared summarization service."""
+    from services.summarization_service import get_summarization_service
+    return await get_summarization_service().asummarize(
+        payload["text"], payload.get("min_length", 64), payload.get("max_length")
+    )
+
+async def _ingest_task(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue payload["text"] for RAG ingestion into payload["collection"]."""
+    from services.ingestion_pipeline import get_ingestion_pipeline
+    await get_ingestion_pipeline().asubmit(payload["text"], payload["collection"], payload.get("metadata"))
+    return {"collection": payload["collection"]}
+
+def register_default_handlers(queue: TaskQueue):
+    """Register the built-in task types."""
+    queue.register_handler("summarize", _summarize_task)
+    queue.register_handler("ingest", _ingest_task)
+
 # Create singleton instance
 _task_queue: Optional[TaskQueue] = None
 
@@ -141,36 +682,18 @@ def get_task_queue() -> TaskQueue:
     """Get or create TaskQueue instance."""
     global _task_queue
     if _task_queue is None:
-        _task_queue = TaskQueue()
+        from config.settings import settings
+        from services.task_store import create_task_store
+        _task_queue = TaskQueue(
+            max_workers=settings.task_queue_workers,
+            process_workers=settings.task_queue_process_workers,
+            aging_interval=settings.task_queue_aging_s,
+            max_retries=settings.task_queue_max_retries,
+            retry_backoff=settings.task_queue_retry_backoff_s,
+            retention=settings.task_queue_retention_s,
+            store=create_task_store(settings.task_queue_backend, settings.task_queue_db),
+            visibility_timeout=settings.task_queue_visibility_timeout_s
+        )
+        register_default_handlers(_task_queue)
+        _task_queue.recover()
     return _task_queue
-
-# Example Celery setup (commented out - requires Celery installation)
-"""
-from celery import Celery
-
-app = Celery(
-    'las_tasks',
-    broker='redis://localhost:6379/0',
-    backend='redis://localhost:6379/0'
-)
-
-app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
-    timezone='UTC',
-    enable_utc=True,
-)
-
-@app.task(bind=True)
-def process_query(self, query_text: str, provider: str, model: str):
-    '''Process a query asynchronously.'''
-    # Implementation here
-    return {"answer": "Response"}
-
-@app.task
-def scrape_website(url: str):
-    '''Scrape a website asynchronously.'''
-    # Implementation here
-    return {"content": "Scraped content"}
-"""
@@ -0,0 +1,243 @@
+"""
+Task Store - Durable storage backends for TaskQueue.
+
+TaskQueue keeps scheduling state in memory and writes every task through to
+a TaskStore, so a restarted process can recover whatever was pending or
+running. Running tasks hold a lease (visibility timeout) that the queue
+renews while they execute; a task whose lease has expired is claimed again
+by the next process that recovers it, giving at-least-once execution.
+Claims are conditional updates, so two processes sharing a store never run
+the same task at once. Idempotency keys are unique, so a producer retrying
+an enqueue gets the original task back.
+"""
+
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# Columns written from a task dict (payload and result as JSON)
+TASK_COLUMNS = (
+    "id", "idempotency_key", "type", "priority", "agent", "status", "attempts", "max_retries",
+    "payload", "result", "error", "created_at", "started_at", "completed_at",
+    "created_ts", "completed_ts", "lease_until"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    idempotency_key TEXT UNIQUE,
+    type TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    agent TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_retries INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    completed_at TEXT,
+    created_ts REAL NOT NULL,
+    completed_ts REAL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed_ts);
+"""
+
+# SQLite's default limit on host parameters is 999
+_IN_CHUNK = 500
+
+class TaskStore(ABC):
+    """Durable task storage used by TaskQueue."""
+
+    @abstractmethod
+    def add(self, tasks: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Persist new tasks in one batch.
+
+        Tasks whose idempotency key is already known are not inserted.
+
+        Args:
+            tasks: Task dicts as built by TaskQueue
+
+        Returns:
+            Task id owning each idempotency key in the batch
+        """
+        pass
+
+    @abstractmethod
+    def save(self, task: Dict[str, Any]):
+        """Persist a task's status, attempts, result, error and timestamps."""
+        pass
+
+    @abstractmethod
+    def claim(self, task: Dict[str, Any], lease_until: float, now: float) -> bool:
+        """
+        Atomically mark a task as running under a lease.
+
+        Succeeds only if the task is pending or its previous lease expired.
+
+        Returns:
+            True if this process now owns the task
+        """
+        pass
+
+    @abstractmethod
+    def extend_leases(self, task_ids: List[str], lease_until: float):
+        """Renew the leases of running tasks."""
+        pass
+
+    @abstractmethod
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Get pending and running tasks, in creation order."""
+        pass
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a task by id."""
+        pass
+
+    @abstractmethod
+    def delete_finished(self, before: float) -> int:
+        """Delete tasks that finished before a wall-clock time; returns how many."""
+        pass
+
+    def close(self):
+        """Release the store's resources."""
+        pass
+
+def _encode(task: Dict[str, Any]) -> tuple:
+    row = dict(task)
+    row["payload"] = json.dumps(task["payload"])
+    row["result"] = None if task["result"] is None else json.dumps(task["result"], default=str)
+    row["created_ts"] = task["_created_ts"]
+    row["completed_ts"] = task.get("_completed_ts")
+    row["lease_until"] = task.get("_lease_until")
+    return tuple(row.get(column) for column in TASK_COLUMNS)
+
+def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+    task = {column: row[column] for column in TASK_COLUMNS}
+    task["payload"] = json.loads(task["payload"])
+    task["result"] = None if task["result"] is None else json.loads(task["result"])
+    task["_created_ts"] = task.pop("created_ts")
+    task["_completed_ts"] = task.pop("completed_ts")
+    task["_lease_until"] = task.pop("lease_until")
+    return task
+
+def _chunks(values: List[Any], size: int = _IN_CHUNK) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+class SQLiteTaskStore(TaskStore):
+    """Single-node task store in an SQLite database in WAL mode."""
+
+    def __init__(self, db_path: str = "data/tasks/tasks.sqlite3"):
+        """
+        Args:
+            db_path: Database file (created with its directory if missing)
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, tasks: List[Dict[str, Any]]) -> Dict[str, str]:
+        keys = [task["idempotency_key"] for task in tasks if task.get("idempotency_key")]
+        with self._lock, self._conn:
+            owners: Dict[str, str] = {}
+            for chunk in _chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                owners.update(self._conn.execute(
+                    f"SELECT idempotency_key, id FROM tasks WHERE idempotency_key IN ({placeholders})", chunk
+                ).fetchall())
+            rows = []
+            for task in tasks:
+                key = task.get("idempotency_key")
+                if key:
+                    if key in owners:
+                        continue
+                    owners[key] = task["id"]
+                rows.append(_encode(task))
+            self._conn.executemany(
+                f"INSERT INTO tasks ({', '.join(TASK_COLUMNS)}) VALUES ({', '.join('?' * len(TASK_COLUMNS))})",
+                rows
+            )
+        return owners
+
+    def save(self, task: Dict[str, Any]):
+        row = _encode(task)
+        values = dict(zip(TASK_COLUMNS, row))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, attempts = ?, result = ?, error = ?, started_at = ?, "
+                "completed_at = ?, completed_ts = ?, lease_until = ? WHERE id = ?",
+                (values["status"], values["attempts"], values["result"], values["error"], values["started_at"],
+                 values["completed_at"], values["completed_ts"], values["lease_until"], values["id"])
+            )
+
+    def claim(self, task: Dict[str, Any], lease_until: float, now: float) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = 'running', attempts = ?, started_at = ?, lease_until = ? "
+                "WHERE id = ? AND (status = 'pending' OR (status = 'running' AND lease_until < ?))",
+                (task["attempts"], task["started_at"], lease_until, task["id"], now)
+            )
+        return cursor.rowcount == 1
+
+    def extend_leases(self, task_ids: List[str], lease_until: float):
+        with self._lock, self._conn:
+            for chunk in _chunks(task_ids):
+                self._conn.execute(
+                    f"UPDATE tasks SET lease_until = ? WHERE status = 'running' "
+                    f"AND id IN ({','.join('?' * len(chunk))})", [lease_until, *chunk]
+                )
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM tasks WHERE status IN ('pending', 'running') ORDER BY seq"
+            ).fetchall()
+        return [_decode(row) for row in rows]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _decode(row) if row is not None else None
+
+    def delete_finished(self, before: float) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM tasks WHERE completed_ts IS NOT NULL AND completed_ts < ?", (before,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def create_task_store(backend: str, db_path: str) -> Optional[TaskStore]:
+    """
+    Create the task store for a backend name.
+
+    Args:
+        backend: memory (no store) or sqlite
+        db_path: Database file of the sqlite backend
+
+    Returns:
+        TaskStore, or None for the in-memory queue
+    """
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteTaskStore(db_path)
+    raise ValueError(f"Unknown task queue backend '{backend}', expected memory or sqlite")
@@ -1,11 +1,27 @@
 """
 Worker Pool Management - Manage distributed workers for scaling.
+
+Workers with a free slot are indexed by capability, so picking one never
+scans the pool: the scheduler samples two candidates from the capability's
+index and takes the less loaded one (power of two choices), or compares
+every candidate of that capability when ``least_loaded`` is selected.
+Workers may run several tasks at once. Liveness comes from heartbeats,
+expired in heartbeat order, and from health probes sent to all workers
+concurrently.
 """
 
-from typing import Dict, List, Optional, Any
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Iterable
 from datetime import datetime
 from enum import Enum
-import requests
+
+import httpx
+
+SELECTION_STRATEGIES = ("p2c", "least_loaded")
 
 class WorkerStatus(str, Enum):
     """Worker status."""
@@ -15,17 +31,32 @@ class WorkerStatus(str, Enum):
 
 class Worker:
     """Represents a worker node."""
-    
-    def __init__(self, id: str, url: str, capabilities: List[str]):
+
+    def __init__(self, id: str, url: str, capabilities: List[str], concurrency: int = 1):
         self.id = id
         self.url = url
         self.capabilities = capabilities
+        self.concurrency = max(1, concurrency)
         self.status = WorkerStatus.IDLE
-        self.current_task = None
+        self.active_tasks: Dict[str, None] = {}
         self.last_heartbeat = datetime.now()
         self.tasks_completed = 0
         self.tasks_failed = 0
-    
+
+    @property
+    def current_task(self) -> Optional[str]:
+        """Most recently assigned task still running."""
+        return next(reversed(self.active_tasks), None) if self.active_tasks else None
+
+    @property
+    def load(self) -> float:
+        """Fraction of slots in use."""
+        return len(self.active_tasks) / self.concurrency
+
+    @property
+    def has_free_slot(self) -> bool:
+        return self.status != WorkerStatus.OFFLINE and len(self.active_tasks) < self.concurrency
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dict."""
         return {
@@ -34,132 +65,319 @@ class Worker:
             "capabilities": self.capabilities,
             "status": self.status.value,
             "current_task": self.current_task,
+            "active_tasks": list(self.active_tasks),
+            "concurrency": self.concurrency,
+            "load": round(self.load, 3),
             "last_heartbeat": self.last_heartbeat.isoformat(),
             "tasks_completed": self.tasks_completed,
             "tasks_failed": self.tasks_failed
         }
 
+class _IndexedSet:
+    """Set with O(1) add, remove and uniform random choice."""
+
+    def __init__(self):
+        self.items: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    def add(self, item: str):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item: str):
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        last = self.items.pop()
+        if position < len(self.items):
+            self.items[position] = last
+            self.positions[last] = position
+
+    def sample(self, k: int) -> List[str]:
+        return random.sample(self.items, min(k, len(self.items)))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
 class WorkerPool:
     """Manages a pool of distributed workers."""
-    
-    def __init__(self):
+
+    def __init__(self, selection: str = "p2c", heartbeat_timeout: float = 30.0,
+                 probe_timeout: float = 2.0, probe_concurrency: int = 32):
+        """
+        Args:
+            selection: p2c (power of two choices, O(1)) or least_loaded (compares every candidate)
+            heartbeat_timeout: Seconds without a heartbeat before a worker is marked offline (0 disables)
+            probe_timeout: Timeout of one /health probe
+            probe_concurrency: Health probes in flight at once
+        """
+        if selection not in SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown selection '{selection}', expected one of {SELECTION_STRATEGIES}")
+        self.selection = selection
+        self.heartbeat_timeout = heartbeat_timeout
+        self.probe_timeout = probe_timeout
+        self.probe_concurrency = probe_concurrency
+
         self.workers: Dict[str, Worker] = {}
-    
+        self._lock = threading.RLock()
+        # Workers with a free slot, per capability (None holds every such worker)
+        self._available: Dict[Optional[str], _IndexedSet] = {None: _IndexedSet()}
+        # Worker ids ordered by last heartbeat, oldest first
+        self._heartbeats: "OrderedDict[str, float]" = OrderedDict()
+        self._status_counts: Dict[WorkerStatus, int] = {status: 0 for status in WorkerStatus}
+        self._busy_slots = 0
+        self._total_slots = 0
+        self._tasks_completed = 0
+        self._tasks_failed = 0
+
+    # === Index maintenance (caller holds the lock) ===
+
+    def _index_keys(self, worker: Worker) -> Iterable[Optional[str]]:
+        yield None
+        yield from worker.capabilities
+
+    def _refresh(self, worker: Worker):
+        """Recompute a worker's status and its place in the availability index."""
+        if worker.status != WorkerStatus.OFFLINE:
+            status = WorkerStatus.BUSY if len(worker.active_tasks) >= worker.concurrency else WorkerStatus.IDLE
+            self._set_status(worker, status)
+        for key in self._index_keys(worker):
+            if worker.has_free_slot:
+                self._available.setdefault(key, _IndexedSet()).add(worker.id)
+            elif key in self._available:
+                self._available[key].discard(worker.id)
+
+    def _set_status(self, worker: Worker, status: WorkerStatus):
+        self._status_counts[worker.status] -= 1
+        self._status_counts[status] += 1
+        worker.status = status
+
+    def _expire_heartbeats(self, now: float):
+        """Mark workers whose heartbeat is too old as offline (amortized O(1))."""
+        if self.heartbeat_timeout <= 0:
+            return
+        deadline = now - self.heartbeat_timeout
+        while self._heartbeats:
+            worker_id, last_seen = next(iter(self._heartbeats.items()))
+            if last_seen >= deadline:
+                break
+            self._heartbeats.popitem(last=False)
+            worker = self.workers.get(worker_id)
+            if worker is not None and worker.status != WorkerStatus.OFFLINE:
+                self._mark_offline(worker)
+
+    def _mark_offline(self, worker: Worker):
+        self._set_status(worker, WorkerStatus.OFFLINE)
+        self._refresh(worker)
+
+    # === Registration ===
+
     def register_worker(self, worker_id: str, url: str,
-                       capabilities: List[str]) -> bool:
-        """Register a new worker."""
-        if worker_id in self.workers:
-            print(f"Worker {worker_id} already registered")
-            return False
-        
-        worker = Worker(worker_id, url, capabilities)
-        self.workers[worker_id] = worker
+                       capabilities: List[str], concurrency: int = 1) -> bool:
+        """Register a new worker that can run `concurrency` tasks at once."""
+        with self._lock:
+            if worker_id in self.workers:
+                print(f"Worker {worker_id} already registered")
+                return False
+
+            worker = Worker(worker_id, url, capabilities, concurrency)
+            self.workers[worker_id] = worker
+            self._status_counts[worker.status] += 1
+            self._total_slots += worker.concurrency
+            self._heartbeats[worker_id] = time.monotonic()
+            self._refresh(worker)
         print(f"✓ Worker {worker_id} registered with capabilities: {capabilities}")
         return True
-    
+
     def unregister_worker(self, worker_id: str) -> bool:
         """Unregister a worker."""
-        if worker_id in self.workers:
-            del self.workers[worker_id]
-            print(f"✓ Worker {worker_id} unregistered")
-            return True
-        return False
-    
+        with self._lock:
+            worker = self.workers.pop(worker_id, None)
+            if worker is None:
+                return False
+            for key in self._index_keys(worker):
+                if key in self._available:
+                    self._available[key].discard(worker_id)
+            self._heartbeats.pop(worker_id, None)
+            self._status_counts[worker.status] -= 1
+            self._total_slots -= worker.concurrency
+            self._busy_slots -= len(worker.active_tasks)
+        print(f"✓ Worker {worker_id} unregistered")
+        return True
+
     def get_worker(self, worker_id: str) -> Optional[Worker]:
         """Get worker by ID."""
         return self.workers.get(worker_id)
-    
+
     def list_workers(self, status: Optional[WorkerStatus] = None) -> List[Worker]:
         """List workers, optionally filtered by status."""
-        workers = list(self.workers.values())
-        
+        with self._lock:
+            self._expire_heartbeats(time.monotonic())
+            workers = list(self.workers.values())
+
         if status:
             workers = [w for w in workers if w.status == status]
-        
+
         return workers
-    
+
+    # === Scheduling ===
+
     def find_available_worker(self, capability: Optional[str] = None) -> Optional[Worker]:
-        """Find an available worker with optional capability filter."""
-        for worker in self.workers.values():
-            if worker.status != WorkerStatus.IDLE:
-                continue
-            
-            if capability and capability not in worker.capabilities:
-                continue
-            
+        """
+        Pick a worker with a free slot and the capability, without assigning it.
+
+        Args:
+            capability: Required capability (any worker when None)
+
+        Returns:
+            The selected worker, or None if none is available
+        """
+        with self._lock:
+            self._expire_heartbeats(time.monotonic())
+            candidates = self._available.get(capability)
+            if not candidates:
+                return None
+            if self.selection == "least_loaded":
+                worker_ids = candidates
+            else:
+                worker_ids = candidates.sample(2)
+            return min((self.workers[worker_id] for worker_id in worker_ids), key=lambda w: w.load)
+
+    def acquire_worker(self, task_id: str, capability: Optional[str] = None) -> Optional[Worker]:
+        """
+        Select a worker and assign it a task in one step.
+
+        Args:
+            task_id: Task to run
+            capability: Required capability
+
+        Returns:
+            The assigned worker, or None if none is available
+        """
+        with self._lock:
+            worker = self.find_available_worker(capability)
+            if worker is not None:
+                self.assign_task(worker.id, task_id)
             return worker
-        
-        return None
-    
+
     def assign_task(self, worker_id: str, task_id: str) -> bool:
         """Assign a task to a worker."""
-        worker = self.workers.get(worker_id)
-        if not worker:
-            return False
-        
-        if worker.status != WorkerStatus.IDLE:
-            print(f"Worker {worker_id} is not idle")
-            return False
-        
-        worker.status = WorkerStatus.BUSY
-        worker.current_task = task_id
-        return True
-    
-    def complete_task(self, worker_id: str, success: bool = True):
-        """Mark task as complete for a worker."""
-        worker = self.workers.get(worker_id)
-        if not worker:
-            return
-        
-        worker.status = WorkerStatus.IDLE
-        worker.current_task = None
-        
-        if success:
-            worker.tasks_completed += 1
-        else:
-            worker.tasks_failed += 1
-    
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if not worker:
+                return False
+
+            if not worker.has_free_slot:
+                print(f"Worker {worker_id} has no free slot")
+                return False
+
+            worker.active_tasks[task_id] = None
+            self._busy_slots += 1
+            self._refresh(worker)
+            return True
+
+    def complete_task(self, worker_id: str, success: bool = True, task_id: Optional[str] = None):
+        """Mark a task (the most recent one by default) as complete for a worker."""
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if not worker or not worker.active_tasks:
+                return
+
+            if task_id is None:
+                task_id = worker.current_task
+            if task_id not in worker.active_tasks:
+                return
+            del worker.active_tasks[task_id]
+            self._busy_slots -= 1
+
+            if success:
+                worker.tasks_completed += 1
+                self._tasks_completed += 1
+            else:
+                worker.tasks_failed += 1
+                self._tasks_failed += 1
+            self._refresh(worker)
+
+    # === Liveness ===
+
     def heartbeat(self, worker_id: str) -> bool:
-        """Update worker heartbeat."""
-        worker = self.workers.get(worker_id)
-        if not worker:
-            return False
-        
-        worker.last_heartbeat = datetime.now()
-        return True
-    
+        """Update worker heartbeat (bringing an offline worker back online)."""
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if not worker:
+                return False
+
+            worker.last_heartbeat = datetime.now()
+            self._heartbeats[worker_id] = time.monotonic()
+            self._heartbeats.move_to_end(worker_id)
+            if worker.status == WorkerStatus.OFFLINE:
+                self._set_status(worker, WorkerStatus.IDLE)
+                self._refresh(worker)
+            return True
+
+    async def check_health(self, worker_ids: Optional[List[str]] = None) -> Dict[str, bool]:
+        """
+        Probe the /health endpoint of workers concurrently.
+
+        Healthy workers count as a heartbeat; failing ones are marked offline.
+
+        Args:
+            worker_ids: Workers to probe (all by default)
+
+        Returns:
+            Health of each probed worker
+        """
+        with self._lock:
+            workers = [self.workers[w] for w in (worker_ids or list(self.workers)) if w in self.workers]
+        limit = asyncio.Semaphore(self.probe_concurrency)
+
+        async def probe(client: httpx.AsyncClient, worker: Worker) -> bool:
+            async with limit:
+                try:
+                    response = await client.get(f"{worker.url}/health")
+                    return response.status_code == 200
+                except httpx.HTTPError:
+                    return False
+
+        async with httpx.AsyncClient(timeout=self.probe_timeout) as client:
+            results = await asyncio.gather(*(probe(client, worker) for worker in workers))
+
+        for worker, healthy in zip(workers, results):
+            if healthy:
+                self.heartbeat(worker.id)
+            else:
+                with self._lock:
+                    if worker.id in self.workers and worker.status != WorkerStatus.OFFLINE:
+                        self._mark_offline(worker)
+        return {worker.id: healthy for worker, healthy in zip(workers, results)}
+
     def health_check(self, worker_id: str) -> bool:
-        """Check if worker is healthy."""
-        worker = self.workers.get(worker_id)
-        if not worker:
+        """Check if worker is healthy (blocking; prefer check_health for many workers)."""
+        if worker_id not in self.workers:
             return False
-        
-        try:
-            response = requests.get(f"{worker.url}/health", timeout=2)
-            return response.status_code == 200
-        except:
-            worker.status = WorkerStatus.OFFLINE
-            return False
-    
+        return asyncio.run(self.check_health([worker_id])).get(worker_id, False)
+
     def get_stats(self) -> Dict[str, Any]:
         """Get pool statistics."""
-        total = len(self.workers)
-        idle = len([w for w in self.workers.values() if w.status == WorkerStatus.IDLE])
-        busy = len([w for w in self.workers.values() if w.status == WorkerStatus.BUSY])
-        offline = len([w for w in self.workers.values() if w.status == WorkerStatus.OFFLINE])
-        
-        total_completed = sum(w.tasks_completed for w in self.workers.values())
-        total_failed = sum(w.tasks_failed for w in self.workers.values())
-        
-        return {
-            "total_workers": total,
-            "idle": idle,
-            "busy": busy,
-            "offline": offline,
-            "total_tasks_completed": total_completed,
-            "total_tasks_failed": total_failed,
-            "utilization": round((busy / total * 100) if total > 0 else 0, 2)
-        }
+        with self._lock:
+            self._expire_heartbeats(time.monotonic())
+            total = len(self.workers)
+            return {
+                "total_workers": total,
+                "idle": self._status_counts[WorkerStatus.IDLE],
+                "busy": self._status_counts[WorkerStatus.BUSY],
+                "offline": self._status_counts[WorkerStatus.OFFLINE],
+                "total_slots": self._total_slots,
+                "busy_slots": self._busy_slots,
+                "total_tasks_completed": self._tasks_completed,
+                "total_tasks_failed": self._tasks_failed,
+                "selection": self.selection,
+                "utilization": round((self._busy_slots / self._total_slots * 100) if self._total_slots > 0 else 0, 2)
+            }
 
 # Create singleton instance
 _worker_pool: Optional[WorkerPool] = None
@@ -168,5 +386,10 @@ def get_worker_pool() -> WorkerPool:
     """Get or create WorkerPool instance."""
     global _worker_pool
     if _worker_pool is None:
-        _worker_pool = WorkerPool()
+        from config.settings import settings
+        _worker_pool = WorkerPool(
+            selection=settings.worker_selection,
+            heartbeat_timeout=settings.worker_heartbeat_timeout_s,
+            probe_concurrency=settings.worker_probe_concurrency
+        )
     return _worker_pool
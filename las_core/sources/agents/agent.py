@@ -6,9 +6,9 @@ import random
 import time
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from sources.memory import Memory
+from sources.providers.base_provider import usage_agent
 from sources.utility import pretty_print
 from sources.schemas import executorResult
 
@@ -48,7 +48,6 @@ class Agent():
         self.status_message = "Haven't started yet"
         self.stop = False
         self.verbose = verbose
-        self.executor = ThreadPoolExecutor(max_workers=1)
     
     @property
     def get_agent_name(self) -> str:
@@ -160,18 +159,41 @@ class Agent():
     async def llm_request(self) -> Tuple[str, str]:
         """
         Asynchronously ask the LLM to process the prompt.
+        Providers with an async interface run on the event loop directly;
+        legacy providers fall back to a worker thread.
         """
         self.status_message = "Thinking..."
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self.sync_llm_request)
+        memory = self.memory.get()
+        # Attribute the request's usage to this agent (and check its budget)
+        token = usage_agent.set(self.agent_name)
+        try:
+            if hasattr(self.llm, "achat_completion"):
+                thought = await self.llm.achat_completion(memory)
+            else:
+                thought = await asyncio.to_thread(self.llm.respond, memory, self.verbose)
+        finally:
+            usage_agent.reset(token)
+        return self.process_thought(thought)
     
     def sync_llm_request(self) -> Tuple[str, str]:
         """
         Ask the LLM to process the prompt and return the answer and the reasoning.
         """
         memory = self.memory.get()
-        thought = self.llm.respond(memory, self.verbose)
-
+        token = usage_agent.set(self.agent_name)
+        try:
+            if hasattr(self.llm, "chat_completion"):
+                thought = self.llm.chat_completion(memory)
+            else:
+                thought = self.llm.respond(memory, self.verbose)
+        finally:
+            usage_agent.reset(token)
+        return self.process_thought(thought)
+    
+    def process_thought(self, thought: str) -> Tuple[str, str]:
+        """
+        Split a raw LLM answer into answer and reasoning and record it in memory.
+        """
         reasoning = self.extract_reasoning_text(thought)
         answer = self.remove_reasoning_text(thought)
         self.memory.push('assistant', answer)
@@ -184,8 +206,7 @@ class Agent():
                     "Computing... I recommand you have a coffee while I work.",
                     "Hold on, I’m crunching numbers.",
                     "Working on it, please let me think."]
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, lambda: speech_module.speak(messages[random.randint(0, len(messages)-1)]))
+        return await asyncio.to_thread(speech_module.speak, messages[random.randint(0, len(messages)-1)])
     
     def get_last_tool_type(self) -> str:
         return self.blocks_result[-1].tool_type if len(self.blocks_result) > 0 else None
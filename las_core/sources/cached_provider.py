@@ -0,0 +1,259 @@
+"""
+Cache-aware completion layer on top of the semantic cache.
+
+Completions are keyed on the normalized conversation, provider, model and
+temperature. The final user turn is matched semantically; everything before
+it (system prompt, history) must match exactly through a context hash.
+Fresh hits are served directly. Stale hits (past their TTL but inside the
+cache's stale window) are served immediately while a background refresh
+replaces the entry.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.semantic_cache import SemanticCache, get_semantic_cache
+from sources.logger import Logger
+
+logger = Logger("completion_cache.log")
+
+# Cache statuses reported to callers
+CACHE_HIT = "hit"
+CACHE_STALE = "stale"
+CACHE_MISS = "miss"
+CACHE_BYPASS = "bypass"
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Lower-case roles and collapse whitespace in message contents."""
+    return [
+        {
+            "role": str(message.get("role", "user")).lower(),
+            "content": " ".join(str(message.get("content", "")).split())
+        }
+        for message in messages
+    ]
+
+
+class CompletionCache:
+    """Stale-while-revalidate completion cache backed by SemanticCache."""
+
+    def __init__(self, cache: Optional[SemanticCache] = None, refresh_workers: int = 2):
+        """
+        Args:
+            cache: Semantic cache to use (defaults to the shared instance)
+            refresh_workers: Threads available for synchronous background refreshes
+        """
+        self._cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers,
+                                            thread_name_prefix="completion-refresh")
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._tasks = set()
+
+    @property
+    def cache(self) -> SemanticCache:
+        if self._cache is None:
+            self._cache = get_semantic_cache()
+        return self._cache
+
+    def cache_key(self, messages: List[Dict[str, str]], provider: str, model: str,
+                  temperature: Optional[float]) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """
+        Build the semantic query, partition metadata and exact-match fields.
+
+        Returns:
+            Tuple of (query text, metadata, exact fields)
+        """
+        normalized = normalize_messages(messages)
+        last_user = max((i for i, m in enumerate(normalized) if m["role"] == "user"), default=None)
+        query = normalized[last_user]["content"] if last_user is not None else ""
+        context = normalized[:last_user] + normalized[last_user + 1:] if last_user is not None else normalized
+        exact = {
+            "context": hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest(),
+            "temperature": None if temperature is None else round(float(temperature), 3)
+        }
+        metadata = {"provider": provider, "model": model, **exact}
+        return query, metadata, exact
+
+    def _claim_refresh(self, query: str, exact: Dict[str, Any]) -> Optional[Tuple]:
+        """Mark a refresh as in flight; returns None if one is already running."""
+        token = (query, exact["context"], exact["temperature"])
+        with self._refresh_lock:
+            if token in self._refreshing:
+                return None
+            self._refreshing.add(token)
+        return token
+
+    def _release_refresh(self, token: Tuple):
+        with self._refresh_lock:
+            self._refreshing.discard(token)
+
+    def _store(self, query: str, response: Any, metadata: Dict[str, Any],
+               ttl: Optional[float], replaces: Optional[str] = None):
+        if replaces:
+            self.cache.discard(replaces)
+        self.cache.set(query, response, metadata, ttl=ttl)
+
+    def _refresh(self, token: Tuple, query: str, metadata: Dict[str, Any],
+                 compute: Callable[[], Any], ttl: Optional[float], replaces: str):
+        try:
+            self._store(query, compute(), metadata, ttl, replaces)
+        except Exception as e:
+            logger.error(f"Background refresh failed: {e}")
+        finally:
+            self._release_refresh(token)
+
+    def complete(self, messages: List[Dict[str, str]], provider: str, model: str,
+                 temperature: Optional[float], compute: Callable[[], Any],
+                 bypass: bool = False, ttl: Optional[float] = None,
+                 refresh: Optional[Callable[[], Any]] = None) -> Tuple[Any, str]:
+        """
+        Serve a completion from cache or compute it.
+
+        Args:
+            messages: Chat messages
+            provider: Provider name
+            model: Model identifier
+            temperature: Sampling temperature used for the completion
+            compute: Callable producing the completion on a miss or refresh
+            bypass: Skip the cache entirely
+            ttl: Optional TTL in seconds for the stored entry
+            refresh: Callable used for background refreshes (defaults to compute)
+
+        Returns:
+            Tuple of (response, cache status)
+        """
+        if bypass:
+            return compute(), CACHE_BYPASS
+
+        query, metadata, exact = self.cache_key(messages, provider, model, temperature)
+        hit = self.cache.get(query, metadata, exact=exact)
+        if hit is not None:
+            if not hit["stale"]:
+                return hit["response"], CACHE_HIT
+            token = self._claim_refresh(query, exact)
+            if token is not None:
+                self._executor.submit(self._refresh, token, query, metadata, refresh or compute, ttl,
+                                      hit["entry_id"])
+            return hit["response"], CACHE_STALE
+
+        response = compute()
+        self._store(query, response, metadata, ttl)
+        return response, CACHE_MISS
+
+    async def acomplete(self, messages: List[Dict[str, str]], provider: str, model: str,
+                        temperature: Optional[float], compute: Callable[[], Awaitable[Any]],
+                        bypass: bool = False, ttl: Optional[float] = None,
+                        refresh: Optional[Callable[[], Awaitable[Any]]] = None) -> Tuple[Any, str]:
+        """
+        Async variant of complete(); ``compute`` and ``refresh`` are coroutine functions.
+
+        Cache lookups run in a worker thread because embedding may block, and
+        stale entries are refreshed in a background task.
+        """
+        if bypass:
+            return await compute(), CACHE_BYPASS
+
+        query, metadata, exact = self.cache_key(messages, provider, model, temperature)
+        hit = await asyncio.to_thread(self.cache.get, query, metadata, exact)
+        if hit is not None:
+            if not hit["stale"]:
+                return hit["response"], CACHE_HIT
+            token = self._claim_refresh(query, exact)
+            if token is not None:
+                task = asyncio.create_task(
+                    self._arefresh(token, query, metadata, refresh or compute, ttl, hit["entry_id"])
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return hit["response"], CACHE_STALE
+
+        response = await compute()
+        await asyncio.to_thread(self._store, query, response, metadata, ttl)
+        return response, CACHE_MISS
+
+    async def _arefresh(self, token: Tuple, query: str, metadata: Dict[str, Any],
+                        compute: Callable[[], Awaitable[Any]], ttl: Optional[float], replaces: str):
+        try:
+            response = await compute()
+            await asyncio.to_thread(self._store, query, response, metadata, ttl, replaces)
+        except Exception as e:
+            logger.error(f"Background refresh failed: {e}")
+        finally:
+            self._release_refresh(token)
+
+
+class CachedProvider:
+    """
+    Provider wrapper that serves non-streaming chat completions from the
+    completion cache. Everything else is delegated to the wrapped Provider.
+    """
+
+    def __init__(self, provider, completion_cache: Optional[CompletionCache] = None):
+        """
+        Args:
+            provider: sources.llm_provider.Provider instance
+            completion_cache: Completion cache (defaults to the shared instance)
+        """
+        self._wrapped = provider
+        self._completion_cache = completion_cache or get_completion_cache()
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    @property
+    def temperature(self) -> Optional[float]:
+        """Temperature configured on the underlying provider, if known."""
+        inner = getattr(self._wrapped, "_provider", None)
+        config = getattr(inner, "config", None)
+        return getattr(config, "temperature", None)
+
+    def chat_completion(self, messages: List[Dict[str, str]], stream: bool = False,
+                        cache_bypass: bool = False, cache_ttl: Optional[float] = None, **kwargs):
+        """Generate chat completion, consulting the cache unless streaming or bypassed."""
+        if stream:
+            return self._wrapped.chat_completion(messages, stream, **kwargs)
+
+        response, _ = self._completion_cache.complete(
+            messages,
+            provider=self._wrapped.provider_name,
+            model=self._wrapped.model,
+            temperature=kwargs.get("temperature", self.temperature),
+            compute=lambda: self._wrapped.chat_completion(messages, False, **kwargs),
+            bypass=cache_bypass,
+            ttl=cache_ttl
+        )
+        return response
+
+    async def achat_completion(self, messages: List[Dict[str, str]], cache_bypass: bool = False,
+                               cache_ttl: Optional[float] = None, **kwargs):
+        """Async chat completion, consulting the cache unless bypassed."""
+        response, _ = await self._completion_cache.acomplete(
+            messages,
+            provider=self._wrapped.provider_name,
+            model=self._wrapped.model,
+            temperature=kwargs.get("temperature", self.temperature),
+            compute=lambda: self._wrapped.achat_completion(messages, **kwargs),
+            bypass=cache_bypass,
+            ttl=cache_ttl
+        )
+        return response
+
+    def __repr__(self) -> str:
+        return f"CachedProvider({self._wrapped!r})"
+
+
+# Singleton instance
+_completion_cache: Optional[CompletionCache] = None
+
+def get_completion_cache() -> CompletionCache:
+    """Get or create the shared CompletionCache."""
+    global _completion_cache
+    if _completion_cache is None:
+        _completion_cache = CompletionCache()
+    return _completion_cache
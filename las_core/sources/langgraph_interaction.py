@@ -1,57 +1,163 @@
+import copy
+import time
+from typing import Any, AsyncIterator, Dict
 from agents.hierarchical_graph import graph
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, AIMessage
 from sources.logger import Logger
 
 logger = Logger("langgraph_interaction.log")
 
+# Conversation turns (user + assistant messages) carried into the next query
+MAX_HISTORY_MESSAGES = 20
+
+class GraphAgent:
+    """Minimal agent stand-in exposing what the query router reads."""
+    def __init__(self, name):
+        self.agent_name = name
+
+    def get_blocks_result(self):
+        return []
+
+def _chunk_text(chunk) -> str:
+    """Text of a chat (message chunk) or completion (generation chunk) stream delta."""
+    if chunk is None:
+        return ""
+    content = getattr(chunk, "content", None)
+    if content is None:
+        content = getattr(chunk, "text", "")
+    if isinstance(content, list):
+        # Content blocks (e.g. Anthropic): keep the text parts
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
 class LangGraphInteraction:
-    def __init__(self, agents=None, tts_enabled=False, stt_enabled=False, recover_last_session=False, langs=["en"]):
+    def __init__(self, agents=None, tts_enabled=False, stt_enabled=False, recover_last_session=False, langs=["en"],
+                 agent_factory=None, session_id=None, provider=None):
         self.graph = graph
+        self.session_id = session_id
+        self.last_active = time.time()
         self.last_query = None
         self.last_answer = None
         self.last_reasoning = None
         self.last_success = False
         self.current_agent = None # Placeholder to satisfy API
-        self.agents = agents or [] # Placeholder
+        self._agents = agents
+        self._agent_factory = agent_factory
+        self.provider = provider
+        self.history = []
         self.recover_last_session = recover_last_session
         self.tts_enabled = tts_enabled
+
+    @property
+    def agents(self):
+        """Session agents, created on first access."""
+        if self._agents is None:
+            self._agents = self._agent_factory(self.provider) if self._agent_factory else []
+        return self._agents
+
+    def use_provider(self, provider):
+        """Select the provider for this session's agents (other sessions are unaffected)."""
+        if provider is self.provider:
+            return
+        self.provider = provider
+        for agent in self._agents or []:
+            agent.llm = provider
         
+    def fork(self):
+        """
+        Detached copy for a background run: same session, agents and provider,
+        but its own history and results, so the session is left untouched.
+        """
+        forked = copy.copy(self)
+        forked.history = list(self.history)
+        return forked
+
+    def record_turn(self, query: str, answer: str):
+        """Append a question and its answer to the conversation history."""
+        turn = [HumanMessage(content=query), AIMessage(content=answer)]
+        self.history = (self.history + turn)[-MAX_HISTORY_MESSAGES:]
+
     def set_query(self, query):
         self.last_query = query
+
+    def history_messages(self):
+        """Conversation history as role/content dicts."""
+        return [
+            {"role": "user" if isinstance(m, HumanMessage) else "assistant", "content": m.content}
+            for m in self.history
+        ]
         
     async def think(self):
+        """
+        Run the graph for the last query, publishing node transitions and
+        token deltas to the event bus as they happen.
+        """
         if not self.last_query:
             return False
-            
+
+        async for _ in self.astream_think():
+            pass
+        return self.last_success
+
+    async def astream_think(self, publish: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the graph for the last query and yield progress events.
+
+        Yields dicts with a "type" of node_start / node_end (with "node"),
+        token (with "node" and "delta"), then a single final or error event.
+
+        Args:
+            publish: Also publish each event to the /stream event bus
+        """
+        if not self.last_query:
+            return
+
+        from services.event_bus import get_event_bus
+        bus = get_event_bus() if publish else None
+        async for event in self._graph_events():
+            if bus is not None:
+                try:
+                    await bus.publish(f"agent_{event['type']}", {**event, "session_id": self.session_id})
+                except Exception as e:
+                    logger.warning(f"Failed to publish {event['type']} event: {e}")
+            yield event
+
+    async def _graph_events(self) -> AsyncIterator[Dict[str, Any]]:
+        """Translate graph.astream_events into progress events and record the result."""
+        query = HumanMessage(content=self.last_query)
+        inputs = {"messages": self.history + [query]}
+        final_state = None
         try:
-            inputs = {"messages": [HumanMessage(content=self.last_query)]}
-            # Invoke the graph
-            # Note: graph.invoke is synchronous, but we can wrap it or use astream
-            # For now, let's use invoke. If it blocks too long, we might need astream.
-            result = self.graph.invoke(inputs)
-            
-            # Extract the final answer
-            messages = result["messages"]
-            last_message = messages[-1]
+            async for event in self.graph.astream_events(inputs, version="v2"):
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+                if kind in ("on_chat_model_stream", "on_llm_stream"):
+                    delta = _chunk_text(event["data"].get("chunk"))
+                    if delta:
+                        yield {"type": "token", "node": node, "delta": delta}
+                elif kind in ("on_chain_start", "on_chain_end") and node and event.get("name") == node:
+                    yield {"type": "node_start" if kind == "on_chain_start" else "node_end", "node": node}
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # Root run: its output is the final graph state
+                    final_state = event["data"].get("output")
+
+            if not final_state or not final_state.get("messages"):
+                raise RuntimeError("graph finished without messages")
+
+            last_message = final_state["messages"][-1]
+            agent_name = getattr(last_message, "name", None) or "System"
             self.last_answer = last_message.content
-            self.last_reasoning = f"Processed by {last_message.name if hasattr(last_message, 'name') else 'Agent'}"
+            self.record_turn(self.last_query, self.last_answer)
+            self.last_reasoning = f"Processed by {agent_name}"
             self.last_success = True
-            
-            # Mock current agent for UI compatibility
-            class MockAgent:
-                def __init__(self, name):
-                    self.agent_name = name
-                def get_blocks_result(self):
-                    return []
-            
-            self.current_agent = MockAgent(last_message.name if hasattr(last_message, 'name') else "System")
-            
-            return True
+            # Stand-in agent for UI compatibility
+            self.current_agent = GraphAgent(agent_name)
+            yield {"type": "final", "answer": self.last_answer, "agent_name": agent_name}
         except Exception as e:
             logger.error(f"Graph execution failed: {e}")
             self.last_answer = f"Error executing agent graph: {e}"
             self.last_success = False
-            return False
+            yield {"type": "error", "error": str(e)}
 
     def get_interaction(self):
         return self
@@ -1,5 +1,6 @@
 from typing import List, Tuple, Type, Dict
 import re
+import threading
 import langid
 from transformers import MarianMTModel, MarianTokenizer
 
@@ -14,16 +15,26 @@ class LanguageUtility:
         args:
             supported_language: list of languages for translation, determine which Helsinki-NLP model to load
         """
-        self.translators_tokenizer = None 
-        self.translators_model = None
+        self.translators_tokenizer = {}
+        self.translators_model = {}
         self.logger = Logger("language.log")
         self.supported_language = supported_language
-        self.load_model()
+        self._load_lock = threading.Lock()
     
-    def load_model(self) -> None:
-        animate_thinking("Loading language utility...", color="status")
-        self.translators_tokenizer = {lang: MarianTokenizer.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
-        self.translators_model = {lang: MarianMTModel.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en") for lang in self.supported_language if lang != "en"}
+    def load_model(self, lang: str) -> None:
+        """
+        Load the Helsinki-NLP translator for a language, the first time it is needed.
+        args:
+            lang: ISO language code to translate from
+        """
+        if lang in self.translators_model:
+            return
+        with self._load_lock:
+            if lang in self.translators_model:
+                return
+            animate_thinking(f"Loading {lang}-en translator...", color="status")
+            self.translators_tokenizer[lang] = MarianTokenizer.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en")
+            self.translators_model[lang] = MarianMTModel.from_pretrained(f"Helsinki-NLP/opus-mt-{lang}-en")
     
     def detect_language(self, text: str) -> str:
         """
@@ -48,9 +59,10 @@ class LanguageUtility:
         """
         if origin_lang == "en":
             return text
-        if origin_lang not in self.translators_tokenizer:
+        if origin_lang not in self.supported_language:
             pretty_print(f"Language {origin_lang} not supported for translation", color="error")
             return text
+        self.load_model(origin_lang)
         tokenizer = self.translators_tokenizer[origin_lang]
         inputs = tokenizer(text, return_tensors="pt", padding=True)
         model = self.translators_model[origin_lang]
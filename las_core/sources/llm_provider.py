@@ -4,11 +4,17 @@ Simplified LLM Provider Wrapper - Backward compatible interface.
 This module provides a backward-compatible wrapper around the new modular
 provider architecture. The old 767-line Provider class now delegates to
 the new provider factory while maintaining the same public interface.
+
+Every request made through the wrapper is checked against the calling
+agent's budget before dispatch, and its token usage (as reported by the API,
+or counted with the local tokenizer when it is not) is handed to the cost
+tracker.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+import asyncio
 from sources.provider_factory import ProviderFactory
-from sources.providers.base_provider import BaseProvider
+from sources.providers.base_provider import BaseProvider, usage_agent, usage_collector
 from sources.logger import Logger
 
 class Provider:
@@ -54,6 +60,7 @@ class Provider:
             self._provider = None
             self._using_new_provider = False
             self.logger.info(f"Using legacy provider implementation for {self.provider_name}")
+        self._downgrade_provider: Optional[BaseProvider] = None
     
     def get_langchain_llm(self):
         """Get LangChain LLM instance."""
@@ -63,6 +70,89 @@ class Provider:
             # Fall back to legacy implementation
             return self._get_legacy_langchain_llm()
     
+    def _dispatch_provider(self) -> Optional[BaseProvider]:
+        """
+        Check the calling agent's budget and pick the provider for a request.
+        
+        Returns:
+            The provider to call (None for the legacy implementation)
+            
+        Raises:
+            BudgetExceededError: If the agent is over budget and requests are rejected
+        """
+        agent = usage_agent.get()
+        if agent is None:
+            return self._provider
+        from services.cost_tracker import get_cost_tracker, BudgetExceededError
+        tracker = get_cost_tracker()
+        if tracker.check_budget(agent) != "exceeded":
+            return self._provider
+        
+        from config.settings import settings
+        if settings.budget_action == "downgrade" and settings.budget_downgrade_model:
+            if self._downgrade_provider is None:
+                self._downgrade_provider = ProviderFactory.create(
+                    provider_name=settings.budget_downgrade_provider or self.provider_name,
+                    model=settings.budget_downgrade_model
+                )
+            self.logger.warning(f"Agent {agent} is over budget, downgrading to {self._downgrade_provider}")
+            return self._downgrade_provider
+        raise BudgetExceededError(agent, tracker.agent_spend(agent), tracker.get_budget(agent))
+    
+    def _record_usage(
+        self,
+        provider: BaseProvider,
+        messages: List[Dict[str, str]],
+        output: str,
+        usage: Dict[str, int],
+        agent: Optional[str]
+    ):
+        """Send a request's token usage to the cost tracker, counting what the API did not report."""
+        try:
+            input_tokens = usage.get("input_tokens")
+            if input_tokens is None:
+                input_tokens = sum(provider.count_tokens(msg.get("content") or "") for msg in messages)
+            output_tokens = usage.get("output_tokens")
+            if output_tokens is None:
+                output_tokens = provider.count_tokens(output or "")
+            from services.cost_tracker import get_cost_tracker
+            get_cost_tracker().track_usage(
+                provider=provider.provider_name,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                agent=agent,
+                model=provider.model,
+                cost=provider.get_cost_per_token(input_tokens, output_tokens)
+            )
+        except Exception as e:
+            self.logger.warning(f"Failed to record usage: {e}")
+    
+    def _tracked_stream(
+        self,
+        provider: BaseProvider,
+        messages: List[Dict[str, str]],
+        chunks: Iterator[str],
+        agent: Optional[str]
+    ) -> Iterator[str]:
+        """Yield stream chunks, then record the usage of the whole stream."""
+        usage: Dict[str, int] = {}
+        output = []
+        chunks = iter(chunks)
+        try:
+            while True:
+                # Only the provider's own code runs with the collector set
+                token = usage_collector.set(usage)
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    usage_collector.reset(token)
+                output.append(chunk)
+                yield chunk
+        finally:
+            self._record_usage(provider, messages, "".join(output), usage, agent)
+    
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -70,11 +160,71 @@ class Provider:
         **kwargs
     ):
         """Generate chat completion."""
-        if self._using_new_provider:
-            return self._provider.chat_completion(messages, stream, **kwargs)
-        else:
+        provider = self._dispatch_provider()
+        if provider is None:
             # Fall back to legacy implementation
             return self._legacy_chat_completion(messages, stream, **kwargs)
+        
+        agent = usage_agent.get()
+        if stream:
+            return self._tracked_stream(provider, messages, provider.chat_completion(messages, True, **kwargs), agent)
+        usage: Dict[str, int] = {}
+        token = usage_collector.set(usage)
+        try:
+            answer = provider.chat_completion(messages, False, **kwargs)
+        finally:
+            usage_collector.reset(token)
+        self._record_usage(provider, messages, answer, usage, agent)
+        return answer
+    
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> str:
+        """Generate chat completion asynchronously."""
+        provider = self._dispatch_provider()
+        if provider is None:
+            # Legacy providers are blocking
+            return await asyncio.to_thread(self._legacy_chat_completion, messages, False, **kwargs)
+        
+        usage: Dict[str, int] = {}
+        token = usage_collector.set(usage)
+        try:
+            answer = await provider.achat_completion(messages, **kwargs)
+        finally:
+            usage_collector.reset(token)
+        self._record_usage(provider, messages, answer, usage, usage_agent.get())
+        return answer
+    
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream chat completion chunks asynchronously."""
+        provider = self._dispatch_provider()
+        if provider is None:
+            yield await asyncio.to_thread(self._legacy_chat_completion, messages, False, **kwargs)
+            return
+        
+        agent = usage_agent.get()
+        usage: Dict[str, int] = {}
+        output = []
+        chunks = provider.astream(messages, **kwargs).__aiter__()
+        try:
+            while True:
+                token = usage_collector.set(usage)
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    usage_collector.reset(token)
+                output.append(chunk)
+                yield chunk
+        finally:
+            self._record_usage(provider, messages, "".join(output), usage, agent)
     
     def list_models(self) -> List[str]:
         """List available models."""
@@ -105,6 +255,17 @@ class Provider:
         return legacy.list_models()
     
     # Utility methods for backward compatibility
+    def get_model_name(self) -> str:
+        """Get the model identifier."""
+        return self.model
+    
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with the model's tokenizer."""
+        if self._using_new_provider:
+            return self._provider.count_tokens(text)
+        from sources.token_counter import count_tokens
+        return count_tokens(text, self.model)
+    
     @property
     def supports_streaming(self) -> bool:
         """Check if provider supports streaming."""
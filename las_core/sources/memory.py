@@ -4,27 +4,67 @@ import uuid
 import os
 import sys
 import json
-from typing import List, Tuple, Type, Dict
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Type, Dict
 import configparser
 
-from sources.utility import timer_decorator, pretty_print, animate_thinking
+from sources.utility import timer_decorator, pretty_print
 from sources.logger import Logger
+from sources.token_counter import token_counter_for
 
 config = configparser.ConfigParser()
 config.read('config.ini')
 
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+# Single background worker shared by every Memory for rolling summary updates
+_summary_executor: Optional[ThreadPoolExecutor] = None
+_summary_executor_lock = threading.Lock()
+
+def get_summary_executor() -> ThreadPoolExecutor:
+    """Get or create the background summarization worker."""
+    global _summary_executor
+    with _summary_executor_lock:
+        if _summary_executor is None:
+            _summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+        return _summary_executor
+
 class Memory():
     """
     Memory is a class for managing the conversation memory
-    It provides a method to compress the memory using summarization model.
+    The prompt returned by get() is packed to a token budget: the system prompt,
+    a rolling summary of older messages and as many recent messages as fit.
+    Messages that fall out of the window are folded into the summary by a
+    background worker, so per-turn cost does not grow with the conversation.
     """
     def __init__(self, system_prompt: str,
                  recover_last_session: bool = False,
                  memory_compression: bool = True,
-                 model_provider: str = "deepseek-r1:14b"):
+                 model_provider: str = "deepseek-r1:14b",
+                 token_counter: Callable[[str], int] = None,
+                 token_budget: int = None,
+                 summary_tokens: int = None):
+        """
+        Args:
+            system_prompt: The agent system prompt
+            recover_last_session: Load the last saved session
+            memory_compression: Summarize with the shared summarization service
+            model_provider: Model name, used to pick a tokenizer when no token_counter is given
+            token_counter: Count function of the provider's tokenizer
+            token_budget: Max tokens of the packed prompt (default MEMORY_TOKEN_BUDGET)
+            summary_tokens: Max tokens of the rolling summary (default MEMORY_SUMMARY_TOKENS)
+        """
+        from config.settings import settings
         self.memory = [{'role': 'system', 'content': system_prompt}]
+        self.count_tokens = token_counter or token_counter_for(model_provider)
+        self.token_budget = token_budget or settings.memory_token_budget
+        self.summary_tokens = summary_tokens or settings.memory_summary_tokens
+        self._token_cache: Dict[str, int] = {}
+        self._summary_lock = threading.Lock()
+        self.summary = ""
+        self.summarized_upto = 1  # memory[1:summarized_upto] is folded into the summary
+        self._summary_pending = False
         
         self.logger = Logger("memory.log")
         self.session_time = datetime.datetime.now()
@@ -34,44 +74,13 @@ class Memory():
         if recover_last_session:
             self.load_memory()
             self.session_recovered = True
-        # memory compression system
-        self.model = None
-        self.tokenizer = None
-        self.device = self.get_cuda_device()
+        # memory compression system, one model shared by every agent
+        self.summarizer = None
         self.memory_compression = memory_compression
         self.model_provider = model_provider
         if self.memory_compression:
-            self.download_model()
-
-    def get_ideal_ctx(self, model_name: str) -> int | None:
-        """
-        Estimate context size based on the model name.
-        EXPERIMENTAL for memory compression
-        """
-        import re
-        import math
-
-        def extract_number_before_b(sentence: str) -> int:
-            match = re.search(r'(\d+)b', sentence, re.IGNORECASE)
-            return int(match.group(1)) if match else None
-
-        model_size = extract_number_before_b(model_name)
-        if not model_size:
-            return None
-        base_size = 7  # Base model size in billions
-        base_context = 4096  # Base context size in tokens
-        scaling_factor = 1.5  # Approximate scaling factor for context size growth
-        context_size = int(base_context * (model_size / base_size) ** scaling_factor)
-        context_size = 2 ** round(math.log2(context_size))
-        self.logger.info(f"Estimated context size for {model_name}: {context_size} tokens.")
-        return context_size
-    
-    def download_model(self):
-        """Download the model if not already downloaded."""
-        animate_thinking("Loading memory compression model...", color="status")
-        self.tokenizer = AutoTokenizer.from_pretrained("pszemraj/led-base-book-summary")
-        self.model = AutoModelForSeq2SeqLM.from_pretrained("pszemraj/led-base-book-summary")
-        self.logger.info("Memory compression system initialized.")
+            from services.summarization_service import get_summarization_service
+            self.summarizer = get_summarization_service()
     
     def get_filename(self) -> str:
         """Get the filename for the save file."""
@@ -148,20 +157,22 @@ class Memory():
         self.memory = self.load_json_file(path) 
         if self.memory[-1]['role'] == 'user':
             self.memory.pop()
-        self.compress()
+        self.reset_summary()
         pretty_print("Session recovered successfully", color="success")
     
     def reset(self, memory: list = []) -> None:
         self.logger.info("Memory reset performed.")
         self.memory = memory
+        self.reset_summary()
+    
+    def reset_summary(self) -> None:
+        """Drop the rolling summary; it is rebuilt from the messages as needed."""
+        with self._summary_lock:
+            self.summary = ""
+            self.summarized_upto = 1
     
     def push(self, role: str, content: str) -> int:
         """Push a message to the memory."""
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        if ideal_ctx is not None:
-            if self.memory_compression and len(content) > ideal_ctx * 1.5:
-                self.logger.info(f"Compressing memory: Content {len(content)} > {ideal_ctx} model context.")
-                self.compress()
         curr_idx = len(self.memory)
         if self.memory[curr_idx-1]['content'] == content:
             pretty_print("Warning: same message have been pushed twice to memory", color="error")
@@ -176,6 +187,7 @@ class Memory():
         """Clear all memory except system prompt"""
         self.logger.info("Memory clear performed.")
         self.memory = self.memory[:1]
+        self.reset_summary()
     
     def clear_section(self, start: int, end: int) -> None:
         """
@@ -188,84 +200,171 @@ class Memory():
         start = max(0, start) + 1
         end = min(end, len(self.memory)-1) + 2
         self.memory = self.memory[:start] + self.memory[end:]
+        if start < self.summarized_upto:
+            self.reset_summary()
+    
+    def tokens(self, content: str) -> int:
+        """Token count of a message content, cached per content."""
+        count = self._token_cache.get(content)
+        if count is None:
+            count = self.count_tokens(content)
+            if len(self._token_cache) > 4096:
+                self._token_cache.clear()
+            self._token_cache[content] = count
+        return count
+    
+    def system_message(self) -> dict:
+        """The system prompt, with the rolling summary appended when there is one."""
+        system = self.memory[0]
+        if not self.summary:
+            return system
+        return {**system, 'content': f"{system['content']}\n\n{SUMMARY_HEADER}\n{self.summary}"}
+    
+    def window_start(self) -> int:
+        """
+        Index of the oldest message that fits in the token budget next to the
+        system prompt and summary. The latest message is always included.
+        Returns:
+            int: Start index of the packed window (>= 1)
+        """
+        remaining = self.token_budget - self.tokens(self.system_message()['content'])
+        start = len(self.memory)
+        while start > 1:
+            cost = self.tokens(self.memory[start-1]['content'])
+            if cost > remaining and start < len(self.memory):
+                break
+            remaining -= cost
+            start -= 1
+        return start
     
     def get(self) -> list:
-        return self.memory
-
-    def get_cuda_device(self) -> str:
-        if torch.backends.mps.is_available():
-            return "mps"
-        elif torch.cuda.is_available():
-            return "cuda"
+        """
+        Get the prompt messages packed to the token budget.
+        Returns:
+            list: System message (with summary) followed by the most recent messages
+        """
+        if len(self.memory) == 0 or self.memory[0]['role'] != 'system':
+            return self.memory
+        start = self.window_start()
+        if start > self.summarized_upto:
+            self.schedule_summary(start)
+        return [self.system_message()] + self.memory[start:]
+    
+    def schedule_summary(self, upto: int) -> None:
+        """
+        Fold memory[summarized_upto:upto] into the rolling summary in the background.
+        At most one update per memory is in flight; later calls catch up on the next turn.
+        """
+        with self._summary_lock:
+            if self._summary_pending:
+                return
+            self._summary_pending = True
+        get_summary_executor().submit(self.update_summary, upto)
+    
+    def update_summary(self, upto: int) -> None:
+        """Incrementally update the rolling summary with the messages before upto."""
+        try:
+            with self._summary_lock:
+                begin, previous = self.summarized_upto, self.summary
+            messages = self.memory[begin:upto]
+            if not messages:
+                return
+            summary = self.summarize_incremental(previous, messages)
+            with self._summary_lock:
+                # Skip if the memory was cleared or reset while summarizing
+                if self.summarized_upto == begin and self.summary == previous:
+                    self.summary = summary
+                    self.summarized_upto = upto
+            self.logger.info(f"Rolling summary now covers {upto - 1} messages ({self.tokens(summary)} tokens).")
+        except Exception as e:
+            self.logger.warning(f"Rolling summary update failed: {e}")
+        finally:
+            with self._summary_lock:
+                self._summary_pending = False
+    
+    def summarize_incremental(self, previous: str, messages: list) -> str:
+        """
+        Merge new messages into the previous summary, within summary_tokens.
+        Uses the summarization model when loaded; otherwise keeps the first
+        line of each message. The oldest text past the budget is dropped.
+        """
+        if self.summarizer is not None:
+            new_text = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+            summary = self.summarize(f"{previous}\n{new_text}".strip(),
+                                     min_length=min(64, self.summary_tokens), max_length=self.summary_tokens)
         else:
-            return "cpu"
+            lines = [line for line in previous.split("\n") if line]
+            lines += [f"{m['role']}: {m['content'].strip().split(chr(10))[0][:200]}" for m in messages]
+            summary = "\n".join(lines)
+        return self.truncate_tokens(summary, self.summary_tokens)
 
-    def summarize(self, text: str, min_length: int = 64) -> str:
+    def truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """
+        Keep the end of a text within max_tokens: whole leading lines are
+        dropped first, then leading words of what is left.
         """
-        Summarize the text using the AI model.
+        while self.tokens(text) > max_tokens and "\n" in text:
+            text = text.split("\n", 1)[1]
+        while self.tokens(text) > max_tokens:
+            words = text.split(" ")
+            # Cut proportionally to the overshoot (at least one word) and re-count
+            cut = max(1, len(words) - int(len(words) * max_tokens / self.tokens(text)))
+            if cut >= len(words):
+                return ""
+            text = " ".join(words[cut:])
+        return text
+
+    def summarize(self, text: str, min_length: int = 64, max_length: Optional[int] = None) -> str:
+        """
+        Summarize the text using the shared summarization service.
         Args:
             text (str): The text to summarize
             min_length (int, optional): The minimum length of the summary. Defaults to 64.
+            max_length (int, optional): The maximum length of the summary. Defaults to half the text.
         Returns:
             str: The summarized text
         """
-        if self.tokenizer is None or self.model is None:
-            self.logger.warning("No tokenizer or model to perform summarization.")
-            return text
-        if len(text) < min_length*1.5:
+        if self.summarizer is None:
+            self.logger.warning("No summarization service to perform summarization.")
             return text
-        max_length = len(text) // 2 if len(text) > min_length*2 else min_length*2
-        input_text = "summarize: " + text
-        inputs = self.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
-        summary_ids = self.model.generate(
-            inputs['input_ids'],
-            max_length=max_length,
-            min_length=min_length,
-            length_penalty=1.0,
-            num_beams=4,
-            early_stopping=True
-        )
-        summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-        summary.replace('summary:', '')
+        summary = self.summarizer.summarize(text, min_length=min_length, max_length=max_length)
         self.logger.info(f"Memory summarized from len {len(text)} to {len(summary)}.")
-        self.logger.info(f"Summarized text:\n{summary}")
         return summary
     
     #@timer_decorator
     def compress(self) -> str:
         """
         Compress (summarize) the memory using the model.
+        Long messages are submitted together so the service can batch them.
         """
-        if self.tokenizer is None or self.model is None:
-            self.logger.warning("No tokenizer or model to perform memory compression.")
+        if self.summarizer is None:
+            self.logger.warning("No summarization service to perform memory compression.")
             return
-        for i in range(len(self.memory)):
-            if self.memory[i]['role'] == 'system':
-                continue
-            if len(self.memory[i]['content']) > 1024:
-                self.memory[i]['content'] = self.summarize(self.memory[i]['content'])
+        jobs = [(i, self.summarizer.submit(message['content']))
+                for i, message in enumerate(self.memory)
+                if message['role'] != 'system' and len(message['content']) > 1024]
+        for i, future in jobs:
+            self.memory[i]['content'] = future.result()
     
     def trim_text_to_max_ctx(self, text: str) -> str:
         """
-        Truncate a text to fit within the maximum context size of the model.
+        Truncate a text to fit within the token budget.
         """
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        return text[:ideal_ctx] if ideal_ctx is not None else text
+        tokens = self.tokens(text)
+        if tokens <= self.token_budget:
+            return text
+        return text[:int(len(text) * self.token_budget / tokens)]
     
     #@timer_decorator
     def compress_text_to_max_ctx(self, text) -> str:
         """
         Compress a text to fit within the maximum context size of the model.
         """
-        if self.tokenizer is None or self.model is None:
-            self.logger.warning("No tokenizer or model to perform memory compression.")
-            return text
-        ideal_ctx = self.get_ideal_ctx(self.model_provider)
-        if ideal_ctx is None:
-            self.logger.warning("No ideal context size found.")
+        if self.summarizer is None:
+            self.logger.warning("No summarization service to perform memory compression.")
             return text
-        while len(text) > ideal_ctx:
-            self.logger.info(f"Compressing text: {len(text)} > {ideal_ctx} model context.")
+        while self.tokens(text) > self.token_budget:
+            self.logger.info(f"Compressing text: {self.tokens(text)} > {self.token_budget} token budget.")
             text = self.summarize(text)
         return text
 
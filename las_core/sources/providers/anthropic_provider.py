@@ -2,13 +2,16 @@
 Anthropic Provider - Claude API implementation.
 """
 
-from typing import List, Dict, Iterator, Union
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Tuple, Union
 from anthropic import Anthropic
 from sources.providers.base_provider import BaseProvider, ProviderConfig
 
 class AnthropicProvider(BaseProvider):
     """Anthropic Claude API provider."""
     
+    api_base_url = "https://api.anthropic.com/v1/"
+    api_version = "2023-06-01"
+    
     def __init__(self, config: ProviderConfig):
         super().__init__(config)
         if not self.api_key:
@@ -29,14 +32,7 @@ class AnthropicProvider(BaseProvider):
         client = Anthropic(api_key=self.api_key)
         
         try:
-            # Extract system message if present
-            system_msg = None
-            filtered_messages = []
-            for msg in messages:
-                if msg.get("role") == "system":
-                    system_msg = msg.get("content")
-                else:
-                    filtered_messages.append(msg)
+            system_msg, filtered_messages = self._split_system(messages)
             
             response = client.messages.create(
                 model=self.model,
@@ -49,16 +45,77 @@ class AnthropicProvider(BaseProvider):
             if stream:
                 return self._handle_stream(response)
             else:
+                self._report_usage(response.usage)
                 return response.content[0].text
         except Exception as e:
             raise RuntimeError(f"Anthropic API error: {e}")
     
+    def _split_system(self, messages: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """Extract the system message, which Claude takes as a separate field."""
+        system_msg = None
+        filtered_messages = []
+        for msg in messages:
+            if msg.get("role") == "system":
+                system_msg = msg.get("content")
+            else:
+                filtered_messages.append(msg)
+        return system_msg, filtered_messages
+    
+    def _api_payload(self, messages: List[Dict[str, str]], stream: bool, **kwargs) -> Dict[str, Any]:
+        system_msg, filtered_messages = self._split_system(messages)
+        payload = {
+            "model": self.model,
+            "messages": filtered_messages,
+            "max_tokens": kwargs.get("max_tokens", 1024),
+            "stream": stream
+        }
+        if system_msg:
+            payload["system"] = system_msg
+        return payload
+    
+    def _api_headers(self) -> Dict[str, str]:
+        return {"x-api-key": self.api_key or "", "anthropic-version": self.api_version}
+    
+    async def achat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Generate chat completion over the shared connection pool."""
+        try:
+            data = await self._apost_json(
+                self.base_url or self.api_base_url, "messages",
+                self._api_payload(messages, False, **kwargs), headers=self._api_headers()
+            )
+            self._report_usage(data.get("usage"))
+            return "".join(block.get("text", "") for block in data["content"] if block.get("type") == "text")
+        except Exception as e:
+            raise RuntimeError(f"Anthropic API error: {e}")
+    
+    async def astream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream text deltas from the Messages API event stream."""
+        try:
+            async for event in self._astream_sse(
+                self.base_url or self.api_base_url, "messages",
+                self._api_payload(messages, True, **kwargs), headers=self._api_headers()
+            ):
+                if event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event.get("type") == "message_start":
+                    self._report_usage(event.get("message", {}).get("usage"))
+                elif event.get("type") == "message_delta":
+                    self._report_usage(event.get("usage"))
+        except Exception as e:
+            raise RuntimeError(f"Anthropic API error: {e}")
+    
     def _handle_stream(self, response) -> Iterator[str]:
-        """Handle streaming response."""
+        """Handle streaming response, reporting usage from the message events."""
         for event in response:
             if event.type == "content_block_delta":
                 if hasattr(event.delta, 'text'):
                     yield event.delta.text
+            elif event.type == "message_start":
+                self._report_usage(event.message.usage)
+            elif event.type == "message_delta":
+                self._report_usage(event.usage)
     
     def get_langchain_llm(self):
         """Get LangChain Claude LLM instance."""
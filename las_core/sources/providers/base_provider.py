@@ -3,8 +3,58 @@ Base Provider Abstract Class for LLM integrations.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Iterator, Union
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Union
+from contextvars import ContextVar
 from dataclasses import dataclass
+import asyncio
+import json
+
+import httpx
+
+# Generations can run far longer than the pool's default request timeout
+ASYNC_REQUEST_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+# Agent on whose behalf LLM requests are made (used for cost attribution and budgets)
+usage_agent: ContextVar[Optional[str]] = ContextVar("usage_agent", default=None)
+
+# Usage reported by the provider for the request in flight; the Provider façade
+# sets a fresh dict before each call and reads it afterwards
+usage_collector: ContextVar[Optional[Dict[str, int]]] = ContextVar("usage_collector", default=None)
+
+# Token usage field names used by the supported APIs: OpenAI-compatible,
+# Anthropic, Ollama and Gemini
+_USAGE_FIELDS = (
+    ("prompt_tokens", "completion_tokens"),
+    ("input_tokens", "output_tokens"),
+    ("prompt_eval_count", "eval_count"),
+    ("promptTokenCount", "candidatesTokenCount"),
+    ("prompt_token_count", "candidates_token_count"),
+)
+
+def normalize_usage(usage: Any) -> Dict[str, int]:
+    """
+    Map an API usage block (dict or SDK object) to input/output token counts.
+    
+    Args:
+        usage: Usage block in any supported provider format
+        
+    Returns:
+        Dict with whichever of 'input_tokens' and 'output_tokens' were reported
+    """
+    def field(name):
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        return value if isinstance(value, int) else None
+    
+    counts = {}
+    if usage is None:
+        return counts
+    for input_field, output_field in _USAGE_FIELDS:
+        input_tokens, output_tokens = field(input_field), field(output_field)
+        if input_tokens is not None:
+            counts.setdefault("input_tokens", input_tokens)
+        if output_tokens is not None:
+            counts.setdefault("output_tokens", output_tokens)
+    return counts
 
 @dataclass
 class ProviderConfig:
@@ -58,6 +108,120 @@ class BaseProvider(ABC):
         """
         pass
     
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> str:
+        """
+        Generate chat completion without blocking the event loop.
+        
+        Providers with an HTTP API override this on top of the shared
+        connection pool; the default runs chat_completion in a worker thread.
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            **kwargs: Additional provider-specific parameters
+            
+        Returns:
+            Complete response string
+        """
+        return await asyncio.to_thread(self.chat_completion, messages, False, **kwargs)
+    
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream chat completion chunks asynchronously.
+        
+        The default yields the full achat_completion result as one chunk.
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            **kwargs: Additional provider-specific parameters
+            
+        Yields:
+            Response text chunks
+        """
+        yield await self.achat_completion(messages, **kwargs)
+    
+    def _async_client(self, base_url: str) -> httpx.AsyncClient:
+        """Get the pooled keep-alive client for a base URL."""
+        from services.connection_pool import get_connection_pool
+        return get_connection_pool().get_client(base_url)
+    
+    async def _apost_json(
+        self,
+        base_url: str,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        POST a JSON payload through the connection pool and decode the reply.
+        
+        Raises:
+            httpx.HTTPStatusError: On a non-2xx response
+        """
+        response = await self._async_client(base_url).post(
+            path, json=payload, headers=headers, params=params, timeout=ASYNC_REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def _astream_lines(
+        self,
+        base_url: str,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        POST a JSON payload and yield non-empty response lines as they arrive.
+        
+        Raises:
+            httpx.HTTPStatusError: On a non-2xx response
+        """
+        client = self._async_client(base_url)
+        async with client.stream(
+            "POST", path, json=payload, headers=headers, params=params, timeout=ASYNC_REQUEST_TIMEOUT
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield line
+    
+    def _report_usage(self, usage: Any):
+        """
+        Record token usage returned by the API for the current request.
+        
+        Later reports override earlier ones field by field, so streams that
+        send cumulative counts (or input and output counts in separate
+        events) end up with the final numbers.
+        """
+        collector = usage_collector.get()
+        if collector is not None:
+            collector.update(normalize_usage(usage))
+    
+    async def _astream_sse(self, *args, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Yield decoded JSON 'data:' events from a server-sent event stream."""
+        async for line in self._astream_lines(*args, **kwargs):
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            try:
+                yield json.loads(data)
+            except json.JSONDecodeError:
+                continue
+    
     @abstractmethod
     def get_langchain_llm(self):
         """
@@ -92,6 +256,19 @@ class BaseProvider(ABC):
             raise ValueError(f"{self.provider_name}: model is required")
         return True
     
+    def count_tokens(self, text: str) -> int:
+        """
+        Count tokens with this model's tokenizer.
+        
+        Args:
+            text: Text to count
+            
+        Returns:
+            Number of tokens
+        """
+        from sources.token_counter import count_tokens
+        return count_tokens(text, self.model)
+    
     def get_cost_per_token(self, input_tokens: int, output_tokens: int) -> float:
         """
         Calculate cost for token usage.
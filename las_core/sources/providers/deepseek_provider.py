@@ -5,8 +5,9 @@ DeepSeek Provider - DeepSeek API implementation.
 from typing import List, Dict, Iterator, Union
 from openai import OpenAI
 from sources.providers.base_provider import BaseProvider, ProviderConfig
+from sources.providers.openai_compatible import OpenAICompatibleMixin
 
-class DeepSeekProvider(BaseProvider):
+class DeepSeekProvider(OpenAICompatibleMixin, BaseProvider):
     """DeepSeek API provider (OpenAI-compatible)."""
     
     def __init__(self, config: ProviderConfig):
@@ -33,6 +34,9 @@ class DeepSeekProvider(BaseProvider):
             base_url=self.base_url
         )
         
+        if stream:
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        
         try:
             response = client.chat.completions.create(
                 model=self.model,
@@ -44,17 +48,20 @@ class DeepSeekProvider(BaseProvider):
             if stream:
                 return self._handle_stream(response)
             else:
+                self._report_usage(response.usage)
                 return response.choices[0].message.content
         except Exception as e:
             raise RuntimeError(f"DeepSeek API error: {e}")
     
     def _handle_stream(self, response) -> Iterator[str]:
-        """Handle streaming response."""
+        """Handle streaming response, reporting usage from the final chunk."""
         for chunk in response:
             if chunk.choices and len(chunk.choices) > 0:
                 delta = chunk.choices[0].delta
                 if hasattr(delta, 'content') and delta.content:
                     yield delta.content
+            if getattr(chunk, 'usage', None):
+                self._report_usage(chunk.usage)
     
     def get_langchain_llm(self):
         """Get LangChain LLM for DeepSeek."""
@@ -2,13 +2,15 @@
 Gemini Provider - Google Gemini API implementation.
 """
 
-from typing import List, Dict, Iterator, Union
+from typing import List, Dict, Any, Iterator, AsyncIterator, Union
 import google.generativeai as genai
 from sources.providers.base_provider import BaseProvider, ProviderConfig
 
 class GeminiProvider(BaseProvider):
     """Google Gemini API provider."""
     
+    api_base_url = "https://generativelanguage.googleapis.com/v1beta/"
+    
     def __init__(self, config: ProviderConfig):
         super().__init__(config)
         if not self.api_key:
@@ -40,6 +42,7 @@ class GeminiProvider(BaseProvider):
                 return self._handle_stream(response)
             else:
                 response = model.generate_content(prompt)
+                self._report_usage(response.usage_metadata)
                 return response.text
         except Exception as e:
             raise RuntimeError(f"Gemini API error: {e}")
@@ -58,11 +61,52 @@ class GeminiProvider(BaseProvider):
                 prompt_parts.append(f"Assistant: {content}")
         return "\n\n".join(prompt_parts)
     
+    def _api_payload(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return {"contents": [{"role": "user", "parts": [{"text": self._convert_messages(messages)}]}]}
+    
+    @staticmethod
+    def _response_text(data: Dict[str, Any]) -> str:
+        """Concatenate the text parts of the first candidate."""
+        candidates = data.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
+    
+    async def achat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Generate chat completion over the shared connection pool."""
+        try:
+            data = await self._apost_json(
+                self.base_url or self.api_base_url, f"models/{self.model}:generateContent",
+                self._api_payload(messages), params={"key": self.api_key or ""}
+            )
+            self._report_usage(data.get("usageMetadata"))
+            return self._response_text(data)
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {e}")
+    
+    async def astream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream chunks from streamGenerateContent as server-sent events."""
+        try:
+            async for event in self._astream_sse(
+                self.base_url or self.api_base_url, f"models/{self.model}:streamGenerateContent",
+                self._api_payload(messages), params={"alt": "sse", "key": self.api_key or ""}
+            ):
+                text = self._response_text(event)
+                if text:
+                    yield text
+                if event.get("usageMetadata"):
+                    self._report_usage(event["usageMetadata"])
+        except Exception as e:
+            raise RuntimeError(f"Gemini API error: {e}")
+    
     def _handle_stream(self, response) -> Iterator[str]:
-        """Handle streaming response."""
+        """Handle streaming response, reporting the cumulative usage of each chunk."""
         for chunk in response:
             if chunk.text:
                 yield chunk.text
+            if getattr(chunk, 'usage_metadata', None):
+                self._report_usage(chunk.usage_metadata)
     
     def get_langchain_llm(self):
         """Get LangChain Gemini LLM instance."""
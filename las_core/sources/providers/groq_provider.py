@@ -5,10 +5,13 @@ Groq Provider - Groq API implementation for fast inference.
 from typing import List, Dict, Iterator, Union
 from groq import Groq
 from sources.providers.base_provider import BaseProvider, ProviderConfig
+from sources.providers.openai_compatible import OpenAICompatibleMixin
 
-class GroqProvider(BaseProvider):
+class GroqProvider(OpenAICompatibleMixin, BaseProvider):
     """Groq API provider for ultra-fast LLM inference."""
     
+    api_base_url = "https://api.groq.com/openai/v1"
+    
     def __init__(self, config: ProviderConfig):
         super().__init__(config)
         if not self.api_key:
@@ -39,17 +42,22 @@ class GroqProvider(BaseProvider):
             if stream:
                 return self._handle_stream(response)
             else:
+                self._report_usage(response.usage)
                 return response.choices[0].message.content
         except Exception as e:
             raise RuntimeError(f"Groq API error: {e}")
     
     def _handle_stream(self, response) -> Iterator[str]:
-        """Handle streaming response."""
+        """Handle streaming response, reporting usage from the final chunk."""
         for chunk in response:
             if chunk.choices and len(chunk.choices) > 0:
                 delta = chunk.choices[0].delta
                 if hasattr(delta, 'content') and delta.content:
                     yield delta.content
+            # Groq reports usage on the final chunk under x_groq
+            x_groq = getattr(chunk, 'x_groq', None)
+            if getattr(x_groq, 'usage', None):
+                self._report_usage(x_groq.usage)
     
     def get_langchain_llm(self):
         """Get LangChain Groq LLM instance."""
@@ -2,7 +2,8 @@
 Ollama Provider - Local LLM provider implementation.
 """
 
-from typing import List, Dict, Iterator, Union
+from typing import List, Dict, Iterator, AsyncIterator, Union
+import json
 import requests
 from langchain_community.llms import Ollama
 from sources.providers.base_provider import BaseProvider, ProviderConfig
@@ -41,14 +42,41 @@ class OllamaProvider(BaseProvider):
             if stream:
                 return self._handle_stream(response)
             else:
-                return response.json()["message"]["content"]
+                data = response.json()
+                self._report_usage(data)
+                return data["message"]["content"]
+        except Exception as e:
+            raise RuntimeError(f"Ollama API error: {e}")
+    
+    async def achat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Generate chat completion over the shared connection pool."""
+        try:
+            payload = {"model": self.model, "messages": messages, "stream": False, **kwargs}
+            data = await self._apost_json(self.base_url, "/api/chat", payload)
+            self._report_usage(data)
+            return data["message"]["content"]
+        except Exception as e:
+            raise RuntimeError(f"Ollama API error: {e}")
+    
+    async def astream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream newline-delimited JSON chunks from Ollama."""
+        try:
+            payload = {"model": self.model, "messages": messages, "stream": True, **kwargs}
+            async for line in self._astream_lines(self.base_url, "/api/chat", payload):
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                content = chunk.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    self._report_usage(chunk)
         except Exception as e:
             raise RuntimeError(f"Ollama API error: {e}")
     
     def _handle_stream(self, response) -> Iterator[str]:
-        """Handle streaming response from Ollama."""
-        import json
-        
+        """Handle streaming response from Ollama, reporting usage from the final chunk."""
         for line in response.iter_lines():
             if line:
                 try:
@@ -57,6 +85,8 @@ class OllamaProvider(BaseProvider):
                         content = chunk["message"].get("content", "")
                         if content:
                             yield content
+                    if chunk.get("done"):
+                        self._report_usage(chunk)
                 except json.JSONDecodeError:
                     continue
     
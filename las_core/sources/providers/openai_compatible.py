@@ -0,0 +1,64 @@
+"""
+Async transport shared by providers exposing the OpenAI chat completions API.
+"""
+
+from typing import List, Dict, Any, AsyncIterator
+
+
+class OpenAICompatibleMixin:
+    """
+    Async chat completions against an OpenAI-compatible /chat/completions
+    endpoint, using the pooled HTTP client from BaseProvider.
+
+    Subclasses set ``api_base_url`` (or ``base_url``) and may extend
+    ``_api_headers``, ``_api_payload`` and ``_on_usage``.
+    """
+
+    api_base_url: str = ""
+
+    def _api_base(self) -> str:
+        return (self.base_url or self.api_base_url).rstrip("/") + "/"
+
+    def _api_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def _api_payload(self, messages: List[Dict[str, str]], stream: bool, **kwargs) -> Dict[str, Any]:
+        payload = {"model": self.model, "messages": messages, "stream": stream, **kwargs}
+        if stream:
+            # Ask for a final chunk carrying the token usage
+            payload.setdefault("stream_options", {"include_usage": True})
+        return payload
+
+    def _on_usage(self, usage: Dict[str, Any]):
+        """Called with the API's token usage block when one is returned."""
+        self._report_usage(usage)
+
+    async def achat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Generate chat completion over the shared connection pool."""
+        try:
+            data = await self._apost_json(
+                self._api_base(), "chat/completions",
+                self._api_payload(messages, False, **kwargs), headers=self._api_headers()
+            )
+            if data.get("usage"):
+                self._on_usage(data["usage"])
+            return data["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise RuntimeError(f"{self.provider_name} API error: {e}")
+
+    async def astream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream chat completion chunks over the shared connection pool."""
+        try:
+            async for event in self._astream_sse(
+                self._api_base(), "chat/completions",
+                self._api_payload(messages, True, **kwargs), headers=self._api_headers()
+            ):
+                choices = event.get("choices") or []
+                if choices:
+                    content = (choices[0].get("delta") or {}).get("content")
+                    if content:
+                        yield content
+                if event.get("usage"):
+                    self._on_usage(event["usage"])
+        except Exception as e:
+            raise RuntimeError(f"{self.provider_name} API error: {e}")
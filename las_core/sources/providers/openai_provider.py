@@ -6,10 +6,13 @@ from typing import List, Dict, Iterator, Union
 from langchain_openai import ChatOpenAI
 from openai import OpenAI
 from sources.providers.base_provider import BaseProvider, ProviderConfig
+from sources.providers.openai_compatible import OpenAICompatibleMixin
 
-class OpenAIProvider(BaseProvider):
+class OpenAIProvider(OpenAICompatibleMixin, BaseProvider):
     """OpenAI API provider with GPT models."""
     
+    api_base_url = "https://api.openai.com/v1"
+    
     def __init__(self, config: ProviderConfig):
         super().__init__(config)
         if not self.api_key:
@@ -29,6 +32,9 @@ class OpenAIProvider(BaseProvider):
         """Generate chat completion using OpenAI API."""
         client = OpenAI(api_key=self.api_key)
         
+        if stream:
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        
         try:
             response = client.chat.completions.create(
                 model=self.model,
@@ -40,17 +46,20 @@ class OpenAIProvider(BaseProvider):
             if stream:
                 return self._handle_stream(response)
             else:
+                self._report_usage(response.usage)
                 return response.choices[0].message.content
         except Exception as e:
             raise RuntimeError(f"OpenAI API error: {e}")
     
     def _handle_stream(self, response) -> Iterator[str]:
-        """Handle streaming response."""
+        """Handle streaming response, reporting usage from the final chunk."""
         for chunk in response:
             if chunk.choices and len(chunk.choices) > 0:
                 delta = chunk.choices[0].delta
                 if hasattr(delta, 'content') and delta.content:
                     yield delta.content
+            if getattr(chunk, 'usage', None):
+                self._report_usage(chunk.usage)
     
     def get_langchain_llm(self):
         """Get LangChain ChatOpenAI instance."""
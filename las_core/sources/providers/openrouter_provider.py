@@ -6,8 +6,9 @@ from typing import List, Dict, Iterator, Union
 from langchain_openai import ChatOpenAI
 from openai import OpenAI
 from sources.providers.base_provider import BaseProvider, ProviderConfig
+from sources.providers.openai_compatible import OpenAICompatibleMixin
 
-class OpenRouterProvider(BaseProvider):
+class OpenRouterProvider(OpenAICompatibleMixin, BaseProvider):
     """OpenRouter API provider with streaming and cost tracking."""
     
     def __init__(self, config: ProviderConfig):
@@ -31,7 +32,6 @@ class OpenRouterProvider(BaseProvider):
     ) -> Union[str, Iterator[str]]:
         """Generate chat completion using OpenRouter API."""
         from config.settings import settings
-        from services.cost_tracker import get_cost_tracker, Provider as CostProvider
         
         client = OpenAI(
             api_key=self.api_key,
@@ -54,29 +54,30 @@ class OpenRouterProvider(BaseProvider):
             if stream:
                 return self._handle_stream(response)
             else:
+                self._report_usage(response.usage)
                 return response.choices[0].message.content
         except Exception as e:
             raise RuntimeError(f"OpenRouter API error: {e}")
     
     def _handle_stream(self, response) -> Iterator[str]:
-        """Handle streaming response with cost tracking."""
-        from services.cost_tracker import get_cost_tracker, Provider as CostProvider
-        
+        """Handle streaming response, reporting usage from the final chunk."""
         for chunk in response:
             if chunk.choices and len(chunk.choices) > 0:
                 delta = chunk.choices[0].delta
                 if hasattr(delta, 'content') and delta.content:
                     yield delta.content
             
-            # Track usage from final chunk
-            if hasattr(chunk, 'usage') and chunk.usage:
-                tracker = get_cost_tracker()
-                tracker.track_usage(
-                    provider=CostProvider.OPENROUTER,
-                    input_tokens=chunk.usage.prompt_tokens,
-                    output_tokens=chunk.usage.completion_tokens,
-                    agent="user"
-                )
+            if getattr(chunk, 'usage', None):
+                self._report_usage(chunk.usage)
+    
+    def _api_headers(self) -> Dict[str, str]:
+        from config.settings import settings
+        
+        return {
+            **super()._api_headers(),
+            "HTTP-Referer": settings.app_url,
+            "X-Title": settings.app_name
+        }
     
     def get_langchain_llm(self):
         """Get LangChain ChatOpenAI instance for OpenRouter."""
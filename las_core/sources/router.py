@@ -1,7 +1,8 @@
 import os
 import sys
+import threading
 import torch
-import random
+import numpy as np
 from typing import List, Tuple, Type, Dict
 
 from transformers import pipeline
@@ -13,9 +14,15 @@ from sources.agents.casual_agent import CasualAgent
 from sources.agents.planner_agent import FileAgent
 from sources.agents.browser_agent import BrowserAgent
 from sources.language import LanguageUtility
+from sources.routing_engine import RoutingEngine, RoutingDecision
+from sources.router_prototypes import PrototypeHead, fingerprint
 from sources.utility import pretty_print, animate_thinking, timer_decorator
 from sources.logger import Logger
 
+# One routing model per path, shared by every AgentRouter in the process
+_shared_classifiers: Dict[str, AdaptiveClassifier] = {}
+_shared_classifiers_lock = threading.Lock()
+
 class AgentRouter:
     """
     AgentRouter is a class that selects the appropriate agent based on the user query.
@@ -25,11 +32,25 @@ class AgentRouter:
         self.logger = Logger("router.log")
         self.lang_analysis = LanguageUtility(supported_language=supported_language)
         self.pipelines = self.load_pipelines()
-        self.talk_classifier = self.load_llm_router()
-        self.complexity_classifier = self.load_llm_router()
-        self.learn_few_shots_tasks()
-        self.learn_few_shots_complexity()
+        self.classifier = self.load_llm_router()
+        self.heads = self.load_prototype_heads()
+        self.routing_engine = self.load_routing_engine()
         self.asked_clarify = False
+
+    def load_routing_engine(self) -> RoutingEngine:
+        """
+        Create the micro-batching, caching engine used by select_agent.
+        returns:
+            RoutingEngine: Engine calling classify_batch on coalesced queries
+        """
+        from config.settings import settings
+        return RoutingEngine(
+            self.classify_batch,
+            preprocess=self.prepare_text,
+            max_batch=settings.router_batch_size,
+            max_wait_ms=settings.router_batch_wait_ms,
+            cache_size=settings.router_cache_size
+        )
     
     def load_pipelines(self) -> Dict[str, Type[pipeline]]:
         """
@@ -43,21 +64,78 @@ class AgentRouter:
             # "bart": pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
         }
 
+    def model_path(self) -> str:
+        return "../llm_router" if __name__ == "__main__" else "./llm_router"
+
     def load_llm_router(self) -> AdaptiveClassifier:
         """
-        Load the LLM router model.
+        Load the LLM router model, once per process.
         returns:
             AdaptiveClassifier: The loaded model
         exceptions:
             Exception: If the safetensors fails to load
         """
-        path = "../llm_router" if __name__ == "__main__" else "./llm_router"
-        try:
-            animate_thinking("Loading LLM router model...", color="status")
-            talk_classifier = AdaptiveClassifier.from_pretrained(path)
-        except Exception as e:
-            raise Exception("Failed to load the routing model. Please run the dl_safetensors.sh script inside llm_router/ directory to download the model.")
-        return talk_classifier
+        path = self.model_path()
+        with _shared_classifiers_lock:
+            if path in _shared_classifiers:
+                return _shared_classifiers[path]
+            try:
+                animate_thinking("Loading LLM router model...", color="status")
+                classifier = AdaptiveClassifier.from_pretrained(path)
+            except Exception as e:
+                raise Exception("Failed to load the routing model. Please run the dl_safetensors.sh script inside llm_router/ directory to download the model.")
+            _shared_classifiers[path] = classifier
+            return classifier
+
+    def load_prototype_heads(self) -> Dict[str, PrototypeHead]:
+        """
+        Memory-map the task and complexity prototypes, building and saving
+        any head whose model or few-shot examples changed.
+        returns:
+            Dict[str, PrototypeHead]: The "task" and "complexity" heads
+        """
+        from config.settings import settings
+        directory = settings.router_prototype_dir
+        heads, stale = {}, {}
+        for name, examples in (("task", self.few_shots_tasks()), ("complexity", self.few_shots_complexity())):
+            key = fingerprint(self.model_path(), examples)
+            head = PrototypeHead.load(directory, name, key) if directory else None
+            if head is None:
+                stale[name] = (examples, key)
+            else:
+                heads[name] = head
+        if not stale:
+            return heads
+
+        animate_thinking("Building router prototypes...", color="status")
+        pretrained = self.pretrained_embeddings()
+        texts = [text for examples, _ in stale.values() for text, _ in examples]
+        embeddings = iter(self.encode(texts))
+        for name, (examples, key) in stale.items():
+            grouped = {label: list(vectors) for label, vectors in pretrained.items()}
+            for _, label in examples:
+                grouped.setdefault(label, []).append(next(embeddings))
+            heads[name] = PrototypeHead.from_examples(grouped)
+            if directory:
+                try:
+                    heads[name].save(directory, name, key)
+                except OSError as e:
+                    self.logger.warning(f"Could not save router prototypes '{name}': {e}")
+        return heads
+
+    def pretrained_embeddings(self) -> Dict[str, List[np.ndarray]]:
+        """
+        Example embeddings shipped with the pretrained router model.
+        returns:
+            Dict[str, List[np.ndarray]]: label -> example embeddings
+        """
+        memory = getattr(self.classifier, "memory", None)
+        examples = getattr(memory, "examples", None)
+        if examples:
+            return {label: [np.asarray(example.embedding.cpu(), dtype=np.float32) for example in items]
+                    for label, items in examples.items()}
+        prototypes = getattr(memory, "prototypes", None) or {}
+        return {label: [np.asarray(vector.cpu(), dtype=np.float32)] for label, vector in prototypes.items()}
 
     def get_device(self) -> str:
         if torch.backends.mps.is_available():
@@ -67,10 +145,11 @@ class AgentRouter:
         else:
             return "cpu"
     
-    def learn_few_shots_complexity(self) -> None:
+    def few_shots_complexity(self) -> List[Tuple[str, str]]:
         """
-        Few shot learning for complexity estimation.
-        Use the build in add_examples method of the Adaptive_classifier.
+        Few shot examples for complexity estimation.
+        returns:
+            List[Tuple[str, str]]: (text, HIGH or LOW) pairs
         """
         few_shots = [
             ("hi", "LOW"),
@@ -196,15 +275,13 @@ class AgentRouter:
             ("Create a Node.js app to query a public API for event listings and display them", "HIGH"),
             ("Find a file named ‘budget.xlsx’, analyze its data, and generate a chart", "HIGH"),
         ]
-        random.shuffle(few_shots)
-        texts = [text for text, _ in few_shots]
-        labels = [label for _, label in few_shots]
-        self.complexity_classifier.add_examples(texts, labels)
+        return few_shots
 
-    def learn_few_shots_tasks(self) -> None:
+    def few_shots_tasks(self) -> List[Tuple[str, str]]:
         """
-        Few shot learning for tasks classification.
-        Use the build in add_examples method of the Adaptive_classifier.
+        Few shot examples for tasks classification.
+        returns:
+            List[Tuple[str, str]]: (text, task label) pairs
         """
         few_shots = [
             ("Write a python script to check if the device on my network is connected to the internet", "coding"),
@@ -352,10 +429,86 @@ class AgentRouter:
             ("hi", "talk"),
             ("hello", "talk"),
         ]
-        random.shuffle(few_shots)
-        texts = [text for text, _ in few_shots]
-        labels = [label for _, label in few_shots]
-        self.talk_classifier.add_examples(texts, labels)
+        return few_shots
+
+    def prepare_text(self, text: str) -> str:
+        """
+        Detect the language, keep the first sentence and translate it to English.
+        Args:
+            text: The raw user query
+        Returns:
+            str: The text fed to the classifiers
+        """
+        lang = self.lang_analysis.detect_language(text)
+        text = self.find_first_sentence(text)
+        return self.lang_analysis.translate(text, lang)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts in a single forward pass of the shared encoder.
+        Falls back to one pass per text if the installed adaptive-classifier
+        has no batch encoder (_get_embeddings is private to the library).
+        Args:
+            texts: The input texts
+        Returns:
+            np.ndarray: One embedding per row
+        """
+        get_embeddings = getattr(self.classifier, "_get_embeddings", None)
+        with torch.no_grad():
+            if get_embeddings is not None:
+                embeddings = get_embeddings(texts)
+            else:
+                embeddings = [self.encode_text(text) for text in texts]
+        if not len(embeddings):
+            return np.zeros((0, 0), dtype=np.float32)
+        # Rows come back as a list of tensors (or a tensor in some versions)
+        return np.stack([np.asarray(embedding.cpu(), dtype=np.float32) for embedding in embeddings])
+
+    def encode_text(self, text: str) -> torch.Tensor:
+        """
+        Embed one text with the classifier's model and tokenizer, the way
+        adaptive-classifier does: the CLS token, L2-normalized.
+        Args:
+            text: The input text
+        Returns:
+            torch.Tensor: The embedding
+        """
+        classifier = self.classifier
+        inputs = classifier.tokenizer(text, max_length=classifier.config.max_length,
+                                      truncation=True, return_tensors="pt").to(classifier.device)
+        embedding = classifier.model(**inputs).last_hidden_state[:, 0, :]
+        return torch.nn.functional.normalize(embedding, p=2, dim=1)[0]
+
+    def task_predictions(self, embedding: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Task labels for an embedding, excluding the complexity labels.
+        Args:
+            embedding: The text embedding from encode()
+        Returns:
+            List[Tuple[str, float]]: (label, score) sorted by score
+        """
+        predictions = self.heads["task"].predict(embedding)
+        return [pred for pred in predictions if pred[0] not in ["HIGH", "LOW"]]
+
+    def classify_batch(self, texts: List[str]) -> List[RoutingDecision]:
+        """
+        Route a batch of prepared texts: one encoder pass, then both heads per text.
+        Args:
+            texts: Texts returned by prepare_text
+        Returns:
+            List[RoutingDecision]: One decision per text, in order
+        """
+        embeddings = self.encode(texts)
+        decisions = []
+        for text, embedding in zip(texts, embeddings):
+            task_predictions = self.task_predictions(embedding)
+            task, task_confidence = task_predictions[0] if task_predictions else ("talk", 0.0)
+            if len(text) <= 8:
+                task = "talk"
+            complexity, complexity_confidence = self.interpret_complexity(self.heads["complexity"].predict(embedding))
+            self.logger.info(f"Routing for text {text}: {task} ({task_confidence}), complexity {complexity} ({complexity_confidence})")
+            decisions.append(RoutingDecision(task, task_confidence, complexity, complexity_confidence, text))
+        return decisions
 
     def llm_router(self, text: str) -> tuple:
         """
@@ -363,10 +516,7 @@ class AgentRouter:
         Args:
             text: The input text
         """
-        predictions = self.talk_classifier.predict(text)
-        predictions = [pred for pred in predictions if pred[0] not in ["HIGH", "LOW"]]
-        predictions = sorted(predictions, key=lambda x: x[1], reverse=True)
-        return predictions[0]
+        return self.task_predictions(self.encode([text])[0])[0]
     
     def router_vote(self, text: str, labels: list, log_confidence:bool = False) -> str:
         """
@@ -419,23 +569,31 @@ class AgentRouter:
         str: The estimated complexity
         """
         try:
-            predictions = self.complexity_classifier.predict(text)
+            predictions = self.heads["complexity"].predict(self.encode([text])[0])
         except Exception as e:
             pretty_print(f"Error in estimate_complexity: {str(e)}", color="failure")
             return "LOW"
+        return self.interpret_complexity(predictions)[0]
+
+    def interpret_complexity(self, predictions: List[Tuple[str, float]]) -> Tuple[str, float]:
+        """
+        Turn complexity classifier predictions into a complexity label.
+        Args:
+            predictions: (label, score) pairs from the complexity classifier
+        Returns:
+            Tuple[str, float]: The complexity (HIGH or LOW) and its confidence
+        """
         predictions = sorted(predictions, key=lambda x: x[1], reverse=True)
         if len(predictions) == 0:
-            return "LOW"
+            return "LOW", 0.0
         complexity, confidence = predictions[0][0], predictions[0][1]
         if confidence < 0.5:
             self.logger.info(f"Low confidence in complexity estimation: {confidence}")
-            return "HIGH"
-        if complexity == "HIGH":
-            return "HIGH"
-        elif complexity == "LOW":
-            return "LOW"
+            return "HIGH", confidence
+        if complexity in ("HIGH", "LOW"):
+            return complexity, confidence
         pretty_print(f"Failed to estimate the complexity of the text.", color="failure")
-        return "LOW"
+        return "LOW", confidence
     
     def find_planner_agent(self) -> Agent:
         """
@@ -461,18 +619,37 @@ class AgentRouter:
         assert len(self.agents) > 0, "No agents available."
         if len(self.agents) == 1:
             return self.agents[0]
-        lang = self.lang_analysis.detect_language(text)
-        text = self.find_first_sentence(text)
-        text = self.lang_analysis.translate(text, lang)
-        labels = [agent.role for agent in self.agents]
-        complexity = self.estimate_complexity(text)
-        if complexity == "HIGH":
+        return self.agent_for_decision(self.routing_engine.route(text))
+
+    async def aselect_agent(self, text: str) -> Agent:
+        """
+        Select the appropriate agent without blocking the event loop.
+        Concurrent calls are batched together by the routing engine.
+        Args:
+            text (str): The text to select the agent from
+        Returns:
+            Agent: The selected agent
+        """
+        assert len(self.agents) > 0, "No agents available."
+        if len(self.agents) == 1:
+            return self.agents[0]
+        return self.agent_for_decision(await self.routing_engine.aroute(text))
+
+    def agent_for_decision(self, decision: RoutingDecision) -> Agent:
+        """
+        Map a routing decision to one of the agents.
+        Args:
+            decision: The routing decision for the query
+        Returns:
+            Agent: The selected agent
+        """
+        if decision.complexity == "HIGH":
             pretty_print(f"Complex task detected, routing to planner agent.", color="info")
             return self.find_planner_agent()
-        try:
-            best_agent = self.router_vote(text, labels, log_confidence=False)
-        except Exception as e:
-            raise e
+        best_agent = decision.task
+        if 'bart' in self.pipelines and self.pipelines['bart'] is not None:
+            labels = [agent.role for agent in self.agents]
+            best_agent = self.router_vote(decision.text, labels, log_confidence=False)
         for agent in self.agents:
             if best_agent == agent.role:
                 role_name = agent.role
@@ -0,0 +1,144 @@
+"""
+Router Prototypes - Precomputed few-shot prototypes for AgentRouter.
+
+Each routing head (task, complexity) is a matrix of label prototypes: the
+mean embedding of that label's examples. Heads are built once, written to
+disk as ``.npy`` files with a fingerprint of the model and the examples, and
+memory-mapped on later starts, so workers skip re-embedding the few-shot
+examples. Scoring matches AdaptiveClassifier's prototype memory: exp(-squared
+L2 distance), normalized over the nearest labels.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from sources.logger import Logger
+
+logger = Logger("router_prototypes.log")
+
+
+def fingerprint(model_path: str, examples: Iterable[Tuple[str, str]]) -> str:
+    """
+    Identify a head's inputs: the model files (name, size, mtime) and the examples.
+    Args:
+        model_path: Directory of the routing model
+        examples: (text, label) pairs
+    Returns:
+        str: Hex digest that changes when the model or the examples change
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(model_path):
+        for name in sorted(os.listdir(model_path)):
+            stat = os.stat(os.path.join(model_path, name))
+            digest.update(f"{name}\0{stat.st_size}\0{int(stat.st_mtime)}\n".encode("utf-8"))
+    for text, label in sorted(examples):
+        digest.update(f"{label}\0{text}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _atomic_write(target: Path, write) -> None:
+    """
+    Write a file through a uniquely named temp file in the same directory, so
+    workers building the same head concurrently never share a temp file and
+    readers only ever see a complete file.
+    """
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp",
+                                     delete=False) as f:
+        try:
+            write(f)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, target)
+
+
+class PrototypeHead:
+    """Nearest-prototype classifier over precomputed label embeddings."""
+
+    def __init__(self, labels: List[str], prototypes: np.ndarray):
+        """
+        Args:
+            labels: Label of each prototype row
+            prototypes: (len(labels), dim) float32 matrix, possibly memory-mapped
+        """
+        self.labels = labels
+        self.prototypes = prototypes
+        self._norms = np.einsum("ij,ij->i", prototypes, prototypes)
+
+    @classmethod
+    def from_examples(cls, embeddings: Dict[str, List[np.ndarray]]) -> "PrototypeHead":
+        """
+        Build a head from example embeddings grouped by label.
+        Args:
+            embeddings: label -> example embeddings
+        Returns:
+            PrototypeHead: One mean prototype per label
+        """
+        labels = sorted(label for label, vectors in embeddings.items() if len(vectors))
+        prototypes = np.stack([np.mean(np.asarray(embeddings[label], dtype=np.float32), axis=0)
+                               for label in labels]).astype(np.float32)
+        return cls(labels, prototypes)
+
+    def predict(self, embedding, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Score an embedding against the prototypes.
+        Args:
+            embedding: Query embedding (numpy array or CPU tensor)
+            k: Number of labels to return
+        Returns:
+            List[Tuple[str, float]]: (label, score) sorted by score, scores summing to 1
+        """
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        distances = self._norms - 2.0 * (self.prototypes @ query) + float(query @ query)
+        nearest = np.argsort(distances)[:k]
+        similarities = np.exp(-(distances[nearest] - distances[nearest[0]]))
+        similarities /= similarities.sum()
+        return [(self.labels[i], float(s)) for i, s in zip(nearest, similarities)]
+
+    def save(self, directory: str, name: str, key: str) -> None:
+        """
+        Write the head as <name>.npy and <name>.json.
+        Args:
+            directory: Output directory
+            name: Head name
+            key: Fingerprint stored alongside the prototypes
+        """
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        prototypes = np.ascontiguousarray(self.prototypes, dtype=np.float32)
+        _atomic_write(path / f"{name}.npy", lambda f: np.save(f, prototypes))
+        meta = json.dumps({"fingerprint": key, "labels": self.labels}).encode("utf-8")
+        _atomic_write(path / f"{name}.json", lambda f: f.write(meta))
+
+    @classmethod
+    def load(cls, directory: str, name: str, key: str) -> Optional["PrototypeHead"]:
+        """
+        Memory-map a saved head.
+        Args:
+            directory: Directory used by save()
+            name: Head name
+            key: Expected fingerprint
+        Returns:
+            PrototypeHead or None when missing, unreadable or stale
+        """
+        path = Path(directory)
+        try:
+            with open(path / f"{name}.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("fingerprint") != key:
+                logger.info(f"Router prototypes '{name}' are stale, rebuilding")
+                return None
+            prototypes = np.load(path / f"{name}.npy", mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.info(f"Router prototypes '{name}' not loaded: {e}")
+            return None
+        if prototypes.shape[0] != len(meta["labels"]):
+            return None
+        return cls(meta["labels"], prototypes)
@@ -0,0 +1,199 @@
+"""
+Routing Engine - Micro-batched, cached routing decisions for AgentRouter.
+
+A routing decision (task label + complexity) is computed for many queries at
+once by a single ``classify_batch`` call, which lets the router share one
+encoder forward pass between the task and complexity heads. Concurrent
+callers are coalesced into micro-batches, identical in-flight queries share
+one result, and finished decisions are kept in an LRU keyed by the
+normalized query text.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from sources.logger import Logger
+
+logger = Logger("routing_engine.log")
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: case-folded, whitespace collapsed, outer punctuation stripped."""
+    return _SPACES.sub(" ", text.casefold()).strip(" \t\n.!?,;:")
+
+
+@dataclass
+class RoutingDecision:
+    """Outcome of routing one query."""
+    task: str
+    task_confidence: float
+    complexity: str
+    complexity_confidence: float
+    text: str = ""
+
+
+class RoutingEngine:
+    """Coalesces routing requests into batched classifier calls with a decision cache."""
+
+    def __init__(self, classify_batch: Callable[[List[str]], List[RoutingDecision]],
+                 preprocess: Optional[Callable[[str], str]] = None, max_batch: int = 16,
+                 max_wait_ms: float = 5.0, cache_size: int = 1024):
+        """
+        Args:
+            classify_batch: Maps preprocessed texts to decisions, in order
+            preprocess: Per-query preparation run on cache misses only (language detection, translation)
+            max_batch: Largest micro-batch handed to classify_batch
+            max_wait_ms: How long the first request of a batch waits for company
+            cache_size: Decisions kept in the LRU (0 disables caching)
+        """
+        self.classify_batch = classify_batch
+        self.preprocess = preprocess
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, RoutingDecision]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+        self._batch_ready = threading.Condition(self._lock)
+        self._leader_active = False
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "batches": 0,
+            "classified": 0,
+            "classify_ms": 0.0
+        }
+
+    def route(self, text: str) -> RoutingDecision:
+        """
+        Route one query, blocking until its batch has been classified.
+
+        Args:
+            text: Raw user query
+        Returns:
+            RoutingDecision: The cached or freshly computed decision
+        """
+        key = normalize_query(text)
+        with self._lock:
+            self.stats["requests"] += 1
+            decision = self._cache.get(key)
+            if decision is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return decision
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                owner = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                owner = True
+        if not owner:
+            return future.result()
+
+        # Language detection / translation run in the caller's thread, outside the batch
+        try:
+            prepared = self.preprocess(text) if self.preprocess else text
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._pending.append((key, prepared, future))
+            self._batch_ready.notify_all()
+        self._lead_until(future)
+        return future.result()
+
+    async def aroute(self, text: str) -> RoutingDecision:
+        """Route a query without blocking the event loop."""
+        return await asyncio.to_thread(self.route, text)
+
+    def _lead_until(self, future: Future):
+        """
+        Take turns leading until this caller's own request is answered.
+
+        A leader collects one micro-batch (waiting up to max_wait for it to
+        fill), classifies it and hands leadership to the next waiting caller,
+        so no caller runs other callers' batches after its own result is in.
+        """
+        while True:
+            with self._lock:
+                while self._leader_active and not future.done():
+                    self._batch_ready.wait()
+                if future.done():
+                    return
+                # Our request is still pending, so the batch below includes it or precedes it
+                self._leader_active = True
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._batch_ready.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._lock:
+                    self._leader_active = False
+                    self._batch_ready.notify_all()
+
+    def _run_batch(self, batch: List[tuple]):
+        keys = [key for key, _, _ in batch]
+        texts = [text for _, text, _ in batch]
+        try:
+            start = time.perf_counter()
+            decisions = self.classify_batch(texts)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if len(decisions) != len(batch):
+                raise RuntimeError(f"classify_batch returned {len(decisions)} decisions for {len(batch)} texts")
+        except Exception as e:
+            logger.error(f"Routing batch of {len(batch)} failed: {e}")
+            with self._lock:
+                for key in keys:
+                    self._inflight.pop(key, None)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["classified"] += len(batch)
+            self.stats["classify_ms"] += elapsed_ms
+            for key, decision in zip(keys, decisions):
+                self._inflight.pop(key, None)
+                if self.cache_size > 0:
+                    self._cache[key] = decision
+                    self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        for (_, _, future), decision in zip(batch, decisions):
+            future.set_result(decision)
+
+    def clear_cache(self):
+        """Drop cached decisions (e.g. after the classifiers learn new examples)."""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["cache_size"] = len(self._cache)
+        stats["hit_ratio"] = stats["cache_hits"] / stats["requests"] if stats["requests"] else 0.0
+        stats["avg_batch_size"] = stats["classified"] / stats["batches"] if stats["batches"] else 0.0
+        stats["avg_classify_ms"] = stats["classify_ms"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
@@ -1,5 +1,5 @@
 
-from typing import Tuple, Callable
+from typing import Tuple, Callable, Optional
 from pydantic import BaseModel
 from sources.utility import pretty_print
 
@@ -8,16 +8,22 @@ class QueryRequest(BaseModel):
     tts_enabled: bool = True
     provider: str = None
     model: str = None
+    cache_bypass: bool = False
+    cache_ttl: Optional[int] = None  # Seconds; defaults to the cache TTL
+    session_id: Optional[str] = None  # A new session is started when omitted
 
     def __str__(self):
-        return f"Query: {self.query}, TTS: {self.tts_enabled}, Provider: {self.provider}, Model: {self.model}"
+        return f"Query: {self.query}, TTS: {self.tts_enabled}, Provider: {self.provider}, Model: {self.model}, Session: {self.session_id}"
 
     def jsonify(self):
         return {
             "query": self.query,
             "tts_enabled": self.tts_enabled,
             "provider": self.provider,
-            "model": self.model
+            "model": self.model,
+            "cache_bypass": self.cache_bypass,
+            "cache_ttl": self.cache_ttl,
+            "session_id": self.session_id
         }
 
 class QueryResponse(BaseModel):
@@ -29,9 +35,11 @@ class QueryResponse(BaseModel):
     blocks: dict
     status: str
     uid: str
+    cache: str = "miss"
+    session_id: str = ""
 
     def __str__(self):
-        return f"Done: {self.done}, Answer: {self.answer}, Agent Name: {self.agent_name}, Success: {self.success}, Blocks: {self.blocks}, Status: {self.status}, UID: {self.uid}"
+        return f"Done: {self.done}, Answer: {self.answer}, Agent Name: {self.agent_name}, Success: {self.success}, Blocks: {self.blocks}, Status: {self.status}, UID: {self.uid}, Cache: {self.cache}, Session: {self.session_id}"
 
     def jsonify(self):
         return {
@@ -42,7 +50,9 @@ class QueryResponse(BaseModel):
             "success": self.success,
             "blocks": self.blocks,
             "status": self.status,
-            "uid": self.uid
+            "uid": self.uid,
+            "cache": self.cache,
+            "session_id": self.session_id
         }
 
 class executorResult:
@@ -0,0 +1,58 @@
+"""
+Token Counter - Count prompt tokens with the model's tokenizer.
+
+Uses tiktoken's encoding for the model when tiktoken is installed (falling
+back to cl100k_base for models it does not know, which is within a few
+percent for most BPE tokenizers), and a characters-per-token estimate
+otherwise. Providers expose this through ``count_tokens`` so callers never
+compare character counts against token limits.
+"""
+
+import math
+import threading
+from typing import Callable, Dict, Optional
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+CHARS_PER_TOKEN = 4.0
+
+_encodings: Dict[str, object] = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding_for(model: Optional[str]):
+    key = model or ""
+    with _encodings_lock:
+        if key not in _encodings:
+            try:
+                _encodings[key] = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+            except KeyError:
+                _encodings[key] = tiktoken.get_encoding("cl100k_base")
+        return _encodings[key]
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text.
+
+    Args:
+        text: Text to count
+        model: Model name used to pick the tokenizer
+
+    Returns:
+        Number of tokens
+    """
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_encoding_for(model).encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def token_counter_for(model: Optional[str] = None) -> Callable[[str], int]:
+    """Get a count function bound to a model."""
+    return lambda text: count_tokens(text, model)
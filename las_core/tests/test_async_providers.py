@@ -0,0 +1,145 @@
+"""
+Test the async provider interface on top of the shared connection pool.
+"""
+
+import json
+import asyncio
+import httpx
+import pytest
+import services.connection_pool as connection_pool
+from services.connection_pool import ConnectionPool
+from sources.providers.base_provider import BaseProvider, ProviderConfig, normalize_usage, usage_collector
+from sources.providers.openai_compatible import OpenAICompatibleMixin
+
+BASE_URL = "https://llm.test/v1"
+
+
+class EchoProvider(OpenAICompatibleMixin, BaseProvider):
+    """Minimal OpenAI-compatible provider used by the tests."""
+
+    api_base_url = BASE_URL
+
+    @property
+    def provider_name(self) -> str:
+        return "echo"
+
+    def chat_completion(self, messages, stream=False, **kwargs):
+        return "sync:" + messages[-1]["content"]
+
+    def get_langchain_llm(self):
+        return None
+
+    def list_models(self):
+        return [self.model]
+
+
+class SyncOnlyProvider(EchoProvider):
+    """Provider relying on the BaseProvider async fallbacks."""
+
+    achat_completion = BaseProvider.achat_completion
+    astream = BaseProvider.astream
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    payload = json.loads(request.content)
+    content = payload["messages"][-1]["content"]
+    assert request.headers["Authorization"] == "Bearer key"
+    if payload["stream"]:
+        events = [{"choices": [{"delta": {"content": word}}]} for word in content.split()]
+        if payload.get("stream_options", {}).get("include_usage"):
+            events.append({"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": len(events)}})
+        body = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+    return httpx.Response(200, json={
+        "choices": [{"message": {"content": content.upper()}}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 3}
+    })
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Shared pool whose client for BASE_URL answers through a mock transport."""
+    pool = ConnectionPool()
+    pool.pools[BASE_URL + "/"] = httpx.AsyncClient(base_url=BASE_URL + "/", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(connection_pool, "_pool_instance", pool)
+    return pool
+
+
+@pytest.fixture
+def provider():
+    return EchoProvider(ProviderConfig(model="echo-1", api_key="key"))
+
+
+class TestAsyncProviders:
+    """Test achat_completion and astream."""
+
+    @pytest.mark.asyncio
+    async def test_achat_completion(self, pool, provider):
+        usages = []
+        provider._on_usage = usages.append
+
+        answer = await provider.achat_completion([{"role": "user", "content": "hello there"}])
+        assert answer == "HELLO THERE"
+        assert usages == [{"prompt_tokens": 3, "completion_tokens": 3}]
+
+    @pytest.mark.asyncio
+    async def test_astream(self, pool, provider):
+        chunks = [chunk async for chunk in provider.astream([{"role": "user", "content": "one two three"}])]
+        assert chunks == ["one", "two", "three"]
+
+    @pytest.mark.asyncio
+    async def test_usage_reported_to_collector(self, pool, provider):
+        usage = {}
+        token = usage_collector.set(usage)
+        try:
+            chunks = [chunk async for chunk in provider.astream([{"role": "user", "content": "one two"}])]
+        finally:
+            usage_collector.reset(token)
+
+        assert chunks == ["one", "two"]
+        assert usage == {"input_tokens": 3, "output_tokens": 2}
+
+    def test_normalize_usage_formats(self):
+        class SDKUsage:
+            input_tokens = 7
+            output_tokens = 9
+
+        assert normalize_usage({"prompt_tokens": 1, "completion_tokens": 2}) == \
+            {"input_tokens": 1, "output_tokens": 2}
+        assert normalize_usage(SDKUsage()) == {"input_tokens": 7, "output_tokens": 9}
+        assert normalize_usage({"prompt_eval_count": 4, "eval_count": 5, "done": True}) == \
+            {"input_tokens": 4, "output_tokens": 5}
+        assert normalize_usage({"promptTokenCount": 6, "candidatesTokenCount": 8}) == \
+            {"input_tokens": 6, "output_tokens": 8}
+        assert normalize_usage({"output_tokens": 11}) == {"output_tokens": 11}
+        assert normalize_usage(None) == {}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_client(self, pool, provider):
+        messages = [[{"role": "user", "content": f"q{i}"}] for i in range(50)]
+        answers = await asyncio.gather(*(provider.achat_completion(m) for m in messages))
+
+        assert answers == [f"Q{i}" for i in range(50)]
+        assert len(pool.pools) == 1
+
+    @pytest.mark.asyncio
+    async def test_http_error_is_wrapped(self, monkeypatch, provider):
+        pool = ConnectionPool()
+        pool.pools[BASE_URL + "/"] = httpx.AsyncClient(
+            base_url=BASE_URL + "/", transport=httpx.MockTransport(lambda r: httpx.Response(503))
+        )
+        monkeypatch.setattr(connection_pool, "_pool_instance", pool)
+
+        with pytest.raises(RuntimeError, match="echo API error"):
+            await provider.achat_completion([{"role": "user", "content": "hi"}])
+
+    @pytest.mark.asyncio
+    async def test_sync_fallback(self):
+        provider = SyncOnlyProvider(ProviderConfig(model="echo-1"))
+
+        assert await provider.achat_completion([{"role": "user", "content": "hi"}]) == "sync:hi"
+        assert [c async for c in provider.astream([{"role": "user", "content": "hi"}])] == ["sync:hi"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
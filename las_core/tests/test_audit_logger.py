@@ -0,0 +1,89 @@
+"""
+Unit tests for the group-commit audit writer.
+"""
+import os
+import threading
+import pytest
+from security.audit_logger import AuditLogger, AuditEventType
+
+
+class TestAuditWriter:
+    """Test durability futures, batching, ordering and shutdown."""
+
+    @pytest.fixture
+    def logger(self, tmp_path):
+        logger = AuditLogger(str(tmp_path))
+        yield logger
+        logger.close()
+
+    def test_future_resolves_to_hash(self, logger):
+        future = logger.log(AuditEventType.TOOL_CALL, "call_search", agent="browser")
+        entry_hash = future.result(timeout=5)
+
+        assert logger.query()[0]["hash"] == entry_hash
+        assert logger.last_hash == entry_hash
+
+    def test_group_commit_batches_fsyncs(self, tmp_path, monkeypatch):
+        gate = threading.Event()
+        fsyncs = []
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            fsyncs.append(fd)
+            gate.wait(5)
+            real_fsync(fd)
+
+        monkeypatch.setattr(os, "fsync", slow_fsync)
+        logger = AuditLogger(str(tmp_path))
+        first = logger.log(AuditEventType.TOOL_CALL, "first")
+        # The writer blocks in fsync for the first batch while these queue up
+        futures = [logger.log(AuditEventType.TOOL_CALL, f"call_{n}") for n in range(200)]
+        gate.set()
+
+        for future in [first] + futures:
+            future.result(timeout=5)
+        assert len(fsyncs) <= 3
+        assert logger.verify_integrity()
+        logger.close()
+
+    def test_concurrent_loggers_keep_chain(self, logger):
+        def worker(name):
+            for n in range(50):
+                logger.log(AuditEventType.DECISION, f"{name}_{n}", agent=name)
+
+        threads = [threading.Thread(target=worker, args=(f"agent{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert logger.get_stats()["total_entries"] == 400
+        assert logger.verify_integrity()
+        entries = logger.query(agent="agent3", limit=100)
+        assert [e["action"] for e in entries] == [f"agent3_{n}" for n in range(49, -1, -1)]
+
+    def test_write_failure_sets_exception(self, logger, monkeypatch):
+        def fail(entries, sync=False):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(logger.store, "append", fail)
+        with pytest.raises(OSError):
+            logger.log(AuditEventType.ERROR, "lost").result(timeout=5)
+        monkeypatch.undo()
+
+        logger.log(AuditEventType.ERROR, "kept").result(timeout=5)
+        assert [e["action"] for e in logger.query()] == ["kept"]
+        assert logger.verify_integrity()
+
+    def test_log_after_close_commits_inline(self, logger):
+        logger.log(AuditEventType.DECISION, "before", result=object())
+        logger.close()
+
+        future = logger.log(AuditEventType.DECISION, "after")
+        assert future.done()
+        assert [e["action"] for e in logger.query()] == ["after", "before"]
+        assert logger.verify_integrity()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,157 @@
+"""
+Unit tests for the segmented, indexed audit store.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+import pytest
+from security.audit_logger import AuditLogger, AuditEventType
+from security.audit_store import AuditStore, INDEX_DTYPE
+
+
+class TestAuditStore:
+    """Test rotation, indexed queries, crash repair and legacy migration."""
+
+    @pytest.fixture
+    def logger(self, tmp_path):
+        return AuditLogger(str(tmp_path), segment_max_entries=10)
+
+    def test_rotation_writes_footers(self, logger, tmp_path):
+        for n in range(25):
+            logger.log(AuditEventType.TOOL_CALL, f"call_{n}", agent="coder")
+        logger.flush()
+
+        segments = logger.store.segments()
+        assert [s.count for s in segments] == [10, 10, 5]
+        footer = json.loads((tmp_path / "segment_00000001.footer.json").read_text())
+        assert footer["count"] == 10
+        assert footer["last_hash"] == segments[1].first_previous_hash
+        assert logger.get_stats()["total_entries"] == 25
+        assert logger.verify_integrity()
+
+    def test_query_filters_newest_first(self, logger):
+        for n in range(30):
+            logger.log(
+                AuditEventType.TOOL_CALL if n % 3 else AuditEventType.DECISION,
+                f"action_{n}",
+                agent="coder" if n % 2 else "planner",
+                user="alice" if n < 15 else "bob"
+            )
+
+        decisions = logger.query(event_type=AuditEventType.DECISION, limit=100)
+        assert [e["action"] for e in decisions] == [f"action_{n}" for n in range(27, -1, -3)]
+
+        combined = logger.query(event_type=AuditEventType.TOOL_CALL, agent="coder", user="bob", limit=3)
+        assert [e["action"] for e in combined] == ["action_29", "action_25", "action_23"]
+
+        assert logger.query(agent="browser") == []
+        assert len(logger.query(limit=7)) == 7
+
+    def test_time_range(self, logger):
+        logger.log(AuditEventType.ERROR, "early")
+        middle = datetime.now()
+        logger.log(AuditEventType.ERROR, "late")
+
+        assert [e["action"] for e in logger.query(start_time=middle)] == ["late"]
+        assert [e["action"] for e in logger.query(end_time=middle)] == ["early"]
+        assert logger.query(start_time=datetime.now() + timedelta(hours=1)) == []
+
+    def test_restart_continues_chain(self, tmp_path):
+        first = AuditLogger(str(tmp_path), segment_max_entries=4)
+        for n in range(6):
+            first.log(AuditEventType.DECISION, f"d{n}", user="alice")
+        first.close()
+
+        second = AuditLogger(str(tmp_path), segment_max_entries=4)
+        assert second.last_hash == first.last_hash
+        second.log(AuditEventType.DECISION, "d6")
+        assert second.verify_integrity()
+        assert len(second.query(user="alice")) == 6
+
+    def test_crash_repair(self, tmp_path):
+        logger = AuditLogger(str(tmp_path))
+        for n in range(3):
+            logger.log(AuditEventType.TOOL_CALL, f"t{n}")
+        logger.close()
+
+        index_path = tmp_path / "segment_00000001.idx"
+        data_path = tmp_path / "segment_00000001.jsonl"
+        # Last index record lost, plus a torn write at the end of the data
+        index_path.write_bytes(index_path.read_bytes()[:2 * INDEX_DTYPE.itemsize + 5])
+        with open(data_path, "ab") as f:
+            f.write(b'{"timestamp": "2026')
+
+        store = AuditStore(str(tmp_path))
+        assert [e["action"] for e in store.query()] == ["t2", "t1", "t0"]
+        assert data_path.read_bytes().endswith(b"}\n")
+        assert store.last_hash == logger.last_hash
+
+    def test_failed_write_leaves_chain_unchanged(self, tmp_path):
+        logger = AuditLogger(str(tmp_path))
+        logger.log(AuditEventType.TOOL_CALL, "t0").result(timeout=5)
+        data_file = logger.store._data_file
+
+        class TornFile:
+            """Writes half of the first batch, then fails like a full disk."""
+
+            def write(self, data):
+                data_file.write(data[:len(data) // 2])
+                raise OSError("disk full")
+
+            def __getattr__(self, name):
+                return getattr(data_file, name)
+
+        logger.store._data_file = TornFile()
+        with pytest.raises(OSError):
+            logger.log(AuditEventType.TOOL_CALL, "lost").result(timeout=5)
+        logger.log(AuditEventType.TOOL_CALL, "t1").result(timeout=5)
+
+        assert [e["action"] for e in logger.query()] == ["t1", "t0"]
+        assert logger.store.segments()[-1].count == 2
+        assert logger.verify(full=True)["valid"]
+        logger.close()
+        assert [e["action"] for e in AuditStore(str(tmp_path)).query()] == ["t1", "t0"]
+
+    def test_legacy_day_files_migrated(self, tmp_path):
+        legacy = AuditLogger(str(tmp_path / "tmp"))
+        legacy.log(AuditEventType.FILE_ACCESS, "read", agent="file")
+        legacy.log(AuditEventType.FILE_ACCESS, "write", agent="file")
+        legacy.close()
+        (tmp_path / "tmp" / "segment_00000001.jsonl").rename(tmp_path / "audit_20260101.jsonl")
+
+        logger = AuditLogger(str(tmp_path))
+        assert not list(tmp_path.glob("audit_*.jsonl"))
+        assert [e["action"] for e in logger.query(agent="file")] == ["write", "read"]
+        logger.log(AuditEventType.FILE_ACCESS, "delete", agent="file")
+        assert logger.store.segments()[-1].number == 2
+        assert logger.verify_integrity()
+
+    def test_interrupted_migration_resumes(self, tmp_path, monkeypatch):
+        legacy = AuditLogger(str(tmp_path / "tmp"), segment_max_entries=2)
+        for n in range(4):
+            legacy.log(AuditEventType.DECISION, f"d{n}")
+        legacy.close()
+        for number, day in ((1, "20260101"), (2, "20260102")):
+            (tmp_path / "tmp" / f"segment_{number:08d}.jsonl").rename(tmp_path / f"audit_{day}.jsonl")
+
+        real_replace = os.replace
+
+        def crash_on_second_day(src, dst):
+            if str(src).endswith("audit_20260102.jsonl"):
+                raise OSError("crashed")
+            real_replace(src, dst)
+
+        monkeypatch.setattr(os, "replace", crash_on_second_day)
+        with pytest.raises(OSError):
+            AuditStore(str(tmp_path))
+        monkeypatch.undo()
+
+        logger = AuditLogger(str(tmp_path))
+        assert not list(tmp_path.glob("audit_*.jsonl"))
+        assert [e["action"] for e in logger.query()] == ["d3", "d2", "d1", "d0"]
+        assert logger.get_stats()["total_entries"] == 4
+        assert logger.verify_integrity()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
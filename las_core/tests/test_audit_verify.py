@@ -0,0 +1,105 @@
+"""
+Unit tests for checkpointed audit verification and Merkle range proofs.
+"""
+import json
+import time
+from datetime import datetime
+import pytest
+from security.audit_logger import AuditLogger, AuditEventType
+from security.audit_verify import merkle_levels, merkle_leaf, merkle_root, range_proof, root_from_range
+
+
+def tamper(path, action):
+    lines = path.read_text().splitlines(keepends=True)
+    entry = json.loads(lines[3])
+    entry["action"] = action
+    lines[3] = json.dumps(entry) + "\n"
+    path.write_text("".join(lines))
+
+
+class TestAuditVerify:
+    """Test checkpoints, parallel replay, tamper detection and range proofs."""
+
+    @pytest.fixture
+    def logger(self, tmp_path):
+        logger = AuditLogger(str(tmp_path), segment_max_entries=20, verify_workers=2)
+        for n in range(75):
+            logger.log(AuditEventType.TOOL_CALL, f"call_{n}", agent="coder")
+        logger.flush()
+        yield logger
+        logger.close()
+
+    def test_checkpoints_skip_verified_segments(self, logger):
+        first = logger.verify()
+        assert first["valid"]
+        assert first["verified_entries"] == 75
+        assert first["checkpointed_segments"] == 0
+
+        logger.log(AuditEventType.DECISION, "new").result(timeout=5)
+        second = logger.verify()
+        assert second["valid"]
+        assert second["checkpointed_segments"] == 3
+        assert second["verified_entries"] == 16  # Only the active segment
+
+        assert logger.verify(full=True)["verified_entries"] == 76
+
+    def test_tampering_detected(self, logger, tmp_path):
+        logger.verify()
+        segment = tmp_path / "segment_00000002.jsonl"
+        tamper(segment, "call_x")  # Same length: the checkpoint's size still matches
+
+        assert not logger.verify(full=True)["valid"]
+
+        tamper(segment, "call_longer_name")
+        assert not logger.verify_integrity()
+
+    def test_forged_checkpoint_ignored(self, logger, tmp_path):
+        logger.verify()
+        checkpoints = tmp_path / "checkpoints.jsonl"
+        lines = checkpoints.read_text().splitlines()
+        forged = json.loads(lines[0])
+        forged["root"] = "00" * 32
+        checkpoints.write_text("\n".join([json.dumps(forged)] + lines[1:]) + "\n")
+
+        assert 1 not in logger.verifier.checkpoints()
+        assert logger.verify()["checkpointed_segments"] == 2
+
+    def test_merkle_range_proofs(self):
+        hashes = [f"{n:064x}" for n in range(13)]
+        levels = merkle_levels([merkle_leaf(h) for h in hashes])
+        root = merkle_root(hashes)
+        for lo in range(13):
+            for hi in range(lo, 13):
+                proof = range_proof(levels, lo, hi)
+                assert root_from_range(hashes[lo:hi + 1], lo, 13, proof) == root
+
+    def test_verify_time_window(self, tmp_path):
+        logger = AuditLogger(str(tmp_path), segment_max_entries=10)
+        for n in range(25):
+            logger.log(AuditEventType.DECISION, f"early_{n}")
+        time.sleep(0.01)
+        start = datetime.now()
+        for n in range(12):
+            logger.log(AuditEventType.DECISION, f"window_{n}")
+        end = datetime.now()
+        time.sleep(0.01)
+        for n in range(15):
+            logger.log(AuditEventType.DECISION, f"late_{n}")
+        logger.verify()
+
+        proof = logger.prove_range(start, end)
+        actions = [e["action"] for part in proof["parts"] for e in part["entries"]]
+        assert actions == [f"window_{n}" for n in range(12)]
+        assert all(part["checkpoint"] for part in proof["parts"])
+        assert logger.verifier.verify_range(proof)["valid"]
+
+        proof["parts"][0]["entries"][1]["action"] = "forged"
+        assert not logger.verifier.verify_range(proof)["valid"]
+
+        # A window in the active segment is replayed from the segment start
+        assert logger.verify_range(start_time=end)["valid"]
+        logger.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,86 @@
+"""
+Unit tests for the completion cache.
+"""
+import pytest
+from services.embeddings import HashingEmbeddingBackend
+from services.semantic_cache import SemanticCache
+from sources.cached_provider import (
+    CompletionCache, CACHE_HIT, CACHE_STALE, CACHE_MISS, CACHE_BYPASS
+)
+
+
+class TestCompletionCache:
+    """Test stale-while-revalidate completion caching."""
+
+    @pytest.fixture
+    def completions(self, tmp_path):
+        cache = SemanticCache(storage_dir=str(tmp_path), stale_ttl=60.0,
+                              embedding_backend=HashingEmbeddingBackend())
+        return CompletionCache(cache)
+
+    def messages(self, query, system="You are helpful."):
+        return [{"role": "system", "content": system}, {"role": "user", "content": query}]
+
+    def test_miss_then_hit(self, completions):
+        calls = []
+        compute = lambda: calls.append(1) or "A container runtime"
+
+        first = completions.complete(self.messages("What is Docker?"), "ollama", "llama3", 0.7, compute)
+        second = completions.complete(self.messages("what is  docker?"), "ollama", "llama3", 0.7, compute)
+
+        assert first == ("A container runtime", CACHE_MISS)
+        assert second == ("A container runtime", CACHE_HIT)
+        assert len(calls) == 1
+
+    def test_context_and_temperature_must_match(self, completions):
+        completions.complete(self.messages("What is Docker?"), "ollama", "llama3", 0.7, lambda: "a")
+
+        _, status = completions.complete(self.messages("What is Docker?", system="Be terse."),
+                                         "ollama", "llama3", 0.7, lambda: "b")
+        assert status == CACHE_MISS
+        _, status = completions.complete(self.messages("What is Docker?"), "ollama", "llama3", 0.2, lambda: "c")
+        assert status == CACHE_MISS
+
+    def test_stale_entry_served_and_refreshed(self, completions):
+        messages = self.messages("What is Docker?")
+        completions.complete(messages, "ollama", "llama3", None, lambda: "old", ttl=0)
+
+        response, status = completions.complete(messages, "ollama", "llama3", None, lambda: "new")
+        assert (response, status) == ("old", CACHE_STALE)
+
+        completions._executor.shutdown(wait=True)
+        assert completions.complete(messages, "ollama", "llama3", None, lambda: "other") == ("new", CACHE_HIT)
+
+    def test_stale_entry_uses_refresh_callable(self, completions):
+        messages = self.messages("What is Docker?")
+        completions.complete(messages, "ollama", "llama3", None, lambda: "old", ttl=0)
+
+        compute_calls = []
+        response, status = completions.complete(messages, "ollama", "llama3", None,
+                                                lambda: compute_calls.append(1) or "compute",
+                                                refresh=lambda: "refreshed")
+        assert (response, status) == ("old", CACHE_STALE)
+
+        completions._executor.shutdown(wait=True)
+        assert compute_calls == []
+        assert completions.complete(messages, "ollama", "llama3", None, lambda: "other") == ("refreshed", CACHE_HIT)
+
+    def test_bypass(self, completions):
+        assert completions.complete(self.messages("What is Docker?"), "ollama", "llama3", None,
+                                    lambda: "a", bypass=True) == ("a", CACHE_BYPASS)
+        assert completions.cache.get_stats()["cache_size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_async_miss_then_hit(self, completions):
+        async def compute():
+            return {"answer": "A container runtime"}
+
+        messages = self.messages("What is Docker?")
+        assert (await completions.acomplete(messages, "ollama", "llama3", None, compute))[1] == CACHE_MISS
+        response, status = await completions.acomplete(messages, "ollama", "llama3", None, compute)
+        assert status == CACHE_HIT
+        assert response["answer"] == "A container runtime"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,119 @@
+"""
+Unit tests for the SQLite-backed cost tracker.
+"""
+import json
+import sqlite3
+from datetime import datetime
+import pytest
+from services.cost_tracker import CostTracker, Provider
+
+
+class TestCostTracker:
+    """Test buffered writes, rollups and migration."""
+
+    @pytest.fixture
+    def tracker(self, tmp_path):
+        tracker = CostTracker(storage_dir=str(tmp_path), flush_interval_ms=10_000)
+        yield tracker
+        tracker.close()
+
+    def test_track_usage_is_buffered_until_flush(self, tracker, tmp_path):
+        tracker.track_usage(Provider.OPENAI, 1_000_000, 0, agent="coder", model="gpt-4o-mini")
+
+        conn = sqlite3.connect(str(tmp_path / "usage.sqlite3"))
+        assert conn.execute("SELECT COUNT(*) FROM usage").fetchone()[0] == 0
+        assert tracker.flush() == 1
+        assert conn.execute("SELECT provider, model, agent, cost FROM usage").fetchone() == \
+            ("openai", "gpt-4o-mini", "coder", 0.5)
+
+    def test_summary_rollups(self, tracker):
+        tracker.track_usage(Provider.OPENAI, 1_000_000, 1_000_000, agent="coder", model="gpt-4o-mini")
+        tracker.track_usage(Provider.OPENAI, 1_000_000, 0, agent="browser", model="gpt-4o-mini")
+        tracker.track_usage(Provider.ANTHROPIC, 0, 1_000_000, agent="coder", model="claude")
+
+        daily = tracker.get_cost_summary("daily")
+        assert daily["key"] == datetime.now().strftime("%Y-%m-%d")
+        assert daily["total_requests"] == 3
+        assert daily["total_cost"] == pytest.approx(17.5)
+        assert daily["by_provider"]["openai"]["requests"] == 2
+        assert daily["by_provider"]["openai"]["input_tokens"] == 2_000_000
+
+        by_agent = tracker.get_cost_summary("monthly", group_by="agent")["by_agent"]
+        assert by_agent["coder"]["cost"] == pytest.approx(17.0)
+        assert set(tracker.get_cost_summary("total", group_by="model")["by_model"]) == {"gpt-4o-mini", "claude"}
+        assert tracker.get_cost_by_agent("browser") == pytest.approx(0.5)
+
+    def test_unknown_group_rejected(self, tracker):
+        with pytest.raises(ValueError):
+            tracker.get_cost_summary(group_by="region")
+
+    def test_usage_shared_across_instances(self, tmp_path):
+        first = CostTracker(storage_dir=str(tmp_path), flush_interval_ms=10_000)
+        second = CostTracker(storage_dir=str(tmp_path), flush_interval_ms=10_000)
+        first.track_usage(Provider.OPENAI, 1_000_000, 0)
+        second.track_usage(Provider.OPENAI, 1_000_000, 0)
+        first.close()
+        second.close()
+
+        third = CostTracker(storage_dir=str(tmp_path))
+        assert third.get_cost_summary("total")["total_requests"] == 2
+        third.close()
+
+    def test_background_flush(self, tmp_path):
+        tracker = CostTracker(storage_dir=str(tmp_path), flush_interval_ms=10)
+        tracker.track_usage(Provider.GROQ, 10, 10)
+        tracker._closed.wait(0.2)
+
+        with sqlite3.connect(str(tmp_path / "usage.sqlite3")) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM usage").fetchone()[0] == 1
+        tracker.close()
+
+    def test_legacy_json_is_migrated(self, tmp_path):
+        legacy = {"daily": {"2024-05-01": {"openai": {
+            "input_tokens": 10, "output_tokens": 20, "total_cost": 1.25, "requests": 3}}}}
+        (tmp_path / "usage.json").write_text(json.dumps(legacy))
+
+        tracker = CostTracker(storage_dir=str(tmp_path))
+        summary = tracker.get_cost_summary("monthly", key="2024-05")
+        assert summary["total_cost"] == 1.25
+        assert summary["total_requests"] == 3
+        assert not (tmp_path / "usage.json").exists()
+        tracker.close()
+
+    def test_check_budget_uses_cached_spend(self, tracker):
+        tracker.set_budget("coder", 1.0)
+        assert tracker.check_budget("coder") == "ok"
+        assert tracker.check_budget("planner") == "ok"  # No budget
+
+        tracker.track_usage(Provider.OPENAI, 0, 0, agent="coder", cost=0.95)
+        assert tracker.check_budget("coder") == "warning"
+        tracker.flush()
+        assert tracker.agent_spend("coder") == pytest.approx(0.95)
+
+        tracker.track_usage(Provider.OPENAI, 0, 0, agent="coder", cost=0.10)
+        assert tracker.check_budget("coder") == "exceeded"
+        assert tracker.get_cost_by_agent("coder") == pytest.approx(1.05)
+
+    def test_spend_loaded_from_database(self, tmp_path):
+        first = CostTracker(storage_dir=str(tmp_path), flush_interval_ms=10_000)
+        first.track_usage(Provider.ANTHROPIC, 1_000_000, 0, agent="coder")
+        first.close()
+
+        second = CostTracker(storage_dir=str(tmp_path), flush_interval_ms=10_000)
+        assert second.agent_spend("coder") == pytest.approx(3.0)
+        second.close()
+
+    def test_alerts_only_on_state_change(self, tracker):
+        alerts = []
+        tracker.set_alert_callback(alerts.append)
+        tracker.set_budget("coder", 1.0)
+
+        for _ in range(3):
+            tracker.track_usage(Provider.OPENAI, 0, 0, agent="coder", cost=0.45)
+        tracker.track_usage(Provider.OPENAI, 0, 0, agent="coder", cost=0.45)
+
+        assert [alert["type"] for alert in alerts] == ["warning", "critical"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,86 @@
+"""
+Unit tests for the content-addressed embedding cache.
+"""
+import pytest
+from services.embedding_cache import EmbeddingCache, CachedEmbeddings, DiskTier
+
+
+class CountingEmbeddings:
+    """Fake model recording every text it is asked to embed."""
+
+    def __init__(self):
+        self.documents = []
+        self.queries = []
+
+    def embed_documents(self, texts):
+        self.documents.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text)), 2.0]
+
+
+class TestEmbeddingCache:
+    """Test embedding reuse across calls, models and tiers."""
+
+    @pytest.fixture
+    def model(self):
+        return CountingEmbeddings()
+
+    def test_identical_text_embedded_once(self, model):
+        embeddings = CachedEmbeddings(model, model="m", cache=EmbeddingCache())
+
+        first = embeddings.embed_documents(["alpha", "beta", "alpha"])
+        second = embeddings.embed_documents(["beta", "gamma"])
+
+        assert model.documents == ["alpha", "beta", "gamma"]
+        assert first[0] == first[2] == [5.0, 1.0]
+        assert second[0] == first[1]
+
+    def test_query_cache_separate_from_documents(self, model):
+        embeddings = CachedEmbeddings(model, model="m", cache=EmbeddingCache())
+        embeddings.embed_documents(["alpha"])
+
+        assert embeddings.embed_query("alpha") == [5.0, 2.0]
+        assert embeddings.embed_query("alpha") == [5.0, 2.0]
+        assert model.queries == ["alpha"]
+
+    def test_model_and_version_in_key(self, model):
+        cache = EmbeddingCache()
+        CachedEmbeddings(model, model="m", cache=cache).embed_documents(["alpha"])
+        CachedEmbeddings(model, model="m", version="2", cache=cache).embed_documents(["alpha"])
+        CachedEmbeddings(model, model="other", cache=cache).embed_documents(["alpha"])
+
+        assert model.documents == ["alpha"] * 3
+
+    def test_lru_eviction(self, model):
+        embeddings = CachedEmbeddings(model, model="m", cache=EmbeddingCache(max_entries=2))
+        embeddings.embed_documents(["a", "b", "c"])
+        embeddings.embed_documents(["a"])
+
+        assert model.documents == ["a", "b", "c", "a"]
+
+    def test_disk_tier_survives_restart(self, tmp_path, model):
+        path = str(tmp_path / "emb.sqlite3")
+        CachedEmbeddings(model, model="m", cache=EmbeddingCache(tier=DiskTier(path))).embed_documents(["alpha"])
+
+        cache = EmbeddingCache(tier=DiskTier(path))
+        assert CachedEmbeddings(model, model="m", cache=cache).embed_documents(["alpha"]) == [[5.0, 1.0]]
+        assert model.documents == ["alpha"]
+        assert cache.get_stats()["tier_hits"] == 1
+
+    def test_stats_report_hit_ratio(self, model):
+        cache = EmbeddingCache()
+        embeddings = CachedEmbeddings(model, model="m", cache=cache)
+        embeddings.embed_documents(["alpha", "beta"])
+        embeddings.embed_documents(["alpha", "beta"])
+
+        stats = cache.get_stats()
+        assert stats["hit_ratio"] == 0.5
+        assert stats["embedded"] == 2
+        assert stats["saved_ms"] >= 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
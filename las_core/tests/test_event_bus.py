@@ -0,0 +1,81 @@
+"""
+Unit tests for the SSE event bus.
+"""
+import asyncio
+import pytest
+from services.event_bus import EventBus, Subscription, event_id_key
+
+
+class TestEventBus:
+    """Test in-process fan-out, overflow and resume."""
+
+    @pytest.mark.asyncio
+    async def test_every_subscriber_receives_every_event(self):
+        bus = EventBus()
+        first, second = await bus.subscribe(), await bus.subscribe()
+
+        await bus.publish("status", {"step": 1})
+        await bus.publish("status", {"step": 2})
+
+        for subscription in (first, second):
+            assert [(await subscription.get())["data"]["step"] for _ in range(2)] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_ids_are_monotonic(self):
+        bus = EventBus()
+        ids = [await bus.publish("tick", {}) for _ in range(100)]
+        assert [event_id_key(i) for i in ids] == sorted(set(event_id_key(i) for i in ids))
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_drops_oldest(self):
+        bus = EventBus(buffer_size=3)
+        slow = await bus.subscribe()
+
+        for step in range(5):
+            await bus.publish("status", {"step": step})
+
+        assert slow.take_dropped() == 2
+        assert [(await slow.get())["data"]["step"] for _ in range(3)] == [2, 3, 4]
+        assert bus.get_stats()["dropped"] == 2
+
+    @pytest.mark.asyncio
+    async def test_resume_from_last_event_id(self):
+        bus = EventBus()
+        ids = [await bus.publish("status", {"step": step}) for step in range(4)]
+
+        resumed = await bus.subscribe(last_event_id=ids[1])
+        await bus.publish("status", {"step": 4})
+
+        assert [(await resumed.get())["data"]["step"] for _ in range(3)] == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_get_waits_for_publish(self):
+        bus = EventBus()
+        subscription = await bus.subscribe()
+
+        waiter = asyncio.create_task(subscription.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await bus.publish("status", {"step": 1})
+        assert (await waiter)["type"] == "status"
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe(self):
+        bus = EventBus()
+        subscription = await bus.subscribe()
+        bus.unsubscribe(subscription)
+
+        await bus.publish("status", {})
+        assert not subscription.buffer
+        assert bus.get_stats()["subscribers"] == 0
+
+    def test_duplicate_ids_ignored(self):
+        subscription = Subscription()
+        subscription.push({"id": "5-0", "type": "a", "data": None})
+        subscription.push({"id": "5-0", "type": "a", "data": None})
+        subscription.push({"id": "4-9", "type": "a", "data": None})
+        assert len(subscription.buffer) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
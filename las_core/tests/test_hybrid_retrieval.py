@@ -0,0 +1,129 @@
+"""
+Unit tests for hybrid BM25 + dense retrieval.
+"""
+import time
+import pytest
+from services.hybrid_retrieval import (
+    BM25Index, HybridRetriever, CrossEncoderReranker, reciprocal_rank_fusion, tokenize
+)
+
+DOCS = [
+    ("1", "Timeout while calling get_user_name in auth/session.py", {"source": "a"}),
+    ("2", "The session expired because the user was idle for too long", {"source": "b"}),
+    ("3", "Error ERR-4021 raised by config.settings on startup", {"source": "c"}),
+]
+
+
+class StubReranker(CrossEncoderReranker):
+    """Scores by text length, sleeping per batch to exercise the budget."""
+
+    def __init__(self, delay=0.0, **kwargs):
+        super().__init__(model="stub", **kwargs)
+        self.delay = delay
+        self.scored = 0
+
+    def score(self, query, texts):
+        time.sleep(self.delay)
+        self.scored += len(texts)
+        return [float(len(t)) for t in texts]
+
+
+class TestHybridRetrieval:
+    """Test tokenization, BM25, fusion and the retriever pipeline."""
+
+    @pytest.fixture
+    def bm25(self):
+        index = BM25Index()
+        index.add_documents(DOCS)
+        return index
+
+    def test_tokenize_keeps_and_splits_compounds(self):
+        tokens = tokenize("getUserName failed in config.settings with ERR-42")
+
+        assert "getusername" in tokens and {"get", "user", "name"} <= set(tokens)
+        assert "config.settings" in tokens and {"config", "settings"} <= set(tokens)
+        assert "err-42" in tokens
+
+    def test_bm25_ranks_exact_tokens(self, bm25):
+        assert bm25.search("ERR-4021")[0][0] == "3"
+        assert bm25.search("get_user_name")[0][0] == "1"
+        assert bm25.search("nothing matches") == []
+
+    def test_bm25_log_replay_and_compaction(self, tmp_path):
+        path = str(tmp_path / "docs.jsonl")
+        index = BM25Index(path)
+        index.add_documents(DOCS)
+        index.remove("3")
+        index.add_documents([("2", "replaced text about tokens", {})])
+
+        reloaded = BM25Index(path)
+        assert len(reloaded) == 2
+        assert reloaded.search("ERR-4021") == []
+        assert reloaded.get("2")["text"] == "replaced text about tokens"
+
+        reloaded.compact()
+        assert len(open(path).readlines()) == 2
+        assert BM25Index(path).search("timeout")[0][0] == "1"
+
+    def test_bm25_workers_share_log(self, tmp_path):
+        path = str(tmp_path / "docs.jsonl")
+        first, second = BM25Index(path), BM25Index(path)
+        first.add_documents(DOCS[:2])
+        second.add_documents(DOCS[2:])
+        first.remove("1")
+
+        assert second.search("ERR-4021")[0][0] == "3"
+        assert "1" not in dict(second.search("get_user_name"))
+        assert first.get("3")["metadata"] == {"source": "c"}
+        assert not hasattr(first, "documents")  # Texts stay in the log
+
+    def test_bm25_log_compacts_itself(self, tmp_path):
+        path = str(tmp_path / "docs.jsonl")
+        index = BM25Index(path, compact_min_records=3)
+        reader = BM25Index(path)
+        for n in range(3):
+            index.add_documents([("1", f"revision {n} of get_user_name", {})])
+        assert len(open(path).readlines()) == 3
+
+        index.add_documents([("1", "final revision of get_user_name", {})])
+        assert len(open(path).readlines()) == 1
+        assert index.dead_records == 0
+        # Another worker reloads the rewritten log
+        assert reader.search("revision")[0][0] == "1"
+        assert reader.get("1")["text"] == "final revision of get_user_name"
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+
+        assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
+        assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+
+    def test_hybrid_combines_dense_and_sparse(self, bm25):
+        def dense_search(query, k):
+            return [{"id": "2", "text": DOCS[1][1], "metadata": {}, "score": 0.9}]
+
+        retriever = HybridRetriever(dense_search, bm25)
+        ids = [r["id"] for r in retriever.search("session ERR-4021", limit=3)]
+
+        assert set(ids[:2]) == {"2", "3"}
+        assert set(retriever.last_timings) == {"dense_ms", "sparse_ms", "fusion_ms", "total_ms"}
+        assert [r["id"] for r in retriever.search("ERR-4021", mode="sparse")][0] == "3"
+        assert [r["id"] for r in retriever.search("ERR-4021", mode="dense")] == ["2"]
+        with pytest.raises(ValueError):
+            retriever.search("x", mode="fuzzy")
+
+    def test_rerank_orders_head_and_respects_budget(self, bm25):
+        candidates = [{"id": str(i), "text": "x" * i, "metadata": {}, "score": 0.0} for i in range(1, 7)]
+
+        reranked = StubReranker(batch_size=2).rerank("q", candidates)
+        assert [c["id"] for c in reranked] == ["6", "5", "4", "3", "2", "1"]
+
+        slow = StubReranker(delay=0.03, budget_ms=10, batch_size=2)
+        partial = slow.rerank("q", candidates)
+        assert slow.scored == 2
+        assert [c["id"] for c in partial] == ["2", "1", "3", "4", "5", "6"]
+        assert "reranked" not in partial[2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,147 @@
+"""
+Unit tests for the batched RAG ingestion pipeline.
+"""
+import queue
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from services.embedding_cache import CachedEmbeddings, EmbeddingCache
+from services.embeddings import OllamaEmbeddingBackend
+from services.ingestion_pipeline import IngestionPipeline
+
+
+class FakeEmbeddings:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def embed_documents(self, texts):
+        if self.gate is not None:
+            self.gate.wait()
+        self.calls.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+
+class FakeRAG:
+    """Stands in for RAGService: paragraph splitting and recorded upserts."""
+
+    def __init__(self, gate=None):
+        self.embeddings = FakeEmbeddings(gate)
+        self.upserts = []
+
+    def split_text(self, text, metadata=None):
+        return [SimpleNamespace(page_content=p, metadata=metadata or {}) for p in text.split("\n\n")]
+
+    def upsert_chunks(self, collection_name, chunks, vectors, wait=True):
+        self.upserts.append((collection_name, len(chunks), wait))
+        return len(chunks)
+
+
+class FakeOllamaSession:
+    """Answers /api/embed requests and records each HTTP call."""
+
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append((url, list(json["input"])))
+        vectors = [[float(len(text)), 1.0] for text in json["input"]]
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {"embeddings": vectors})
+
+
+class TestIngestionPipeline:
+    """Test coalescing, bulk upserts, flush and backpressure."""
+
+    def test_coalesces_texts_into_few_batches(self):
+        rag = FakeRAG()
+        pipeline = IngestionPipeline(rag, linger=0.2)
+        for i in range(100):
+            pipeline.submit(f"message {i}", "long_term_memory")
+
+        assert pipeline.flush(timeout=5)
+        stats = pipeline.get_stats()
+        assert stats["ingested_texts"] == 100
+        assert stats["ingested_chunks"] == 100
+        assert sum(rag.embeddings.calls) == 100
+        assert len(rag.embeddings.calls) < 10
+        assert all(wait is False for _, _, wait in rag.upserts)
+        pipeline.close()
+
+    def test_micro_batches_respect_token_budget(self):
+        rag = FakeRAG()
+        pipeline = IngestionPipeline(rag, max_batch_tokens=30, linger=0.2)
+        pipeline.submit("\n\n".join(["x" * 40] * 6), "docs")  # 11 tokens per chunk
+
+        assert pipeline.flush(timeout=5)
+        assert rag.embeddings.calls == [2, 2, 2]
+        pipeline.close()
+
+    def test_one_ollama_request_per_batch(self):
+        rag = FakeRAG()
+        backend = OllamaEmbeddingBackend("http://ollama:11434/")
+        backend.session = FakeOllamaSession()
+        rag.embeddings = CachedEmbeddings(backend, model="ollama:test", cache=EmbeddingCache())
+        pipeline = IngestionPipeline(rag, max_batch_tokens=30, linger=0.2)
+        pipeline.submit("\n\n".join(f"{n}" * 40 for n in range(6)), "docs")
+
+        assert pipeline.flush(timeout=5)
+        assert pipeline.get_stats()["embedding_batches"] == 3
+        assert [url for url, _ in backend.session.posts] == ["http://ollama:11434/api/embed"] * 3
+        assert [len(texts) for _, texts in backend.session.posts] == [2, 2, 2]
+        pipeline.close()
+
+    def test_groups_upserts_by_collection(self):
+        rag = FakeRAG()
+        pipeline = IngestionPipeline(rag, linger=0.2, upsert_batch_size=3)
+        for i in range(4):
+            pipeline.submit(f"a{i}", "a")
+        pipeline.submit("b", "b")
+
+        assert pipeline.flush(timeout=5)
+        assert sorted(rag.upserts) == [("a", 1, False), ("a", 3, False), ("b", 1, False)]
+        pipeline.close()
+
+    def test_backpressure_when_queue_full(self):
+        gate = threading.Event()
+        pipeline = IngestionPipeline(FakeRAG(gate), max_queue=2, linger=0)
+        pipeline.submit("first", "c")  # Picked up by the worker, which then blocks
+        while pipeline.get_stats()["queued"]:
+            time.sleep(0.001)
+        pipeline.submit("second", "c")
+        pipeline.submit("third", "c")
+
+        with pytest.raises(queue.Full):
+            pipeline.submit("fourth", "c", timeout=0.05)
+        assert not pipeline.flush(timeout=0.05)
+
+        gate.set()
+        assert pipeline.flush(timeout=5)
+        assert pipeline.get_stats()["ingested_texts"] == 3
+        pipeline.close()
+
+    def test_embedding_failure_is_counted(self):
+        rag = FakeRAG()
+        rag.embeddings.embed_documents = lambda texts: (_ for _ in ()).throw(RuntimeError("down"))
+        pipeline = IngestionPipeline(rag, linger=0)
+        pipeline.submit("hello", "c")
+
+        assert pipeline.flush(timeout=5)
+        assert pipeline.get_stats()["failed_chunks"] == 1
+        assert rag.upserts == []
+        pipeline.close()
+
+    @pytest.mark.asyncio
+    async def test_async_submit_and_flush(self):
+        rag = FakeRAG()
+        pipeline = IngestionPipeline(rag, linger=0.05)
+        for i in range(10):
+            await pipeline.asubmit(f"m{i}", "c")
+
+        assert await pipeline.aflush(timeout=5)
+        assert pipeline.get_stats()["ingested_chunks"] == 10
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -89,5 +89,64 @@ class TestMemory(unittest.TestCase):
         self.assertEqual(len(new_memory.memory), 3)  # System + messages
         self.assertEqual(new_memory.memory[1]['content'], "Hello")
 
+    def test_get_packs_to_token_budget(self):
+        memory = Memory(self.system_prompt, memory_compression=False,
+                        token_counter=lambda text: len(text.split()), token_budget=10)
+        memory.schedule_summary = lambda upto: None
+        for i in range(6):
+            memory.push("user" if i % 2 == 0 else "assistant", f"message number {i}")
+        packed = memory.get()
+        self.assertEqual(packed[0]['content'], self.system_prompt)
+        self.assertEqual([m['content'] for m in packed[1:]], ["message number 4", "message number 5"])
+        self.assertEqual(len(memory.memory), 7)  # full history is kept
+
+    def test_latest_message_always_included(self):
+        memory = Memory(self.system_prompt, memory_compression=False,
+                        token_counter=lambda text: len(text.split()), token_budget=5)
+        memory.schedule_summary = lambda upto: None
+        memory.push("user", "a message that is much longer than the budget")
+        self.assertEqual(len(memory.get()), 2)
+
+    def test_rolling_summary_covers_dropped_messages(self):
+        memory = Memory(self.system_prompt, memory_compression=False,
+                        token_counter=lambda text: len(text.split()), token_budget=12, summary_tokens=50)
+        scheduled = []
+        memory.schedule_summary = scheduled.append
+        for i in range(6):
+            memory.push("user", f"message number {i}")
+        memory.get()
+        memory.update_summary(scheduled[-1])
+        self.assertIn("user: message number 0", memory.summary)
+        self.assertTrue(memory.get()[0]['content'].startswith(self.system_prompt))
+        self.assertIn("message number 0", memory.get()[0]['content'])
+        memory.clear()
+        self.assertEqual(memory.summary, "")
+
+    def test_model_summary_held_to_summary_tokens(self):
+        from services.summarization_service import SummarizationService
+        requested = []
+
+        def summarize_batch(texts, min_length, max_length):
+            # Model-style output: one long line that ignores max_length
+            requested.append(max_length)
+            return [" ".join(text.split()) for text in texts]
+
+        memory = Memory(self.system_prompt, memory_compression=False,
+                        token_counter=lambda text: len(text.split()), token_budget=50, summary_tokens=20)
+        memory.summarizer = SummarizationService(summarize_batch=summarize_batch)
+        scheduled = []
+        memory.schedule_summary = scheduled.append
+        for i in range(40):
+            memory.push("user", f"message number {i} with a few more words")
+            memory.get()
+            if scheduled:
+                memory.update_summary(scheduled.pop())
+
+        self.assertEqual(set(requested), {20})
+        self.assertLessEqual(memory.tokens(memory.summary), 20)
+        self.assertIn("message number", memory.summary)
+        packed = memory.get()
+        self.assertLessEqual(sum(memory.tokens(m['content']) for m in packed), 50)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
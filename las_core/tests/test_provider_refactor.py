@@ -6,6 +6,9 @@ import pytest
 from sources.provider_factory import ProviderFactory
 from sources.providers.base_provider import BaseProvider
 from sources.llm_provider import Provider
+from sources.providers.base_provider import ProviderConfig, usage_agent
+import services.cost_tracker as cost_tracker
+from services.cost_tracker import CostTracker, BudgetExceededError
 
 class TestProviderFactory:
     """Test provider factory functionality."""
@@ -117,3 +120,58 @@ class TestProviderFunctionality:
         
         assert isinstance(models, list)
         assert len(models) > 0
+
+class MeteredProvider(BaseProvider):
+    """Provider whose API reports token usage."""
+
+    @property
+    def provider_name(self) -> str:
+        return "openai"
+
+    def chat_completion(self, messages, stream=False, **kwargs):
+        self._report_usage({"prompt_tokens": 100, "completion_tokens": 20})
+        return "answer"
+
+    def get_langchain_llm(self):
+        return None
+
+    def list_models(self):
+        return [self.model]
+
+class TestProviderUsage:
+    """Test usage accounting and budget checks in the Provider wrapper."""
+
+    @pytest.fixture
+    def tracker(self, tmp_path, monkeypatch):
+        tracker = CostTracker(storage_dir=str(tmp_path), flush_interval_ms=10_000)
+        monkeypatch.setattr(cost_tracker, "_cost_tracker", tracker)
+        yield tracker
+        tracker.close()
+
+    @pytest.fixture
+    def provider(self):
+        provider = Provider("ollama", "llama2")
+        provider._provider = MeteredProvider(ProviderConfig(model="gpt-4o"))
+        return provider
+
+    def test_reported_usage_is_tracked(self, tracker, provider):
+        token = usage_agent.set("coder")
+        try:
+            assert provider.chat_completion([{"role": "user", "content": "hi"}]) == "answer"
+        finally:
+            usage_agent.reset(token)
+
+        summary = tracker.get_cost_summary("daily", group_by="agent")
+        assert summary["by_agent"]["coder"]["input_tokens"] == 100
+        assert summary["by_agent"]["coder"]["output_tokens"] == 20
+
+    def test_over_budget_agent_is_rejected(self, tracker, provider):
+        tracker.set_budget("coder", 0.01)
+        tracker.track_usage("openai", 0, 0, agent="coder", cost=0.02)
+
+        token = usage_agent.set("coder")
+        try:
+            with pytest.raises(BudgetExceededError):
+                provider.chat_completion([{"role": "user", "content": "hi"}])
+        finally:
+            usage_agent.reset(token)
@@ -0,0 +1,100 @@
+"""
+Unit tests for the Query Scheduler.
+"""
+import asyncio
+import pytest
+from services.query_scheduler import QueryScheduler, SchedulerFullError
+
+
+class TestQueryScheduler:
+    """Test bounded, fair query scheduling."""
+
+    @pytest.mark.asyncio
+    async def test_runs_queries_in_parallel_up_to_limit(self):
+        scheduler = QueryScheduler(max_concurrent=3)
+        peak = 0
+
+        async def query():
+            nonlocal peak
+            peak = max(peak, scheduler.running)
+            await asyncio.sleep(0.01)
+            return scheduler.running
+
+        results = await asyncio.gather(*(scheduler.run(f"s{i}", query) for i in range(10)))
+        assert peak == 3
+        assert all(r <= 3 for r in results)
+        assert scheduler.get_stats()["completed"] == 10
+        assert scheduler.running == 0 and scheduler.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_one_query_at_a_time_per_session(self):
+        scheduler = QueryScheduler(max_concurrent=4)
+        order = []
+
+        async def query(tag):
+            order.append(("start", tag))
+            await asyncio.sleep(0.01)
+            order.append(("end", tag))
+
+        await asyncio.gather(scheduler.run("a", lambda: query(1)), scheduler.run("a", lambda: query(2)))
+        assert order == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+    @pytest.mark.asyncio
+    async def test_round_robin_across_sessions(self):
+        scheduler = QueryScheduler(max_concurrent=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def query(tag):
+            if tag == "blocker":
+                await gate.wait()
+            order.append(tag)
+
+        blocker = asyncio.create_task(scheduler.run("x", lambda: query("blocker")))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(scheduler.run("a", lambda i=i: query(f"a{i}"))) for i in range(3)]
+        tasks.append(asyncio.create_task(scheduler.run("b", lambda: query("b0"))))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+        # Session b is admitted before a's backlog drains
+        assert order.index("b0") < order.index("a1")
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        scheduler = QueryScheduler(max_concurrent=1, max_queued=1)
+        gate = asyncio.Event()
+
+        running = asyncio.create_task(scheduler.run("a", gate.wait))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(scheduler.run("b", gate.wait))
+        await asyncio.sleep(0)
+
+        with pytest.raises(SchedulerFullError):
+            await scheduler.run("c", gate.wait)
+        gate.set()
+        await asyncio.gather(running, waiting)
+        assert scheduler.get_stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = QueryScheduler(max_concurrent=1)
+        gate = asyncio.Event()
+
+        running = asyncio.create_task(scheduler.run("a", gate.wait))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(scheduler.run("b", gate.wait))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert scheduler.queued == 0
+        gate.set()
+        await running
+        assert scheduler.running == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
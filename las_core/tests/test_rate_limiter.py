@@ -0,0 +1,128 @@
+"""
+Unit tests for the GCRA rate limiter and its middleware.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from middleware.security_middleware import RateLimitMiddleware
+from services.rate_limiter import (
+    MemoryRateLimitStore, RateLimit, RateLimiter, RedisRateLimitStore, parse_limits
+)
+
+
+class FailingStore:
+    backend = "redis"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def hit(self, key, rate):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+
+class TestRateLimiter:
+    """Test GCRA limits, bounded local store, rules and Redis fallback."""
+
+    def test_parse(self):
+        assert RateLimit.parse("5/minute") == RateLimit(5, 60)
+        assert RateLimit.parse("10/30s") == RateLimit(10, 30)
+        assert RateLimit.parse("1000 / hour") == RateLimit(1000, 3600)
+        for bad in ("5", "0/minute", "5/fortnight"):
+            with pytest.raises(ValueError):
+                RateLimit.parse(bad)
+        assert parse_limits("alice=5/minute, role:admin=100/hour") == {
+            "alice": RateLimit(5, 60), "role:admin": RateLimit(100, 3600)
+        }
+
+    async def test_gcra_burst_then_spacing(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr("services.rate_limiter.time.monotonic", lambda: now[0])
+        store = MemoryRateLimitStore()
+        rate = RateLimit(5, 60)
+
+        results = [await store.hit("k", rate) for _ in range(6)]
+        assert [r.allowed for r in results] == [True] * 5 + [False]
+        assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+        assert results[5].retry_after == pytest.approx(12)
+
+        now[0] += 12  # One emission interval later
+        assert (await store.hit("k", rate)).allowed
+        assert not (await store.hit("k", rate)).allowed
+        assert (await store.hit("other", rate)).allowed
+
+    async def test_local_store_is_bounded(self):
+        store = MemoryRateLimitStore(max_keys=100)
+        for n in range(1000):
+            await store.hit(f"client{n}", RateLimit(10, 60))
+        assert len(store) == 100
+
+    async def test_rules(self):
+        limiter = RateLimiter(
+            default=RateLimit(100, 60),
+            routes={"/api/v1/auth": RateLimit(10, 60), "/api/v1/auth/login": RateLimit(2, 60)},
+            users={"alice": RateLimit(1000, 60), "role:admin": RateLimit(500, 60)}
+        )
+        assert limiter.limits_for("/api/v1/auth/login") == [
+            ("route:/api/v1/auth/login", RateLimit(2, 60)), ("global", RateLimit(100, 60))
+        ]
+        assert limiter.limits_for("/api/v1/auth/logout")[0] == ("route:/api/v1/auth", RateLimit(10, 60))
+        assert limiter.limits_for("/api/v1/authx") == [("global", RateLimit(100, 60))]
+        assert limiter.limits_for("/x", user="alice") == [("global", RateLimit(1000, 60))]
+        assert limiter.limits_for("/x", user="bob", role="admin") == [("global", RateLimit(500, 60))]
+
+        for _ in range(2):
+            assert (await limiter.check("ip:1", "/api/v1/auth/login")).allowed
+        denied = await limiter.check("ip:1", "/api/v1/auth/login")
+        assert not denied.allowed and denied.limit == 2
+        assert (await limiter.check("ip:2", "/api/v1/auth/login")).allowed
+
+    async def test_falls_back_when_redis_fails(self):
+        store = FailingStore()
+        limiter = RateLimiter(store=store, default=RateLimit(2, 60), retry_interval=60)
+
+        results = [await limiter.check("ip:1", "/x") for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+        assert store.calls == 1  # Not retried until retry_interval passes
+        assert limiter.get_stats()["store_available"] is False
+
+    async def test_redis_store_calls_script(self):
+        calls = []
+
+        class Client:
+            def register_script(self, script):
+                assert "redis.call('TIME')" in script
+
+                async def run(keys, args):
+                    calls.append((keys, args))
+                    return [0, 0, 1500, 60000]
+                return run
+
+        result = await RedisRateLimitStore(Client(), key_prefix="t:").hit("global:ip:1", RateLimit(5, 60))
+        assert calls == [(["t:global:ip:1"], [12000.0, 60000.0])]
+        assert not result.allowed and result.retry_after == 1.5
+        assert result.headers()["Retry-After"] == "2"
+
+    def test_middleware(self):
+        app = FastAPI()
+
+        @app.get("/api/v1/auth/login")
+        async def login():
+            return {"ok": True}
+
+        limiter = RateLimiter(routes={"/api/v1/auth/login": RateLimit(2, 60)})
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+        client = TestClient(app)
+
+        first = client.get("/api/v1/auth/login")
+        assert first.status_code == 200
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        client.get("/api/v1/auth/login")
+        denied = client.get("/api/v1/auth/login")
+        assert denied.status_code == 429
+        assert denied.json()["error"] == "Rate limit exceeded"
+        assert int(denied.headers["Retry-After"]) >= 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
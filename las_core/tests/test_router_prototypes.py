@@ -0,0 +1,68 @@
+"""
+Unit tests for the precomputed router prototypes.
+"""
+import threading
+import numpy as np
+import pytest
+from sources.router_prototypes import PrototypeHead, fingerprint
+
+
+class TestRouterPrototypes:
+    """Test prototype scoring, persistence and fingerprinting."""
+
+    @pytest.fixture
+    def head(self):
+        return PrototypeHead.from_examples({
+            "talk": [np.array([1.0, 0.0]), np.array([0.8, 0.0])],
+            "code": [np.array([0.0, 1.0])],
+            "empty": []
+        })
+
+    def test_prototypes_are_label_means(self, head):
+        assert head.labels == ["code", "talk"]
+        assert head.prototypes[1] == pytest.approx([0.9, 0.0])
+
+    def test_predict_nearest_label(self, head):
+        predictions = head.predict(np.array([0.95, 0.05]))
+
+        assert predictions[0][0] == "talk"
+        assert sum(score for _, score in predictions) == pytest.approx(1.0)
+        assert head.predict(np.array([0.0, 2.0]), k=1) == [("code", 1.0)]
+
+    def test_save_and_memory_map(self, tmp_path, head):
+        head.save(str(tmp_path), "task", "abc")
+        loaded = PrototypeHead.load(str(tmp_path), "task", "abc")
+
+        assert isinstance(loaded.prototypes, np.memmap)
+        assert loaded.labels == head.labels
+        assert loaded.predict(np.array([0.0, 1.0])) == head.predict(np.array([0.0, 1.0]))
+
+    def test_concurrent_saves(self, tmp_path, head):
+        threads = [threading.Thread(target=head.save, args=(str(tmp_path), "task", "abc")) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["task.json", "task.npy"]
+        assert PrototypeHead.load(str(tmp_path), "task", "abc").labels == head.labels
+
+    def test_stale_or_missing_heads_are_rebuilt(self, tmp_path, head):
+        head.save(str(tmp_path), "task", "abc")
+
+        assert PrototypeHead.load(str(tmp_path), "task", "other") is None
+        assert PrototypeHead.load(str(tmp_path), "complexity", "abc") is None
+
+    def test_fingerprint_tracks_model_and_examples(self, tmp_path):
+        (tmp_path / "config.json").write_text("{}")
+        examples = [("hi", "talk"), ("write code", "code")]
+        key = fingerprint(str(tmp_path), examples)
+
+        assert fingerprint(str(tmp_path), list(reversed(examples))) == key
+        assert fingerprint(str(tmp_path), examples + [("hello", "talk")]) != key
+        (tmp_path / "model.safetensors").write_text("weights")
+        assert fingerprint(str(tmp_path), examples) != key
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+"""
+Unit tests for the batched, cached routing engine.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from sources.routing_engine import RoutingEngine, RoutingDecision, normalize_query
+
+
+class FakeClassifier:
+    """Records every batch and labels texts by keyword."""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def __call__(self, texts):
+        time.sleep(self.delay)
+        self.batches.append(list(texts))
+        return [RoutingDecision("coding" if "script" in t else "talk", 0.9, "LOW", 0.8, t) for t in texts]
+
+
+class TestRoutingEngine:
+    """Test decision caching, micro-batching and error handling."""
+
+    @pytest.fixture
+    def classifier(self):
+        return FakeClassifier()
+
+    def test_normalize_query(self):
+        assert normalize_query("  Hello,   World!! ") == "hello, world"
+        assert normalize_query("HI") == normalize_query("hi?")
+
+    def test_decisions_cached_by_normalized_text(self, classifier):
+        prepared = []
+        engine = RoutingEngine(classifier, preprocess=lambda t: prepared.append(t) or t.strip(), max_wait_ms=0)
+
+        assert engine.route("Write a script").task == "coding"
+        assert engine.route("  write a SCRIPT. ").task == "coding"
+        assert classifier.batches == [["Write a script"]]
+        assert prepared == ["Write a script"]
+        assert engine.get_stats()["cache_hits"] == 1
+
+    def test_concurrent_requests_share_one_batch(self):
+        classifier = FakeClassifier()
+        engine = RoutingEngine(classifier, max_batch=8, max_wait_ms=200)
+        results = {}
+        barrier = threading.Barrier(8)
+
+        def worker(i):
+            barrier.wait()
+            results[i] = engine.route(f"query {i}" if i % 2 else "write a script")
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sum(len(b) for b in classifier.batches) == 5  # 4 unique + 1 shared
+        assert len(classifier.batches) <= 2
+        assert all(results[i].task == "coding" for i in range(0, 8, 2))
+        assert engine.get_stats()["requests"] == 8
+
+    def test_batch_size_is_capped(self):
+        classifier = FakeClassifier(delay=0.05)
+        engine = RoutingEngine(classifier, max_batch=2, max_wait_ms=50)
+        threads = [threading.Thread(target=engine.route, args=(f"q{i}",)) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert max(len(b) for b in classifier.batches) <= 2
+        assert sum(len(b) for b in classifier.batches) == 5
+
+    def test_leader_stops_once_answered(self):
+        runs = []
+
+        def classify(texts):
+            time.sleep(0.02)
+            runs.append((threading.current_thread().name, texts[0]))
+            return [RoutingDecision("talk", 0.9, "LOW", 0.8, t) for t in texts]
+
+        engine = RoutingEngine(classify, max_batch=1, max_wait_ms=0)
+        threads = [threading.Thread(target=engine.route, args=(f"q{i}",), name=f"q{i}") for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        order = [text for _, text in runs]
+        assert sorted(order) == [f"q{i}" for i in range(6)]
+        for position, (thread, _) in enumerate(runs):
+            # Threads only run batches up to and including their own
+            assert position <= order.index(thread)
+
+    def test_failures_propagate_and_are_not_cached(self, classifier):
+        calls = []
+
+        def flaky(texts):
+            calls.append(texts)
+            if len(calls) == 1:
+                raise RuntimeError("model not ready")
+            return classifier(texts)
+
+        engine = RoutingEngine(flaky, max_wait_ms=0)
+        with pytest.raises(RuntimeError):
+            engine.route("hello")
+        assert engine.route("hello").task == "talk"
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_async_route(self, classifier):
+        engine = RoutingEngine(classifier, max_wait_ms=50)
+        decisions = await asyncio.gather(*(engine.aroute(f"async {i}") for i in range(4)))
+
+        assert [d.text for d in decisions] == [f"async {i}" for i in range(4)]
+        assert engine.get_stats()["batches"] < 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,104 @@
+"""
+Unit tests for the pure-ASGI security middleware.
+"""
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from middleware.security_middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+from services.rate_limiter import RateLimit, RateLimiter
+
+
+async def call(app, path):
+    messages = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [], "client": ("10.0.0.1", 5000), "server": ("test", 80),
+    }
+
+    requested = []
+
+    async def receive():
+        if requested:
+            # Client stays connected until the response completes
+            await asyncio.Event().wait()
+        requested.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+class TestSecurityMiddleware:
+    """Test header injection, streaming pass-through and rate limit headers."""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+
+        @app.get("/health")
+        async def health():
+            return {"status": "healthy"}
+
+        @app.get("/framed")
+        async def framed():
+            return PlainTextResponse("ok", headers={"X-Frame-Options": "SAMEORIGIN"})
+
+        @app.get("/events")
+        async def events():
+            async def stream():
+                for n in range(3):
+                    yield f"data: {n}\n\n"
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(default=RateLimit(3, 60)))
+        app.add_middleware(SecurityHeadersMiddleware)
+        return app
+
+    def test_security_and_limit_headers(self, app):
+        response = TestClient(app).get("/health")
+        assert response.status_code == 200
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert response.headers["strict-transport-security"].startswith("max-age=")
+        assert response.headers["x-ratelimit-limit"] == "3"
+        assert response.headers["x-ratelimit-remaining"] == "2"
+
+    def test_headers_replace_existing(self, app):
+        response = TestClient(app).get("/framed")
+        assert response.headers.get_list("x-frame-options") == ["DENY"]
+
+    async def test_streaming_is_not_buffered(self, app):
+        messages = await call(app, "/events")
+        bodies = [m for m in messages if m["type"] == "http.response.body" and m.get("body")]
+        assert [m["body"] for m in bodies] == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n"]
+        start = dict(messages[0]["headers"])
+        assert start[b"x-frame-options"] == b"DENY"
+
+    async def test_denied_request_gets_security_headers(self, app):
+        for _ in range(3):
+            await call(app, "/health")
+        messages = await call(app, "/health")
+        headers = dict(messages[0]["headers"])
+        assert messages[0]["status"] == 429
+        assert b"retry-after" in headers
+        assert headers[b"x-content-type-options"] == b"nosniff"
+
+    async def test_non_http_scopes_pass_through(self):
+        seen = []
+
+        async def inner(scope, receive, send):
+            seen.append(scope["type"])
+
+        app = SecurityHeadersMiddleware(RateLimitMiddleware(inner, limiter=RateLimiter(default=RateLimit(1, 60))))
+        await app({"type": "lifespan"}, None, None)
+        await app({"type": "websocket", "path": "/ws"}, None, None)
+        assert seen == ["lifespan", "websocket"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
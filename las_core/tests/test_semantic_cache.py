@@ -0,0 +1,183 @@
+"""
+Unit tests for the Semantic Cache.
+"""
+import threading
+import pytest
+import numpy as np
+from services.embeddings import HashingEmbeddingBackend, normalize
+from services.semantic_cache import SemanticCache, VectorIndex
+
+
+class TestVectorIndex:
+    """Test the contiguous vector index."""
+
+    def test_search_returns_best_slot(self):
+        index = VectorIndex(dimension=4, initial_capacity=2)
+        index.add(normalize(np.array([1, 0, 0, 0])), offset=0, length=1, expires_at=0.0)
+        index.add(normalize(np.array([0, 1, 0, 0])), offset=1, length=1, expires_at=0.0)
+        slot = index.add(normalize(np.array([0, 0, 1, 0])), offset=2, length=1, expires_at=0.0)  # Forces growth
+
+        found, similarity = index.search(normalize(np.array([0, 0.1, 1, 0])))
+        assert found == slot
+        assert similarity > 0.9
+        assert index.capacity == 4
+
+    def test_removed_slot_is_reused(self):
+        index = VectorIndex(dimension=2)
+        slot = index.add(normalize(np.array([1, 0])), offset=0, length=10, expires_at=0.0)
+
+        assert index.remove(slot) == 10
+        assert index.search(normalize(np.array([1, 0]))) == (None, 0.0)
+        assert index.add(normalize(np.array([0, 1])), offset=10, length=1, expires_at=0.0) == slot
+
+    def test_memory_mapped_reopen(self, tmp_path):
+        paths = dict(vectors_path=tmp_path / "p.npy", slots_path=tmp_path / "p.slots.0.npy")
+        index = VectorIndex(dimension=2, initial_capacity=1, **paths)
+        index.add(normalize(np.array([1, 0])), offset=0, length=5, expires_at=1.0)
+        index.add(normalize(np.array([0, 1])), offset=5, length=5, expires_at=1.0)
+        index.flush()
+
+        reopened = VectorIndex(dimension=2, **paths)
+        assert reopened.count == 2
+        assert reopened.search(normalize(np.array([0, 1])))[0] == 1
+
+
+class TestSemanticCache:
+    """Test the Semantic Cache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a cache backed by the dependency-free hashing embeddings."""
+        return SemanticCache(storage_dir=str(tmp_path), embedding_backend=HashingEmbeddingBackend())
+
+    def test_hit_on_similar_query(self, cache):
+        metadata = {"provider": "ollama", "model": "llama3"}
+        cache.set("How do I reverse a list in Python?", "Use reversed()", metadata)
+
+        result = cache.get("how do I reverse a list in python", metadata)
+        assert result is not None
+        assert result["response"] == "Use reversed()"
+
+    def test_partitioned_by_provider_and_model(self, cache):
+        cache.set("What is Docker?", "A container runtime", {"provider": "ollama", "model": "llama3"})
+
+        assert cache.get("What is Docker?", {"provider": "openai", "model": "gpt-4o"}) is None
+        assert cache.get("What is Docker?") is not None
+        assert cache.get_stats()["partitions"] == 1
+
+    def test_miss_on_unrelated_query(self, cache):
+        cache.set("What is Docker?", "A container runtime")
+        assert cache.get("Recommend a pasta recipe") is None
+
+    def test_invalidate_query(self, cache):
+        cache.set("What is Docker?", "A container runtime")
+        cache.set("Recommend a pasta recipe", "Carbonara")
+
+        cache.invalidate("What is Docker?")
+        assert cache.get_stats()["cache_size"] == 1
+
+    def test_embedding_runs_outside_lock(self, tmp_path):
+        locked = []
+
+        class ProbingBackend(HashingEmbeddingBackend):
+            def embed_batch(self, texts):
+                # Another thread can take the cache lock while we embed
+                def probe():
+                    locked.append(cache._lock.acquire(timeout=1))
+                    if locked[-1]:
+                        cache._lock.release()
+                thread = threading.Thread(target=probe)
+                thread.start()
+                thread.join()
+                return super().embed_batch(texts)
+
+        cache = SemanticCache(storage_dir=str(tmp_path), embedding_backend=ProbingBackend())
+        cache.set("What is Docker?", "A container runtime")
+        cache.get("What is Docker?")
+        cache.invalidate("What is Docker?")
+        assert locked == [True, True, True]
+
+    def test_persists_across_instances(self, tmp_path, cache):
+        cache.set("What is Docker?", "A container runtime")
+
+        cache.close()
+
+        reloaded = SemanticCache(storage_dir=str(tmp_path), embedding_backend=HashingEmbeddingBackend())
+        assert reloaded.get("What is Docker?")["response"] == "A container runtime"
+
+    def test_insert_appends_to_log(self, cache):
+        cache.set("What is Docker?", "A container runtime")
+        size = cache.get_stats()["log_bytes"]
+        cache.set("Recommend a pasta recipe", "Carbonara")
+
+        assert cache.get_stats()["log_bytes"] > size
+        assert not (cache.storage_dir / "semantic_cache.json").exists()
+
+    def test_compaction_drops_dead_records(self, tmp_path, cache):
+        cache.set("What is Docker?", "A container runtime")
+        cache.set("Recommend a pasta recipe", "Carbonara")
+        cache.invalidate("What is Docker?")
+        assert cache.get_stats()["dead_bytes"] > 0
+
+        cache.compact()
+        stats = cache.get_stats()
+        assert stats["dead_bytes"] == 0
+        assert stats["cache_size"] == 1
+        assert cache.get("Recommend a pasta recipe")["response"] == "Carbonara"
+
+        cache.close()
+        reloaded = SemanticCache(storage_dir=str(tmp_path), embedding_backend=HashingEmbeddingBackend())
+        assert reloaded.generation == 1
+        assert reloaded.get("Recommend a pasta recipe")["response"] == "Carbonara"
+
+    def test_embedding_model_change_resets_storage(self, tmp_path, cache):
+        cache.set("What is Docker?", "A container runtime")
+        cache.close()
+
+        reloaded = SemanticCache(storage_dir=str(tmp_path), embedding_backend=HashingEmbeddingBackend(dimension=64))
+        assert reloaded.get_stats()["cache_size"] == 0
+
+    def test_expired_entries_are_dropped(self, tmp_path):
+        cache = SemanticCache(storage_dir=str(tmp_path), ttl_hours=0, embedding_backend=HashingEmbeddingBackend())
+        cache.set("What is Docker?", "A container runtime")
+
+        assert cache.get("What is Docker?") is None
+        stats = cache.get_stats()
+        assert stats["expirations"] == 1
+        assert stats["cache_size"] == 0
+
+    def test_lru_eviction_on_max_entries(self, tmp_path):
+        cache = SemanticCache(storage_dir=str(tmp_path), max_entries=2, embedding_backend=HashingEmbeddingBackend())
+        cache.set("What is Docker?", "A container runtime")
+        cache.set("Recommend a pasta recipe", "Carbonara")
+        cache.get("What is Docker?")  # Pasta is now least recently used
+        cache.set("Explain TCP handshakes", "SYN, SYN-ACK, ACK")
+
+        stats = cache.get_stats()
+        assert stats["cache_size"] == 2
+        assert stats["evictions"] == 1
+        assert stats["evicted_bytes"] > 0
+        assert cache.get("Recommend a pasta recipe") is None
+        assert cache.get("What is Docker?") is not None
+
+    def test_lfu_eviction_on_max_bytes(self, tmp_path):
+        cache = SemanticCache(storage_dir=str(tmp_path), eviction_policy="lfu",
+                              embedding_backend=HashingEmbeddingBackend())
+        cache.set("What is Docker?", "A container runtime")
+        cache.get("What is Docker?")
+        cache.get("What is Docker?")
+        cache.set("Recommend a pasta recipe", "Carbonara")
+        cache.max_bytes = cache.get_stats()["total_bytes"]
+        cache.set("Explain TCP handshakes", "SYN, SYN-ACK, ACK")
+
+        assert cache.get_stats()["total_bytes"] <= cache.max_bytes
+        assert cache.get("What is Docker?") is not None
+        assert cache.get("Recommend a pasta recipe") is None
+
+    def test_unknown_eviction_policy(self, tmp_path):
+        with pytest.raises(ValueError):
+            SemanticCache(storage_dir=str(tmp_path), eviction_policy="fifo")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,88 @@
+"""
+Unit tests for the shared, batched summarization service.
+"""
+import asyncio
+import threading
+import pytest
+from services.summarization_service import SummarizationService
+
+LONG_TEXT = "The quick brown fox jumps over the lazy dog. " * 10
+
+
+class RecordingSummarizer:
+    """Fake model returning the first word of each text and recording batches."""
+
+    def __init__(self, gate=None):
+        self.batches = []
+        self.gate = gate
+
+    def __call__(self, texts, min_length, max_length):
+        if self.gate is not None:
+            self.gate.wait()
+        self.batches.append((len(texts), min_length, max_length))
+        return [f"summary of {text.split()[0]}" for text in texts]
+
+
+class TestSummarizationService:
+    """Test dynamic batching, futures and failure handling."""
+
+    def test_jobs_are_batched(self):
+        gate = threading.Event()
+        model = RecordingSummarizer(gate)
+        service = SummarizationService(summarize_batch=model, max_batch=4, linger=0.05)
+        futures = [service.submit(f"text{i} " + LONG_TEXT) for i in range(6)]
+        gate.set()
+
+        assert [f.result(timeout=5) for f in futures] == [f"summary of text{i}" for i in range(6)]
+        assert sum(size for size, _, _ in model.batches) == 6
+        assert max(size for size, _, _ in model.batches) <= 4
+        assert service.get_stats()["batches"] == len(model.batches) < 6
+        service.close()
+
+    def test_short_texts_returned_unchanged(self):
+        model = RecordingSummarizer()
+        service = SummarizationService(summarize_batch=model)
+
+        assert service.summarize("too short", min_length=64) == "too short"
+        assert model.batches == []
+        assert service.get_stats()["short_circuited"] == 1
+        service.close()
+
+    def test_batch_uses_widest_length_bounds(self):
+        gate = threading.Event()
+        model = RecordingSummarizer(gate)
+        service = SummarizationService(summarize_batch=model, linger=0.05)
+        first = service.submit(LONG_TEXT, min_length=32, max_length=100)
+        second = service.submit(LONG_TEXT, min_length=64, max_length=200)
+        gate.set()
+        first.result(timeout=5)
+        second.result(timeout=5)
+
+        assert model.batches == [(2, 32, 200)]
+        service.close()
+
+    def test_failures_resolve_futures(self):
+        def broken(texts, min_length, max_length):
+            raise RuntimeError("out of memory")
+
+        service = SummarizationService(summarize_batch=broken, linger=0)
+        with pytest.raises(RuntimeError):
+            service.summarize(LONG_TEXT, timeout=5)
+        assert service.get_stats()["failed"] == 1
+        service.close()
+
+    @pytest.mark.asyncio
+    async def test_async_summarize(self):
+        service = SummarizationService(summarize_batch=RecordingSummarizer(), linger=0.02)
+        summaries = await asyncio.gather(*(service.asummarize(f"t{i} " + LONG_TEXT) for i in range(3)))
+
+        assert summaries == ["summary of t0", "summary of t1", "summary of t2"]
+        service.close()
+
+    def test_rejects_unknown_quantization(self):
+        with pytest.raises(ValueError):
+            SummarizationService(quantize="fp4")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
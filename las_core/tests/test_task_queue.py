@@ -0,0 +1,168 @@
+"""
+Unit tests for the priority task queue and its worker runtime.
+"""
+import asyncio
+import os
+import threading
+import time
+import pytest
+from services.task_queue import TaskQueue, TaskPriority, TaskStatus
+
+
+def square(payload):
+    """Process-pool handler (must be importable)."""
+    return {"value": payload["n"] ** 2, "pid": os.getpid()}
+
+
+def wait_for(queue, task_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        task = queue.get_task(task_id)
+        if task["status"] not in (TaskStatus.PENDING.value, TaskStatus.RUNNING.value):
+            return task
+        time.sleep(0.01)
+    raise AssertionError(f"Task {task_id} did not finish")
+
+
+class TestTaskQueue:
+    """Test ordering, execution, retries, cancellation and bookkeeping."""
+
+    @pytest.fixture
+    def queue(self):
+        queue = TaskQueue(max_workers=1, retry_backoff=0.01, aging_interval=0)
+        yield queue
+        queue.close()
+
+    def blocked(self, queue):
+        """Occupy the single worker until the returned event is set."""
+        gate = threading.Event()
+        queue.register_handler("block", lambda payload: gate.wait(5))
+        task_id = queue.enqueue("block", {})
+        while queue.get_task(task_id)["status"] != TaskStatus.RUNNING.value:
+            time.sleep(0.005)
+        return gate
+
+    def test_runs_by_priority(self, queue):
+        order = []
+        queue.register_handler("record", lambda payload: order.append(payload["name"]))
+        gate = self.blocked(queue)
+
+        ids = [queue.enqueue("record", {"name": name}, priority=priority) for name, priority in [
+            ("low", TaskPriority.LOW), ("normal", TaskPriority.NORMAL),
+            ("urgent", TaskPriority.URGENT), ("high", TaskPriority.HIGH), ("normal-2", TaskPriority.NORMAL)
+        ]]
+        gate.set()
+        for task_id in ids:
+            wait_for(queue, task_id)
+
+        assert order == ["urgent", "high", "normal", "normal-2", "low"]
+
+    def test_aging_prevents_starvation(self):
+        queue = TaskQueue(max_workers=1, aging_interval=0.05)
+        order = []
+        queue.register_handler("record", lambda payload: order.append(payload["name"]))
+        gate = self.blocked(queue)
+
+        old = queue.enqueue("record", {"name": "old-low"}, priority=TaskPriority.LOW)
+        time.sleep(0.2)  # Four aging intervals: LOW now outranks a fresh URGENT
+        new = queue.enqueue("record", {"name": "new-urgent"}, priority=TaskPriority.URGENT)
+        gate.set()
+        wait_for(queue, old)
+        wait_for(queue, new)
+
+        assert order == ["old-low", "new-urgent"]
+        assert queue.get_stats()["aged_dispatches"] >= 1
+        queue.close()
+
+    def test_retries_then_succeeds(self, queue):
+        attempts = []
+
+        async def flaky(payload):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RuntimeError("transient")
+            return "ok"
+
+        queue.register_handler("flaky", flaky)
+        task = wait_for(queue, queue.enqueue("flaky", {}))
+
+        assert task["status"] == TaskStatus.COMPLETED.value
+        assert task["result"] == "ok"
+        assert task["attempts"] == 3
+        assert queue.get_stats()["retries"] == 2
+
+    def test_fails_after_max_retries(self, queue):
+        def broken(payload):
+            raise ValueError("bad payload")
+
+        queue.register_handler("broken", broken, max_retries=1)
+        task = wait_for(queue, queue.enqueue("broken", {}))
+
+        assert task["status"] == TaskStatus.FAILED.value
+        assert task["attempts"] == 2
+        assert task["error"] == "bad payload"
+
+    def test_cancel_running_coroutine(self, queue):
+        started = threading.Event()
+
+        async def slow(payload):
+            started.set()
+            await asyncio.sleep(10)
+
+        queue.register_handler("slow", slow)
+        task_id = queue.enqueue("slow", {})
+        assert started.wait(5)
+
+        assert queue.cancel_task(task_id)
+        assert wait_for(queue, task_id)["status"] == TaskStatus.CANCELLED.value
+        assert queue.cancel_task(task_id) is False
+
+    def test_cancel_pending(self, queue):
+        queue.register_handler("record", lambda payload: payload)
+        gate = self.blocked(queue)
+        task_id = queue.enqueue("record", {})
+        kept = queue.enqueue("record", {}, priority=TaskPriority.HIGH)
+        assert queue.get_stats()["queued_by_priority"][TaskPriority.NORMAL.value] == 1
+
+        assert queue.cancel_task(task_id)
+        # The cancelled entry is still in the heap but no longer counted
+        queued = queue.get_stats()["queued_by_priority"]
+        assert queued[TaskPriority.NORMAL.value] == 0
+        assert queued[TaskPriority.HIGH.value] == 1
+        gate.set()
+        wait_for(queue, kept)
+        assert queue.get_task(task_id)["status"] == TaskStatus.CANCELLED.value
+        assert queue.get_stats()["cancelled"] == 1
+        assert sum(queue.get_stats()["queued_by_priority"].values()) == 0
+
+    def test_process_pool_handler(self, queue):
+        queue.register_handler("square", square, cpu_bound=True)
+        task = wait_for(queue, queue.enqueue("square", {"n": 7}), timeout=30)
+
+        assert task["result"]["value"] == 49
+        assert task["result"]["pid"] != os.getpid()
+
+    def test_counters_indexes_and_cleanup(self, queue):
+        queue.register_handler("echo", lambda payload: payload)
+        ids = [queue.enqueue("echo", {"i": i}, agent="coder" if i % 2 else "planner") for i in range(6)]
+        for task_id in ids:
+            wait_for(queue, task_id)
+
+        stats = queue.get_stats()
+        assert stats["total"] == 6
+        assert stats["completed"] == 6
+        assert stats["pending"] == 0
+        assert len(queue.list_tasks(status=TaskStatus.COMPLETED, agent="coder")) == 3
+        assert len(queue.list_tasks(agent="planner", limit=2)) == 2
+
+        assert queue.cleanup(max_age=0) == 6
+        assert queue.get_stats()["total"] == 0
+        assert queue.list_tasks(agent="coder") == []
+
+    def test_unknown_task_type_rejected(self, queue):
+        with pytest.raises(ValueError, match="No handler"):
+            queue.enqueue("missing", {})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,157 @@
+"""
+Unit tests for durable task storage and crash recovery.
+"""
+import threading
+import time
+import pytest
+from services.task_queue import TaskQueue, TaskPriority, TaskStatus
+from services.task_store import SQLiteTaskStore, create_task_store
+
+
+def wait_for(queue, task_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        task = queue.get_task(task_id)
+        if task["status"] not in (TaskStatus.PENDING.value, TaskStatus.RUNNING.value):
+            return task
+        time.sleep(0.01)
+    raise AssertionError(f"Task {task_id} did not finish")
+
+
+class TestTaskStore:
+    """Test write-through persistence, recovery, leases and idempotency."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return str(tmp_path / "tasks.sqlite3")
+
+    def test_pending_tasks_survive_restart(self, db_path):
+        gate = threading.Event()
+        first = TaskQueue(max_workers=1, store=SQLiteTaskStore(db_path))
+        first.register_handler("block", lambda payload: gate.wait(5))
+        first.register_handler("echo", lambda payload: payload)
+        blocked = first.enqueue("block", {})
+        while first.get_task(blocked)["status"] != TaskStatus.RUNNING.value:
+            time.sleep(0.01)  # Keep the only worker busy so the echo task stays queued
+        queued = first.enqueue("echo", {"n": 1}, priority=TaskPriority.HIGH, agent="coder")
+        first.close(timeout=0)
+
+        second = TaskQueue(max_workers=1, store=SQLiteTaskStore(db_path), visibility_timeout=60)
+        second.register_handler("block", lambda payload: None)
+        second.register_handler("echo", lambda payload: payload)
+        assert second.recover() == 2
+
+        task = wait_for(second, queued)
+        assert task["status"] == TaskStatus.COMPLETED.value
+        assert task["result"] == {"n": 1}
+        assert task["agent"] == "coder"
+        second.close()
+        gate.set()  # Only release the crashed worker once recovery is checked
+
+    def test_expired_lease_is_run_again(self, db_path):
+        store = SQLiteTaskStore(db_path)
+        queue = TaskQueue(store=store, visibility_timeout=0.1)
+        runs = []
+        queue.register_handler("echo", lambda payload: runs.append(1))
+        task = queue._new_task("echo", {})
+        store.add([task])
+        # Simulate a process that claimed the task and crashed
+        task["attempts"] = 1
+        assert store.claim(task, time.time() + 0.1, time.time())
+
+        assert queue.recover() == 1
+        result = wait_for(queue, task["id"])
+        assert result["status"] == TaskStatus.COMPLETED.value
+        assert result["attempts"] == 2
+        assert runs == [1]
+        queue.close()
+
+    def test_claim_is_exclusive(self, db_path):
+        first, second = SQLiteTaskStore(db_path), SQLiteTaskStore(db_path)
+        queue = TaskQueue()
+        queue.register_handler("echo", lambda payload: payload)
+        task = queue._new_task("echo", {})
+        first.add([task])
+
+        now = time.time()
+        assert first.claim(task, now + 60, now)
+        assert not second.claim(task, now + 60, now)
+        assert second.claim(task, now + 120, now + 61)  # Lease expired
+        first.close()
+        second.close()
+
+    def test_idempotency_key_returns_original(self, db_path):
+        queue = TaskQueue(store=SQLiteTaskStore(db_path))
+        queue.register_handler("echo", lambda payload: payload)
+
+        original = queue.enqueue("echo", {"n": 1}, idempotency_key="job-1")
+        assert queue.enqueue("echo", {"n": 2}, idempotency_key="job-1") == original
+        ids = queue.enqueue_many([
+            {"task_type": "echo", "payload": {"n": 3}, "idempotency_key": "job-2"},
+            {"task_type": "echo", "payload": {"n": 4}, "idempotency_key": "job-2"},
+            {"task_type": "echo", "payload": {"n": 5}, "idempotency_key": "job-1"},
+        ])
+        assert ids[0] == ids[1]
+        assert ids[2] == original
+        wait_for(queue, original)
+        assert queue.get_stats()["total"] == 2
+        queue.close()
+
+        restarted = TaskQueue(store=SQLiteTaskStore(db_path))
+        restarted.register_handler("echo", lambda payload: payload)
+        assert restarted.enqueue("echo", {}, idempotency_key="job-1") == original
+        restarted.close()
+
+    def test_two_queues_share_one_store(self, db_path):
+        first = TaskQueue(store=SQLiteTaskStore(db_path))
+        second = TaskQueue(store=SQLiteTaskStore(db_path))
+        for queue in (first, second):
+            queue.register_handler("echo", lambda payload: payload)
+
+        first_id = first.enqueue("echo", {"n": 1})
+        second_id = second.enqueue("echo", {"n": 2})
+        assert first_id != second_id
+        assert wait_for(first, first_id)["result"] == {"n": 1}
+        assert wait_for(second, second_id)["result"] == {"n": 2}
+        first.close()
+        second.close()
+
+    def test_memory_queue_idempotency(self):
+        queue = TaskQueue()
+        queue.register_handler("echo", lambda payload: payload)
+
+        assert queue.enqueue("echo", {}, idempotency_key="k") == queue.enqueue("echo", {}, idempotency_key="k")
+        queue.close()
+
+    def test_finished_tasks_readable_after_cleanup_and_deleted_by_retention(self, db_path):
+        queue = TaskQueue(store=SQLiteTaskStore(db_path))
+        queue.register_handler("echo", lambda payload: payload)
+        task_id = queue.enqueue("echo", {"n": 1})
+        wait_for(queue, task_id)
+
+        with queue._lock:
+            queue._forget(queue.tasks[task_id])
+        assert queue.get_task(task_id)["result"] == {"n": 1}
+
+        queue.cleanup(max_age=0)
+        assert queue.get_task(task_id) is None
+        queue.close()
+
+    def test_bulk_enqueue_and_unknown_backend(self, db_path):
+        queue = TaskQueue(store=create_task_store("sqlite", db_path))
+        queue.register_handler("echo", lambda payload: payload)
+
+        ids = queue.enqueue_many([{"task_type": "echo", "payload": {"i": i}} for i in range(200)])
+        assert len(set(ids)) == 200
+        for task_id in ids:
+            wait_for(queue, task_id)
+        assert queue.get_stats()["completed"] == 200
+        queue.close()
+
+        assert create_task_store("memory", db_path) is None
+        with pytest.raises(ValueError):
+            create_task_store("kafka", db_path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
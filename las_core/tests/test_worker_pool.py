@@ -0,0 +1,131 @@
+"""
+Unit tests for WorkerPool scheduling, slots and liveness.
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from services.worker_pool import WorkerPool, WorkerStatus
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == "/health" else 404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWorkerPool:
+    """Test capability index, load-aware selection, stats and health probes."""
+
+    @pytest.fixture
+    def pool(self):
+        return WorkerPool(heartbeat_timeout=30)
+
+    @pytest.fixture
+    def health_server(self):
+        server = HTTPServer(("127.0.0.1", 0), HealthHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_port}"
+        server.shutdown()
+
+    def test_capability_index(self, pool):
+        pool.register_worker("gpu", "http://gpu", ["summarize", "embed"])
+        pool.register_worker("cpu", "http://cpu", ["ingest"])
+
+        assert pool.find_available_worker("embed").id == "gpu"
+        assert pool.find_available_worker("ingest").id == "cpu"
+        assert pool.find_available_worker("browse") is None
+
+        assert pool.acquire_worker("t1", "embed").id == "gpu"
+        assert pool.find_available_worker("summarize") is None
+        pool.complete_task("gpu")
+        assert pool.find_available_worker("summarize").id == "gpu"
+
+    def test_multi_slot_worker(self, pool):
+        pool.register_worker("w", "http://w", ["x"], concurrency=3)
+        for n in range(3):
+            assert pool.acquire_worker(f"t{n}", "x").id == "w"
+        assert pool.get_worker("w").status == WorkerStatus.BUSY
+        assert pool.acquire_worker("t3", "x") is None
+
+        pool.complete_task("w", task_id="t1")
+        worker = pool.get_worker("w")
+        assert worker.status == WorkerStatus.IDLE
+        assert list(worker.active_tasks) == ["t0", "t2"]
+        assert worker.current_task == "t2"
+
+    def test_selection_prefers_less_loaded(self):
+        for selection in ("p2c", "least_loaded"):
+            pool = WorkerPool(selection=selection)
+            pool.register_worker("a", "http://a", ["x"], concurrency=4)
+            pool.register_worker("b", "http://b", ["x"], concurrency=4)
+            for n in range(3):
+                pool.assign_task("a", f"t{n}")
+            # With two candidates, p2c always compares both
+            assert pool.find_available_worker("x").id == "b"
+
+        with pytest.raises(ValueError):
+            WorkerPool(selection="random")
+
+    def test_p2c_balances_many_workers(self, pool):
+        for n in range(200):
+            pool.register_worker(f"w{n}", f"http://w{n}", ["x"], concurrency=4)
+        for n in range(400):
+            assert pool.acquire_worker(f"t{n}", "x") is not None
+
+        loads = [len(w.active_tasks) for w in pool.list_workers()]
+        assert sum(loads) == 400
+        assert max(loads) <= 4
+
+    def test_incremental_stats(self, pool):
+        pool.register_worker("a", "http://a", ["x"], concurrency=2)
+        pool.register_worker("b", "http://b", ["x"])
+        pool.assign_task("b", "t1")
+        pool.assign_task("a", "t2")
+        pool.complete_task("a", success=False)
+
+        stats = pool.get_stats()
+        assert stats["idle"] == 1 and stats["busy"] == 1 and stats["offline"] == 0
+        assert stats["total_slots"] == 3 and stats["busy_slots"] == 1
+        assert stats["total_tasks_failed"] == 1
+        assert stats["utilization"] == pytest.approx(33.33)
+
+        pool.unregister_worker("b")
+        stats = pool.get_stats()
+        assert stats["total_workers"] == 1 and stats["busy"] == 0 and stats["busy_slots"] == 0
+
+    def test_heartbeat_expiry(self):
+        pool = WorkerPool(heartbeat_timeout=0.05)
+        pool.register_worker("a", "http://a", ["x"])
+        pool.register_worker("b", "http://b", ["x"])
+        time.sleep(0.03)
+        pool.heartbeat("b")
+        time.sleep(0.03)
+
+        assert pool.find_available_worker("x").id == "b"
+        assert pool.get_worker("a").status == WorkerStatus.OFFLINE
+        assert pool.get_stats()["offline"] == 1
+
+        pool.heartbeat("a")
+        assert pool.get_worker("a").status == WorkerStatus.IDLE
+        assert pool.heartbeat("missing") is False
+
+    def test_parallel_health_probes(self, pool, health_server):
+        pool.register_worker("up", health_server, ["x"])
+        pool.register_worker("down", "http://127.0.0.1:1", ["x"])
+
+        health = asyncio.run(pool.check_health())
+        assert health == {"up": True, "down": False}
+        assert pool.get_worker("down").status == WorkerStatus.OFFLINE
+        assert pool.find_available_worker("x").id == "up"
+        assert pool.health_check("up") is True
+        assert pool.health_check("missing") is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])